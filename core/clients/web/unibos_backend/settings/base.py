@@ -515,6 +515,15 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'core.system.nodes.backend.tasks.cleanup_old_events',
         'schedule': timedelta(days=1),  # Daily cleanup of old events
     },
+    # Sync Tasks
+    'cleanup-export-logs': {
+        'task': 'core.system.sync.backend.tasks.cleanup_export_logs',
+        'schedule': timedelta(days=1),  # Daily range delete of expired export logs
+    },
+    'push-node-changes': {
+        'task': 'core.system.sync.backend.tasks.push_node_changes',
+        'schedule': timedelta(minutes=5),  # Node change log to the Hub (no-op on the Hub)
+    },
 }
 
 # Email Configuration
@@ -160,22 +160,32 @@ def aggregate_metrics(period: str = 'hourly'):
     """
     Aggregate system metrics for reporting
 
+    Rolls closed hours of SystemLog/ActivityLog into LogAggregation and
+    reports totals for the period from those rollups.
+
     Args:
         period: Aggregation period (hourly, daily, weekly)
 
     Returns:
         Dict with aggregated metrics
     """
-    # TODO: Implement actual metrics aggregation from database
+    from core.system.logging.backend.rollups import rollup_pending, summarize_hours
+
+    hours = {'hourly': 1, 'daily': 24, 'weekly': 24 * 7}.get(period, 1)
+    rolled_up = rollup_pending()
+    summary = summarize_hours(hours)
+
     return {
         'status': 'completed',
         'period': period,
         'aggregated_at': datetime.now().isoformat(),
+        'hours_rolled_up': len(rolled_up),
         'metrics': {
-            'api_requests': 0,
-            'active_users': 0,
-            'tasks_processed': 0,
-            'errors': 0,
+            'api_requests': summary.category_counts.get('api', 0),
+            'active_users': len(summary.user_actions),
+            'user_actions': summary.total_actions,
+            'errors': summary.level_counts['error_count'] + summary.level_counts['critical_count'],
+            'p95_response_ms': summary.sketch.quantile(0.95),
+            'p99_response_ms': summary.sketch.quantile(0.99),
         },
-        'note': 'Metrics aggregation placeholder',
     }
@@ -0,0 +1,130 @@
+"""
+Load test the async log collector
+
+Pushes system log records through a private AsyncLogCollector at a target
+rate (default 50k/s) and reports accepted/flushed/spilled/dropped counts,
+flush latency and how long the collector needed to drain. Inserted rows
+are deleted afterwards.
+
+Usage: python manage.py benchmark_log_collector --rate 50000 --seconds 5
+"""
+
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.system.logging.backend.middleware import AsyncLogCollector
+from core.system.logging.backend.models import SystemLog, LogLevel, LogCategory
+
+
+class Command(BaseCommand):
+    help = 'Load test AsyncLogCollector at a fixed log rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rate',
+            type=int,
+            default=50000,
+            help='Log records per second (default: 50000)',
+        )
+        parser.add_argument(
+            '--seconds',
+            type=int,
+            default=5,
+            help='Test duration in seconds (default: 5)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Collector batch size (default: LOG_COLLECTOR_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep inserted log rows',
+        )
+
+    def handle(self, *args, **options):
+        rate = options['rate']
+        seconds = options['seconds']
+        marker = f'benchmark-{uuid.uuid4().hex[:12]}'
+
+        spill_dir = tempfile.mkdtemp(prefix='log_collector_')
+        collector = AsyncLogCollector(
+            batch_size=options['batch_size'],
+            spill_path=Path(spill_dir) / 'spill.jsonl',
+        )
+        collector.start()
+
+        self.stdout.write(f'Pushing {rate:,} logs/s for {seconds}s (session_key={marker})')
+
+        # Send in 10ms slices so the offered load stays close to the target rate
+        per_slice = max(1, rate // 100)
+        total = rate * seconds
+        sent = 0
+        add_time = 0.0
+        started = time.perf_counter()
+
+        while sent < total:
+            slice_start = time.perf_counter()
+            for _ in range(min(per_slice, total - sent)):
+                collector.add_log('system', {
+                    'timestamp': timezone.now(),
+                    'level': LogLevel.INFO,
+                    'category': LogCategory.API,
+                    'message': f'GET /api/v1/benchmark/{sent} - 200',
+                    'request_method': 'GET',
+                    'request_path': f'/api/v1/benchmark/{sent}',
+                    'session_key': marker,
+                    'duration_ms': 3,
+                    'extra_data': {'status_code': 200},
+                })
+                sent += 1
+            elapsed = time.perf_counter() - slice_start
+            add_time += elapsed
+            if elapsed < 0.01:
+                time.sleep(0.01 - elapsed)
+
+        offered_seconds = time.perf_counter() - started
+
+        drain_start = time.perf_counter()
+        collector.stop(timeout=120)
+        drain_seconds = time.perf_counter() - drain_start
+        # Spilled logs are replayed once the queue drains; pick up any remainder
+        collector._replay_spill()
+
+        stats = collector.stats()
+        stored = SystemLog.objects.filter(session_key=marker).count()
+
+        self.stdout.write('')
+        self.stdout.write(f'Offered rate:        {sent / offered_seconds:,.0f} logs/s')
+        self.stdout.write(f'add_log() cost:      {add_time / sent * 1e6:.2f} us/call')
+        self.stdout.write(f'Drain after stop:    {drain_seconds:.2f}s')
+        self.stdout.write(
+            f'Effective write rate: {stored / (offered_seconds + drain_seconds):,.0f} logs/s'
+        )
+        self.stdout.write(f'Flush latency:       last {stats["last_flush_ms"]}ms, max {stats["max_flush_ms"]}ms')
+        self.stdout.write(
+            f'Queued {stats["queued"]:,}  flushed {stats["flushed"]:,}  '
+            f'spilled {stats["spilled"]:,}  replayed {stats["replayed"]:,}  '
+            f'dropped {stats["dropped"]:,}'
+        )
+        self.stdout.write(f'Rows stored:         {stored:,} / {sent:,}')
+
+        if stored + stats['dropped'] < sent:
+            self.stdout.write(self.style.WARNING(
+                f'{sent - stored - stats["dropped"]:,} logs still in spill file {collector.spill_path}'
+            ))
+        elif stats['dropped']:
+            self.stdout.write(self.style.WARNING(f'{stats["dropped"]:,} logs dropped'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No logs lost'))
+
+        if not options['keep']:
+            deleted, _ = SystemLog.objects.filter(session_key=marker).delete()
+            self.stdout.write(f'Cleaned up {deleted:,} benchmark rows')
@@ -3,92 +3,207 @@ High-performance logging middleware with async support
 Uses background threads for non-blocking log writes
 """
 
+import atexit
+import json
+import os
 import time
 import threading
 import logging
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+from django.db import close_old_connections
 from django.utils import timezone
-from django.core.cache import cache
-from queue import Queue
+from django.utils.dateparse import parse_datetime
+from queue import Queue, Empty, Full
 import traceback
 
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
+if PROMETHEUS_AVAILABLE:
+    LOGS_QUEUED = Counter(
+        'unibos_log_collector_queued_total', 'Log records accepted by the collector', ['log_type']
+    )
+    LOGS_FLUSHED = Counter(
+        'unibos_log_collector_flushed_total', 'Log records written to the database', ['log_type']
+    )
+    LOGS_SPILLED = Counter(
+        'unibos_log_collector_spilled_total', 'Log records written to the spill file'
+    )
+    LOGS_REPLAYED = Counter(
+        'unibos_log_collector_replayed_total', 'Spilled log records replayed into the database'
+    )
+    LOGS_DROPPED = Counter(
+        'unibos_log_collector_dropped_total', 'Log records lost (no spill file or spill failed)'
+    )
+    QUEUE_DEPTH = Gauge(
+        'unibos_log_collector_queue_depth', 'Log records waiting in the collector queue'
+    )
+    FLUSH_LATENCY = Histogram(
+        'unibos_log_collector_flush_seconds', 'Time to bulk insert one batch',
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+    )
+
+
 class AsyncLogCollector:
     """
     Asynchronous log collector using thread-safe queue
     Processes logs in background thread
+
+    - Blocking get with size/time flush triggers (no sleep polling)
+    - Overflow and failed batches go to an on-disk spill file (JSON lines)
+      instead of being dropped, and are replayed once the database keeps up
+    - Pending logs are flushed on process shutdown
+    - Counters are exported through prometheus_client when available
     """
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.queue = Queue(maxsize=10000)
-            cls._instance.running = False
-            cls._instance.thread = None
-        return cls._instance
-    
+
+    def __init__(self, queue_size=None, batch_size=None, flush_interval=None, spill_path=None):
+        self.queue_size = queue_size or getattr(settings, 'LOG_COLLECTOR_QUEUE_SIZE', 10000)
+        self.batch_size = batch_size or getattr(settings, 'LOG_COLLECTOR_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or getattr(settings, 'LOG_COLLECTOR_FLUSH_INTERVAL', 1.0)
+        if spill_path is None:
+            spill_path = getattr(settings, 'LOG_COLLECTOR_SPILL_PATH', None)
+            if spill_path is None and getattr(settings, 'LOGS_DIR', None):
+                spill_path = Path(settings.LOGS_DIR) / 'log_collector_spill.jsonl'
+        self.spill_path = Path(spill_path) if spill_path else None
+
+        self.queue = Queue(maxsize=self.queue_size)
+        self.running = False
+        self.thread = None
+        self._stopping = threading.Event()
+        self._spill_lock = threading.Lock()
+        self._atexit_registered = False
+
+        # Counters (also mirrored to Prometheus)
+        self.queued = 0
+        self.flushed = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
     def start(self):
         """Start the background processing thread"""
         if not self.running:
             self.running = True
-            self.thread = threading.Thread(target=self._process_queue, daemon=True)
+            self._stopping.clear()
+            self.thread = threading.Thread(
+                target=self._process_queue, name='log-collector', daemon=True
+            )
             self.thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
             logger.info("async log collector started")
-    
-    def stop(self):
-        """Stop the background thread"""
-        self.running = False
+
+    def stop(self, timeout=10):
+        """Flush pending logs and stop the background thread"""
+        if not self.running:
+            return
+        self._stopping.set()
         if self.thread:
-            self.thread.join(timeout=5)
-    
+            self.thread.join(timeout=timeout)
+        self.running = False
+
+        # Anything still queued after the timeout goes to disk
+        leftover = self._drain(self.queue_size)
+        if leftover:
+            self._spill(leftover)
+
     def add_log(self, log_type, log_data):
         """Add log to queue (non-blocking)"""
         try:
-            if not self.queue.full():
-                self.queue.put((log_type, log_data), block=False)
-            else:
-                # Queue full, log to file as fallback
-                logger.warning("log queue full, dropping log entry")
+            self.queue.put_nowait((log_type, log_data))
+        except Full:
+            # Database is not keeping up - spill instead of dropping
+            self._spill([(log_type, log_data)])
+            return
         except Exception as e:
             logger.error(f"error adding log to queue: {e}")
-    
+            return
+
+        self.queued += 1
+        if PROMETHEUS_AVAILABLE:
+            LOGS_QUEUED.labels(log_type).inc()
+
+    def stats(self):
+        """Collector counters"""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_size': self.queue_size,
+            'queued': self.queued,
+            'flushed': self.flushed,
+            'spilled': self.spilled,
+            'replayed': self.replayed,
+            'dropped': self.dropped,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'max_flush_ms': round(self.max_flush_ms, 2),
+            'spill_pending': bool(self.spill_path and self.spill_path.exists()),
+        }
+
+    def _drain(self, limit):
+        """Take up to `limit` queued logs without blocking"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
     def _process_queue(self):
         """Background thread to process log queue"""
-        from .models import SystemLog, ActivityLog, log_buffer
-        
         batch = []
-        last_flush = time.time()
-        
-        while self.running:
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
             try:
-                # Collect logs for batch insert
-                while not self.queue.empty() and len(batch) < 100:
-                    log_type, log_data = self.queue.get(timeout=0.1)
-                    batch.append((log_type, log_data))
-                
-                # Flush if batch is full or 5 seconds passed
-                if batch and (len(batch) >= 100 or time.time() - last_flush > 5):
-                    self._flush_batch(batch)
-                    batch.clear()
-                    last_flush = time.time()
-                
-                # Small sleep to prevent CPU spinning
-                if self.queue.empty():
-                    time.sleep(0.1)
-                    
+                # Block until a log arrives or the flush interval elapses
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except Empty:
+                    pass
+                batch.extend(self._drain(self.batch_size - len(batch)))
+
+                now = time.monotonic()
+                stopping = self._stopping.is_set()
+                if batch and (len(batch) >= self.batch_size or now >= deadline or stopping):
+                    if self._flush_batch(batch):
+                        self._replay_spill()
+                    batch = []
+
+                if PROMETHEUS_AVAILABLE:
+                    QUEUE_DEPTH.set(self.queue.qsize())
+
+                if now >= deadline:
+                    deadline = now + self.flush_interval
+
+                if stopping and not batch and self.queue.empty():
+                    break
+
             except Exception as e:
                 logger.error(f"error processing log queue: {e}")
-                time.sleep(1)
-    
-    def _flush_batch(self, batch):
-        """Flush batch of logs to database"""
+                if batch:
+                    self._spill(batch)
+                    batch = []
+
+        close_old_connections()
+
+    def _build_objects(self, batch):
+        """Turn queued (log_type, log_data) pairs into model instances"""
         from .models import SystemLog, ActivityLog
-        
+
         system_logs = []
         activity_logs = []
-        
+
         for log_type, log_data in batch:
             try:
                 if log_type == 'system':
@@ -96,16 +211,142 @@ class AsyncLogCollector:
                 elif log_type == 'activity':
                     activity_logs.append(ActivityLog(**log_data))
             except Exception as e:
+                self._count_dropped(1)
                 logger.error(f"error creating log object: {e}")
-        
-        # Bulk insert
+
+        return system_logs, activity_logs
+
+    def _flush_batch(self, batch):
+        """
+        Flush batch of logs to database
+
+        Returns True on success; failed batches are spilled to disk.
+        """
+        from .models import SystemLog, ActivityLog
+
+        system_logs, activity_logs = self._build_objects(batch)
+
+        start = time.perf_counter()
         try:
             if system_logs:
-                SystemLog.objects.bulk_create(system_logs, ignore_conflicts=True)
+                SystemLog.objects.bulk_create(system_logs, batch_size=self.batch_size, ignore_conflicts=True)
             if activity_logs:
-                ActivityLog.objects.bulk_create(activity_logs, ignore_conflicts=True)
+                ActivityLog.objects.bulk_create(activity_logs, batch_size=self.batch_size, ignore_conflicts=True)
         except Exception as e:
             logger.error(f"error bulk inserting logs: {e}")
+            close_old_connections()
+            self._spill(batch)
+            return False
+
+        elapsed = time.perf_counter() - start
+        self.last_flush_ms = elapsed * 1000
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+        self.flushed += len(system_logs) + len(activity_logs)
+        if PROMETHEUS_AVAILABLE:
+            FLUSH_LATENCY.observe(elapsed)
+            LOGS_FLUSHED.labels('system').inc(len(system_logs))
+            LOGS_FLUSHED.labels('activity').inc(len(activity_logs))
+        return True
+
+    def _count_dropped(self, count):
+        self.dropped += count
+        if PROMETHEUS_AVAILABLE:
+            LOGS_DROPPED.inc(count)
+
+    @staticmethod
+    def _serialize(log_type, log_data):
+        """JSON-safe form of a queued log (model instances become ids)"""
+        record = {}
+        for key, value in log_data.items():
+            if hasattr(value, '_meta') and hasattr(value, 'pk'):
+                record[f'{key}_id'] = value.pk
+            elif isinstance(value, datetime):
+                record[key] = value.isoformat()
+            else:
+                record[key] = value
+        return json.dumps({'type': log_type, 'data': record}, default=str)
+
+    @staticmethod
+    def _deserialize(line):
+        entry = json.loads(line)
+        data = entry['data']
+        if isinstance(data.get('timestamp'), str):
+            data['timestamp'] = parse_datetime(data['timestamp'])
+        return entry['type'], data
+
+    def _spill(self, batch):
+        """Append logs to the spill file, or count them as dropped"""
+        if not self.spill_path:
+            self._count_dropped(len(batch))
+            logger.warning(f"log queue full, dropping {len(batch)} log entries")
+            return
+
+        try:
+            lines = [self._serialize(log_type, log_data) + '\n' for log_type, log_data in batch]
+            with self._spill_lock:
+                self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.spill_path, 'a', encoding='utf-8') as spill_file:
+                    spill_file.writelines(lines)
+        except Exception as e:
+            self._count_dropped(len(batch))
+            logger.error(f"error spilling logs to {self.spill_path}: {e}")
+            return
+
+        self.spilled += len(batch)
+        if PROMETHEUS_AVAILABLE:
+            LOGS_SPILLED.inc(len(batch))
+
+    def _read_spilled(self, lines):
+        """Deserialized spilled entries; corrupt lines are skipped and counted as dropped"""
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield self._deserialize(line)
+            except (ValueError, KeyError):
+                self._count_dropped(1)
+
+    def _replay_spill(self):
+        """Load spilled logs back into the database once flushes succeed"""
+        if not self.spill_path or not self.spill_path.exists() or not self.queue.empty():
+            return
+
+        replay_path = self.spill_path.with_suffix('.replay')
+        with self._spill_lock:
+            if replay_path.exists() or not self.spill_path.exists():
+                return
+            os.replace(self.spill_path, replay_path)
+
+        batch = []
+        replayed = 0
+        try:
+            with open(replay_path, encoding='utf-8') as replay_file:
+                entries = self._read_spilled(replay_file)
+                for entry in entries:
+                    batch.append(entry)
+                    if len(batch) >= self.batch_size:
+                        if not self._flush_batch(batch):
+                            break  # batch was spilled again
+                        replayed += len(batch)
+                        batch = []
+                else:
+                    if batch and self._flush_batch(batch):
+                        replayed += len(batch)
+                    batch = []
+
+                # Flush failed mid-file: re-spill the unread remainder
+                remainder = list(entries)
+                if remainder:
+                    self._spill(remainder)
+        finally:
+            # A leftover .replay file would block every later replay
+            replay_path.unlink(missing_ok=True)
+
+        self.replayed += replayed
+        if PROMETHEUS_AVAILABLE:
+            LOGS_REPLAYED.inc(replayed)
+        if replayed:
+            logger.info(f"replayed {replayed} spilled log entries")
 
 
 # Global collector instance
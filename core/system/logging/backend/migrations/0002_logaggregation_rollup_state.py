@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logaggregation',
+            name='latency_sketch',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name='logaggregation',
+            name='successful_actions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='logaggregation',
+            name='user_actions',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name='logaggregation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
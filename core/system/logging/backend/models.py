@@ -168,6 +168,12 @@ class LogAggregation(models.Model):
     # Top errors
     top_errors = models.JSONField(default=list)  # List of most common errors
     
+    # Mergeable state, so ranges of hours can be combined (see rollups.py)
+    latency_sketch = models.JSONField(default=dict)  # LatencySketch.to_dict()
+    successful_actions = models.IntegerField(default=0)
+    user_actions = models.JSONField(default=dict)  # {user_id: action count}
+    updated_at = models.DateTimeField(auto_now=True)
+    
     class Meta:
         db_table = 'log_aggregations'
         indexes = [
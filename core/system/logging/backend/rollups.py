@@ -0,0 +1,258 @@
+"""
+Hourly log rollups
+
+Fills LogAggregation with one row per hour (counts by level/category,
+activity totals, per-user action counts, latency sketch and top errors)
+and answers dashboard queries by merging those rows with a live summary
+of the current, still-open hour.
+
+The rollup job is incremental: each run aggregates the hours after the
+newest rollup and re-aggregates the last few closed hours so that logs
+flushed late by the async collector are still counted.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import SystemLog, ActivityLog, LogAggregation, LogLevel
+from .sketch import LatencySketch
+
+logger = logging.getLogger(__name__)
+
+# Closed hours re-aggregated on every run (late collector flushes)
+LOOKBACK_HOURS = 2
+
+# Hours aggregated on a first run or after a long outage
+MAX_BACKFILL_HOURS = 24 * 7
+
+TOP_ERRORS = 10
+
+LEVEL_FIELDS = {
+    LogLevel.DEBUG: 'debug_count',
+    LogLevel.INFO: 'info_count',
+    LogLevel.WARNING: 'warning_count',
+    LogLevel.ERROR: 'error_count',
+    LogLevel.CRITICAL: 'critical_count',
+}
+
+
+def truncate_hour(dt):
+    """Start of the hour containing dt"""
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+class LogSummary:
+    """
+    Mergeable log statistics for a time range.
+
+    Built from raw rows (from_logs) or a LogAggregation row (from_rollup);
+    summaries for adjacent ranges are combined with merge().
+    """
+
+    def __init__(self):
+        self.level_counts = {field: 0 for field in LEVEL_FIELDS.values()}
+        self.category_counts = {}
+        self.sketch = LatencySketch()
+        self.errors = {}  # message -> count
+        self.total_actions = 0
+        self.successful_actions = 0
+        self.user_actions = {}  # str(user_id) -> count
+
+    @classmethod
+    def from_logs(cls, start, end):
+        """Aggregate raw SystemLog/ActivityLog rows in [start, end)"""
+        summary = cls()
+        system_logs = SystemLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        activity_logs = ActivityLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+
+        for row in system_logs.values('level', 'category').annotate(n=Count('id')).order_by():
+            field = LEVEL_FIELDS.get(row['level'])
+            if field:
+                summary.level_counts[field] += row['n']
+            category = row['category']
+            summary.category_counts[category] = summary.category_counts.get(category, 0) + row['n']
+
+        # duration_ms is an integer, so grouping by value keeps this query small
+        durations = system_logs.filter(duration_ms__isnull=False).values('duration_ms')
+        for row in durations.annotate(n=Count('id')).order_by():
+            summary.sketch.add(row['duration_ms'], row['n'])
+
+        errors = system_logs.filter(level__in=[LogLevel.ERROR, LogLevel.CRITICAL])
+        for row in errors.values('message').annotate(n=Count('id')).order_by('-n')[:TOP_ERRORS]:
+            summary.errors[row['message'][:200]] = row['n']
+
+        for row in activity_logs.values('user_id', 'success').annotate(n=Count('id')).order_by():
+            user_key = str(row['user_id'])
+            summary.user_actions[user_key] = summary.user_actions.get(user_key, 0) + row['n']
+            summary.total_actions += row['n']
+            if row['success']:
+                summary.successful_actions += row['n']
+
+        return summary
+
+    @classmethod
+    def from_rollup(cls, rollup):
+        summary = cls()
+        for field in LEVEL_FIELDS.values():
+            summary.level_counts[field] = getattr(rollup, field)
+        summary.category_counts = dict(rollup.category_counts)
+        summary.sketch = LatencySketch.from_dict(rollup.latency_sketch)
+        summary.errors = {error['message']: error['count'] for error in rollup.top_errors}
+        summary.total_actions = rollup.total_actions
+        summary.successful_actions = rollup.successful_actions
+        summary.user_actions = dict(rollup.user_actions)
+        return summary
+
+    def merge(self, other):
+        for field, count in other.level_counts.items():
+            self.level_counts[field] += count
+        for category, count in other.category_counts.items():
+            self.category_counts[category] = self.category_counts.get(category, 0) + count
+        self.sketch.merge(other.sketch)
+        for message, count in other.errors.items():
+            self.errors[message] = self.errors.get(message, 0) + count
+        self.total_actions += other.total_actions
+        self.successful_actions += other.successful_actions
+        for user_key, count in other.user_actions.items():
+            self.user_actions[user_key] = self.user_actions.get(user_key, 0) + count
+        return self
+
+    @property
+    def total(self):
+        return sum(self.level_counts.values())
+
+    def top_errors(self, limit=TOP_ERRORS):
+        ranked = sorted(self.errors.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{'message': message, 'count': count} for message, count in ranked]
+
+    def top_users(self, limit=10):
+        """[(str(user_id), action_count)] for the most active users"""
+        return sorted(self.user_actions.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def system_stats(self):
+        return {
+            'total': self.total,
+            'errors': self.level_counts['error_count'],
+            'warnings': self.level_counts['warning_count'],
+            'avg_duration': self.sketch.mean,
+            'p95_duration': self.sketch.quantile(0.95),
+            'p99_duration': self.sketch.quantile(0.99),
+        }
+
+    def activity_stats(self):
+        return {
+            'total': self.total_actions,
+            'unique_users': len(self.user_actions),
+            'success_rate': (
+                self.successful_actions * 100 / self.total_actions
+                if self.total_actions else None
+            ),
+        }
+
+    def rollup_fields(self):
+        """Field values for a LogAggregation row"""
+        return {
+            **self.level_counts,
+            'category_counts': self.category_counts,
+            'active_users': len(self.user_actions),
+            'total_actions': self.total_actions,
+            'successful_actions': self.successful_actions,
+            'user_actions': self.user_actions,
+            'avg_response_time': self.sketch.mean,
+            'p95_response_time': self.sketch.quantile(0.95),
+            'p99_response_time': self.sketch.quantile(0.99),
+            'latency_sketch': self.sketch.to_dict(),
+            'top_errors': self.top_errors(),
+        }
+
+
+def rollup_hour(hour_start):
+    """(Re)build the LogAggregation row for one closed hour"""
+    hour_start = truncate_hour(hour_start)
+    summary = LogSummary.from_logs(hour_start, hour_start + timedelta(hours=1))
+    rollup, _ = LogAggregation.objects.update_or_create(
+        date_hour=hour_start,
+        defaults=summary.rollup_fields()
+    )
+    return rollup
+
+
+def rollup_pending(now=None, lookback_hours=LOOKBACK_HOURS, max_hours=MAX_BACKFILL_HOURS):
+    """
+    Aggregate every closed hour not yet rolled up, plus the last few.
+
+    Returns:
+        list: date_hour of each rollup written
+    """
+    current_hour = truncate_hour(now or timezone.now())
+    earliest = current_hour - timedelta(hours=max_hours)
+
+    latest = LogAggregation.objects.filter(date_hour__lt=current_hour).order_by('-date_hour').first()
+    if latest is not None:
+        start = max(latest.date_hour - timedelta(hours=lookback_hours - 1), earliest)
+    else:
+        start = earliest
+
+    written = []
+    hour = start
+    while hour < current_hour:
+        rollup_hour(hour)
+        written.append(hour)
+        hour += timedelta(hours=1)
+
+    logger.debug("Rolled up %d log hours up to %s", len(written), current_hour)
+    return written
+
+
+def summarize_hours(hours, now=None):
+    """
+    Summary of the current partial hour plus the preceding hours - 1 closed hours.
+
+    Closed hours come from LogAggregation; only the open hour is read from
+    raw log rows. Missing rollups for the last LOOKBACK_HOURS closed hours
+    are built on the spot (the hourly job may not have run yet).
+    """
+    summaries, _, _ = summarize_windows({'window': hours}, now=now)
+    return summaries['window']
+
+
+def summarize_windows(windows, now=None):
+    """
+    Summaries for several hour-aligned windows sharing one rollup query.
+
+    Args:
+        windows: {name: hours}
+        now: Reference time (defaults to timezone.now())
+
+    Returns:
+        tuple: ({name: LogSummary}, {date_hour: LogSummary} for closed hours,
+                LogSummary of the current hour)
+    """
+    now = now or timezone.now()
+    current_hour = truncate_hour(now)
+    oldest = current_hour - timedelta(hours=max(windows.values()) - 1)
+
+    hourly = {
+        rollup.date_hour: LogSummary.from_rollup(rollup)
+        for rollup in LogAggregation.objects.filter(date_hour__gte=oldest, date_hour__lt=current_hour)
+    }
+    for back in range(1, LOOKBACK_HOURS + 1):
+        hour = current_hour - timedelta(hours=back)
+        if hour >= oldest and hour not in hourly:
+            hourly[hour] = LogSummary.from_rollup(rollup_hour(hour))
+
+    current = LogSummary.from_logs(current_hour, now + timedelta(seconds=1))
+
+    summaries = {}
+    for name, hours in windows.items():
+        start = current_hour - timedelta(hours=hours - 1)
+        summary = LogSummary().merge(current)
+        for hour, hour_summary in hourly.items():
+            if hour >= start:
+                summary.merge(hour_summary)
+        summaries[name] = summary
+
+    return summaries, hourly, current
@@ -0,0 +1,104 @@
+"""
+Mergeable latency sketch
+
+Log-bucketed histogram with bounded relative error (DDSketch-style).
+Hourly rollups store one sketch each; sketches for any range of hours are
+merged by adding bucket counts, so p95/p99 over 24h or 7d come from the
+rollups without touching raw log rows.
+"""
+
+import math
+
+# Quantiles are accurate to within 1% of the true value
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+
+class LatencySketch:
+    """
+    Histogram of non-negative durations (ms) in logarithmic buckets.
+
+    Usage:
+        sketch = LatencySketch()
+        sketch.add(12)
+        sketch.add(40, count=3)
+        sketch.merge(other)
+        sketch.quantile(0.95)
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}  # bucket index -> count
+        self.zero_count = 0  # values < 1ms
+        self.count = 0
+        self.total = 0.0
+
+    def _index(self, value):
+        return int(math.ceil(math.log(value) / self._log_gamma))
+
+    def _value(self, index):
+        """Representative value of a bucket (minimises relative error)"""
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        """Record `count` observations of `value`"""
+        if value is None or count <= 0:
+            return
+        if value < 1:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+
+    def merge(self, other):
+        """Add another sketch's observations into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError('Cannot merge sketches with different accuracy')
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), None when empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return self._value(index)
+        return self._value(max(self.buckets))
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def to_dict(self):
+        """JSON-serializable form (bucket keys become strings)"""
+        return {
+            'accuracy': self.relative_accuracy,
+            'zero': self.zero_count,
+            'count': self.count,
+            'total': self.total,
+            'buckets': {str(index): count for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(relative_accuracy=data.get('accuracy', DEFAULT_RELATIVE_ACCURACY))
+        if not data:
+            return sketch
+        sketch.zero_count = data.get('zero', 0)
+        sketch.count = data.get('count', 0)
+        sketch.total = data.get('total', 0.0)
+        sketch.buckets = {int(index): count for index, count in data.get('buckets', {}).items()}
+        return sketch
@@ -0,0 +1,190 @@
+"""
+Tests for the Logging module
+
+The export encoders are run over a generated 1M-row fixture with
+tracemalloc to check that streaming keeps memory flat.
+"""
+
+import gzip
+import io
+import json
+import tempfile
+import tracemalloc
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .export import csv_chunks, gzip_chunks, json_array_chunks, ndjson_chunks, time_windows
+from .middleware import AsyncLogCollector
+from .rollups import LogSummary
+from .sketch import LatencySketch
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _rows(count):
+    for i in range(count):
+        yield (
+            START + timedelta(seconds=i),
+            'info',
+            'api',
+            f'GET /api/v1/items/{i} - 200',
+            f'user{i % 50}',
+            '10.0.0.1',
+            f'/api/v1/items/{i}',
+            i % 400,
+        )
+
+
+def _named_rows(count):
+    for row in _rows(count):
+        yield dict(zip(('timestamp', 'level', 'category', 'message', 'user', 'ip', 'path', 'duration'), row))
+
+
+class StreamingExportTests(unittest.TestCase):
+    """Streaming encoders over a 1M-row fixture"""
+
+    ROWS = 1_000_000
+
+    # Peak traced allocation allowed while streaming (buffers, not rows)
+    MAX_PEAK_BYTES = 4 * 1024 * 1024
+
+    def _consume(self, chunks):
+        """Drain a chunk stream, returning (bytes, chunks, peak traced bytes)"""
+        total = 0
+        count = 0
+        tracemalloc.start()
+        try:
+            for chunk in chunks:
+                total += len(chunk)
+                count += 1
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return total, count, peak
+
+    def test_csv_gzip_memory_is_flat(self):
+        header = ['Timestamp', 'Level', 'Category', 'Message', 'User', 'IP', 'Path', 'Duration']
+        total, count, peak = self._consume(gzip_chunks(csv_chunks(header, _rows(self.ROWS))))
+
+        self.assertGreater(count, 1)
+        self.assertGreater(total, 0)
+        self.assertLess(peak, self.MAX_PEAK_BYTES)
+
+    def test_ndjson_memory_does_not_grow_with_rows(self):
+        _, _, small_peak = self._consume(ndjson_chunks(_named_rows(self.ROWS // 100)))
+        total, _, peak = self._consume(ndjson_chunks(_named_rows(self.ROWS // 10)))
+
+        self.assertGreater(total, self.ROWS // 10 * 100)
+        self.assertLess(peak, small_peak * 2)
+
+    def test_gzip_round_trip(self):
+        rows = list(_named_rows(1000))
+        data = b''.join(gzip_chunks(ndjson_chunks(rows)))
+        lines = gzip.decompress(data).decode().splitlines()
+
+        self.assertEqual(len(lines), 1000)
+        self.assertEqual(json.loads(lines[5])['message'], 'GET /api/v1/items/5 - 200')
+
+    def test_csv_output(self):
+        data = b''.join(csv_chunks(['A', 'B'], [(1, 'x,y'), (2, 'z')])).decode()
+        self.assertEqual(data.splitlines(), ['A,B', '1,"x,y"', '2,z'])
+
+    def test_json_array_is_valid(self):
+        data = b''.join(json_array_chunks(_named_rows(10)))
+        parsed = json.load(io.BytesIO(data))
+
+        self.assertEqual(len(parsed), 10)
+        self.assertEqual(parsed[0]['timestamp'], START.isoformat())
+
+    def test_time_windows_cover_range_newest_first(self):
+        end = START + timedelta(days=2, hours=6)
+        windows = list(time_windows(START, end))
+
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[0][1], end)
+        self.assertEqual(windows[-1][0], START)
+        for (_, older_end), (newer_start, _) in zip(windows[1:], windows):
+            self.assertEqual(older_end, newer_start)
+
+
+class LatencySketchTests(unittest.TestCase):
+    """Mergeable latency sketch used by the hourly rollups"""
+
+    def test_merged_quantiles_within_accuracy(self):
+        values = [(i * 7919) % 5000 + 1 for i in range(20000)]
+        first = LatencySketch()
+        second = LatencySketch()
+        for value in values[:10000]:
+            first.add(value)
+        for value in values[10000:]:
+            second.add(value)
+
+        merged = LatencySketch.from_dict(first.to_dict()).merge(LatencySketch.from_dict(second.to_dict()))
+        ordered = sorted(values)
+
+        self.assertEqual(merged.count, len(values))
+        for q in (0.5, 0.95, 0.99):
+            expected = ordered[int(q * (len(ordered) - 1))]
+            self.assertAlmostEqual(merged.quantile(q), expected, delta=expected * 0.02)
+
+    def test_empty_sketch(self):
+        sketch = LatencySketch.from_dict({})
+        self.assertIsNone(sketch.quantile(0.95))
+        self.assertIsNone(sketch.mean)
+
+
+class LogSummaryTests(unittest.TestCase):
+    """Merged rollup statistics"""
+
+    def test_top_users_keeps_uuid_keys(self):
+        busy, quiet = str(uuid.uuid4()), str(uuid.uuid4())
+        first = LogSummary()
+        first.user_actions = {busy: 5, quiet: 1}
+        second = LogSummary()
+        second.user_actions = {busy: 2}
+
+        self.assertEqual(first.merge(second).top_users(10), [(busy, 7), (quiet, 1)])
+
+
+class SpillReplayTests(unittest.TestCase):
+    """Replay of the on-disk spill file"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.spill_path = Path(self.directory.name) / 'spill.jsonl'
+        self.collector = AsyncLogCollector(batch_size=2, spill_path=self.spill_path)
+
+    def line(self, i):
+        return AsyncLogCollector._serialize('system', {'message': f'log {i}', 'timestamp': START}) + '\n'
+
+    def test_corrupt_line_after_failed_flush(self):
+        self.spill_path.write_text(
+            self.line(1) + self.line(2) + self.line(3) + self.line(4) + '{not json\n' + self.line(5),
+            encoding='utf-8'
+        )
+        flushes = []
+
+        def flush(batch):
+            flushes.append(list(batch))
+            if len(flushes) == 2:
+                self.collector._spill(batch)  # database down again
+                return False
+            return True
+
+        self.collector._flush_batch = flush
+        self.collector._replay_spill()
+
+        self.assertFalse(self.spill_path.with_suffix('.replay').exists())
+        self.assertEqual(self.collector.dropped, 1)
+        self.assertEqual(self.collector.replayed, 2)
+
+        # The re-spilled logs (3, 4 and 5) are replayed on the next attempt
+        flushes.clear()
+        self.collector._flush_batch = lambda batch: flushes.append(list(batch)) or True
+        self.collector._replay_spill()
+        messages = [data['message'] for batch in flushes for _, data in batch]
+        self.assertEqual(messages, ['log 3', 'log 4', 'log 5'])
+        self.assertEqual(self.collector.replayed, 5)
@@ -3,13 +3,20 @@ Views for system and activity logging administration
 """
 
 from django.shortcuts import render
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.paginator import Paginator
 from django.db.models import Q, Count, Avg, Max, Min
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
 from .models import SystemLog, ActivityLog, LogAggregation, LogLevel, LogCategory
+from .export import (
+    CONTENT_TYPES, EXPORT_COLUMNS,
+    csv_chunks, gzip_chunks, iter_log_rows, json_array_chunks, ndjson_chunks
+)
+from .rollups import summarize_windows, truncate_hour
 import json
 
 
@@ -143,54 +150,25 @@ def activity_logs_view(request):
 @login_required
 @user_passes_test(is_admin)
 def log_dashboard(request):
-    """Main logging dashboard with aggregated statistics"""
+    """
+    Main logging dashboard with aggregated statistics
+
+    Windows are hour-aligned: closed hours come from the LogAggregation
+    rollups and only the current hour is aggregated from raw log rows.
+    """
     
-    # Time ranges
     now = timezone.now()
-    last_hour = now - timedelta(hours=1)
     last_24h = now - timedelta(hours=24)
-    last_7d = now - timedelta(days=7)
+    
+    summaries, hourly, current = summarize_windows(
+        {'last_hour': 1, 'last_24h': 24, 'last_7d': 24 * 7}, now=now
+    )
     
     # System log statistics
-    system_stats = {
-        'last_hour': SystemLog.objects.filter(timestamp__gte=last_hour).aggregate(
-            total=Count('id'),
-            errors=Count('id', filter=Q(level=LogLevel.ERROR)),
-            warnings=Count('id', filter=Q(level=LogLevel.WARNING)),
-            avg_duration=Avg('duration_ms')
-        ),
-        'last_24h': SystemLog.objects.filter(timestamp__gte=last_24h).aggregate(
-            total=Count('id'),
-            errors=Count('id', filter=Q(level=LogLevel.ERROR)),
-            warnings=Count('id', filter=Q(level=LogLevel.WARNING)),
-            avg_duration=Avg('duration_ms')
-        ),
-        'last_7d': SystemLog.objects.filter(timestamp__gte=last_7d).aggregate(
-            total=Count('id'),
-            errors=Count('id', filter=Q(level=LogLevel.ERROR)),
-            warnings=Count('id', filter=Q(level=LogLevel.WARNING)),
-            avg_duration=Avg('duration_ms')
-        ),
-    }
+    system_stats = {name: summary.system_stats() for name, summary in summaries.items()}
     
     # Activity statistics
-    activity_stats = {
-        'last_hour': ActivityLog.objects.filter(timestamp__gte=last_hour).aggregate(
-            total=Count('id'),
-            unique_users=Count('user', distinct=True),
-            success_rate=Avg('success') * 100
-        ),
-        'last_24h': ActivityLog.objects.filter(timestamp__gte=last_24h).aggregate(
-            total=Count('id'),
-            unique_users=Count('user', distinct=True),
-            success_rate=Avg('success') * 100
-        ),
-        'last_7d': ActivityLog.objects.filter(timestamp__gte=last_7d).aggregate(
-            total=Count('id'),
-            unique_users=Count('user', distinct=True),
-            success_rate=Avg('success') * 100
-        ),
-    }
+    activity_stats = {name: summary.activity_stats() for name, summary in summaries.items()}
     
     # Recent errors
     recent_errors = SystemLog.objects.filter(
@@ -199,27 +177,32 @@ def log_dashboard(request):
     ).select_related('user')[:10]
     
     # Most active users
-    active_users = ActivityLog.objects.filter(
-        timestamp__gte=last_24h
-    ).values('user__username').annotate(
-        action_count=Count('id')
-    ).order_by('-action_count')[:10]
+    top_users = summaries['last_24h'].top_users(10)
+    usernames = {
+        str(user_id): username
+        for user_id, username in get_user_model().objects.filter(
+            id__in=[user_id for user_id, _ in top_users]
+        ).values_list('id', 'username')
+    }
+    active_users = [
+        {'user__username': usernames.get(user_id), 'action_count': count}
+        for user_id, count in top_users
+    ]
     
     # Error trends (hourly for last 24 hours)
+    current_hour = truncate_hour(now)
     error_trends = []
-    for i in range(24):
-        hour_start = now - timedelta(hours=i+1)
-        hour_end = now - timedelta(hours=i)
-        count = SystemLog.objects.filter(
-            level=LogLevel.ERROR,
-            timestamp__gte=hour_start,
-            timestamp__lt=hour_end
-        ).count()
+    for i in range(23, 0, -1):
+        hour_start = current_hour - timedelta(hours=i)
+        hour_summary = hourly.get(hour_start)
         error_trends.append({
             'hour': hour_start.strftime('%H:00'),
-            'count': count
+            'count': hour_summary.level_counts['error_count'] if hour_summary else 0
         })
-    error_trends.reverse()
+    error_trends.append({
+        'hour': current_hour.strftime('%H:00'),
+        'count': current.level_counts['error_count']
+    })
     
     context = {
         'system_stats': system_stats,
@@ -227,6 +210,7 @@ def log_dashboard(request):
         'recent_errors': recent_errors,
         'active_users': active_users,
         'error_trends': json.dumps(error_trends),
+        'top_errors': summaries['last_24h'].top_errors(),
     }
     
     return render(request, 'logging/dashboard.html', context)
@@ -284,75 +268,73 @@ def log_detail_api(request, log_id):
         return JsonResponse({'success': False, 'error': 'Log not found'}, status=404)
 
 
+def _parse_export_bound(value, is_end=False):
+    """Parse a date/datetime filter; a bare end date includes that whole day"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        if is_end:
+            day += timedelta(days=1)
+        parsed = datetime.combine(day, time.min)
+    elif is_end:
+        parsed += timedelta(microseconds=1)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
 @login_required
 @user_passes_test(is_admin)
 def export_logs(request):
-    """Export logs to CSV or JSON"""
+    """
+    Export logs to CSV, JSON or NDJSON, optionally gzip-compressed
+
+    The response is streamed from a server-side cursor one day-window at a
+    time, so exports are not capped and memory use stays flat.
+    """
     
     format = request.GET.get('format', 'csv')
     log_type = request.GET.get('type', 'system')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
+    compress = request.GET.get('gzip', '').lower() in ('1', 'true', 'yes')
+    
+    if format not in CONTENT_TYPES:
+        return JsonResponse({'success': False, 'error': f'Unsupported format: {format}'}, status=400)
+    
+    try:
+        date_from = _parse_export_bound(request.GET.get('date_from', ''))
+        date_to = _parse_export_bound(request.GET.get('date_to', ''), is_end=True)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     
     # Get logs
     if log_type == 'system':
-        logs = SystemLog.objects.all()
+        model = SystemLog
     else:
-        logs = ActivityLog.objects.all()
-    
-    # Apply date filters
-    if date_from:
-        logs = logs.filter(timestamp__gte=date_from)
-    if date_to:
-        logs = logs.filter(timestamp__lte=date_to)
-    
-    # Limit to last 10000 records for performance
-    logs = logs[:10000]
-    
-    if format == 'json':
-        # Export as JSON
-        import json
-        from django.core.serializers.json import DjangoJSONEncoder
-        
-        data = list(logs.values())
-        response = JsonResponse(data, safe=False, encoder=DjangoJSONEncoder)
-        response['Content-Disposition'] = f'attachment; filename="{log_type}_logs.json"'
-    
+        log_type = 'activity'
+        model = ActivityLog
+    logs = model.objects.all()
+    
+    if format == 'csv':
+        header = [title for title, _ in EXPORT_COLUMNS[log_type]]
+        fields = [field for _, field in EXPORT_COLUMNS[log_type]]
+        chunks = csv_chunks(header, iter_log_rows(logs, fields, date_from, date_to))
     else:
-        # Export as CSV
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{log_type}_logs.csv"'
-        
-        writer = csv.writer(response)
-        
-        # Write headers
-        if log_type == 'system':
-            writer.writerow(['Timestamp', 'Level', 'Category', 'Message', 'User', 'IP', 'Path', 'Duration'])
-            for log in logs:
-                writer.writerow([
-                    log.timestamp,
-                    log.level,
-                    log.category,
-                    log.message,
-                    log.user.username if log.user else '',
-                    log.ip_address,
-                    log.request_path,
-                    log.duration_ms
-                ])
-        else:
-            writer.writerow(['Timestamp', 'User', 'Action', 'Module', 'URL', 'Success', 'Duration'])
-            for log in logs:
-                writer.writerow([
-                    log.timestamp,
-                    log.user.username,
-                    log.action,
-                    log.module,
-                    log.page_url,
-                    log.success,
-                    log.duration_ms
-                ])
-    
-    return response
\ No newline at end of file
+        fields = [field.attname for field in model._meta.concrete_fields]
+        rows = iter_log_rows(logs, fields, date_from, date_to, named=True)
+        chunks = ndjson_chunks(rows) if format == 'ndjson' else json_array_chunks(rows)
+    
+    filename = f'{log_type}_logs.{format}'
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    else:
+        content_type = CONTENT_TYPES[format]
+    
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
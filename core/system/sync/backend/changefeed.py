@@ -0,0 +1,139 @@
+"""
+Sync Change Feed
+
+Turns SyncChangeLog entries into push records for the Hub.
+
+Reading pending work is one range scan over the change log; the affected
+rows are then loaded with one in_bulk() query per model. Sync checksums are
+computed here - when a record actually leaves the node - rather than on
+every save, and written back in bulk.
+
+push_changes() drains the log through a send callable (the node's push
+task posts each batch to the Hub's push endpoint) and deletes the entries
+it delivered.
+"""
+
+import logging
+from collections import OrderedDict
+
+from django.apps import apps
+
+from .models import SyncChangeLog
+
+logger = logging.getLogger(__name__)
+
+
+def collect_changes(since=0, model_names=None, limit=1000):
+    """
+    Build push records for all changes after a sequence number.
+
+    Multiple changes to the same record are collapsed into its latest state.
+
+    Args:
+        since: Last sequence number already acknowledged by the Hub
+        model_names: Optional list of models to restrict to
+        limit: Maximum number of change log entries to read
+
+    Returns:
+        tuple: (records, last_seq) - pass last_seq as `since` next time
+    """
+    entries = list(SyncChangeLog.changes_since(since, model_names, limit))
+    if not entries:
+        return [], since
+    return _build_records(entries), entries[-1].id
+
+
+def push_changes(send, model_names=None, batch_size=500):
+    """
+    Push every pending change log entry to the Hub.
+
+    Entries are removed only after send() returned for their batch, so a
+    failed push is retried from the same point on the next run. Only the
+    ids actually read are deleted - a concurrent transaction may still
+    commit a lower sequence number.
+
+    Args:
+        send: Callable taking a list of records and returning the Hub's
+              push response (accepted/rejected/conflicts/errors)
+        model_names: Optional list of models to restrict to
+        batch_size: Maximum number of change log entries per push
+
+    Returns:
+        dict: Totals of the push responses plus the number of records sent
+    """
+    totals = {'records': 0, 'accepted': 0, 'rejected': 0, 'conflicts': 0}
+    since = 0
+    while True:
+        entries = list(SyncChangeLog.changes_since(since, model_names, batch_size))
+        if not entries:
+            break
+
+        records = _build_records(entries)
+        result = send(records)
+        for error in result.get('errors', []):
+            logger.warning(f"Hub rejected record {error.get('record_id')}: {error.get('error')}")
+
+        SyncChangeLog.objects.filter(id__in=[entry.id for entry in entries]).delete()
+        totals['records'] += len(records)
+        for key in ('accepted', 'rejected', 'conflicts'):
+            totals[key] += result.get(key, 0)
+
+        if len(entries) < batch_size:
+            break
+        since = entries[-1].id
+
+    return totals
+
+
+def _build_records(entries):
+    """Collapse change log entries into one push record per changed row"""
+    latest = OrderedDict()
+    for entry in entries:
+        key = (entry.model_name, entry.record_id)
+        latest.pop(key, None)
+        latest[key] = entry
+
+    pks_by_model = {}
+    for (model_name, record_id), entry in latest.items():
+        if entry.operation != 'delete':
+            pks_by_model.setdefault(model_name, []).append(record_id)
+
+    instances = {}
+    for model_name, pks in pks_by_model.items():
+        model = apps.get_model(model_name)
+        pk_field = model._meta.pk
+        objects = model.objects.in_bulk([pk_field.to_python(pk) for pk in pks])
+        stale = []
+        for obj in objects.values():
+            if not obj.sync_checksum:
+                stale.append(obj)
+            obj.get_sync_checksum()
+            instances[(model_name, str(obj.pk))] = obj
+        if stale:
+            model.objects.bulk_update(stale, ['sync_checksum'], batch_size=500)
+
+    records = []
+    for (model_name, record_id), entry in latest.items():
+        obj = instances.get((model_name, record_id))
+        if entry.operation == 'delete' or obj is None:
+            records.append({
+                'model_name': model_name,
+                'record_id': record_id,
+                'operation': 'delete',
+                'data': {},
+                'local_version': entry.version,
+                'local_modified_at': entry.created_at.isoformat(),
+            })
+            continue
+
+        records.append({
+            'model_name': model_name,
+            'record_id': record_id,
+            'operation': entry.operation,
+            'data': obj.get_sync_data(),
+            'checksum': obj.sync_checksum,
+            'local_version': obj.sync_version,
+            'local_modified_at': obj.local_modified_at.isoformat(),
+        })
+
+    return records
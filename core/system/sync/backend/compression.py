@@ -0,0 +1,133 @@
+"""
+Sync Payload Compression
+
+Content-Encoding negotiation for sync request and response bodies.
+
+Nodes learn the Hub's supported encodings from the SyncInit response and
+send compressed push bodies with a matching Content-Encoding header. Pull
+responses are compressed according to the Node's Accept-Encoding header.
+zstd is preferred when the optional `zstandard` package is installed,
+gzip is always available.
+"""
+
+import gzip
+import io
+import logging
+
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.parsers import JSONParser
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+    DECOMPRESS_ERRORS = (OSError, EOFError, zstandard.ZstdError)
+except ImportError:
+    ZSTD_AVAILABLE = False
+    DECOMPRESS_ERRORS = (OSError, EOFError)
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def supported_encodings():
+    """Encodings this process can decode, in order of preference"""
+    encodings = ['gzip', 'identity']
+    if ZSTD_AVAILABLE:
+        encodings.insert(0, 'zstd')
+    return encodings
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        if token:
+            accepted.add(token.lower())
+
+    for encoding in supported_encodings():
+        if encoding in accepted:
+            return encoding
+    return 'identity'
+
+
+def compress(body, encoding):
+    """Compress bytes with the given content encoding"""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def decompress(body, encoding):
+    """Decompress bytes encoded with the given content encoding"""
+    encoding = (encoding or 'identity').lower()
+    if encoding == 'identity':
+        return body
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'zstd' and ZSTD_AVAILABLE:
+        # Streaming reader: frames written without a content size are valid
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body))
+        return reader.read()
+    raise UnsupportedMediaType(encoding, detail=f'Unsupported Content-Encoding: {encoding}')
+
+
+class CompressedJSONParser(JSONParser):
+    """JSON parser that transparently decodes gzip/zstd request bodies"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context.get('request')
+        encoding = request.META.get('HTTP_CONTENT_ENCODING') if request else None
+
+        if not encoding or encoding.lower() == 'identity':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            body = decompress(stream.read(), encoding)
+        except DECOMPRESS_ERRORS as e:
+            raise ParseError(f'Invalid {encoding} body - {e}')
+
+        return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class CompressedResponseMixin:
+    """
+    APIView mixin that compresses rendered responses per Accept-Encoding.
+
+    Streaming responses are left untouched.
+    """
+    parser_classes = [CompressedJSONParser]
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(response, 'streaming', False) or not hasattr(response, 'add_post_render_callback'):
+            return response
+
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding == 'identity':
+            return response
+
+        def _compress(rendered):
+            if rendered.has_header('Content-Encoding') or len(rendered.content) < MIN_COMPRESS_BYTES:
+                return rendered
+            original_size = len(rendered.content)
+            rendered.content = compress(rendered.content, encoding)
+            rendered['Content-Encoding'] = encoding
+            rendered['Content-Length'] = str(len(rendered.content))
+            rendered['X-Uncompressed-Length'] = str(original_size)
+            vary = rendered.get('Vary')
+            rendered['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+            return rendered
+
+        response.add_post_render_callback(_compress)
+        return response
@@ -0,0 +1,100 @@
+"""
+Sync Delta Format
+
+Field-level diffs for sync records. Instead of shipping the whole row on
+every change, a Node sends only the fields that differ from the last version
+the Hub acknowledged, together with the checksum of that base version:
+
+    {
+        "base_checksum": "<sha256 of base data>",
+        "changed": {"field": new_value, ...},
+        "removed": ["field", ...]
+    }
+
+The Hub rebuilds the full row from its own copy and rejects the delta when
+its copy does not match base_checksum, in which case the Node resends the
+full record.
+"""
+
+import hashlib
+import json
+
+
+class DeltaMismatch(ValueError):
+    """Raised when a delta cannot be applied to the available base data"""
+
+
+def checksum_data(data):
+    """SHA256 checksum of a sync data dict (stable key order)"""
+    data_str = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(data_str.encode()).hexdigest()
+
+
+def compute_delta(base, current):
+    """
+    Build a field-level delta from base to current.
+
+    Args:
+        base: Data dict last acknowledged by the Hub
+        current: Current data dict
+
+    Returns:
+        dict: Delta with base_checksum, changed and removed fields
+    """
+    # Compare JSON-normalized values so Decimal/UUID/datetime fields match
+    # the string form the Hub stores
+    base = json.loads(json.dumps(base, default=str))
+    current = json.loads(json.dumps(current, default=str))
+
+    changed = {
+        field: value
+        for field, value in current.items()
+        if field not in base or base[field] != value
+    }
+    removed = [field for field in base if field not in current]
+
+    return {
+        'base_checksum': checksum_data(base),
+        'changed': changed,
+        'removed': removed,
+    }
+
+
+def apply_delta(base, delta, expected_checksum=None):
+    """
+    Rebuild the full data dict from a base and a delta.
+
+    Args:
+        base: Hub's copy of the record data (or None if unknown)
+        delta: Delta produced by compute_delta
+        expected_checksum: Optional checksum of the rebuilt data
+
+    Returns:
+        dict: Reconstructed data
+
+    Raises:
+        DeltaMismatch: If the base is missing/stale or the result is corrupt
+    """
+    if not isinstance(delta, dict) or not isinstance(delta.get('changed', {}), dict):
+        raise DeltaMismatch('Malformed delta')
+    if base is None:
+        raise DeltaMismatch('Delta base not found, resend full record')
+    if checksum_data(base) != delta.get('base_checksum'):
+        raise DeltaMismatch('Delta base checksum mismatch, resend full record')
+
+    data = dict(base)
+    data.update(delta.get('changed', {}))
+    for field in delta.get('removed', []):
+        data.pop(field, None)
+
+    if expected_checksum and checksum_data(data) != expected_checksum:
+        raise DeltaMismatch('Reconstructed data checksum mismatch')
+
+    return data
+
+
+def is_worth_delta(current, delta):
+    """Whether sending the delta is smaller than sending the full row"""
+    delta_size = len(json.dumps(delta, default=str))
+    full_size = len(json.dumps(current, default=str))
+    return delta_size < full_size
@@ -0,0 +1,161 @@
+"""
+Export Log Writer
+
+Buffered background writer for DataExportLog entries.
+
+The export control middleware hands entries to a bounded in-memory queue
+instead of inserting a row in the response path. A daemon thread drains the
+queue, bulk-inserts the rows and folds them into hourly rollups.
+
+When the queue is full the caller writes the entry itself (backpressure),
+so audit entries are never dropped; these fallbacks are counted in stats().
+
+Each entry is timestamped when it is submitted, not when its batch is
+flushed, so log times and hourly rollups reflect the export itself.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = getattr(settings, 'EXPORT_LOG_QUEUE_SIZE', 5000)
+BATCH_SIZE = getattr(settings, 'EXPORT_LOG_BATCH_SIZE', 200)
+FLUSH_INTERVAL = getattr(settings, 'EXPORT_LOG_FLUSH_INTERVAL', 2.0)  # seconds
+
+
+class ExportLogWriter:
+    """
+    Bounded-queue batch writer for export log entries.
+
+    Usage:
+        export_log_writer.submit(node_id=..., module=..., ...)
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._atexit_registered = False
+
+        # Metrics
+        self.queued = 0
+        self.written = 0
+        self.failed = 0
+        self.sync_fallbacks = 0
+        self.flushes = 0
+        self.max_queue_depth = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        """Start the background writer thread (idempotent)"""
+        with self._lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self._stopping.clear()
+            self.thread = threading.Thread(
+                target=self._run, name='export-log-writer', daemon=True
+            )
+            self.thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def stop(self, timeout=5):
+        """Flush pending entries and stop the thread"""
+        self._stopping.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def submit(self, **fields):
+        """Queue an export log entry; writes inline if the queue is full"""
+        fields.setdefault('timestamp', timezone.now())
+        self.start()
+        try:
+            self.queue.put_nowait(fields)
+        except queue.Full:
+            self.sync_fallbacks += 1
+            self._write([fields])
+            return
+
+        self.queued += 1
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def stats(self):
+        """Writer metrics (queue depth, throughput, backpressure)"""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.queue.maxsize,
+            'max_queue_depth': self.max_queue_depth,
+            'queued': self.queued,
+            'written': self.written,
+            'failed': self.failed,
+            'sync_fallbacks': self.sync_fallbacks,
+            'flushes': self.flushes,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+        }
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+
+            # Drain whatever is already waiting without blocking
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = self._stopping.is_set()
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline or stopping):
+                self._write(batch)
+                batch = []
+
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+            if stopping and self.queue.empty() and not batch:
+                return
+
+    def _write(self, batch):
+        """Bulk insert a batch of entries and update rollups"""
+        from .models import DataExportLog, DataExportLogRollup
+
+        start = time.perf_counter()
+        try:
+            entries = [DataExportLog(**fields) for fields in batch]
+            DataExportLog.objects.bulk_create(entries, batch_size=self.batch_size)
+            DataExportLogRollup.add_entries(entries)
+            self.written += len(entries)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} export log entries: {e}")
+        finally:
+            self.flushes += 1
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+            if threading.current_thread() is self.thread:
+                close_old_connections()
+
+
+# Global writer instance
+export_log_writer = ExportLogWriter()
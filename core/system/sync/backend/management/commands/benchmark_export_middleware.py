@@ -0,0 +1,112 @@
+"""
+Benchmark DataExportControlMiddleware request overhead
+
+Runs the middleware against a ~1 MB JSON response (plain JsonResponse and a
+rendered DRF Response) for a temporary node and reports the mean added time
+per request over the bare view.
+
+Usage: python manage.py benchmark_export_middleware --requests 500
+"""
+
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from core.system.sync.backend.middleware import DataExportControlMiddleware
+from core.system.sync.backend.models import DataExportSettings, DataExportLog
+from core.system.sync.backend.policy import policy_cache
+
+
+def _payload(target_bytes):
+    """List of portfolio-like rows totalling roughly target_bytes of JSON"""
+    row = {
+        'id': str(uuid.uuid4()),
+        'name': 'Portfolio',
+        'description': 'x' * 120,
+        'total_value_try': '123456.78',
+        'total_value_usd': '3456.78',
+    }
+    rows = max(1, target_bytes // 260)
+    return {'count': rows, 'results': [dict(row, index=i) for i in range(rows)]}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark DataExportControlMiddleware overhead on a 1 MB JSON response'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Requests per scenario (default: 500)',
+        )
+        parser.add_argument(
+            '--size-kb',
+            type=int,
+            default=1024,
+            help='Response size in KB (default: 1024)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        data = _payload(options['size_kb'] * 1024)
+        node_id = uuid.uuid4()
+
+        json_response = JsonResponse(data)
+
+        drf_response = Response(data)
+        drf_response.accepted_renderer = JSONRenderer()
+        drf_response.accepted_media_type = 'application/json'
+        drf_response.renderer_context = {}
+        drf_response.render()
+
+        self.stdout.write(
+            f'{count} requests, {len(json_response.content) / 1024:,.0f} KB body\n'
+        )
+
+        factory = RequestFactory()
+        request = factory.get('/api/v1/currencies/portfolio/')
+
+        try:
+            with override_settings(NODE_UUID=node_id):
+                export_settings = DataExportSettings.get_for_node(node_id)
+                export_settings.module_settings = {'currencies': True}
+
+                for log_exports in (False, True):
+                    export_settings.log_all_exports = log_exports
+                    export_settings.save()
+                    policy_cache.clear()
+
+                    for label, response in (('JsonResponse', json_response), ('DRF Response', drf_response)):
+                        overhead = self._run(request, response, count)
+                        self.stdout.write(
+                            f'  {label:<14} logging={"on " if log_exports else "off"}  '
+                            f'{overhead * 1e6:>10,.1f} us/request'
+                        )
+
+                self.stdout.write(
+                    f'\n  policy cache: {policy_cache.hits} hits, {policy_cache.misses} misses'
+                )
+        finally:
+            DataExportLog.objects.filter(node_id=node_id).delete()
+            DataExportSettings.objects.filter(node_id=node_id).delete()
+            policy_cache.clear()
+
+        self.stdout.write(self.style.SUCCESS('\nBenchmark complete'))
+
+    def _run(self, request, response, count):
+        """Mean middleware time per request, view time excluded"""
+        middleware = DataExportControlMiddleware(lambda req: response)
+
+        # Warm the policy cache
+        middleware(request)
+
+        start = time.perf_counter()
+        for _ in range(count):
+            middleware(request)
+        return (time.perf_counter() - start) / count
@@ -0,0 +1,258 @@
+"""
+Benchmark sync payload size and push latency
+
+Builds a realistic module mix of sync records (portfolios, transactions and
+documents with large analysis_results), applies small edits, and compares
+full-row vs field-level delta payloads, uncompressed and compressed.
+
+Each payload is POSTed to a local hub endpoint (which decodes the body and
+rebuilds the rows from their deltas) through a TCP proxy that paces every
+direction to the link bandwidth and delays each chunk by half the RTT.
+The reported latency is the measured wall time from encoding on the node
+to the hub's response, TCP connection set-up included.
+
+Usage: python manage.py benchmark_sync_payload --records 1000 --bandwidth-kbps 512
+"""
+
+import http.client
+import json
+import queue
+import random
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from core.system.sync.backend.compression import compress, decompress, supported_encodings
+from core.system.sync.backend.delta import apply_delta, compute_delta, checksum_data
+
+CHUNK_SIZE = 4096
+
+
+class ThrottledLink:
+    """Localhost TCP proxy with a bandwidth limit and one-way delay per direction"""
+
+    def __init__(self, target_port, bytes_per_second, rtt):
+        self.target = ('127.0.0.1', target_port)
+        self.bytes_per_second = bytes_per_second
+        self.one_way = rtt / 2
+        self.listener = socket.create_server(('127.0.0.1', 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(self.target)
+            for source, sink in ((client, upstream), (upstream, client)):
+                chunks = queue.Queue()
+                threading.Thread(target=self._receive, args=(source, chunks), daemon=True).start()
+                threading.Thread(target=self._deliver, args=(chunks, sink), daemon=True).start()
+
+    def _receive(self, source, chunks):
+        link_free_at = 0.0
+        while True:
+            try:
+                chunk = source.recv(CHUNK_SIZE)
+            except OSError:
+                chunk = b''
+            now = time.perf_counter()
+            # Serialised onto the link behind what is already queued, then in flight
+            link_free_at = max(now, link_free_at) + len(chunk) / self.bytes_per_second
+            chunks.put((link_free_at + self.one_way, chunk))
+            if not chunk:
+                return
+
+    def _deliver(self, chunks, sink):
+        while True:
+            deliver_at, chunk = chunks.get()
+            delay = deliver_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                if not chunk:
+                    sink.shutdown(socket.SHUT_WR)
+                    return
+                sink.sendall(chunk)
+            except OSError:
+                return
+
+    def close(self):
+        self.listener.close()
+
+
+class _HubPushHandler(BaseHTTPRequestHandler):
+    """Hub side of a push: decode the body and rebuild delta rows"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        pushed = json.loads(decompress(body, self.headers.get('Content-Encoding')))['records']
+        for base, record in zip(self.server.bases, pushed):
+            if 'delta' in record:
+                apply_delta(base, record['delta'], expected_checksum=record['checksum'])
+
+        reply = json.dumps({'accepted': len(pushed), 'rejected': 0, 'conflicts': 0}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark sync payload bytes-on-the-wire and push latency over a throttled link'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--records',
+            type=int,
+            default=1000,
+            help='Records per push batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--bandwidth-kbps',
+            type=int,
+            default=512,
+            help='Link bandwidth in kbit/s (default: 512)',
+        )
+        parser.add_argument(
+            '--rtt-ms',
+            type=int,
+            default=80,
+            help='Link round-trip time in ms (default: 80)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        count = options['records']
+
+        bases = [self._make_row(i, rng) for i in range(count)]
+        currents = [self._edit_row(row, rng) for row in bases]
+
+        hub = ThreadingHTTPServer(('127.0.0.1', 0), _HubPushHandler)
+        hub.bases = bases
+        threading.Thread(target=hub.serve_forever, daemon=True).start()
+        link = ThrottledLink(
+            hub.server_address[1],
+            bytes_per_second=options['bandwidth_kbps'] * 1000 / 8,
+            rtt=options['rtt_ms'] / 1000,
+        )
+
+        self.stdout.write(
+            f'{count} records, link {options["bandwidth_kbps"]} kbit/s, RTT {options["rtt_ms"]} ms\n'
+        )
+        self.stdout.write(f'  {"payload":<22}{"bytes":>14}{"ratio":>9}{"latency":>12}')
+
+        baseline = None
+        try:
+            for encoding in supported_encodings():
+                for use_delta in (False, True):
+                    label = f'{"delta" if use_delta else "full"}/{encoding}'
+                    size, latency = self._push(link.port, bases, currents, use_delta, encoding)
+                    if baseline is None:
+                        baseline = size
+                    self.stdout.write(
+                        f'  {label:<22}{size:>14,}{baseline / size:>8.1f}x{latency * 1000:>10,.0f}ms'
+                    )
+        finally:
+            link.close()
+            hub.shutdown()
+            hub.server_close()
+
+        self.stdout.write(self.style.SUCCESS('\nBenchmark complete'))
+
+    def _push(self, port, bases, currents, use_delta, encoding):
+        start = time.perf_counter()
+
+        records = []
+        for base, current in zip(bases, currents):
+            record = {
+                'model_name': current['_model'],
+                'record_id': current['id'],
+                'operation': 'update',
+                'local_version': 2,
+            }
+            if use_delta:
+                record['delta'] = compute_delta(base, current)
+                record['checksum'] = checksum_data(current)
+            else:
+                record['data'] = current
+            records.append(record)
+        body = compress(json.dumps({'records': records}).encode(), encoding)
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+        try:
+            connection.request('POST', '/push/', body=body, headers={
+                'Content-Type': 'application/json',
+                'Content-Encoding': encoding,
+            })
+            response = connection.getresponse()
+            response.read()
+        finally:
+            connection.close()
+        if response.status != 200:
+            raise RuntimeError(f'Hub push failed: HTTP {response.status}')
+
+        return len(body), time.perf_counter() - start
+
+    def _make_row(self, i, rng):
+        kind = i % 10
+        if kind < 4:
+            return {
+                '_model': 'currencies.Portfolio',
+                'id': str(uuid.UUID(int=i)),
+                'name': f'Portfolio {i}',
+                'description': 'Long term holdings ' * 4,
+                'base_currency': 'TRY',
+                'total_value_try': f'{rng.uniform(1e3, 1e6):.2f}',
+                'total_value_usd': f'{rng.uniform(1e2, 1e5):.2f}',
+                'daily_pnl': f'{rng.uniform(-1e3, 1e3):.2f}',
+                'is_public': False,
+                'created_at': '2025-01-01T00:00:00+00:00',
+            }
+        if kind < 8:
+            return {
+                '_model': 'wimm.Transaction',
+                'id': str(uuid.UUID(int=i)),
+                'amount': f'{rng.uniform(1, 5000):.2f}',
+                'currency': 'TRY',
+                'category': rng.choice(['food', 'rent', 'transport', 'bills']),
+                'description': f'Payment {i}',
+                'date': '2025-06-01',
+            }
+        return {
+            '_model': 'documents.Document',
+            'id': str(uuid.UUID(int=i)),
+            'original_filename': f'receipt_{i}.jpg',
+            'document_type': 'receipt',
+            'processing_status': 'completed',
+            'ocr_text': 'MIGROS MARKET TOPLAM 123.45 TL ' * 40,
+            'analysis_results': {
+                method: {
+                    'text': 'line of recognised text ' * 30,
+                    'confidence': rng.random(),
+                    'boxes': [[rng.randint(0, 2000) for _ in range(4)] for _ in range(40)],
+                }
+                for method in ('tesseract', 'paddleocr', 'easyocr', 'llava')
+            },
+        }
+
+    def _edit_row(self, row, rng):
+        current = dict(row)
+        model = row['_model']
+        if model == 'currencies.Portfolio':
+            current['total_value_try'] = f'{rng.uniform(1e3, 1e6):.2f}'
+        elif model == 'wimm.Transaction':
+            current['category'] = 'other'
+        else:
+            current['processing_status'] = 'reviewed'
+        return current
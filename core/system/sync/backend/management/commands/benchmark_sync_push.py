@@ -0,0 +1,99 @@
+"""
+Benchmark sync push throughput
+
+Pushes synthetic records through the per-record (serial) and set-based
+(batch) push paths against the configured database and reports records/s.
+
+Usage: python manage.py benchmark_sync_push --records 10000
+"""
+
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.system.sync.backend.models import SyncSession, VersionVector
+from core.system.sync.backend.push import process_push_batch, process_push_serial
+
+
+class Command(BaseCommand):
+    help = 'Benchmark SyncPushView record processing (serial vs batch)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--records',
+            type=int,
+            default=10000,
+            help='Number of records to push per run (default: 10000)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Records per push request (default: 1000, the API maximum)',
+        )
+        parser.add_argument(
+            '--skip-serial',
+            action='store_true',
+            help='Only benchmark the batch path',
+        )
+
+    def handle(self, *args, **options):
+        count = options['records']
+        batch_size = options['batch_size']
+
+        self.stdout.write(f'Pushing {count} records in batches of {batch_size}\n')
+
+        engines = [('batch', process_push_batch)]
+        if not options['skip_serial']:
+            engines.insert(0, ('serial', process_push_serial))
+
+        for label, engine in engines:
+            node_id = uuid.uuid4()
+            session = SyncSession.objects.create(
+                node_id=node_id,
+                node_hostname=f'benchmark-{label}',
+            )
+            try:
+                records = self._make_records(count, version=1)
+                created_rate = self._run(engine, session, records, batch_size)
+
+                records = self._make_records(count, version=2)
+                updated_rate = self._run(engine, session, records, batch_size)
+
+                self.stdout.write(
+                    f'  {label:<8} create: {created_rate:>10,.0f} records/s   '
+                    f'update: {updated_rate:>10,.0f} records/s'
+                )
+            finally:
+                session.delete()
+                VersionVector.objects.filter(node_id=node_id).delete()
+
+        self.stdout.write(self.style.SUCCESS('\nBenchmark complete'))
+
+    def _run(self, engine, session, records, batch_size):
+        start = time.perf_counter()
+        for i in range(0, len(records), batch_size):
+            result = engine(session, records[i:i + batch_size])
+            if result['rejected']:
+                self.stdout.write(self.style.WARNING(
+                    f'  {result["rejected"]} records rejected: {result["errors"][:1]}'
+                ))
+        elapsed = time.perf_counter() - start
+        return len(records) / elapsed if elapsed else 0
+
+    def _make_records(self, count, version):
+        modified_at = timezone.now().isoformat()
+        models = ['currencies.Portfolio', 'documents.Document', 'wimm.Transaction']
+        return [
+            {
+                'model_name': models[i % len(models)],
+                'record_id': str(i),
+                'operation': 'create' if version == 1 else 'update',
+                'data': {'id': i, 'name': f'record {i}', 'amount': i * 1.5},
+                'local_version': version,
+                'local_modified_at': modified_at,
+            }
+            for i in range(count)
+        ]
@@ -0,0 +1,109 @@
+"""
+Benchmark save() throughput with and without SyncableModelMixin
+
+Creates throwaway tables for a plain model and a syncable model, then
+measures saves/s for:
+  - plain:     models.Model.save()
+  - checksum:  plain save + full-row checksum (the previous mixin behaviour)
+  - changelog: SyncableModelMixin.save() (version bump + change log append)
+
+Tables are dropped afterwards.
+
+Usage: python manage.py benchmark_sync_save --saves 5000
+"""
+
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+
+from core.system.sync.backend.delta import checksum_data
+from core.system.sync.backend.models import SyncableModelMixin, SyncChangeLog
+
+
+def _build_models(suffix):
+    """Define throwaway plain and syncable models with identical fields"""
+    fields = {
+        'name': models.CharField(max_length=100),
+        'amount': models.DecimalField(max_digits=20, decimal_places=2),
+        'notes': models.TextField(blank=True),
+        'payload': models.JSONField(default=dict),
+        '__module__': __name__,
+    }
+    plain = type(f'BenchPlain{suffix}', (models.Model,), {
+        **fields,
+        'Meta': type('Meta', (), {'app_label': 'sync', 'db_table': f'sync_bench_plain_{suffix}'}),
+    })
+    syncable = type(f'BenchSyncable{suffix}', (SyncableModelMixin, models.Model), {
+        **fields,
+        'Meta': type('Meta', (), {'app_label': 'sync', 'db_table': f'sync_bench_syncable_{suffix}'}),
+    })
+    return plain, syncable
+
+
+class Command(BaseCommand):
+    help = 'Benchmark save() throughput with and without SyncableModelMixin'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--saves',
+            type=int,
+            default=5000,
+            help='Number of saves per run (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['saves']
+        suffix = uuid.uuid4().hex[:8]
+        plain, syncable = _build_models(suffix)
+
+        with connection.schema_editor() as editor:
+            editor.create_model(plain)
+            editor.create_model(syncable)
+
+        seq_before = SyncChangeLog.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        try:
+            self.stdout.write(f'{count} saves per run (update of existing rows)\n')
+
+            rows = self._seed(plain, count)
+            rate = self._run(rows, lambda obj: obj.save())
+            self.stdout.write(f'  plain      {rate:>10,.0f} saves/s')
+
+            def legacy_save(obj):
+                data = {f.name: getattr(obj, f.name) for f in obj._meta.fields}
+                checksum_data(data)
+                obj.save()
+
+            rate = self._run(rows, legacy_save)
+            self.stdout.write(f'  checksum   {rate:>10,.0f} saves/s')
+
+            rows = self._seed(syncable, count)
+            rate = self._run(rows, lambda obj: obj.save())
+            self.stdout.write(f'  changelog  {rate:>10,.0f} saves/s')
+        finally:
+            with connection.schema_editor() as editor:
+                editor.delete_model(plain)
+                editor.delete_model(syncable)
+            SyncChangeLog.objects.filter(
+                id__gt=seq_before,
+                model_name__in=[plain._meta.label, syncable._meta.label]
+            ).delete()
+
+        self.stdout.write(self.style.SUCCESS('\nBenchmark complete'))
+
+    def _seed(self, model, count):
+        payload = {'tags': ['a', 'b', 'c'], 'history': list(range(50))}
+        return [
+            model.objects.create(name=f'row {i}', amount=i, notes='x' * 200, payload=payload)
+            for i in range(count)
+        ]
+
+    def _run(self, rows, save):
+        start = time.perf_counter()
+        for i, obj in enumerate(rows):
+            obj.amount = i + 1
+            save(obj)
+        elapsed = time.perf_counter() - start
+        return len(rows) / elapsed if elapsed else 0
@@ -0,0 +1,259 @@
+"""
+Merkle Anti-Entropy
+
+Range-hash summaries of a model's (record_id, sync_checksum) pairs, used by
+Hub and Node to detect silent divergence (lost pushes, restored backups)
+without re-sending every record.
+
+Records are bucketed by the hex prefix of sha256(record_id). Every prefix
+of length 0..depth is a tree node whose hash is the XOR of the item hashes
+beneath it, so the tree is order-independent and cheap to build in one pass.
+Reconciliation walks down only the prefixes whose hashes differ:
+
+    round 0  SyncInit: compare root hashes per model
+    round k  /sync/reconcile/: compare children of differing prefixes
+    leaf     Hub returns its (record_id, checksum) pairs for the differing
+             buckets and the Node computes the exact record diff
+
+That is depth + 1 round-trips (O(log n) for a fanout-16 tree).
+"""
+
+import hashlib
+
+HEX_DIGITS = '0123456789abcdef'
+
+# 16^3 = 4096 leaf buckets - ~50 records per bucket at 200k records
+DEFAULT_DEPTH = 3
+
+EMPTY_HASH = '0' * 64
+
+
+def _item_hash(record_id, checksum):
+    digest = hashlib.sha256(f'{record_id}\0{checksum}'.encode()).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def bucket_of(record_id, depth=DEFAULT_DEPTH):
+    """Leaf bucket prefix for a record id"""
+    return hashlib.sha256(str(record_id).encode()).hexdigest()[:depth]
+
+
+class MerkleSummary:
+    """
+    Fixed-depth, fanout-16 hash tree over (record_id, checksum) pairs.
+
+    Usage:
+        summary = MerkleSummary.from_pairs(Model.objects.values_list('pk', 'sync_checksum'))
+        summary.root
+        summary.children('a')     # {'a0': hash, ..., 'af': hash}
+
+    Leaf items are only retained for buckets starting with one of
+    keep_prefixes; pass [''] to keep every item.
+    """
+
+    def __init__(self, depth=DEFAULT_DEPTH, keep_prefixes=None):
+        self.depth = depth
+        self.count = 0
+        self._hashes = {}  # prefix -> XOR of item hashes
+        self._keep = tuple(keep_prefixes) if keep_prefixes else None
+        self._items = {}  # leaf prefix -> {record_id: checksum}
+
+    @classmethod
+    def from_pairs(cls, pairs, depth=DEFAULT_DEPTH, keep_prefixes=None):
+        """Build a summary from an iterable of (record_id, checksum)"""
+        summary = cls(depth=depth, keep_prefixes=keep_prefixes)
+        for record_id, checksum in pairs:
+            summary.add(record_id, checksum)
+        return summary
+
+    def add(self, record_id, checksum):
+        """Add one record to the tree"""
+        record_id = str(record_id)
+        value = _item_hash(record_id, checksum)
+        leaf = bucket_of(record_id, self.depth)
+
+        for length in range(self.depth + 1):
+            prefix = leaf[:length]
+            self._hashes[prefix] = self._hashes.get(prefix, 0) ^ value
+        self.count += 1
+
+        if self._keep is not None and leaf.startswith(self._keep):
+            self._items.setdefault(leaf, {})[record_id] = checksum
+
+    def hash_of(self, prefix):
+        """Hex hash of a tree node (EMPTY_HASH if no records under it)"""
+        value = self._hashes.get(prefix, 0)
+        return f'{value:064x}' if value else EMPTY_HASH
+
+    @property
+    def root(self):
+        return self.hash_of('')
+
+    def hashes(self, prefixes):
+        """Hex hashes for a list of prefixes"""
+        return {prefix: self.hash_of(prefix) for prefix in prefixes}
+
+    def children(self, prefix):
+        """Hex hashes of the 16 children of a prefix"""
+        if len(prefix) >= self.depth:
+            return {}
+        return self.hashes(prefix + digit for digit in HEX_DIGITS)
+
+    def items(self, prefix):
+        """(record_id -> checksum) pairs kept for a leaf bucket"""
+        if self._keep is None:
+            raise ValueError('Summary was built without keep_prefixes')
+        return dict(self._items.get(prefix, {}))
+
+    def is_leaf(self, prefix):
+        return len(prefix) >= self.depth
+
+    def to_dict(self):
+        """Serializable form for caching between reconcile rounds"""
+        return {
+            'depth': self.depth,
+            'count': self.count,
+            'hashes': {prefix: f'{value:x}' for prefix, value in self._hashes.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(depth=data['depth'])
+        summary.count = data['count']
+        summary._hashes = {prefix: int(value, 16) for prefix, value in data['hashes'].items()}
+        return summary
+
+
+def differing_prefixes(summary, remote_hashes):
+    """Prefixes whose remote hash differs from the local summary"""
+    return sorted(
+        prefix for prefix, remote_hash in remote_hashes.items()
+        if summary.hash_of(prefix) != remote_hash
+    )
+
+
+def diff_items(local_items, remote_items):
+    """
+    Exact record diff for a leaf bucket.
+
+    Returns:
+        dict: missing_remote (only local), missing_local (only remote),
+              changed (present on both with different checksums)
+    """
+    local_ids = set(local_items)
+    remote_ids = set(remote_items)
+    return {
+        'missing_remote': sorted(local_ids - remote_ids),
+        'missing_local': sorted(remote_ids - local_ids),
+        'changed': sorted(
+            record_id for record_id in local_ids & remote_ids
+            if local_items[record_id] != remote_items[record_id]
+        ),
+    }
+
+
+def reconcile(local, remote_step, local_items=None, max_rounds=None):
+    """
+    Drive a full reconciliation of `local` against a remote summary.
+
+    Args:
+        local: Local MerkleSummary
+        remote_step: Callable(hashes: {prefix: hash}) returning
+            {'differing': [...], 'items': {leaf_prefix: {record_id: checksum}}}
+            - the same contract as the /sync/reconcile/ endpoint
+        local_items: Callable(leaf_prefix) returning local {record_id: checksum};
+            defaults to local.items (summary built with keep_prefixes=[''])
+        max_rounds: Safety limit (defaults to depth + 1)
+
+    Returns:
+        tuple: (diff dict as from diff_items, round_trips)
+    """
+    max_rounds = max_rounds or local.depth + 1
+    local_items = local_items or local.items
+    result = {'missing_remote': [], 'missing_local': [], 'changed': []}
+    hashes = {'': local.root}
+    rounds = 0
+
+    while hashes and rounds < max_rounds:
+        response = remote_step(hashes)
+        rounds += 1
+
+        next_hashes = {}
+        for prefix in response.get('differing', []):
+            if local.is_leaf(prefix):
+                continue
+            next_hashes.update(local.children(prefix))
+
+        for prefix, remote_items in response.get('items', {}).items():
+            leaf_diff = diff_items(local_items(prefix), remote_items)
+            for key, values in leaf_diff.items():
+                result[key].extend(values)
+
+        hashes = next_hashes
+
+    for values in result.values():
+        values.sort()
+    return result, rounds
+
+
+def answer_step(summary, hashes, leaf_items=None):
+    """
+    Hub side of one reconcile round.
+
+    Args:
+        summary: Hub MerkleSummary for the model
+        hashes: Node's {prefix: hash} for this round
+        leaf_items: Callable(prefixes) returning {leaf_prefix: {record_id: checksum}}
+            for differing leaf buckets
+
+    Returns:
+        dict: {'differing': [...], 'items': {...}}
+    """
+    differing = differing_prefixes(summary, hashes)
+    leaves = [prefix for prefix in differing if summary.is_leaf(prefix)]
+
+    items = {}
+    if leaves and leaf_items is not None:
+        items = leaf_items(leaves)
+
+    return {'differing': differing, 'items': items}
+
+
+def hub_checksum_pairs(node_id, model_name):
+    """
+    Latest (record_id, checksum) per record the Hub holds for a node/model.
+
+    Deleted records are excluded so they do not count as present.
+    """
+    from .models import SyncRecord, SyncStatus
+
+    records = SyncRecord.objects.filter(
+        session__node_id=node_id,
+        model_name=model_name,
+        status=SyncStatus.COMPLETED
+    ).order_by('record_id', '-synced_at').values_list('record_id', 'checksum', 'operation')
+
+    last_id = None
+    for record_id, checksum, operation in records.iterator(chunk_size=2000):
+        if record_id == last_id:
+            continue
+        last_id = record_id
+        if operation != 'delete':
+            yield record_id, checksum
+
+
+def node_checksum_pairs(model):
+    """
+    (record_id, sync_checksum) for every row of a syncable model on the Node.
+
+    Rows whose checksum has not been computed yet (see SyncableModelMixin)
+    are hashed and written back first.
+    """
+    stale = [obj for obj in model.objects.filter(sync_checksum='')]
+    for obj in stale:
+        obj.get_sync_checksum()
+    if stale:
+        model.objects.bulk_update(stale, ['sync_checksum'], batch_size=500)
+
+    for pk, checksum in model.objects.values_list('pk', 'sync_checksum').iterator(chunk_size=2000):
+        yield str(pk), checksum
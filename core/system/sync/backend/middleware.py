@@ -10,7 +10,9 @@ import logging
 from django.conf import settings
 from django.http import JsonResponse
 
-from .models import DataExportSettings, DataExportLog, ExportDestination, ExportStatus
+from .models import ExportDestination, ExportStatus
+from .export_logs import export_log_writer
+from .policy import policy_cache
 
 logger = logging.getLogger(__name__)
 
@@ -55,10 +57,43 @@ class DataExportControlMiddleware:
         'recaria': r'^/recaria/',
     }
 
+    # Path classes resolved by the router besides module names
+    ROUTE_EXEMPT = '_exempt'
+    ROUTE_INCOMING = '_incoming'
+
+    # Non-DRF JSON bodies larger than this are not parsed for record counts
+    MAX_PARSE_BYTES = 64 * 1024
+
     def __init__(self, get_response):
         self.get_response = get_response
-        self.exempt_patterns = [re.compile(p) for p in self.EXEMPT_PATHS]
-        self.incoming_patterns = [re.compile(p) for p in self.INCOMING_PATHS]
+        self.router = self._compile_router()
+
+    @classmethod
+    def _compile_router(cls):
+        """
+        Compile all path rules into one alternation with named groups.
+
+        Alternatives are tried in order (exempt, incoming, modules), so one
+        match call gives the same answer as checking each list in turn.
+        """
+        routes = [(cls.ROUTE_EXEMPT, p) for p in cls.EXEMPT_PATHS]
+        routes += [(cls.ROUTE_INCOMING, p) for p in cls.INCOMING_PATHS]
+        routes += list(cls.MODULE_PATH_MAP.items())
+
+        group_names = {}
+        alternatives = []
+        for index, (route, pattern) in enumerate(routes):
+            group = f'r{index}'
+            group_names[group] = route
+            alternatives.append(f'(?P<{group}>{pattern})')
+
+        return re.compile('|'.join(alternatives)), group_names
+
+    def _route(self, path):
+        """Classify a path: ROUTE_EXEMPT, ROUTE_INCOMING, a module name or None"""
+        pattern, group_names = self.router
+        match = pattern.match(path)
+        return group_names[match.lastgroup] if match else None
 
     def __call__(self, request):
         # Get response first
@@ -68,31 +103,28 @@ class DataExportControlMiddleware:
         if response.status_code not in [200, 201]:
             return response
 
-        # Skip exempt paths
-        if self._is_exempt(request.path):
-            return response
-
-        # Skip incoming data
-        if self._is_incoming(request.path):
-            return response
-
         # Only check GET and POST responses that return data
         if request.method not in ['GET', 'POST']:
             return response
 
+        # Skip exempt paths, incoming data and unknown modules
+        route = self._route(request.path)
+        if route in (None, self.ROUTE_EXEMPT, self.ROUTE_INCOMING):
+            return response
+
         # Check if this is a data export
         if self._is_export_response(response):
-            return self._check_export(request, response)
+            return self._check_export(request, response, route)
 
         return response
 
     def _is_exempt(self, path):
         """Check if path is exempt from export control"""
-        return any(p.match(path) for p in self.exempt_patterns)
+        return self._route(path) == self.ROUTE_EXEMPT
 
     def _is_incoming(self, path):
         """Check if path is for incoming data (not an export)"""
-        return any(p.match(path) for p in self.incoming_patterns)
+        return self._route(path) == self.ROUTE_INCOMING
 
     def _is_export_response(self, response):
         """Check if response contains exportable data"""
@@ -101,10 +133,10 @@ class DataExportControlMiddleware:
 
     def _get_module_from_path(self, path):
         """Extract module name from request path"""
-        for module, pattern in self.MODULE_PATH_MAP.items():
-            if re.match(pattern, path):
-                return module
-        return None
+        route = self._route(path)
+        if route in (self.ROUTE_EXEMPT, self.ROUTE_INCOMING):
+            return None
+        return route
 
     def _get_data_type_from_path(self, path):
         """Extract data type from request path"""
@@ -119,20 +151,20 @@ class DataExportControlMiddleware:
         """Get current node ID from settings"""
         return getattr(settings, 'NODE_UUID', None)
 
-    def _check_export(self, request, response):
+    def _check_export(self, request, response, module=None):
         """Check if export is allowed and log it"""
         node_id = self._get_node_id(request)
         if not node_id:
             return response  # Can't check without node ID
 
-        module = self._get_module_from_path(request.path)
+        module = module or self._get_module_from_path(request.path)
         if not module:
             return response  # Unknown module, allow by default
 
         data_type = self._get_data_type_from_path(request.path)
 
-        # Get export settings
-        export_settings = DataExportSettings.get_for_node(node_id)
+        # Get export settings (process-local, invalidated on change)
+        export_settings = policy_cache.get(node_id)
 
         # Check if export is allowed
         if not export_settings.can_export(module, data_type):
@@ -181,22 +213,7 @@ class DataExportControlMiddleware:
             # Calculate data size
             size_bytes = len(response.content) if hasattr(response, 'content') else 0
 
-            # Try to count records
-            record_count = 0
-            if hasattr(response, 'content'):
-                try:
-                    data = json.loads(response.content)
-                    if isinstance(data, list):
-                        record_count = len(data)
-                    elif isinstance(data, dict):
-                        if 'results' in data:
-                            record_count = len(data['results'])
-                        elif 'count' in data:
-                            record_count = data['count']
-                        else:
-                            record_count = 1
-                except (json.JSONDecodeError, TypeError):
-                    pass
+            record_count = self._count_records(response)
 
             # Determine destination
             destination_type = ExportDestination.UNKNOWN
@@ -216,7 +233,7 @@ class DataExportControlMiddleware:
             if hasattr(request, 'user') and request.user.is_authenticated:
                 user_id = getattr(request.user, 'id', None)
 
-            DataExportLog.log_export(
+            export_log_writer.submit(
                 node_id=node_id,
                 module=module,
                 data_type=data_type,
@@ -234,6 +251,34 @@ class DataExportControlMiddleware:
         except Exception as e:
             logger.error(f"Failed to log export: {e}")
 
+    def _count_records(self, response):
+        """
+        Count records in a JSON response.
+
+        DRF responses still carry the Python data they were rendered from,
+        so the body is not parsed again. Other JSON bodies are only parsed
+        when small.
+        """
+        if hasattr(response, 'data'):
+            data = response.data
+        elif len(getattr(response, 'content', b'')) <= self.MAX_PARSE_BYTES:
+            try:
+                data = json.loads(response.content)
+            except (json.JSONDecodeError, TypeError, ValueError):
+                return 0
+        else:
+            return 0
+
+        if isinstance(data, list):
+            return len(data)
+        if isinstance(data, dict):
+            if isinstance(data.get('results'), list):
+                return len(data['results'])
+            if 'count' in data:
+                return data['count']
+            return 1
+        return 0
+
     def _get_client_ip(self, request):
         """Get client IP from request"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
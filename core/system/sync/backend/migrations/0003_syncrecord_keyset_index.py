@@ -0,0 +1,21 @@
+# Migration: 0003_syncrecord_keyset_index
+# Composite index backing keyset-cursor pulls
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_export_control'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='syncrecord',
+            index=models.Index(
+                fields=['session', 'status', 'model_name', 'record_id'],
+                name='sync_rec_sess_keyset_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Migration: 0004_sync_change_log
+# Append-only change feed for syncable models
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0003_syncrecord_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model_name', models.CharField(max_length=100)),
+                ('record_id', models.CharField(max_length=100)),
+                ('version', models.BigIntegerField(default=0)),
+                ('operation', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'sync_change_log',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='syncchangelog',
+            index=models.Index(fields=['model_name', 'id'], name='sync_chg_model_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Migration: 0005_syncsession_divergent_models
+# Merkle anti-entropy state on sync sessions
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0004_sync_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncsession',
+            name='divergent_models',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Migration: 0006_export_log_rollups
+# Hourly pre-aggregated export log statistics
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+
+
+def backfill_rollups(apps, schema_editor):
+    """Aggregate existing export logs into hourly rollups"""
+    DataExportLog = apps.get_model('sync', 'DataExportLog')
+    DataExportLogRollup = apps.get_model('sync', 'DataExportLogRollup')
+
+    buckets = (
+        DataExportLog.objects
+        .annotate(hour=TruncHour('timestamp'))
+        .order_by()
+        .values('node_id', 'hour', 'module', 'destination_type', 'status')
+        .annotate(count=Count('id'), record_count=Sum('record_count'), size_bytes=Sum('size_bytes'))
+    )
+    DataExportLogRollup.objects.bulk_create(
+        (
+            DataExportLogRollup(
+                node_id=bucket['node_id'],
+                hour=bucket['hour'],
+                module=bucket['module'],
+                destination_type=bucket['destination_type'],
+                status=bucket['status'],
+                count=bucket['count'],
+                record_count=bucket['record_count'] or 0,
+                size_bytes=bucket['size_bytes'] or 0,
+            )
+            for bucket in buckets.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0005_syncsession_divergent_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataExportLogRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('node_id', models.UUIDField()),
+                ('hour', models.DateTimeField()),
+                ('module', models.CharField(max_length=50)),
+                ('destination_type', models.CharField(choices=[('hub', 'Hub Server'), ('node', 'Another Node'), ('external', 'External API'), ('file', 'File Export'), ('unknown', 'Unknown')], default='unknown', max_length=20)),
+                ('status', models.CharField(choices=[('allowed', 'Allowed'), ('blocked', 'Blocked'), ('pending', 'Pending Confirmation'), ('cancelled', 'Cancelled by User')], default='allowed', max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('record_count', models.BigIntegerField(default=0)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'export_log_rollups',
+                'ordering': ['-hour'],
+                'unique_together': {('node_id', 'hour', 'module', 'destination_type', 'status')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dataexportlogrollup',
+            index=models.Index(fields=['node_id', 'hour'], name='export_rollup_node_hour_idx'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
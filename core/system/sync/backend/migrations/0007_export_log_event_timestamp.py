@@ -0,0 +1,20 @@
+# Migration: 0007_export_log_event_timestamp
+# Export log timestamps are written explicitly by the buffered writer
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0006_export_log_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataexportlog',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
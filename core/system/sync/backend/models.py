@@ -6,14 +6,15 @@ Includes version vectors, offline queue, and conflict tracking.
 """
 
 import uuid
-import hashlib
-import json
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from datetime import timedelta
 
+from .delta import checksum_data, compute_delta
+from .policy import bump_policy_version
+
 
 class SyncStatus(models.TextChoices):
     """Sync operation status"""
@@ -75,6 +76,9 @@ class SyncSession(models.Model):
     node_version_vector = models.JSONField(default=dict)  # {model: version, ...}
     hub_version_vector = models.JSONField(default=dict)
 
+    # Anti-entropy: models whose Merkle roots differed at init
+    divergent_models = models.JSONField(default=list)
+
     # Progress tracking
     total_records = models.IntegerField(default=0)
     processed_records = models.IntegerField(default=0)
@@ -184,6 +188,11 @@ class SyncRecord(models.Model):
         indexes = [
             models.Index(fields=['session', 'status']),
             models.Index(fields=['model_name', 'record_id']),
+            # Keyset pull: range scan over a session's pending records
+            models.Index(
+                fields=['session', 'status', 'model_name', 'record_id'],
+                name='sync_rec_sess_keyset_idx'
+            ),
         ]
 
     def __str__(self):
@@ -191,8 +200,7 @@ class SyncRecord(models.Model):
 
     def compute_checksum(self):
         """Compute SHA256 checksum of data"""
-        data_str = json.dumps(self.data, sort_keys=True, default=str)
-        return hashlib.sha256(data_str.encode()).hexdigest()
+        return checksum_data(self.data)
 
     def save(self, *args, **kwargs):
         if not self.checksum:
@@ -465,17 +473,110 @@ class VersionVector(models.Model):
         return obj
 
 
+class SyncChangeLog(models.Model):
+    """
+    Append-only change feed of syncable records on this node.
+
+    One row is written per save/delete of a SyncableModelMixin model, in the
+    same transaction as the change itself. The auto-increment id is a
+    node-local sequence, so "changes since X" is a single primary key range
+    scan instead of scanning sync_status across every syncable table.
+    """
+    id = models.BigAutoField(primary_key=True)
+
+    # Record identification
+    model_name = models.CharField(max_length=100)  # 'currencies.Portfolio'
+    record_id = models.CharField(max_length=100)
+
+    # Change info
+    version = models.BigIntegerField(default=0)
+    operation = models.CharField(
+        max_length=10,
+        choices=[
+            ('create', 'Create'),
+            ('update', 'Update'),
+            ('delete', 'Delete'),
+        ]
+    )
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'sync_change_log'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['model_name', 'id'], name='sync_chg_model_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.operation} {self.model_name}:{self.record_id} v{self.version}"
+
+    @classmethod
+    def record(cls, instance, operation):
+        """Append a change entry for a syncable model instance"""
+        return cls.objects.db_manager(instance._state.db).create(
+            model_name=instance._meta.label,
+            record_id=str(instance.pk),
+            version=instance.sync_version,
+            operation=operation
+        )
+
+    @classmethod
+    def changes_since(cls, since=0, model_names=None, limit=None):
+        """
+        Get change entries after a sequence number.
+
+        Args:
+            since: Last sequence number already acknowledged by the Hub
+            model_names: Optional list of models to restrict to
+            limit: Optional maximum number of entries
+
+        Returns:
+            QuerySet: SyncChangeLog entries in sequence order
+        """
+        queryset = cls.objects.filter(id__gt=since)
+        if model_names:
+            queryset = queryset.filter(model_name__in=model_names)
+        queryset = queryset.order_by('id')
+        return queryset[:limit] if limit else queryset
+
+    @classmethod
+    def latest_vector(cls):
+        """Current head sequence per model"""
+        return dict(
+            cls.objects.values('model_name')
+            .annotate(seq=models.Max('id'))
+            .values_list('model_name', 'seq')
+        )
+
+    @classmethod
+    def prune(cls, upto):
+        """Remove entries already acknowledged by the Hub"""
+        return cls.objects.filter(id__lte=upto).delete()
+
+
 class SyncableModelMixin(models.Model):
     """
     Mixin for models that need to be synced between Node and Hub.
 
     Add this mixin to any model that should participate in sync.
 
+    Every save bumps sync_version and appends a SyncChangeLog entry in the
+    same transaction. The sync checksum is computed lazily, only when the
+    record is collected for export (see changefeed.py).
+
     Usage:
         class Portfolio(SyncableModelMixin, models.Model):
             # your fields here
             pass
     """
+    # Fields maintained by the sync engine itself
+    SYNC_META_FIELDS = frozenset([
+        'sync_version', 'sync_checksum', 'sync_status',
+        'synced_at', 'local_created_at', 'local_modified_at'
+    ])
+
     # Sync metadata
     sync_version = models.BigIntegerField(default=0, db_index=True)
     sync_checksum = models.CharField(max_length=64, blank=True)
@@ -507,8 +608,7 @@ class SyncableModelMixin(models.Model):
         """
         data = {}
         for field in self._meta.fields:
-            if field.name not in ['sync_version', 'sync_checksum', 'sync_status',
-                                   'synced_at', 'local_created_at', 'local_modified_at']:
+            if field.name not in self.SYNC_META_FIELDS:
                 value = getattr(self, field.name)
                 # Handle special types
                 if hasattr(value, 'isoformat'):
@@ -520,16 +620,31 @@ class SyncableModelMixin(models.Model):
 
     def compute_sync_checksum(self):
         """Compute checksum of syncable data"""
-        data = self.get_sync_data()
-        data_str = json.dumps(data, sort_keys=True, default=str)
-        return hashlib.sha256(data_str.encode()).hexdigest()
+        return checksum_data(self.get_sync_data())
+
+    def get_sync_checksum(self):
+        """Checksum of the current data, computed on first use"""
+        if not self.sync_checksum:
+            self.sync_checksum = self.compute_sync_checksum()
+        return self.sync_checksum
+
+    def get_sync_delta(self, base_data):
+        """
+        Field-level diff of the current sync data against base_data.
+
+        base_data is the version last acknowledged by the Hub. Returns a
+        delta dict (see delta.py) to send instead of the full row.
+        """
+        return compute_delta(base_data, self.get_sync_data())
 
     def mark_for_sync(self):
         """Mark record as needing sync"""
         self.sync_version += 1
-        self.sync_checksum = self.compute_sync_checksum()
+        self.sync_checksum = ''
         self.sync_status = 'pending'
-        self.save(update_fields=['sync_version', 'sync_checksum', 'sync_status', 'local_modified_at'])
+        with transaction.atomic(using=self._state.db):
+            super().save(update_fields=['sync_version', 'sync_checksum', 'sync_status', 'local_modified_at'])
+            SyncChangeLog.record(self, 'update')
 
     def mark_synced(self):
         """Mark record as synced"""
@@ -538,14 +653,29 @@ class SyncableModelMixin(models.Model):
         self.save(update_fields=['sync_status', 'synced_at'])
 
     def save(self, *args, **kwargs):
-        # Auto-compute checksum on save if data changed
-        if not kwargs.get('update_fields'):
-            new_checksum = self.compute_sync_checksum()
-            if new_checksum != self.sync_checksum:
-                self.sync_checksum = new_checksum
-                self.sync_version += 1
-                self.sync_status = 'pending'
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not set(update_fields) - self.SYNC_META_FIELDS:
+            # Sync bookkeeping only - not a data change
+            super().save(*args, **kwargs)
+            return
+
+        operation = 'create' if self._state.adding else 'update'
+        self.sync_version += 1
+        self.sync_checksum = ''
+        self.sync_status = 'pending'
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                'sync_version', 'sync_checksum', 'sync_status', 'local_modified_at'
+            }
+
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            SyncChangeLog.record(self, operation)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            SyncChangeLog.record(self, 'delete')
+            return super().delete(*args, **kwargs)
 
 
 # =============================================================================
@@ -603,6 +733,12 @@ class DataExportSettings(models.Model):
         status = "BLOCKED" if self.master_kill_switch else "ALLOWED"
         return f"Export Settings for {self.node_hostname} ({status})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Cached policies in every process reload once this commits
+        node_id = self.node_id
+        transaction.on_commit(lambda: bump_policy_version(node_id))
+
     def can_export(self, module, data_type=None):
         """
         Check if export is allowed for a module/data_type.
@@ -740,7 +876,8 @@ class DataExportLog(models.Model):
     user_agent = models.TextField(blank=True)
 
     # Timestamps
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Event time - set explicitly by the buffered writer when the entry is queued
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
 
     # Extra data
     extra_data = models.JSONField(default=dict)
@@ -762,8 +899,8 @@ class DataExportLog(models.Model):
     @classmethod
     def log_export(cls, node_id, module, data_type, destination_type,
                    status=ExportStatus.ALLOWED, **kwargs):
-        """Create an export log entry"""
-        return cls.objects.create(
+        """Create an export log entry (synchronously, with its rollup)"""
+        entry = cls.objects.create(
             node_id=node_id,
             module=module,
             data_type=data_type,
@@ -771,6 +908,8 @@ class DataExportLog(models.Model):
             status=status,
             **kwargs
         )
+        DataExportLogRollup.add_entries([entry])
+        return entry
 
     @classmethod
     def log_blocked(cls, node_id, module, data_type, destination_type, reason, **kwargs):
@@ -787,26 +926,152 @@ class DataExportLog(models.Model):
 
     @classmethod
     def get_stats(cls, node_id, days=7):
-        """Get export statistics for a node"""
+        """
+        Get export statistics for a node.
+
+        Read from hourly rollups; the window starts at the top of the hour
+        `days` ago.
+        """
+        return DataExportLogRollup.get_stats(node_id, days=days)
+
+    @classmethod
+    def cleanup_old(cls, days=90, window_hours=24):
+        """
+        Remove old log entries and rollups.
+
+        Deletes in timestamp ranges of window_hours so each statement only
+        touches one slice of the timestamp index, instead of one long sweep
+        over every expired row.
+        """
         cutoff = timezone.now() - timedelta(days=days)
-        logs = cls.objects.filter(node_id=node_id, timestamp__gte=cutoff)
+        oldest = cls.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list(
+            'timestamp', flat=True
+        ).first()
+
+        deleted = 0
+        start = oldest
+        while start is not None and start < cutoff:
+            end = min(start + timedelta(hours=window_hours), cutoff)
+            count, _ = cls.objects.filter(timestamp__gte=start, timestamp__lt=end).delete()
+            deleted += count
+            start = end
+
+        rollups, _ = DataExportLogRollup.objects.filter(
+            hour__lt=DataExportLogRollup.truncate_hour(cutoff)
+        ).delete()
+
+        return deleted, {'sync.DataExportLog': deleted, 'sync.DataExportLogRollup': rollups}
+
+
+class DataExportLogRollup(models.Model):
+    """
+    Hourly pre-aggregated export counts per node/module/destination/status.
+
+    Maintained incrementally as export log entries are written so export
+    statistics never aggregate over raw DataExportLog rows.
+    """
+    id = models.BigAutoField(primary_key=True)
+
+    # Bucket
+    node_id = models.UUIDField()
+    hour = models.DateTimeField()
+    module = models.CharField(max_length=50)
+    destination_type = models.CharField(
+        max_length=20,
+        choices=ExportDestination.choices,
+        default=ExportDestination.UNKNOWN
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=ExportStatus.choices,
+        default=ExportStatus.ALLOWED
+    )
+
+    # Aggregates
+    count = models.IntegerField(default=0)
+    record_count = models.BigIntegerField(default=0)
+    size_bytes = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'export_log_rollups'
+        ordering = ['-hour']
+        unique_together = ['node_id', 'hour', 'module', 'destination_type', 'status']
+        indexes = [
+            models.Index(fields=['node_id', 'hour'], name='export_rollup_node_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}:00 {self.module} {self.status} x{self.count}"
+
+    @staticmethod
+    def truncate_hour(value):
+        return value.replace(minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def add_entries(cls, entries):
+        """
+        Fold DataExportLog entries (saved or unsaved) into hourly rollups.
+
+        Entries are aggregated in memory first, so a batch costs one
+        UPDATE (or INSERT) per distinct bucket.
+        """
+        buckets = {}
+        for entry in entries:
+            timestamp = entry.timestamp or timezone.now()
+            key = (
+                entry.node_id, cls.truncate_hour(timestamp),
+                entry.module, entry.destination_type, entry.status
+            )
+            count, records, size = buckets.get(key, (0, 0, 0))
+            buckets[key] = (
+                count + 1,
+                records + (entry.record_count or 0),
+                size + (entry.size_bytes or 0)
+            )
+
+        for (node_id, hour, module, destination_type, status), (count, records, size) in buckets.items():
+            lookup = {
+                'node_id': node_id, 'hour': hour, 'module': module,
+                'destination_type': destination_type, 'status': status,
+            }
+            increments = {
+                'count': models.F('count') + count,
+                'record_count': models.F('record_count') + records,
+                'size_bytes': models.F('size_bytes') + size,
+            }
+            if cls.objects.filter(**lookup).update(**increments):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(**lookup, count=count, record_count=records, size_bytes=size)
+            except IntegrityError:
+                # Another writer created the bucket first
+                cls.objects.filter(**lookup).update(**increments)
+
+    @classmethod
+    def get_stats(cls, node_id, days=7):
+        """Export statistics for a node from rollups"""
+        cutoff = cls.truncate_hour(timezone.now() - timedelta(days=days))
+        rollups = cls.objects.filter(node_id=node_id, hour__gte=cutoff)
+
+        totals = rollups.aggregate(
+            total=models.Sum('count'),
+            allowed=models.Sum('count', filter=models.Q(status=ExportStatus.ALLOWED)),
+            blocked=models.Sum('count', filter=models.Q(status=ExportStatus.BLOCKED)),
+            total_records=models.Sum('record_count'),
+            total_bytes=models.Sum('size_bytes'),
+        )
 
         return {
-            'total': logs.count(),
-            'allowed': logs.filter(status=ExportStatus.ALLOWED).count(),
-            'blocked': logs.filter(status=ExportStatus.BLOCKED).count(),
+            'total': totals['total'] or 0,
+            'allowed': totals['allowed'] or 0,
+            'blocked': totals['blocked'] or 0,
             'by_module': dict(
-                logs.values('module').annotate(count=models.Count('id')).values_list('module', 'count')
+                rollups.order_by().values('module').annotate(total=models.Sum('count')).values_list('module', 'total')
             ),
             'by_destination': dict(
-                logs.values('destination_type').annotate(count=models.Count('id')).values_list('destination_type', 'count')
+                rollups.order_by().values('destination_type').annotate(total=models.Sum('count')).values_list('destination_type', 'total')
             ),
-            'total_records': logs.aggregate(total=models.Sum('record_count'))['total'] or 0,
-            'total_bytes': logs.aggregate(total=models.Sum('size_bytes'))['total'] or 0,
+            'total_records': totals['total_records'] or 0,
+            'total_bytes': totals['total_bytes'] or 0,
         }
-
-    @classmethod
-    def cleanup_old(cls, days=90):
-        """Remove old log entries"""
-        cutoff = timezone.now() - timedelta(days=days)
-        return cls.objects.filter(timestamp__lt=cutoff).delete()
@@ -0,0 +1,117 @@
+"""
+Export Policy Cache
+
+In-process cache of DataExportSettings for the export control middleware.
+
+Each node's settings carry a version stamp in the shared Django cache. The
+stamp is replaced whenever DataExportSettings is saved, so every worker
+process notices a change (e.g. the kill switch) on its next request with a
+single cache GET instead of a database query per request.
+
+When the default cache is process-local (the node's LocMemCache fallback
+without Redis) a stamp bump would only reach the process that saved the
+settings, so the stamp is read from the settings row instead
+(updated_at + master_kill_switch) - one indexed single-row query that
+keeps the kill switch instant for every worker.
+"""
+
+import logging
+import threading
+import time
+import uuid
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+STAMP_KEY = 'sync:export_policy:{node_id}'
+
+# Upper bound on how long a process trusts its copy if stamps go missing
+MAX_AGE_SECONDS = 60
+
+
+def _stamp_key(node_id):
+    return STAMP_KEY.format(node_id=node_id)
+
+
+def bump_policy_version(node_id):
+    """Invalidate every process's cached policy for a node"""
+    try:
+        cache.set(_stamp_key(node_id), uuid.uuid4().hex, None)
+    except Exception as e:
+        logger.warning(f"Could not bump export policy version for {node_id}: {e}")
+
+
+def _cache_is_shared():
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _database_stamp(node_id):
+    """Version of a node's settings row (None until it exists)"""
+    from .models import DataExportSettings
+    return DataExportSettings.objects.filter(node_id=node_id).values_list(
+        'updated_at', 'master_kill_switch'
+    ).first()
+
+
+def _current_stamp(node_id):
+    """Read (or initialise) the version stamp for a node"""
+    if not _cache_is_shared():
+        return _database_stamp(node_id)
+
+    key = _stamp_key(node_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        stamp = cache.get(key)
+    return stamp
+
+
+class ExportPolicyCache:
+    """
+    Process-local DataExportSettings cache keyed by node id.
+
+    The stamp is read before the settings are loaded, so a change that
+    races with a reload is always picked up on the following request.
+    """
+
+    def __init__(self, max_age=MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._entries = {}  # node_id -> (stamp, loaded_at, settings)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, node_id):
+        """Get export settings for a node, reloading only when stale"""
+        from .models import DataExportSettings
+
+        node_key = str(node_id)
+        try:
+            stamp = _current_stamp(node_key)
+        except Exception as e:
+            # Shared cache unavailable - fall back to the database
+            logger.debug(f"Export policy stamp unavailable: {e}")
+            return DataExportSettings.get_for_node(node_id)
+
+        entry = self._entries.get(node_key)
+        if entry is not None:
+            cached_stamp, loaded_at, settings_obj = entry
+            if cached_stamp == stamp and time.monotonic() - loaded_at < self.max_age:
+                self.hits += 1
+                return settings_obj
+
+        settings_obj = DataExportSettings.get_for_node(node_id)
+        with self._lock:
+            self._entries[node_key] = (stamp, time.monotonic(), settings_obj)
+        self.misses += 1
+        return settings_obj
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+policy_cache = ExportPolicyCache()
@@ -0,0 +1,107 @@
+"""
+Sync Pull Engine
+
+Keyset (cursor) pagination and NDJSON streaming over pending SyncRecords.
+
+Records are walked in their natural (model_name, record_id) ordering, which
+is backed by the composite index on SyncRecord, so every page is a single
+index range scan - no COUNT(*) and no OFFSET.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import SyncRecord, SyncStatus
+
+# Fields sent to the Node for each record (mirrors SyncRecordSerializer)
+RECORD_FIELDS = [
+    'id', 'model_name', 'record_id', 'operation',
+    'data', 'checksum', 'local_version', 'remote_version',
+    'status', 'local_modified_at', 'remote_modified_at',
+    'synced_at', 'error_message'
+]
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pull cursor cannot be decoded"""
+
+
+def encode_cursor(model_name, record_id):
+    """Encode a (model_name, record_id) position as an opaque cursor"""
+    raw = json.dumps([model_name, record_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode an opaque cursor back into (model_name, record_id)"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        model_name, record_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursor(f'Invalid cursor: {cursor}')
+    return str(model_name), str(record_id)
+
+
+def pending_records(session, models_filter=None):
+    """Pending records for a session in keyset order"""
+    queryset = SyncRecord.objects.filter(
+        session=session,
+        status=SyncStatus.PENDING
+    )
+    if models_filter:
+        queryset = queryset.filter(model_name__in=models_filter)
+    return queryset.order_by('model_name', 'record_id')
+
+
+def after_position(queryset, model_name, record_id):
+    """Restrict a keyset-ordered queryset to rows after (model_name, record_id)"""
+    return queryset.filter(
+        Q(model_name__gt=model_name) |
+        Q(model_name=model_name, record_id__gt=record_id)
+    )
+
+
+def after_cursor(queryset, cursor):
+    """Restrict a keyset-ordered queryset to rows after the cursor position"""
+    if not cursor:
+        return queryset
+    return after_position(queryset, *decode_cursor(cursor))
+
+
+def fetch_page(queryset, cursor, batch_size):
+    """
+    Fetch one page of records after the cursor.
+
+    Returns:
+        tuple: (records, next_cursor) - next_cursor is None on the last page
+    """
+    records = list(after_cursor(queryset, cursor)[:batch_size + 1])
+    if len(records) <= batch_size:
+        return records, None
+
+    records = records[:batch_size]
+    last = records[-1]
+    return records, encode_cursor(last.model_name, last.record_id)
+
+
+def iter_ndjson(queryset, chunk_size=500):
+    """
+    Yield every record in the queryset as one JSON line.
+
+    Walks the set in keyset chunks so memory stays flat for any session size.
+    """
+    page = queryset
+    while True:
+        rows = list(page.values(*RECORD_FIELDS)[:chunk_size])
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]
+        page = after_position(queryset, last['model_name'], last['record_id'])
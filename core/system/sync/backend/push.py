@@ -0,0 +1,345 @@
+"""
+Sync Push Engine
+
+Set-based processing of records pushed from a Node to the Hub.
+
+A push batch is resolved against the Hub's existing records with a single
+query, classified into accepted/conflict in memory, and written back with
+bulk operations instead of one lookup + one upsert per record.
+
+Records may carry a field-level `delta` (see delta.py) instead of full
+`data`; the Hub rebuilds the row from the copy it last accepted from the
+Node - in any session, since every sync init opens a new one - before
+classifying it.
+"""
+
+import logging
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .delta import apply_delta, DeltaMismatch
+from .models import (
+    SyncRecord, SyncConflict, VersionVector,
+    SyncStatus, ConflictStrategy
+)
+
+logger = logging.getLogger(__name__)
+
+VALID_OPERATIONS = ('create', 'update', 'delete')
+
+# Fields rewritten when an already-known record is pushed again
+UPDATE_FIELDS = [
+    'operation', 'data', 'checksum', 'local_version',
+    'local_modified_at', 'status', 'synced_at'
+]
+
+
+def _parse_modified_at(value, default):
+    """Normalize a pushed local_modified_at value to an aware datetime"""
+    if not value:
+        return default
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = parse_datetime(str(value))
+        if parsed is None:
+            raise ValueError(f'Invalid local_modified_at: {value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _normalize_record(record_data, now):
+    """Validate a pushed record and return its normalized fields"""
+    model_name = record_data.get('model_name')
+    record_id = record_data.get('record_id')
+    operation = record_data.get('operation')
+
+    if not model_name or record_id in (None, ''):
+        raise ValueError('model_name and record_id are required')
+    if operation not in VALID_OPERATIONS:
+        raise ValueError(f'Invalid operation: {operation}')
+
+    delta = record_data.get('delta')
+    if delta is not None:
+        if not isinstance(delta, dict):
+            raise ValueError('delta must be an object')
+        data = None
+    else:
+        data = record_data.get('data') or {}
+        if not isinstance(data, dict):
+            raise ValueError('data must be an object')
+
+    return {
+        'model_name': str(model_name),
+        'record_id': str(record_id),
+        'operation': operation,
+        'data': data,
+        'delta': delta,
+        'checksum': record_data.get('checksum'),
+        'local_version': int(record_data.get('local_version') or 0),
+        'local_modified_at': _parse_modified_at(record_data.get('local_modified_at'), now),
+    }
+
+
+def _fetch_existing(session, keys):
+    """Load the Hub's current records for all pushed keys in one query"""
+    if not keys:
+        return {}
+
+    model_names = {model_name for model_name, _ in keys}
+    record_ids = {record_id for _, record_id in keys}
+
+    existing = SyncRecord.objects.filter(
+        session=session,
+        model_name__in=model_names,
+        record_id__in=record_ids
+    )
+    return {
+        (record.model_name, record.record_id): record
+        for record in existing
+        if (record.model_name, record.record_id) in keys
+    }
+
+
+def _fetch_delta_bases(node_id, keys):
+    """Data of the latest accepted record per key pushed by the node, across sessions"""
+    if not keys:
+        return {}
+
+    latest = SyncRecord.objects.filter(
+        session__node_id=node_id,
+        status=SyncStatus.COMPLETED,
+        model_name__in={model_name for model_name, _ in keys},
+        record_id__in={record_id for _, record_id in keys}
+    ).order_by('model_name', 'record_id', '-synced_at').distinct(
+        'model_name', 'record_id'
+    ).values_list('model_name', 'record_id', 'data')
+    return {
+        (model_name, record_id): data
+        for model_name, record_id, data in latest
+        if (model_name, record_id) in keys
+    }
+
+
+def _bump_version_vectors(node_id, versions, now):
+    """Raise each model's version vector to the highest accepted version"""
+    for model_name, version in versions.items():
+        updated = VersionVector.objects.filter(
+            node_id=node_id,
+            model_name=model_name
+        ).update(
+            version=Greatest(F('version'), Value(version)),
+            last_synced=now,
+            last_modified=now
+        )
+        if not updated:
+            vv = VersionVector.get_or_create_for_model(node_id, model_name)
+            vv.version = max(vv.version, version)
+            vv.last_synced = now
+            vv.save()
+
+
+def process_push_batch(session, records):
+    """
+    Apply a batch of pushed records to the Hub.
+
+    Args:
+        session: SyncSession the records belong to
+        records: List of record dicts as sent by the Node
+
+    Returns:
+        dict: accepted/rejected/conflicts counts and per-record errors
+    """
+    now = timezone.now()
+    result = {'accepted': 0, 'rejected': 0, 'conflicts': 0, 'errors': []}
+
+    normalized = []
+    for record_data in records:
+        try:
+            normalized.append(_normalize_record(record_data, now))
+        except (TypeError, ValueError) as e:
+            result['rejected'] += 1
+            result['errors'].append({
+                'record_id': record_data.get('record_id'),
+                'error': str(e)
+            })
+
+    keys = {(r['model_name'], r['record_id']) for r in normalized}
+    existing = _fetch_existing(session, keys)
+    delta_bases = _fetch_delta_bases(
+        session.node_id,
+        {(r['model_name'], r['record_id']) for r in normalized if r['delta'] is not None}
+    )
+
+    to_create = {}
+    to_update = {}
+    conflicts = []
+    versions = {}
+
+    for record in normalized:
+        key = (record['model_name'], record['record_id'])
+        hub_record = existing.get(key)
+
+        if record['delta'] is not None:
+            # Base is the newest copy: an earlier record in this batch or the last accepted row
+            base = to_create.get(key) or to_update.get(key)
+            try:
+                record['data'] = apply_delta(
+                    base.data if base is not None else delta_bases.get(key),
+                    record['delta'],
+                    expected_checksum=record['checksum']
+                )
+            except DeltaMismatch as e:
+                result['rejected'] += 1
+                result['errors'].append({
+                    'record_id': record['record_id'],
+                    'error': str(e),
+                    'resend_full': True
+                })
+                continue
+
+        if hub_record is not None and hub_record.remote_version > record['local_version']:
+            conflicts.append(SyncConflict(
+                session=session,
+                model_name=record['model_name'],
+                record_id=record['record_id'],
+                local_data=record['data'],
+                remote_data=hub_record.data,
+                local_modified_at=record['local_modified_at'],
+                remote_modified_at=hub_record.remote_modified_at or now,
+                local_node_id=session.node_id,
+                remote_source='hub',
+                strategy=ConflictStrategy.MANUAL
+            ))
+            result['conflicts'] += 1
+            continue
+
+        if hub_record is not None:
+            target = hub_record
+            to_update[key] = target
+        elif key in to_create:
+            target = to_create[key]
+        else:
+            target = SyncRecord(
+                session=session,
+                model_name=record['model_name'],
+                record_id=record['record_id']
+            )
+            to_create[key] = target
+
+        target.operation = record['operation']
+        target.data = record['data']
+        target.local_version = record['local_version']
+        target.local_modified_at = record['local_modified_at']
+        target.status = SyncStatus.COMPLETED
+        target.synced_at = now
+        target.checksum = target.compute_checksum()
+
+        versions[record['model_name']] = max(
+            versions.get(record['model_name'], 0),
+            record['local_version']
+        )
+        result['accepted'] += 1
+
+    with transaction.atomic():
+        if to_create:
+            SyncRecord.objects.bulk_create(to_create.values(), batch_size=500)
+        if to_update:
+            SyncRecord.objects.bulk_update(to_update.values(), UPDATE_FIELDS, batch_size=500)
+        if conflicts:
+            SyncConflict.objects.bulk_create(conflicts, batch_size=500)
+        _bump_version_vectors(session.node_id, versions, now)
+
+    logger.debug(
+        "Push batch for session %s: %d created, %d updated, %d conflicts, %d rejected",
+        session.id, len(to_create), len(to_update), len(conflicts), result['rejected']
+    )
+    return result
+
+
+def process_push_serial(session, records):
+    """
+    Apply pushed records one at a time.
+
+    Reference implementation (one lookup + one upsert per record) kept for
+    benchmarking against process_push_batch.
+    """
+    result = {'accepted': 0, 'rejected': 0, 'conflicts': 0, 'errors': []}
+
+    with transaction.atomic():
+        for record_data in records:
+            try:
+                with transaction.atomic():
+                    outcome = _process_record_serial(session, record_data)
+            except Exception as e:
+                result['rejected'] += 1
+                result['errors'].append({
+                    'record_id': record_data.get('record_id'),
+                    'error': str(e)
+                })
+                continue
+            result['accepted' if outcome == 'accepted' else 'conflicts'] += 1
+
+    return result
+
+
+def _process_record_serial(session, record_data):
+    """Process a single sync record"""
+    now = timezone.now()
+    record = _normalize_record(record_data, now)
+
+    existing_record = SyncRecord.objects.filter(
+        session=session,
+        model_name=record['model_name'],
+        record_id=record['record_id']
+    ).first()
+
+    if record['delta'] is not None:
+        key = (record['model_name'], record['record_id'])
+        record['data'] = apply_delta(
+            _fetch_delta_bases(session.node_id, {key}).get(key),
+            record['delta'],
+            expected_checksum=record['checksum']
+        )
+
+    if existing_record and existing_record.remote_version > record['local_version']:
+        SyncConflict.objects.create(
+            session=session,
+            model_name=record['model_name'],
+            record_id=record['record_id'],
+            local_data=record['data'],
+            remote_data=existing_record.data,
+            local_modified_at=record['local_modified_at'],
+            remote_modified_at=existing_record.remote_modified_at or now,
+            local_node_id=session.node_id,
+            remote_source='hub',
+            strategy=ConflictStrategy.MANUAL
+        )
+        return 'conflict'
+
+    SyncRecord.objects.update_or_create(
+        session=session,
+        model_name=record['model_name'],
+        record_id=record['record_id'],
+        defaults={
+            'operation': record['operation'],
+            'data': record['data'],
+            'local_version': record['local_version'],
+            'local_modified_at': record['local_modified_at'],
+            'status': SyncStatus.COMPLETED,
+            'synced_at': now
+        }
+    )
+
+    vv = VersionVector.get_or_create_for_model(session.node_id, record['model_name'])
+    vv.version = max(vv.version, record['local_version'])
+    vv.last_synced = now
+    vv.save()
+
+    return 'accepted'
@@ -41,6 +41,12 @@ class SyncInitRequestSerializer(serializers.Serializer):
         choices=SyncDirection.choices,
         default=SyncDirection.BIDIRECTIONAL
     )
+    # Merkle root hash per model for anti-entropy checks
+    merkle_roots = serializers.DictField(
+        child=serializers.CharField(max_length=64),
+        required=False,
+        default=dict
+    )
 
 
 class SyncInitResponseSerializer(serializers.Serializer):
@@ -50,6 +56,12 @@ class SyncInitResponseSerializer(serializers.Serializer):
     changes_available = serializers.IntegerField()
     conflicts_detected = serializers.IntegerField()
     modules = serializers.ListField(child=serializers.CharField())
+    # Payload capabilities the Node may use for this session
+    encodings = serializers.ListField(child=serializers.CharField())
+    delta_supported = serializers.BooleanField()
+    # Anti-entropy: models to walk with /sync/reconcile/
+    divergent_models = serializers.ListField(child=serializers.CharField())
+    merkle_depth = serializers.IntegerField()
 
 
 class SyncRecordSerializer(serializers.ModelSerializer):
@@ -75,6 +87,12 @@ class SyncPullRequestSerializer(serializers.Serializer):
         child=serializers.CharField(max_length=100),
         required=False
     )
+    # 'offset' (legacy), 'cursor' (keyset pages) or 'stream' (NDJSON)
+    mode = serializers.ChoiceField(
+        choices=['offset', 'cursor', 'stream'],
+        default='offset'
+    )
+    cursor = serializers.CharField(required=False, allow_blank=True, allow_null=True)
 
 
 class SyncPullResponseSerializer(serializers.Serializer):
@@ -85,6 +103,29 @@ class SyncPullResponseSerializer(serializers.Serializer):
     next_offset = serializers.IntegerField()
 
 
+class SyncPullCursorResponseSerializer(serializers.Serializer):
+    """Response from a cursor-mode sync pull"""
+    records = SyncRecordSerializer(many=True)
+    has_more = serializers.BooleanField()
+    next_cursor = serializers.CharField(allow_null=True)
+
+
+class SyncReconcileRequestSerializer(serializers.Serializer):
+    """One anti-entropy round: Node hashes for a set of tree prefixes"""
+    session_id = serializers.UUIDField()
+    model_name = serializers.CharField(max_length=100)
+    hashes = serializers.DictField(
+        child=serializers.CharField(max_length=64),
+        allow_empty=False
+    )
+
+
+class SyncReconcileResponseSerializer(serializers.Serializer):
+    """Prefixes that differ, plus Hub items for differing leaf buckets"""
+    differing = serializers.ListField(child=serializers.CharField())
+    items = serializers.DictField(child=serializers.DictField())
+
+
 class SyncPushRequestSerializer(serializers.Serializer):
     """Request to push changes to Hub"""
     session_id = serializers.UUIDField()
@@ -135,6 +176,7 @@ class SyncSessionSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'node_id', 'node_hostname', 'direction', 'status',
             'modules', 'node_version_vector', 'hub_version_vector',
+            'divergent_models',
             'total_records', 'processed_records', 'conflicts_count',
             'progress_percent', 'created_at', 'started_at', 'completed_at',
             'last_error', 'retry_count'
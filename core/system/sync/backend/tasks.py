@@ -0,0 +1,93 @@
+"""
+Celery Tasks for the Sync module
+"""
+
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from .changefeed import push_changes
+from .models import DataExportLog, DataExportSettings
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def cleanup_export_logs(self):
+    """
+    Remove expired export logs and rollups.
+
+    Runs daily via Celery Beat.
+    """
+    try:
+        retention_days = getattr(settings, 'EXPORT_LOG_RETENTION_DAYS', 90)
+        deleted_count, details = DataExportLog.cleanup_old(days=retention_days)
+
+        logger.info(f"Cleaned up {deleted_count} export logs (older than {retention_days} days)")
+
+        return {
+            'status': 'success',
+            'deleted_logs': deleted_count,
+            'deleted_rollups': details.get('sync.DataExportLogRollup', 0),
+            'retention_days': retention_days
+        }
+
+    except Exception as e:
+        logger.error(f"Error cleaning up export logs: {e}")
+        raise self.retry(exc=e)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def push_node_changes(self):
+    """
+    Push this node's pending change log to the Hub.
+
+    Opens a push session, sends the change feed in batches and completes
+    the session. Runs every sync interval via Celery Beat; skipped on the
+    Hub, when server sync is disabled and while the kill switch is on.
+    """
+    import requests
+
+    server_url = getattr(settings, 'UNIBOS_SERVER_URL', None)
+    node_id = getattr(settings, 'NODE_UUID', None)
+    if not server_url or not node_id or not getattr(settings, 'UNIBOS_SERVER_SYNC_ENABLED', False):
+        logger.debug("Server sync not configured, skipping change push")
+        return {'status': 'skipped', 'reason': 'sync_disabled'}
+
+    if DataExportSettings.get_for_node(node_id).master_kill_switch:
+        logger.info("Kill switch is on, not pushing changes")
+        return {'status': 'skipped', 'reason': 'kill_switch'}
+
+    sync_url = f"{server_url.rstrip('/')}/api/v1/sync"
+    headers = {}
+    api_token = getattr(settings, 'UNIBOS_SERVER_API_TOKEN', '')
+    if api_token:
+        headers['Authorization'] = f"Bearer {api_token}"
+
+    def post(endpoint, payload):
+        response = requests.post(f"{sync_url}/{endpoint}/", json=payload, headers=headers, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        session = post('init', {
+            'node_id': node_id,
+            'node_hostname': getattr(settings, 'NODE_HOSTNAME', 'unknown-node'),
+            'direction': 'push',
+        })
+        session_id = session['session_id']
+
+        totals = push_changes(lambda records: post('push', {
+            'session_id': session_id,
+            'records': records,
+        }))
+        post('complete', {'session_id': session_id})
+
+        logger.info(f"Pushed {totals['records']} changes to {server_url} ({totals['accepted']} accepted)")
+
+        return {'status': 'success', 'session_id': session_id, **totals}
+
+    except Exception as e:
+        logger.error(f"Error pushing changes to {server_url}: {e}")
+        raise self.retry(exc=e)
@@ -0,0 +1,295 @@
+"""
+Tests for the Sync module
+
+Merkle anti-entropy is exercised against two SQLite databases (Hub and
+Node) with injected drift, without going through the HTTP layer.
+"""
+
+import hashlib
+import sqlite3
+import unittest
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection, models
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .merkle import (
+    MerkleSummary, DEFAULT_DEPTH, EMPTY_HASH,
+    answer_step, diff_items, reconcile
+)
+from .changefeed import collect_changes, push_changes
+from .delta import checksum_data, compute_delta
+from .export_logs import ExportLogWriter
+from .models import (
+    DataExportLog, DataExportLogRollup, DataExportSettings, ExportStatus,
+    SyncableModelMixin, SyncChangeLog, SyncRecord, SyncSession
+)
+from .policy import ExportPolicyCache
+from .push import process_push_batch
+
+
+class SyncNote(SyncableModelMixin, models.Model):
+    """Syncable model for change feed tests (table created per test class)"""
+    title = models.CharField(max_length=100)
+
+    class Meta:
+        app_label = 'sync'
+        db_table = 'sync_test_note'
+
+
+def _checksum(record_id, version):
+    return hashlib.sha256(f'{record_id}:{version}'.encode()).hexdigest()
+
+
+class MerkleReconcileTests(unittest.TestCase):
+    """Hub/Node reconciliation over two SQLite databases"""
+
+    RECORDS = 5000
+
+    def setUp(self):
+        self.hub = sqlite3.connect(':memory:')
+        self.node = sqlite3.connect(':memory:')
+        for db in (self.hub, self.node):
+            db.execute('CREATE TABLE records (record_id TEXT PRIMARY KEY, checksum TEXT)')
+            db.executemany(
+                'INSERT INTO records VALUES (?, ?)',
+                ((str(i), _checksum(i, 1)) for i in range(self.RECORDS))
+            )
+            db.commit()
+
+    def tearDown(self):
+        self.hub.close()
+        self.node.close()
+
+    def _pairs(self, db):
+        return db.execute('SELECT record_id, checksum FROM records').fetchall()
+
+    def _reconcile(self):
+        node_summary = MerkleSummary.from_pairs(self._pairs(self.node), keep_prefixes=[''])
+        hub_summary = MerkleSummary.from_pairs(self._pairs(self.hub))
+        requests = []
+
+        def remote_step(hashes):
+            requests.append(hashes)
+
+            def leaf_items(prefixes):
+                leaves = MerkleSummary.from_pairs(self._pairs(self.hub), keep_prefixes=prefixes)
+                return {prefix: leaves.items(prefix) for prefix in prefixes}
+
+            return answer_step(hub_summary, hashes, leaf_items=leaf_items)
+
+        diff, rounds = reconcile(node_summary, remote_step)
+        return diff, rounds, requests
+
+    def test_identical_databases(self):
+        """No drift: one round, nothing to transfer"""
+        diff, rounds, _ = self._reconcile()
+        self.assertEqual(rounds, 1)
+        self.assertEqual(diff, {'missing_remote': [], 'missing_local': [], 'changed': []})
+
+    def test_injected_drift_is_located_exactly(self):
+        """Changed, lost and restored records are all found"""
+        # Node edits that never reached the Hub
+        self.node.executemany(
+            'UPDATE records SET checksum = ? WHERE record_id = ?',
+            [(_checksum(i, 2), str(i)) for i in (7, 1234, 4999)]
+        )
+        # Lost pushes: records the Hub never received
+        self.hub.executemany('DELETE FROM records WHERE record_id = ?', [('42',), ('3000',)])
+        # Restored Hub backup contains a record the Node deleted
+        self.hub.execute('INSERT INTO records VALUES (?, ?)', ('restored-1', _checksum('r', 1)))
+
+        diff, rounds, _ = self._reconcile()
+
+        self.assertEqual(diff['changed'], sorted(['7', '1234', '4999']))
+        self.assertEqual(diff['missing_remote'], sorted(['42', '3000']))
+        self.assertEqual(diff['missing_local'], ['restored-1'])
+        self.assertEqual(rounds, DEFAULT_DEPTH + 1)
+
+    def test_round_trips_only_descend_differing_prefixes(self):
+        """Each round only sends children of prefixes that differed"""
+        self.node.execute(
+            'UPDATE records SET checksum = ? WHERE record_id = ?',
+            (_checksum(99, 2), '99')
+        )
+
+        _, rounds, requests = self._reconcile()
+
+        self.assertEqual(rounds, DEFAULT_DEPTH + 1)
+        self.assertEqual([len(hashes) for hashes in requests], [1] + [16] * DEFAULT_DEPTH)
+
+    def test_root_is_order_independent(self):
+        pairs = self._pairs(self.hub)
+        forward = MerkleSummary.from_pairs(pairs)
+        backward = MerkleSummary.from_pairs(reversed(pairs))
+        self.assertEqual(forward.root, backward.root)
+        self.assertEqual(MerkleSummary().root, EMPTY_HASH)
+
+    def test_summary_round_trips_through_cache_form(self):
+        summary = MerkleSummary.from_pairs(self._pairs(self.hub))
+        restored = MerkleSummary.from_dict(summary.to_dict())
+        self.assertEqual(restored.root, summary.root)
+        self.assertEqual(restored.children('a'), summary.children('a'))
+
+    def test_diff_items(self):
+        diff = diff_items({'a': '1', 'b': '2'}, {'b': '3', 'c': '4'})
+        self.assertEqual(diff, {'missing_remote': ['a'], 'missing_local': ['c'], 'changed': ['b']})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ExportPolicyCacheTests(TestCase):
+    """Kill switch with the process-local cache fallback"""
+
+    def test_kill_switch_reaches_other_processes_without_shared_cache(self):
+        node_id = uuid.uuid4()
+        # Two worker processes, each with its own warm policy copy
+        worker, other_worker = ExportPolicyCache(), ExportPolicyCache()
+        self.assertFalse(worker.get(node_id).master_kill_switch)
+        self.assertFalse(other_worker.get(node_id).master_kill_switch)
+
+        # on_commit never runs inside TestCase, so no stamp bump is seen -
+        # like a LocMemCache bump that stays in the saving process
+        DataExportSettings.objects.get(node_id=node_id).enable_kill_switch()
+
+        self.assertTrue(other_worker.get(node_id).master_kill_switch)
+        # Unchanged settings are still served from the process copy
+        self.assertTrue(other_worker.get(node_id).master_kill_switch)
+        self.assertGreaterEqual(other_worker.hits, 1)
+
+
+class ExportLogWriterTests(TestCase):
+    """Buffered export log writes"""
+
+    def test_entries_keep_the_time_they_were_queued(self):
+        writer = ExportLogWriter()
+        writer.start = lambda: None  # flush by hand instead of the thread
+        node_id = uuid.uuid4()
+        queued_at = timezone.now().replace(minute=59, second=59) - timedelta(hours=1)
+
+        with patch('core.system.sync.backend.export_logs.timezone.now', return_value=queued_at):
+            writer.submit(node_id=node_id, module='currencies', status=ExportStatus.ALLOWED)
+        # Flushed in the next hour
+        writer._write([writer.queue.get_nowait()])
+
+        self.assertEqual(DataExportLog.objects.get(node_id=node_id).timestamp, queued_at)
+        rollup = DataExportLogRollup.objects.get(node_id=node_id)
+        self.assertEqual(rollup.hour, DataExportLogRollup.truncate_hour(queued_at))
+
+
+class PushDeltaTests(TestCase):
+    """Delta pushes against the Hub's last accepted copy"""
+
+    def test_delta_in_a_later_session(self):
+        node_id = uuid.uuid4()
+        base = {'name': 'Main', 'currency': 'TRY', 'value': '1000.00'}
+        first = SyncSession.objects.create(node_id=node_id, node_hostname='node-1')
+        result = process_push_batch(first, [{
+            'model_name': 'currencies.Portfolio', 'record_id': '42', 'operation': 'create',
+            'data': base, 'local_version': 1,
+        }])
+        self.assertEqual(result['accepted'], 1)
+
+        # Every sync init opens a new session; the delta is against the row accepted in the first
+        current = dict(base, value='1250.00')
+        second = SyncSession.objects.create(node_id=node_id, node_hostname='node-1')
+        result = process_push_batch(second, [{
+            'model_name': 'currencies.Portfolio', 'record_id': '42', 'operation': 'update',
+            'delta': compute_delta(base, current), 'checksum': checksum_data(current), 'local_version': 2,
+        }])
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(result['accepted'], 1)
+        record = SyncRecord.objects.get(session=second, model_name='currencies.Portfolio', record_id='42')
+        self.assertEqual(record.data, current)
+
+        # Another node's copy is never used as a base
+        other = SyncSession.objects.create(node_id=uuid.uuid4(), node_hostname='node-2')
+        result = process_push_batch(other, [{
+            'model_name': 'currencies.Portfolio', 'record_id': '42', 'operation': 'update',
+            'delta': compute_delta(current, base), 'checksum': checksum_data(base), 'local_version': 3,
+        }])
+        self.assertTrue(result['errors'][0]['resend_full'])
+
+
+class ChangeFeedTests(TestCase):
+    """Change log capture, lazy checksums and the node push path"""
+
+    MODELS = ['sync.SyncNote']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Rolled back with the class transaction
+        with connection.schema_editor() as editor:
+            editor.create_model(SyncNote)
+
+    def test_changes_are_captured_and_checksummed_on_collect(self):
+        note = SyncNote.objects.create(title='draft')
+        note.title = 'final'
+        note.save()
+        gone = SyncNote.objects.create(title='gone')
+        gone_id = str(gone.pk)
+        gone.delete()
+
+        self.assertEqual(
+            list(SyncChangeLog.changes_since(0, self.MODELS).values_list('operation', flat=True)),
+            ['create', 'update', 'create', 'delete']
+        )
+        # Saves never compute the checksum
+        note.refresh_from_db()
+        self.assertEqual(note.sync_checksum, '')
+
+        records, last_seq = collect_changes(model_names=self.MODELS)
+
+        self.assertEqual(last_seq, SyncChangeLog.changes_since(0, self.MODELS).last().id)
+        by_id = {record['record_id']: record for record in records}
+        self.assertEqual(len(records), 2)
+        self.assertEqual(by_id[gone_id]['operation'], 'delete')
+        self.assertEqual(by_id[gone_id]['data'], {})
+
+        pushed = by_id[str(note.pk)]
+        self.assertEqual(pushed['operation'], 'update')
+        self.assertEqual(pushed['local_version'], 2)
+        self.assertEqual(pushed['data']['title'], 'final')
+        note.refresh_from_db()
+        self.assertEqual(note.sync_checksum, checksum_data(note.get_sync_data()))
+        self.assertEqual(pushed['checksum'], note.sync_checksum)
+
+    def test_push_drains_the_change_log(self):
+        first = SyncNote.objects.create(title='first')
+        SyncNote.objects.create(title='second')
+        first.title = 'first, edited'
+        first.save()
+
+        session = SyncSession.objects.create(node_id=uuid.uuid4(), node_hostname='node-1')
+        batches = []
+
+        def send(records):
+            batches.append(records)
+            return process_push_batch(session, records)
+
+        totals = push_changes(send, model_names=self.MODELS, batch_size=2)
+
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual(totals['records'], 3)
+        self.assertEqual(totals['accepted'], 3)
+        self.assertFalse(SyncChangeLog.changes_since(0, self.MODELS).exists())
+        record = SyncRecord.objects.get(session=session, record_id=str(first.pk))
+        self.assertEqual(record.data['title'], 'first, edited')
+
+        # Nothing left to send
+        self.assertEqual(push_changes(send, model_names=self.MODELS)['records'], 0)
+        self.assertEqual(len(batches), 2)
+
+    def test_failed_push_keeps_the_change_log(self):
+        SyncNote.objects.create(title='pending')
+
+        def send(records):
+            raise ConnectionError('hub unreachable')
+
+        with self.assertRaises(ConnectionError):
+            push_changes(send, model_names=self.MODELS)
+        self.assertEqual(SyncChangeLog.changes_since(0, self.MODELS).count(), 1)
@@ -9,6 +9,7 @@ from .views import (
     SyncInitView,
     SyncPullView,
     SyncPushView,
+    SyncReconcileView,
     SyncCompleteView,
     SyncStatusView,
     SyncConflictViewSet,
@@ -32,6 +33,7 @@ urlpatterns = [
     path('init/', SyncInitView.as_view(), name='sync-init'),
     path('pull/', SyncPullView.as_view(), name='sync-pull'),
     path('push/', SyncPushView.as_view(), name='sync-push'),
+    path('reconcile/', SyncReconcileView.as_view(), name='sync-reconcile'),
     path('complete/', SyncCompleteView.as_view(), name='sync-complete'),
     path('status/', SyncStatusView.as_view(), name='sync-status'),
 
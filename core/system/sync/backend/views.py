@@ -9,8 +9,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.db import transaction
 from django.db.models import Count, Q
 
 from .models import (
@@ -22,7 +23,9 @@ from .models import (
 from .serializers import (
     SyncInitRequestSerializer, SyncInitResponseSerializer,
     SyncPullRequestSerializer, SyncPullResponseSerializer,
+    SyncPullCursorResponseSerializer, SyncRecordSerializer,
     SyncPushRequestSerializer, SyncPushResponseSerializer,
+    SyncReconcileRequestSerializer, SyncReconcileResponseSerializer,
     SyncConflictSerializer, ConflictResolveRequestSerializer,
     SyncSessionSerializer, OfflineOperationSerializer,
     SyncStatusSerializer, VersionVectorSerializer,
@@ -31,9 +34,24 @@ from .serializers import (
     DataExportLogSerializer, ExportStatsSerializer,
     ExportCheckRequestSerializer, ExportCheckResponseSerializer
 )
+from .compression import CompressedResponseMixin, supported_encodings
+from .export_logs import export_log_writer
+from .merkle import MerkleSummary, DEFAULT_DEPTH, answer_step, hub_checksum_pairs
+from .pull import (
+    pending_records, fetch_page, iter_ndjson,
+    InvalidCursor, NDJSON_CONTENT_TYPE
+)
+from .push import process_push_batch
+
+
+MERKLE_CACHE_TIMEOUT = 3600  # Hub summaries live for the session's reconcile rounds
+
 
+def _merkle_cache_key(session_id, model_name):
+    return f'sync:merkle:{session_id}:{model_name}'
 
-class SyncInitView(APIView):
+
+class SyncInitView(CompressedResponseMixin, APIView):
     """
     Initialize a sync session between Node and Hub.
 
@@ -76,6 +94,15 @@ class SyncInitView(APIView):
             resolved=False
         ).count()
 
+        # Anti-entropy: compare Merkle roots to catch silent divergence
+        hub_summaries = {}
+        divergent_models = []
+        for model_name, node_root in data.get('merkle_roots', {}).items():
+            summary = MerkleSummary.from_pairs(hub_checksum_pairs(node_id, model_name))
+            hub_summaries[model_name] = summary
+            if summary.root != node_root:
+                divergent_models.append(model_name)
+
         # Create sync session
         session = SyncSession.objects.create(
             node_id=node_id,
@@ -84,16 +111,28 @@ class SyncInitView(APIView):
             modules=modules,
             node_version_vector=node_version_vector,
             hub_version_vector=hub_version_vector,
+            divergent_models=divergent_models,
             total_records=changes_available,
             conflicts_count=conflicts_detected
         )
 
+        for model_name in divergent_models:
+            cache.set(
+                _merkle_cache_key(session.id, model_name),
+                hub_summaries[model_name].to_dict(),
+                MERKLE_CACHE_TIMEOUT
+            )
+
         response_data = {
             'session_id': session.id,
             'hub_version_vector': hub_version_vector,
             'changes_available': changes_available,
             'conflicts_detected': conflicts_detected,
-            'modules': modules
+            'modules': modules,
+            'encodings': supported_encodings(),
+            'delta_supported': True,
+            'divergent_models': divergent_models,
+            'merkle_depth': DEFAULT_DEPTH
         }
 
         return Response(
@@ -102,11 +141,16 @@ class SyncInitView(APIView):
         )
 
 
-class SyncPullView(APIView):
+class SyncPullView(CompressedResponseMixin, APIView):
     """
     Pull changes from Hub to Node.
 
     POST /api/v1/sync/pull/
+
+    Modes:
+        offset - legacy count + offset pages (default, for old nodes)
+        cursor - keyset pages, pass back `next_cursor` until it is null
+        stream - entire pending set as one chunked NDJSON response
     """
     permission_classes = [AllowAny]
 
@@ -133,6 +177,40 @@ class SyncPullView(APIView):
         if session.status == SyncStatusEnum.PENDING:
             session.start()
 
+        mode = data.get('mode', 'offset')
+
+        if mode == 'stream':
+            response = StreamingHttpResponse(
+                iter_ndjson(pending_records(session, models_filter), chunk_size=batch_size),
+                content_type=NDJSON_CONTENT_TYPE
+            )
+            response['X-Sync-Session'] = str(session.id)
+            return response
+
+        if mode == 'cursor':
+            try:
+                records, next_cursor = fetch_page(
+                    pending_records(session, models_filter),
+                    data.get('cursor'),
+                    batch_size
+                )
+            except InvalidCursor as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            response_data = {
+                'records': records,
+                'has_more': next_cursor is not None,
+                'next_cursor': next_cursor
+            }
+
+            return Response(
+                SyncPullCursorResponseSerializer(response_data).data,
+                status=status.HTTP_200_OK
+            )
+
         # Get pending records for this session
         records_query = SyncRecord.objects.filter(
             session=session,
@@ -158,7 +236,7 @@ class SyncPullView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
 
 
-class SyncPushView(APIView):
+class SyncPushView(CompressedResponseMixin, APIView):
     """
     Push changes from Node to Hub.
 
@@ -187,100 +265,84 @@ class SyncPushView(APIView):
         if session.status == SyncStatusEnum.PENDING:
             session.start()
 
-        accepted = 0
-        rejected = 0
-        conflicts = 0
-        errors = []
-
-        with transaction.atomic():
-            for record_data in records:
-                try:
-                    result = self._process_record(session, record_data)
-                    if result == 'accepted':
-                        accepted += 1
-                    elif result == 'conflict':
-                        conflicts += 1
-                    else:
-                        rejected += 1
-                        errors.append({
-                            'record_id': record_data.get('record_id'),
-                            'error': result
-                        })
-                except Exception as e:
-                    rejected += 1
-                    errors.append({
-                        'record_id': record_data.get('record_id'),
-                        'error': str(e)
-                    })
+        result = process_push_batch(session, records)
 
         # Update session progress
-        session.processed_records += accepted
-        session.conflicts_count += conflicts
+        session.processed_records += result['accepted']
+        session.conflicts_count += result['conflicts']
         session.save(update_fields=['processed_records', 'conflicts_count'])
 
         response_data = {
-            'accepted': accepted,
-            'rejected': rejected,
-            'conflicts': conflicts,
-            'errors': errors
+            'accepted': result['accepted'],
+            'rejected': result['rejected'],
+            'conflicts': result['conflicts'],
+            'errors': result['errors']
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
 
-    def _process_record(self, session, record_data):
-        """Process a single sync record"""
-        model_name = record_data.get('model_name')
-        record_id = record_data.get('record_id')
-        operation = record_data.get('operation')
-        data = record_data.get('data', {})
-        local_version = record_data.get('local_version', 0)
-        local_modified_at = record_data.get('local_modified_at')
-
-        # Check for conflicts - is there a newer version on Hub?
-        existing_record = SyncRecord.objects.filter(
-            session=session,
-            model_name=model_name,
-            record_id=record_id
-        ).first()
 
-        if existing_record and existing_record.remote_version > local_version:
-            # Conflict detected
-            SyncConflict.objects.create(
-                session=session,
-                model_name=model_name,
-                record_id=record_id,
-                local_data=data,
-                remote_data=existing_record.data,
-                local_modified_at=local_modified_at or timezone.now(),
-                remote_modified_at=existing_record.remote_modified_at or timezone.now(),
-                local_node_id=session.node_id,
-                remote_source='hub',
-                strategy=ConflictStrategy.MANUAL
+class SyncReconcileView(CompressedResponseMixin, APIView):
+    """
+    One round of Merkle anti-entropy for a divergent model.
+
+    POST /api/v1/sync/reconcile/
+
+    The Node sends its hashes for a set of tree prefixes (starting with the
+    root children of a model listed in divergent_models at init). The Hub
+    answers with the prefixes that differ and, for differing leaf buckets,
+    its (record_id -> checksum) pairs so the Node can compute the exact diff.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = SyncReconcileRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        session_id = data['session_id']
+        model_name = data['model_name']
+
+        try:
+            session = SyncSession.objects.get(id=session_id)
+        except SyncSession.DoesNotExist:
+            return Response(
+                {'error': 'Session not found'},
+                status=status.HTTP_404_NOT_FOUND
             )
-            return 'conflict'
 
-        # Create or update sync record
-        sync_record, created = SyncRecord.objects.update_or_create(
-            session=session,
-            model_name=model_name,
-            record_id=record_id,
-            defaults={
-                'operation': operation,
-                'data': data,
-                'local_version': local_version,
-                'local_modified_at': local_modified_at or timezone.now(),
-                'status': SyncStatusEnum.COMPLETED,
-                'synced_at': timezone.now()
-            }
-        )
+        if model_name not in session.divergent_models:
+            return Response(
+                {'error': f'{model_name} is not divergent in this session'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if session.status == SyncStatusEnum.PENDING:
+            session.start()
 
-        # Update version vector
-        vv = VersionVector.get_or_create_for_model(session.node_id, model_name)
-        vv.version = max(vv.version, local_version)
-        vv.last_synced = timezone.now()
-        vv.save()
+        cache_key = _merkle_cache_key(session.id, model_name)
+        cached = cache.get(cache_key)
+        if cached:
+            summary = MerkleSummary.from_dict(cached)
+        else:
+            summary = MerkleSummary.from_pairs(hub_checksum_pairs(session.node_id, model_name))
+            cache.set(cache_key, summary.to_dict(), MERKLE_CACHE_TIMEOUT)
+
+        def leaf_items(prefixes):
+            # Second scan keeps only the requested buckets in memory
+            leaves = MerkleSummary.from_pairs(
+                hub_checksum_pairs(session.node_id, model_name),
+                depth=summary.depth,
+                keep_prefixes=prefixes
+            )
+            return {prefix: leaves.items(prefix) for prefix in prefixes}
+
+        response_data = answer_step(summary, data['hashes'], leaf_items=leaf_items)
 
-        return 'accepted'
+        return Response(
+            SyncReconcileResponseSerializer(response_data).data,
+            status=status.HTTP_200_OK
+        )
 
 
 class SyncCompleteView(APIView):
@@ -729,5 +791,6 @@ class ExportStatsView(APIView):
 
         days = int(request.query_params.get('days', 7))
         stats = DataExportLog.get_stats(node_id, days=days)
+        stats['log_writer'] = export_log_writer.stats()
 
         return Response(stats)
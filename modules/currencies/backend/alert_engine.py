@@ -0,0 +1,344 @@
+"""
+Currency Alert Engine
+
+Evaluates every active CurrencyAlert against the latest rates without a
+query per alert. Alerts are kept in memory, per currency pair, in sorted
+threshold indexes:
+
+- above: triggered alerts are the thresholds below the rate (a prefix)
+- below: triggered alerts are the thresholds above the rate (a suffix)
+- change_percent: |threshold| at or below the 24h change (a prefix)
+
+so a rate only touches the alerts it triggers, found with bisect. A
+triggered alert leaves its index for the cooldown period (kept in a heap)
+and is re-indexed when the cooldown expires, which keeps the old
+"trigger again every hour while the condition holds" behaviour.
+
+Trigger bookkeeping (last_triggered / trigger_count) is written with one
+UPDATE per batch; the batch first re-reads which alerts are still out of
+cooldown, so two worker processes cannot trigger the same alert twice.
+
+Alert changes reach other processes through a version stamp read from
+the database - the number of alerts and their newest updated_at - since
+web and worker processes do not share a cache key space (different
+KEY_PREFIX). With settings.CURRENCY_ALERTS_EVENT_DRIVEN enabled, each
+saved ExchangeRate also schedules a (debounced) evaluation of its pair,
+so alerts fire on rate updates instead of waiting for the periodic task.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CurrencyAlert, ExchangeRate
+
+logger = logging.getLogger(__name__)
+
+# How often a process looks at the version stamp
+STAMP_CHECK_INTERVAL = 5.0
+
+# Reload even without a stamp change (alerts written outside the ORM)
+MAX_AGE_SECONDS = 600
+
+# Minimum time between two triggers of the same alert
+COOLDOWN_SECONDS = 3600
+
+# Delay that groups bursts of rate saves into one evaluation per pair
+EVENT_DEBOUNCE_SECONDS = 5
+
+UPDATE_BATCH_SIZE = 1000
+
+Alert = namedtuple('Alert', 'id user_id pair alert_type threshold')
+
+
+def _current_stamp():
+    """(alert count, newest updated_at): changes with every create, edit and delete"""
+    stamp = CurrencyAlert.objects.aggregate(count=Count('id'), changed=Max('updated_at'))
+    return stamp['count'], stamp['changed']
+
+
+def active_alert_rows():
+    """(id, user id, base code, target code, type, threshold, last_triggered) of active alerts"""
+    return CurrencyAlert.objects.filter(is_active=True).values_list(
+        'id', 'user_id', 'base_currency__code', 'target_currency__code',
+        'alert_type', 'threshold_value', 'last_triggered'
+    ).iterator(chunk_size=5000)
+
+
+class ThresholdIndex:
+    """Alert ids of one pair and alert type, sorted by threshold"""
+
+    def __init__(self):
+        self.thresholds = []
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, threshold, alert_id):
+        i = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.ids.insert(i, alert_id)
+
+    def extend(self, entries):
+        """Add many (threshold, alert id) entries; re-sorts instead of inserting one by one"""
+        if len(entries) < 32:
+            for threshold, alert_id in entries:
+                self.add(threshold, alert_id)
+            return
+        merged = sorted(list(zip(self.thresholds, self.ids)) + list(entries), key=lambda entry: entry[0])
+        self.thresholds = [threshold for threshold, _ in merged]
+        self.ids = [alert_id for _, alert_id in merged]
+
+    def take_below(self, value, inclusive=False):
+        """Remove and return ids with threshold < value (<= if inclusive)"""
+        i = (bisect_right if inclusive else bisect_left)(self.thresholds, value)
+        taken = self.ids[:i]
+        del self.thresholds[:i]
+        del self.ids[:i]
+        return taken
+
+    def take_above(self, value):
+        """Remove and return ids with threshold > value"""
+        i = bisect_right(self.thresholds, value)
+        taken = self.ids[i:]
+        del self.thresholds[i:]
+        del self.ids[i:]
+        return taken
+
+
+def _index_threshold(alert):
+    return abs(alert.threshold) if alert.alert_type == 'change_percent' else alert.threshold
+
+
+class AlertEngine:
+    """
+    In-memory alert indexes with batched trigger updates.
+
+    Usage:
+        triggered = alert_engine.evaluate(latest_rates, rates_24h_ago)
+        confirmed = alert_engine.record_triggers(triggered)
+    """
+
+    def __init__(self, cooldown=COOLDOWN_SECONDS, max_age=MAX_AGE_SECONDS, check_interval=STAMP_CHECK_INTERVAL):
+        self.cooldown = cooldown
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._alerts = {}  # id -> Alert
+        self._indexes = {}  # (pair, alert type) -> ThresholdIndex
+        self._cooling = []  # heap of (eligible at, alert id)
+        self._stamp = None
+        self._loaded_at = None
+        self._checked_at = 0.0
+
+    def load(self, rows, now=None):
+        """Replace all alerts from active_alert_rows()-shaped rows"""
+        now = time.time() if now is None else now
+        alerts = {}
+        indexes = {}
+        cooling = []
+
+        for alert_id, user_id, base, target, alert_type, threshold, last_triggered in rows:
+            alert = Alert(alert_id, user_id, (base, target), alert_type, threshold)
+            alerts[alert_id] = alert
+            if last_triggered is not None and last_triggered.timestamp() + self.cooldown > now:
+                cooling.append((last_triggered.timestamp() + self.cooldown, alert_id))
+            else:
+                indexes.setdefault((alert.pair, alert_type), []).append((_index_threshold(alert), alert_id))
+
+        for key, entries in indexes.items():
+            index = ThresholdIndex()
+            index.extend(entries)
+            indexes[key] = index
+        heapq.heapify(cooling)
+
+        with self._lock:
+            self._alerts = alerts
+            self._indexes = indexes
+            self._cooling = cooling
+            self._loaded_at = self._checked_at = time.monotonic()
+
+    def refresh(self):
+        """Reload active alerts from the database"""
+        try:
+            stamp = _current_stamp()
+        except Exception:
+            stamp = None
+        self.load(active_alert_rows())
+        self._stamp = stamp
+        logger.debug(f"Alert engine loaded: {len(self._alerts)} alerts")
+
+    def invalidate(self):
+        """Force a reload on the next evaluation in this process"""
+        self._loaded_at = None
+
+    def ensure_fresh(self):
+        """Reload if the alerts changed (version stamp) or the load is older than max_age"""
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= self.max_age:
+            self.refresh()
+            return
+        if now - self._checked_at < self.check_interval:
+            return
+
+        self._checked_at = now
+        try:
+            stamp = _current_stamp()
+        except Exception as e:
+            logger.debug(f"Alert stamp unavailable: {e}")
+            return
+        if stamp != self._stamp:
+            self.refresh()
+
+    def _release_cooled(self, now):
+        """Re-index alerts whose cooldown has expired"""
+        cooling = self._cooling
+        released = {}
+        while cooling and cooling[0][0] <= now:
+            _, alert_id = heapq.heappop(cooling)
+            alert = self._alerts.get(alert_id)
+            if alert is not None:
+                released.setdefault((alert.pair, alert.alert_type), []).append((_index_threshold(alert), alert_id))
+
+        for key, entries in released.items():
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = ThresholdIndex()
+            index.extend(entries)
+
+    def change_pairs(self):
+        """Pairs with change_percent alerts (they need the 24h-old rate)"""
+        return {pair for pair, alert_type in self._indexes if alert_type == 'change_percent'}
+
+    def evaluate(self, latest, previous=None, now=None, refresh=True):
+        """
+        Alerts triggered by the given rates.
+
+        Args:
+            latest: {(base, target): current rate}
+            previous: {(base, target): rate 24 hours ago}, for change_percent
+            now: Epoch seconds (default: time.time())
+            refresh: Check the version stamp / reload first
+
+        Returns:
+            list of (Alert, rate) - the alerts are in cooldown from now on
+        """
+        if refresh:
+            self.ensure_fresh()
+        now = time.time() if now is None else now
+        previous = previous or {}
+        triggered = []
+
+        with self._lock:
+            self._release_cooled(now)
+            eligible_at = now + self.cooldown
+
+            for pair, rate in latest.items():
+                if rate is None:
+                    continue
+                taken = []
+                above = self._indexes.get((pair, 'above'))
+                if above:
+                    taken.extend(above.take_below(rate))
+                below = self._indexes.get((pair, 'below'))
+                if below:
+                    taken.extend(below.take_above(rate))
+                change = self._indexes.get((pair, 'change_percent'))
+                old_rate = previous.get(pair)
+                if change and old_rate:
+                    change_pct = abs((rate - old_rate) / old_rate * 100)
+                    taken.extend(change.take_below(change_pct, inclusive=True))
+
+                for alert_id in taken:
+                    heapq.heappush(self._cooling, (eligible_at, alert_id))
+                    triggered.append((self._alerts[alert_id], rate))
+
+        return triggered
+
+    def record_triggers(self, triggered, now=None):
+        """
+        Write last_triggered / trigger_count for triggered alerts in batches.
+
+        Returns the subset still out of cooldown in the database - the ones
+        whose notifications should be sent.
+        """
+        now = now or timezone.now()
+        cutoff = now - timedelta(seconds=self.cooldown)
+        confirmed = []
+
+        for start in range(0, len(triggered), UPDATE_BATCH_SIZE):
+            batch = triggered[start:start + UPDATE_BATCH_SIZE]
+            eligible = CurrencyAlert.objects.filter(
+                Q(last_triggered__isnull=True) | Q(last_triggered__lte=cutoff),
+                id__in=[alert.id for alert, _ in batch],
+                is_active=True,
+            )
+            ids = set(eligible.values_list('id', flat=True))
+            if not ids:
+                continue
+            CurrencyAlert.objects.filter(id__in=ids).update(
+                last_triggered=now,
+                trigger_count=F('trigger_count') + 1,
+                updated_at=now,
+            )
+            confirmed.extend(item for item in batch if item[0].id in ids)
+
+        return confirmed
+
+    def stats(self):
+        return {
+            'alerts': len(self._alerts),
+            'indexed': sum(len(index) for index in self._indexes.values()),
+            'cooling': len(self._cooling),
+        }
+
+
+alert_engine = AlertEngine()
+
+
+def latest_pair_rate(pair, before=None):
+    """Newest rate of one pair (at or before `before`), or None"""
+    rates = ExchangeRate.objects.filter(base_currency__code=pair[0], target_currency__code=pair[1])
+    if before is not None:
+        rates = rates.filter(timestamp__lte=before)
+    return rates.order_by('-timestamp').values_list('rate', flat=True).first()
+
+
+def _schedule_pair_evaluation(base_code, target_code):
+    key = f'currencies:alerts:pending:{base_code}/{target_code}'
+    try:
+        if not cache.add(key, 1, EVENT_DEBOUNCE_SECONDS):
+            return  # An evaluation for this pair is already queued
+        from .tasks import evaluate_pair_alerts
+        evaluate_pair_alerts.apply_async((base_code, target_code), countdown=EVENT_DEBOUNCE_SECONDS)
+    except Exception as e:
+        logger.warning(f"Could not schedule alert evaluation for {base_code}/{target_code}: {e}")
+
+
+@receiver(post_save, sender=CurrencyAlert)
+@receiver(post_delete, sender=CurrencyAlert)
+def _currency_alert_changed(sender, **kwargs):
+    """Alert edits invalidate this process now; others see the stamp change"""
+    alert_engine.invalidate()
+
+
+@receiver(post_save, sender=ExchangeRate)
+def _exchange_rate_saved(sender, instance, **kwargs):
+    if not getattr(settings, 'CURRENCY_ALERTS_EVENT_DRIVEN', False):
+        return
+    base_code = instance.base_currency.code
+    target_code = instance.target_currency.code
+    transaction.on_commit(lambda: _schedule_pair_evaluation(base_code, target_code))
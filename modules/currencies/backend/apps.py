@@ -28,6 +28,9 @@ class CurrenciesConfig(AppConfig):
 
         # Import and register signals (if any)
         # from . import signals  # noqa
+        from . import rate_table  # noqa - ExchangeRate change signals
+        from . import alert_engine  # noqa - CurrencyAlert / ExchangeRate signals
+        from . import broadcast  # noqa - ExchangeRate fan-out to websocket groups
 
     def _add_sdk_to_path(self):
         """Add UNIBOS SDK to Python path if not already there"""
@@ -0,0 +1,311 @@
+"""
+Streaming bank rate export
+
+Turns a BankExchangeRate queryset into CSV, JSON, NDJSON or XLSX byte
+chunks for StreamingHttpResponse. Rows come from a server-side cursor
+(iterator(chunk_size=...)) and statistics are accumulated while the rows
+stream past, so an export of any size is a single query with flat memory.
+
+The XLSX writer streams the worksheet XML straight into a zip stream
+(data descriptors instead of seeking), splitting the data over several
+sheets past Excel's row limit. No spreadsheet package is needed.
+"""
+
+import itertools
+import json
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.system.logging.backend.export import csv_chunks, json_array_chunks, ndjson_chunks
+
+# Rows fetched per server-side cursor round trip
+CHUNK_SIZE = 2000
+
+# Data rows per worksheet (Excel allows 1,048,576 rows including the header)
+XLSX_MAX_ROWS = 1_048_575
+
+# Uncompressed bytes written to a zip member before output is handed on
+XLSX_BUFFER_SIZE = 256 * 1024
+
+EXPORT_COLUMNS = [
+    ('Date', 'date'),
+    ('Timestamp', 'timestamp'),
+    ('Bank', 'bank'),
+    ('Currency Pair', 'currency_pair'),
+    ('Buy Rate', 'buy_rate'),
+    ('Sell Rate', 'sell_rate'),
+    ('Spread', 'spread'),
+    ('Spread %', 'spread_percentage'),
+]
+
+EXPORT_HEADER = [title for title, _ in EXPORT_COLUMNS]
+EXPORT_FIELDS = [field for _, field in EXPORT_COLUMNS]
+BUY_INDEX = EXPORT_FIELDS.index('buy_rate')
+SELL_INDEX = EXPORT_FIELDS.index('sell_rate')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+EXTENSIONS = {'csv': 'csv', 'json': 'json', 'ndjson': 'ndjson', 'excel': 'xlsx'}
+
+
+class RateStatistics:
+    """Running count / sum / min / max of buy and sell rates"""
+
+    def __init__(self):
+        self.count = 0
+        self.buy_sum = Decimal(0)
+        self.sell_sum = Decimal(0)
+        self.min_buy = None
+        self.max_buy = None
+        self.min_sell = None
+        self.max_sell = None
+
+    def add(self, buy, sell):
+        self.count += 1
+        self.buy_sum += buy
+        self.sell_sum += sell
+        if self.min_buy is None or buy < self.min_buy:
+            self.min_buy = buy
+        if self.max_buy is None or buy > self.max_buy:
+            self.max_buy = buy
+        if self.min_sell is None or sell < self.min_sell:
+            self.min_sell = sell
+        if self.max_sell is None or sell > self.max_sell:
+            self.max_sell = sell
+
+    def as_dict(self):
+        """Same keys as the aggregate() based statistics this replaces"""
+        return {
+            'avg_buy': self.buy_sum / self.count if self.count else None,
+            'avg_sell': self.sell_sum / self.count if self.count else None,
+            'min_buy': self.min_buy,
+            'max_sell': self.max_sell,
+        }
+
+    def rows(self):
+        """(label, value) rows for CSV / XLSX"""
+        stats = self.as_dict()
+        return [
+            ('Average Buy Rate', stats['avg_buy']),
+            ('Average Sell Rate', stats['avg_sell']),
+            ('Min Buy Rate', stats['min_buy']),
+            ('Max Sell Rate', stats['max_sell']),
+        ]
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """EXPORT_FIELDS tuples from a server-side cursor"""
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def tally(rows, statistics):
+    """Pass rows through, adding each to the statistics"""
+    add = statistics.add
+    for row in rows:
+        add(row[BUY_INDEX], row[SELL_INDEX])
+        yield row
+
+
+def _csv_export(rows, statistics):
+    def trailer():
+        if statistics is not None:
+            yield []
+            yield ['Statistics']
+            yield from statistics.rows()
+
+    return csv_chunks(EXPORT_HEADER, itertools.chain(rows, _lazy(trailer)))
+
+
+def _json_export(rows, statistics):
+    """{"data": [...], "count": n, "statistics": {...}} with the array streamed"""
+    counter = itertools.count()
+    named = (dict(zip(EXPORT_FIELDS, row)) for row, _ in zip(rows, counter))
+    yield b'{"data":'
+    yield from json_array_chunks(named)
+    tail = {'count': next(counter)}
+    if statistics is not None:
+        tail['statistics'] = statistics.as_dict()
+    yield (',' + json.dumps(tail, cls=DjangoJSONEncoder)[1:]).encode('utf-8')
+
+
+def _ndjson_export(rows, statistics):
+    """One object per row; with statistics, a final {"count", "statistics"} line"""
+    named = (dict(zip(EXPORT_FIELDS, row)) for row in rows)
+    yield from ndjson_chunks(named)
+    if statistics is not None:
+        yield from ndjson_chunks([{'count': statistics.count, 'statistics': statistics.as_dict()}])
+
+
+def _xlsx_export(rows, statistics):
+    def sheets():
+        rows_iter = iter(rows)
+        number = 1
+        while True:
+            page = itertools.islice(rows_iter, XLSX_MAX_ROWS)
+            first = next(page, None)
+            if first is None and number > 1:
+                break
+            body = [] if first is None else itertools.chain([first], page)
+            name = 'Bank Rates' if number == 1 else f'Bank Rates {number}'
+            yield name, itertools.chain([EXPORT_HEADER], body)
+            number += 1
+        if statistics is not None:
+            yield 'Statistics', _lazy(lambda: [('Metric', 'Value')] + statistics.rows())
+
+    return xlsx_chunks(sheets())
+
+
+def _lazy(make_rows):
+    """Rows produced only when iteration reaches them (after the data has streamed)"""
+    yield from make_rows()
+
+
+def export_chunks(export_format, rows, statistics=None):
+    """
+    Byte chunks of an export.
+
+    Args:
+        export_format: 'csv', 'json', 'ndjson' or 'excel'
+        rows: Iterable of EXPORT_FIELDS tuples (see export_rows)
+        statistics: RateStatistics to fill and append, or None
+    """
+    if statistics is not None:
+        rows = tally(rows, statistics)
+    encoders = {
+        'csv': _csv_export,
+        'json': _json_export,
+        'ndjson': _ndjson_export,
+        'excel': _xlsx_export,
+    }
+    return encoders[export_format](rows, statistics)
+
+
+# XLSX
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}</Types>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}</Relationships>'
+)
+_SHEET_RELATIONSHIP = (
+    '<Relationship Id="rId{n}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+class _ZipSink:
+    """Write-only, unseekable target for ZipFile; collected bytes are drained by the caller"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def xlsx_chunks(sheets):
+    """
+    A streamed XLSX workbook.
+
+    Args:
+        sheets: Iterable of (name, rows); each rows iterable is consumed
+            only when its sheet is written, so later sheets may depend on
+            earlier ones (e.g. statistics gathered while writing the data)
+    """
+    sink = _ZipSink()
+    names = []
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, rows in sheets:
+            names.append(name)
+            member = f'xl/worksheets/sheet{len(names)}.xml'
+            with workbook.open(member, 'w', force_zip64=True) as sheet:
+                buffer = [_SHEET_HEAD]
+                length = 0
+                for row in rows:
+                    line = '<row>' + ''.join(_cell(value) for value in row) + '</row>'
+                    buffer.append(line)
+                    length += len(line)
+                    if length >= XLSX_BUFFER_SIZE:
+                        sheet.write(''.join(buffer).encode('utf-8'))
+                        buffer = []
+                        length = 0
+                        output = sink.drain()
+                        if output:
+                            yield output
+                buffer.append(_SHEET_TAIL)
+                sheet.write(''.join(buffer).encode('utf-8'))
+            output = sink.drain()
+            if output:
+                yield output
+
+        numbers = range(1, len(names) + 1)
+        workbook.writestr('[Content_Types].xml', _CONTENT_TYPES_XML.format(
+            sheets=''.join(_SHEET_CONTENT_TYPE.format(n=n) for n in numbers)))
+        workbook.writestr('_rels/.rels', _ROOT_RELS_XML)
+        workbook.writestr('xl/workbook.xml', _WORKBOOK_XML.format(sheets=''.join(
+            f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{n}" r:id="rId{n}"/>'
+            for n, name in zip(numbers, names))))
+        workbook.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS_XML.format(
+            sheets=''.join(_SHEET_RELATIONSHIP.format(n=n) for n in numbers)))
+    yield sink.drain()
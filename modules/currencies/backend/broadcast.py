@@ -0,0 +1,208 @@
+"""
+Rate broadcaster
+
+Pushes exchange-rate changes to per-pair channel groups so that
+CurrencyRatesConsumer instances only join groups and never poll.
+
+Every saved ExchangeRate is offered to the process-wide RatePublisher
+(after the transaction commits). The publisher drops rates that did not
+move since the last message for the pair and sends at most one message
+per pair every PUBLISH_INTERVAL seconds; changes arriving inside that
+window are coalesced and the newest one is sent when the window ends.
+The payload is also written to the per-pair cache key the consumers read
+on subscribe, so a new subscriber is served without a query.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ExchangeRate
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two messages for the same pair
+PUBLISH_INTERVAL = 1.0
+
+# Lifetime of the per-pair cache entry written on publish
+RATE_CACHE_SECONDS = 300
+
+STALE = -1
+
+
+def pair_group(base_code, target_code):
+    """Channel group of one currency pair (group names are limited to [a-zA-Z0-9_.-])"""
+    return re.sub(r'[^a-zA-Z0-9_.-]', '_', f'currency_rate_{base_code}_{target_code}')[:99]
+
+
+def rate_cache_key(base_code, target_code):
+    return f'rate_{base_code}_{target_code}'
+
+
+def rate_payload(rate):
+    """Message data of an ExchangeRate (same shape the consumer serves on subscribe)"""
+    return {
+        'rate': float(rate.rate),
+        'bid': float(rate.bid) if rate.bid else None,
+        'ask': float(rate.ask) if rate.ask else None,
+        'change_24h': float(rate.change_percentage_24h) if rate.change_percentage_24h else 0,
+        'volume_24h': float(rate.volume_24h) if rate.volume_24h else 0,
+        'timestamp': rate.timestamp.isoformat()
+    }
+
+
+class RatePublisher:
+    """
+    Change-only, per-pair throttled fan-out to channel groups.
+
+    Usage:
+        rate_publisher.publish('USD', 'TRY', rate_payload(rate))          # sync code
+        await rate_publisher.apublish('USD', 'TRY', rate_payload(rate))   # async code
+    """
+
+    def __init__(self, min_interval=PUBLISH_INTERVAL, channel_layer=None):
+        self.min_interval = min_interval
+        self._channel_layer = channel_layer
+        self._lock = threading.Lock()
+        self._last = {}  # pair -> last published rate
+        self._sent_at = {}  # pair -> monotonic time of the last message
+        self._pending = {}  # pair -> newest data waiting for the window to end
+        self._newest = {}  # pair -> timestamp of the newest rate offered
+        self.stats = {'offered': 0, 'stale': 0, 'unchanged': 0, 'coalesced': 0, 'sent': 0}
+
+    @property
+    def channel_layer(self):
+        if self._channel_layer is None:
+            from channels.layers import get_channel_layer
+            self._channel_layer = get_channel_layer()
+        return self._channel_layer
+
+    def _offer(self, pair, data, timestamp=None):
+        """0 to send now, seconds until a flush to schedule one, None to do nothing, STALE"""
+        now = time.monotonic()
+        with self._lock:
+            self.stats['offered'] += 1
+            if timestamp is not None:
+                # Backfilled or late rates must not replace a newer one
+                newest = self._newest.get(pair)
+                if newest is not None and timestamp < newest:
+                    self.stats['stale'] += 1
+                    return STALE
+                self._newest[pair] = timestamp
+            if pair in self._pending:
+                # A flush is already scheduled; it will send the newest data
+                self._pending[pair] = data
+                self.stats['coalesced'] += 1
+                return None
+            if data['rate'] == self._last.get(pair):
+                self.stats['unchanged'] += 1
+                return None
+
+            wait = self.min_interval - (now - self._sent_at.get(pair, float('-inf')))
+            if wait > 0:
+                self._pending[pair] = data
+                return wait
+
+            self._mark_sent(pair, data, now)
+            return 0
+
+    def _mark_sent(self, pair, data, now):
+        self._last[pair] = data['rate']
+        self._sent_at[pair] = now
+        self.stats['sent'] += 1
+
+    def _take_pending(self, pair):
+        with self._lock:
+            data = self._pending.pop(pair, None)
+            if data is None or data['rate'] == self._last.get(pair):
+                if data is not None:
+                    self.stats['unchanged'] += 1
+                return None
+            self._mark_sent(pair, data, time.monotonic())
+            return data
+
+    def _message(self, pair, data):
+        return {
+            'type': 'rate_update',
+            'data': {'pair': f'{pair[0]}/{pair[1]}', 'rate': data},
+            'timestamp': timezone.now().isoformat()
+        }
+
+    async def _send(self, pair, data):
+        await self.channel_layer.group_send(pair_group(*pair), self._message(pair, data))
+
+    # Async API
+
+    async def apublish(self, base_code, target_code, data, timestamp=None):
+        """Offer a rate; False if it is older than one already offered"""
+        pair = (base_code, target_code)
+        action = self._offer(pair, data, timestamp)
+        if action == STALE:
+            return False
+        if action == 0:
+            await self._send(pair, data)
+        elif action:
+            asyncio.get_running_loop().call_later(action, lambda: asyncio.ensure_future(self._aflush(pair)))
+        return True
+
+    async def _aflush(self, pair):
+        data = self._take_pending(pair)
+        if data is not None:
+            await self._send(pair, data)
+
+    # Sync API (signal handlers, Celery tasks)
+
+    def publish(self, base_code, target_code, data, timestamp=None):
+        """Offer a rate; False if it is older than one already offered"""
+        pair = (base_code, target_code)
+        action = self._offer(pair, data, timestamp)
+        if action == STALE:
+            return False
+        if action == 0:
+            self._send_sync(pair, data)
+        elif action:
+            timer = threading.Timer(action, self._flush_sync, (pair,))
+            timer.daemon = True
+            timer.start()
+        return True
+
+    def _flush_sync(self, pair):
+        data = self._take_pending(pair)
+        if data is not None:
+            self._send_sync(pair, data)
+
+    def _send_sync(self, pair, data):
+        from asgiref.sync import async_to_sync
+        try:
+            async_to_sync(self._send)(pair, data)
+        except Exception as e:
+            logger.warning(f"Could not broadcast {pair[0]}/{pair[1]} rate: {e}")
+
+
+rate_publisher = RatePublisher()
+
+
+def publish_rate(rate):
+    """Broadcast a saved ExchangeRate and refresh its cache entry"""
+    base_code = rate.base_currency.code
+    target_code = rate.target_currency.code
+    data = rate_payload(rate)
+    if not rate_publisher.publish(base_code, target_code, data, timestamp=rate.timestamp):
+        return
+    try:
+        cache.set(rate_cache_key(base_code, target_code), data, RATE_CACHE_SECONDS)
+    except Exception as e:
+        logger.debug(f"Rate cache update failed: {e}")
+
+
+@receiver(post_save, sender=ExchangeRate)
+def _exchange_rate_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publish_rate(instance))
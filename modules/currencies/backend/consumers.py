@@ -13,15 +13,22 @@ from django.core.cache import cache
 from django.utils import timezone
 from .models import Currency, ExchangeRate, Portfolio, CurrencyAlert
 from .serializers import ExchangeRateSerializer, PortfolioSerializer
+from .broadcast import pair_group, rate_cache_key, rate_payload, RATE_CACHE_SECONDS
 
 
 class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
-    """Real-time currency exchange rates"""
+    """
+    Real-time currency exchange rates
+
+    Subscribing to a pair joins its channel group; rate changes are pushed
+    by broadcast.RatePublisher, so connections never poll.
+    """
     
     async def connect(self):
         """Accept WebSocket connection"""
         self.user = self.scope["user"]
         self.room_group_name = "currency_rates"
+        self.subscriptions = set()
         
         # Join currency rates group
         await self.channel_layer.group_add(
@@ -33,15 +40,15 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
         
         # Send initial rates on connection
         await self.send_initial_rates()
-        
-        # Start periodic rate updates
-        self.update_task = asyncio.create_task(self.periodic_rate_update())
     
     async def disconnect(self, close_code):
         """Handle WebSocket disconnect"""
-        # Cancel periodic updates
-        if hasattr(self, 'update_task'):
-            self.update_task.cancel()
+        # Leave pair groups
+        for pair in getattr(self, 'subscriptions', ()):
+            await self.channel_layer.group_discard(
+                pair_group(*pair.split('/', 1)),
+                self.channel_name
+            )
         
         # Leave room group
         await self.channel_layer.group_discard(
@@ -66,10 +73,13 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
         target_currency = data.get('target_currency')
         
         if base_currency and target_currency:
-            # Store subscription in user's session
-            subscriptions = self.scope.get('subscriptions', set())
-            subscriptions.add(f"{base_currency}/{target_currency}")
-            self.scope['subscriptions'] = subscriptions
+            pair = f"{base_currency}/{target_currency}"
+            if pair not in self.subscriptions:
+                self.subscriptions.add(pair)
+                await self.channel_layer.group_add(
+                    pair_group(base_currency, target_currency),
+                    self.channel_name
+                )
             
             # Send current rate
             await self.send_currency_pair_rate(base_currency, target_currency)
@@ -79,10 +89,13 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
         base_currency = data.get('base_currency')
         target_currency = data.get('target_currency')
         
-        if base_currency and target_currency:
-            subscriptions = self.scope.get('subscriptions', set())
-            subscriptions.discard(f"{base_currency}/{target_currency}")
-            self.scope['subscriptions'] = subscriptions
+        pair = f"{base_currency}/{target_currency}"
+        if base_currency and target_currency and pair in self.subscriptions:
+            self.subscriptions.discard(pair)
+            await self.channel_layer.group_discard(
+                pair_group(base_currency, target_currency),
+                self.channel_name
+            )
     
     async def send_initial_rates(self):
         """Send initial currency rates on connection"""
@@ -126,35 +139,6 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
             'timestamp': timezone.now().isoformat()
         })
     
-    async def periodic_rate_update(self):
-        """Send periodic rate updates"""
-        while True:
-            try:
-                await asyncio.sleep(10)  # Update every 10 seconds
-                
-                # Get subscribed pairs
-                subscriptions = self.scope.get('subscriptions', set())
-                
-                if subscriptions:
-                    updates = {}
-                    for pair in subscriptions:
-                        base, target = pair.split('/')
-                        rate = await self.get_currency_pair_rate(base, target)
-                        if rate:
-                            updates[pair] = rate
-                    
-                    if updates:
-                        await self.send_json({
-                            'type': 'rate_updates',
-                            'data': updates,
-                            'timestamp': timezone.now().isoformat()
-                        })
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                print(f"Error in periodic update: {e}")
-                await asyncio.sleep(30)  # Wait longer on error
-    
     # Group message handlers
     async def rate_update(self, event):
         """Handle rate update from group"""
@@ -197,7 +181,7 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
     @database_sync_to_async
     def get_currency_pair_rate(self, base_currency, target_currency):
         """Get rate for specific currency pair"""
-        cache_key = f'rate_{base_currency}_{target_currency}'
+        cache_key = rate_cache_key(base_currency, target_currency)
         cached_rate = cache.get(cache_key)
         
         if cached_rate:
@@ -211,16 +195,10 @@ class CurrencyRatesConsumer(AsyncJsonWebsocketConsumer):
                 target_currency__code=target_currency
             ).latest('timestamp')
             
-            rate_data = {
-                'rate': float(rate.rate),
-                'bid': float(rate.bid) if rate.bid else None,
-                'ask': float(rate.ask) if rate.ask else None,
-                'change_24h': float(rate.change_percentage_24h) if rate.change_percentage_24h else 0,
-                'volume_24h': float(rate.volume_24h) if rate.volume_24h else 0,
-                'timestamp': rate.timestamp.isoformat()
-            }
+            rate_data = rate_payload(rate)
             
-            cache.set(cache_key, rate_data, 30)
+            # The publisher refreshes this entry on every change
+            cache.set(cache_key, rate_data, RATE_CACHE_SECONDS)
             return rate_data
         except ExchangeRate.DoesNotExist:
             return None
@@ -0,0 +1,394 @@
+"""
+Incremental Firebase bank-rate import
+
+Fetches only the `kurlar` entries added since the last import instead of
+the whole tree:
+
+- The high-water mark (last imported key and its `zaman`) is stored on
+  BankRateImportLog after every page, so an interrupted run resumes
+- Entries are requested in key order with Firebase REST range queries
+  (orderBy="$key", startAt, limitToFirst) one page at a time; push keys
+  are chronological, and each run starts a little before the mark to
+  pick up entries written late
+- Each response is parsed member by member from the socket with
+  iter_object_items(), so memory is bounded by the page size, never by
+  the size of the history
+- Duplicates are checked with one query over the time window of the
+  page, and new or changed rates are written with one bulk upsert
+"""
+
+import codecs
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import pytz
+import requests
+
+from .models import BankExchangeRate, BankRateImportLog
+
+logger = logging.getLogger(__name__)
+
+FIREBASE_URL = 'https://findmeonphotos-default-rtdb.europe-west1.firebasedatabase.app/kurlar.json'
+
+BANK_MAPPING = {
+    'TCMB': 'TCMB',
+    'Akbank': 'Akbank',
+    'Garanti': 'Garanti',
+    'Garanti BBVA': 'Garanti',
+    'YKB': 'YKB',
+    'Yapı Kredi': 'YKB',
+    'Ziraat': 'Ziraat',
+    'Halkbank': 'Halkbank',
+    'Vakıfbank': 'Vakıfbank',
+    'İş Bankası': 'İşbank',
+    'ING': 'ING',
+    'QNB': 'QNB',
+    'Denizbank': 'Denizbank',
+    'TEB': 'TEB',
+}
+
+# Rates are stored with DecimalField(decimal_places=6); parsed floats are
+# rounded the same way so re-read entries compare equal to the stored rows
+RATE_QUANTUM = Decimal(1).scaleb(-BankExchangeRate._meta.get_field('buy_rate').decimal_places)
+
+CURRENCY_MAPPING = {
+    'USDTRY': 'USDTRY',
+    'EURTRY': 'EURTRY',
+    'XAUTRY': 'XAUTRY',
+    'GBPTRY': 'GBPTRY',
+    'CHFTRY': 'CHFTRY',
+    'JPYTRY': 'JPYTRY',
+}
+
+ISTANBUL_TZ = pytz.timezone('Europe/Istanbul')
+
+PAGE_SIZE = 500
+REQUEST_TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
+# Each run re-reads entries pushed this long before the high-water mark
+OVERLAP_MS = 10 * 60 * 1000
+
+UPSERT_FIELDS = ['buy_rate', 'sell_rate', 'spread', 'spread_percentage', 'updated_at']
+
+# Firebase push keys: 8 characters of millisecond timestamp + 12 random
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+
+def _is_push_key(key):
+    return len(key) == 20 and all(char in PUSH_CHARS for char in key)
+
+
+def push_key_floor(timestamp_ms):
+    """Smallest push key generated at timestamp_ms (for startAt)"""
+    prefix = []
+    for _ in range(8):
+        prefix.append(PUSH_CHARS[timestamp_ms % 64])
+        timestamp_ms //= 64
+    return ''.join(reversed(prefix))
+
+
+def iter_object_items(chunks):
+    """
+    Yield (key, value) members of a top-level JSON object, one at a time.
+
+    `chunks` is an iterable of bytes or str (e.g. response.iter_content());
+    only the member being decoded is held in memory. A top-level `null`
+    (Firebase's empty result) yields nothing.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    state = {'buffer': '', 'pos': 0}
+
+    def more():
+        for chunk in chunks:
+            text = utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                state['buffer'] = state['buffer'][state['pos']:] + text
+                state['pos'] = 0
+                return True
+        return False
+
+    def peek():
+        """Next non-whitespace character (None at end of input)"""
+        while True:
+            buffer = state['buffer']
+            pos = state['pos']
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            state['pos'] = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not more():
+                return None
+
+    def decode():
+        while True:
+            try:
+                value, end = decoder.raw_decode(state['buffer'], state['pos'])
+            except json.JSONDecodeError:
+                if not more():
+                    raise
+                continue
+            # A number cut by a chunk boundary ("1." + "5") decodes short;
+            # a complete member is always followed by a separator
+            buffer = state['buffer']
+            if (end == len(buffer) or buffer[end] not in ' \t\r\n,:}') and more():
+                continue
+            state['pos'] = end
+            return value
+
+    first = peek()
+    if first is None:
+        return
+    if first != '{':
+        if decode() is None:
+            return
+        raise ValueError('Expected a JSON object')
+    state['pos'] += 1
+
+    while True:
+        char = peek()
+        if char == '}':
+            state['pos'] += 1
+            return
+        if char == ',':
+            state['pos'] += 1
+            char = peek()
+        if char != '"':
+            raise ValueError(f'Expected an object key, got {char!r}')
+        key = decode()
+        if peek() != ':':
+            raise ValueError(f'Expected ":" after key {key!r}')
+        state['pos'] += 1
+        peek()
+        yield key, decode()
+
+
+class FirebaseRateSource:
+    """Key-ordered, paged reads of the kurlar tree"""
+
+    def __init__(self, url=FIREBASE_URL, page_size=PAGE_SIZE, timeout=REQUEST_TIMEOUT, session=None):
+        self.url = url
+        self.page_size = page_size
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.requests = 0
+
+    def fetch_page(self, start_key=None):
+        """Entries with key >= start_key, at most page_size, sorted by key"""
+        params = {'orderBy': '"$key"', 'limitToFirst': self.page_size}
+        if start_key is not None:
+            params['startAt'] = json.dumps(start_key)
+
+        self.requests += 1
+        with self.session.get(self.url, params=params, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            page = list(iter_object_items(response.iter_content(chunk_size=CHUNK_SIZE)))
+        page.sort(key=lambda item: item[0])
+        return page
+
+    def iter_pages(self, start_key=None):
+        """Pages of (key, entry) after start_key (inclusive), in key order"""
+        last_key = None
+        while True:
+            page = self.fetch_page(start_key)
+            size = len(page)
+            if last_key is not None:
+                page = [item for item in page if item[0] > last_key]
+            if page:
+                yield page
+                last_key = start_key = page[-1][0]
+            if size < self.page_size or not page:
+                return
+
+
+def parse_entry(entry_id, entry):
+    """
+    BankExchangeRate rows (unsaved) of one Firebase entry.
+
+    Returns (timestamp_ms, rows); rows is empty for invalid entries.
+    """
+    if not isinstance(entry, dict) or 'zaman' not in entry:
+        return None, []
+    timestamp_ms = entry['zaman']
+    if not isinstance(entry.get('data'), list):
+        return timestamp_ms, []
+
+    timestamp = datetime.fromtimestamp(timestamp_ms / 1000, tz=ISTANBUL_TZ)
+    rows = []
+    for bank_data in entry['data']:
+        if not isinstance(bank_data, dict):
+            continue
+        bank = BANK_MAPPING.get(bank_data.get('banka', ''))
+        if not bank:
+            continue
+        for rate_data in bank_data.get('banka_kuru', []):
+            if not isinstance(rate_data, dict):
+                continue
+            currency_pair = CURRENCY_MAPPING.get(rate_data.get('kur', ''))
+            if not currency_pair:
+                continue
+            try:
+                buy_rate = Decimal(str(rate_data.get('alis', 0))).quantize(RATE_QUANTUM)
+                sell_rate = Decimal(str(rate_data.get('satis', 0))).quantize(RATE_QUANTUM)
+            except (ValueError, TypeError, InvalidOperation):
+                continue
+            if buy_rate <= 0 or sell_rate <= 0:
+                continue
+            rows.append(BankExchangeRate(
+                entry_id=f"{entry_id}_{bank}_{currency_pair}",
+                bank=bank,
+                currency_pair=currency_pair,
+                buy_rate=buy_rate,
+                sell_rate=sell_rate,
+                date=timestamp.date(),
+                timestamp=timestamp,
+            ))
+    return timestamp_ms, rows
+
+
+def high_water_mark():
+    """(key, zaman in ms) of the newest imported entry, or (None, None)"""
+    log = BankRateImportLog.objects.exclude(last_entry_key='').order_by('-started_at').first()
+    if log is not None:
+        timestamp = log.last_entry_timestamp
+        return log.last_entry_key, int(timestamp.timestamp() * 1000) if timestamp else None
+
+    # First incremental run: derive the mark from the newest stored rate
+    latest = BankExchangeRate.objects.order_by('-timestamp').values_list('entry_id', 'timestamp').first()
+    if latest is None:
+        return None, None
+    entry_id, timestamp = latest
+    return entry_id.rsplit('_', 2)[0], int(timestamp.timestamp() * 1000)
+
+
+def start_key_for(key, timestamp_ms, overlap_ms=OVERLAP_MS):
+    """Where the next range query starts: a bit before the mark when keys are push keys"""
+    if key is None:
+        return None
+    if timestamp_ms is not None and _is_push_key(key):
+        return min(key, push_key_floor(max(timestamp_ms - overlap_ms, 0)))
+    return key
+
+
+class RateImporter:
+    """
+    Writes pages of Firebase entries to BankExchangeRate.
+
+    Usage:
+        importer = RateImporter(import_log)
+        for page in source.iter_pages(start_key):
+            importer.import_page(page)
+    """
+
+    def __init__(self, import_log=None, update_existing=True, dry_run=False):
+        self.import_log = import_log
+        self.update_existing = update_existing
+        self.dry_run = dry_run
+        self.stats = {'total': 0, 'new': 0, 'updated': 0, 'failed': 0, 'skipped': 0, 'pages': 0}
+        self._previous = {}  # (bank, pair) -> (buy, sell) of the last rate seen
+
+    def _previous_rate(self, bank, currency_pair, timestamp):
+        key = (bank, currency_pair)
+        if key not in self._previous:
+            self._previous[key] = BankExchangeRate.objects.filter(
+                bank=bank, currency_pair=currency_pair, timestamp__lt=timestamp
+            ).order_by('-timestamp').values_list('buy_rate', 'sell_rate').first()
+        return self._previous[key]
+
+    def import_page(self, page):
+        """Upsert the rates of one page of (key, entry); returns rows written"""
+        self.stats['pages'] += 1
+        rows = []
+        mark = None
+        for entry_id, entry in page:
+            try:
+                timestamp_ms, entry_rows = parse_entry(entry_id, entry)
+            except Exception as e:
+                logger.error(f'Error processing entry {entry_id}: {e}')
+                self.stats['failed'] += 1
+                continue
+            if timestamp_ms is None or not entry_rows:
+                self.stats['skipped'] += 1
+            if timestamp_ms is not None:
+                mark = (entry_id, timestamp_ms)
+            rows.extend(entry_rows)
+
+        written = self._write(rows) if rows else 0
+        if mark is not None:
+            self._save_mark(*mark)
+        return written
+
+    def _write(self, rows):
+        rows.sort(key=lambda row: row.timestamp)
+        existing = {}
+        occupied = set()
+        window = BankExchangeRate.objects.filter(
+            timestamp__gte=rows[0].timestamp, timestamp__lte=rows[-1].timestamp
+        ).values_list('entry_id', 'bank', 'currency_pair', 'timestamp', 'buy_rate', 'sell_rate')
+        for entry_id, bank, currency_pair, timestamp, buy_rate, sell_rate in window:
+            existing[entry_id] = (buy_rate, sell_rate)
+            occupied.add((bank, currency_pair, timestamp))
+
+        upserts = []
+        for row in rows:
+            self.stats['total'] += 1
+            stored = existing.get(row.entry_id)
+            if stored is not None:
+                if self.update_existing and stored != (row.buy_rate, row.sell_rate):
+                    row.update_derived_fields()
+                    upserts.append(row)
+                    self.stats['updated'] += 1
+                else:
+                    self.stats['skipped'] += 1
+                continue
+            if (row.bank, row.currency_pair, row.timestamp) in occupied:
+                self.stats['skipped'] += 1
+                continue
+
+            previous = self._previous_rate(row.bank, row.currency_pair, row.timestamp)
+            if previous:
+                row.previous_buy_rate, row.previous_sell_rate = previous
+            row.update_derived_fields()
+            self._previous[(row.bank, row.currency_pair)] = (row.buy_rate, row.sell_rate)
+            occupied.add((row.bank, row.currency_pair, row.timestamp))
+            upserts.append(row)
+            self.stats['new'] += 1
+
+        if upserts and not self.dry_run:
+            BankExchangeRate.objects.bulk_create(
+                upserts,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['entry_id'],
+                update_fields=UPSERT_FIELDS,
+            )
+        return len(upserts)
+
+    def _save_mark(self, key, timestamp_ms):
+        if self.import_log is None or self.dry_run:
+            return
+        timestamp = datetime.fromtimestamp(timestamp_ms / 1000, tz=ISTANBUL_TZ)
+        BankRateImportLog.objects.filter(pk=self.import_log.pk).update(
+            last_entry_key=key, last_entry_timestamp=timestamp
+        )
+
+
+def import_incremental(source=None, import_log=None, update_existing=True, dry_run=False):
+    """Import entries after the high-water mark; returns the stats dict"""
+    source = source or FirebaseRateSource()
+    key, timestamp_ms = high_water_mark()
+    start_key = start_key_for(key, timestamp_ms)
+    logger.info(f"Firebase import starting at key {start_key!r}")
+
+    importer = RateImporter(import_log, update_existing=update_existing, dry_run=dry_run)
+    for page in source.iter_pages(start_key):
+        importer.import_page(page)
+
+    importer.stats['requests'] = source.requests
+    return importer.stats
+
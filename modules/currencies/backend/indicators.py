@@ -0,0 +1,412 @@
+"""
+Technical indicators
+
+Vectorised SMA, EMA, RSI, Bollinger Bands and MACD over NumPy price
+arrays, plus rolling state so that new ticks update an indicator in O(1)
+instead of recomputing its window.
+
+- SMA and Bollinger use cumulative sums (no per-point window slices)
+- EMA and Wilder's RSI smoothing are first-order recurrences, evaluated
+  block-wise in closed form: inside a block
+      y[j] = d^(j+1) * y_prev + a * d^j * cumsum(x[k] * d^-k)
+  with d = 1 - a; blocks are short enough that d^-k stays below 1e8
+
+Each indicator class computes its full series with compute(prices) and
+keeps the state needed by update(price) afterwards. IndicatorCache holds
+one instance per (pair, bank, indicator, period) on top of the OHLC
+engine's series cache and feeds it only the samples that arrived since
+the last request.
+"""
+
+import math
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+# Largest d^-k factor used inside one EMA block
+MAX_BLOCK_SCALE = 1e8
+
+INDICATORS = ('sma', 'ema', 'rsi', 'bollinger', 'macd')
+
+
+def _ewm(values, alpha, initial):
+    """y[i] = (1 - alpha) * y[i-1] + alpha * values[i], with y[-1] = initial"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty(len(values))
+    if not len(values):
+        return out
+
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = values
+        return out
+
+    block = max(1, int(math.log(MAX_BLOCK_SCALE) / -math.log(decay)))
+    powers = decay ** np.arange(block + 1)
+    inverse = 1.0 / powers[:block]
+
+    previous = initial
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        size = len(chunk)
+        acc = np.cumsum(chunk * inverse[:size])
+        out[start:start + size] = powers[1:size + 1] * previous + alpha * powers[:size] * acc
+        previous = out[start + size - 1]
+    return out
+
+
+def sma(prices, period):
+    """Simple moving average; element i covers prices[i : i + period]"""
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) < period:
+        return np.empty(0)
+    sums = np.cumsum(np.concatenate(([0.0], prices)))
+    return (sums[period:] - sums[:-period]) / period
+
+
+def ema(prices, period):
+    """EMA seeded with the SMA of the first period prices (aligned at period - 1)"""
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) < period:
+        return np.empty(0)
+    seed = prices[:period].mean()
+    return np.concatenate(([seed], _ewm(prices[period:], 2.0 / (period + 1), seed)))
+
+
+def _rsi_from_averages(up, down):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + up / down)
+    return np.where(down == 0, 100.0, rsi)
+
+
+def rsi_components(prices, period):
+    """Wilder-smoothed average gain/loss (aligned at index period)"""
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) <= period:
+        return np.empty(0), np.empty(0)
+    deltas = np.diff(prices)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+    up0 = gains[:period].mean()
+    down0 = losses[:period].mean()
+    up = np.concatenate(([up0], _ewm(gains[period:], 1.0 / period, up0)))
+    down = np.concatenate(([down0], _ewm(losses[period:], 1.0 / period, down0)))
+    return up, down
+
+
+def rsi(prices, period):
+    """Relative Strength Index (aligned at index period)"""
+    up, down = rsi_components(prices, period)
+    return _rsi_from_averages(up, down)
+
+
+def bollinger(prices, period, width=2.0):
+    """(middle, upper, lower) bands, aligned at period - 1"""
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) < period:
+        empty = np.empty(0)
+        return empty, empty, empty
+    # Centre the prices so the running sum of squares does not lose precision
+    centred = prices - prices.mean()
+    sums = np.cumsum(np.concatenate(([0.0], centred)))
+    squares = np.cumsum(np.concatenate(([0.0], centred * centred)))
+    mean = (sums[period:] - sums[:-period]) / period
+    variance = np.maximum((squares[period:] - squares[:-period]) / period - mean * mean, 0.0)
+    deviation = np.sqrt(variance)
+    middle = mean + prices.mean()
+    return middle, middle + width * deviation, middle - width * deviation
+
+
+def macd(prices, fast=12, slow=26, signal=9):
+    """(macd, signal, histogram), aligned at slow + signal - 2"""
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) < slow + signal - 1:
+        empty = np.empty(0)
+        return empty, empty, empty
+    line = ema(prices, fast)[slow - fast:] - ema(prices, slow)
+    signal_line = ema(line, signal)
+    line = line[signal - 1:]
+    return line, signal_line, line - signal_line
+
+
+class SMA:
+    """Simple moving average with O(1) updates"""
+
+    columns = ('value',)
+
+    def __init__(self, period):
+        self.period = period
+        self.offset = period - 1
+        self._window = deque(maxlen=period)
+        self._sum = 0.0
+
+    def compute(self, prices):
+        values = sma(prices, self.period)
+        tail = np.asarray(prices[-self.period:], dtype=np.float64)
+        self._window = deque(tail.tolist(), maxlen=self.period)
+        self._sum = float(tail.sum())
+        return {'value': values}
+
+    def update(self, price):
+        if len(self._window) == self.period:
+            self._sum -= self._window[0]
+        self._window.append(price)
+        self._sum += price
+        if len(self._window) < self.period:
+            return None
+        return {'value': self._sum / self.period}
+
+
+class EMA:
+    """Exponential moving average with O(1) updates"""
+
+    columns = ('value',)
+
+    def __init__(self, period):
+        self.period = period
+        self.offset = period - 1
+        self.alpha = 2.0 / (period + 1)
+        self._value = None
+
+    def compute(self, prices):
+        values = ema(prices, self.period)
+        self._value = float(values[-1]) if len(values) else None
+        return {'value': values}
+
+    def update(self, price):
+        if self._value is None:
+            return None
+        self._value += self.alpha * (price - self._value)
+        return {'value': self._value}
+
+
+class RSI:
+    """Wilder's RSI with O(1) updates"""
+
+    columns = ('value',)
+
+    def __init__(self, period):
+        self.period = period
+        self.offset = period
+        self._up = None
+        self._down = None
+        self._last = None
+
+    def compute(self, prices):
+        up, down = rsi_components(prices, self.period)
+        if len(up):
+            self._up = float(up[-1])
+            self._down = float(down[-1])
+            self._last = float(prices[-1])
+        return {'value': _rsi_from_averages(up, down)}
+
+    def update(self, price):
+        if self._up is None:
+            return None
+        delta = price - self._last
+        self._last = price
+        self._up += (max(delta, 0.0) - self._up) / self.period
+        self._down += (max(-delta, 0.0) - self._down) / self.period
+        value = 100.0 if self._down == 0 else 100.0 - 100.0 / (1.0 + self._up / self._down)
+        return {'value': value}
+
+
+class Bollinger:
+    """Bollinger Bands (SMA +/- 2 standard deviations) with O(1) updates"""
+
+    columns = ('value', 'upper', 'lower')
+
+    # Re-sum the window now and then to stop floating point drift
+    RESYNC_EVERY = 1000
+
+    def __init__(self, period, width=2.0):
+        self.period = period
+        self.width = width
+        self.offset = period - 1
+        self._window = deque(maxlen=period)
+        self._sum = 0.0
+        self._squares = 0.0
+        self._updates = 0
+
+    def _resync(self):
+        self._sum = math.fsum(self._window)
+        self._squares = math.fsum(price * price for price in self._window)
+
+    def compute(self, prices):
+        middle, upper, lower = bollinger(prices, self.period, self.width)
+        self._window = deque(np.asarray(prices[-self.period:], dtype=np.float64).tolist(), maxlen=self.period)
+        self._resync()
+        return {'value': middle, 'upper': upper, 'lower': lower}
+
+    def update(self, price):
+        if len(self._window) == self.period:
+            oldest = self._window[0]
+            self._sum -= oldest
+            self._squares -= oldest * oldest
+        self._window.append(price)
+        self._sum += price
+        self._squares += price * price
+
+        self._updates += 1
+        if self._updates % self.RESYNC_EVERY == 0:
+            self._resync()
+        if len(self._window) < self.period:
+            return None
+
+        mean = self._sum / self.period
+        deviation = math.sqrt(max(self._squares / self.period - mean * mean, 0.0))
+        return {'value': mean, 'upper': mean + self.width * deviation, 'lower': mean - self.width * deviation}
+
+
+class MACD:
+    """MACD (12/26/9 by default) with O(1) updates"""
+
+    columns = ('value', 'signal', 'histogram')
+
+    def __init__(self, period=None, fast=12, slow=26, signal=9):
+        self.period = period
+        self.offset = slow + signal - 2
+        self._fast = EMA(fast)
+        self._slow = EMA(slow)
+        self._signal = EMA(signal)
+
+    def compute(self, prices):
+        line, signal_line, histogram = macd(prices, self._fast.period, self._slow.period, self._signal.period)
+        if len(line):
+            self._fast.compute(prices)
+            self._slow.compute(prices)
+            self._signal._value = float(signal_line[-1])
+        return {'value': line, 'signal': signal_line, 'histogram': histogram}
+
+    def update(self, price):
+        fast = self._fast.update(price)
+        slow = self._slow.update(price)
+        if fast is None or slow is None:
+            return None
+        line = fast['value'] - slow['value']
+        signal = self._signal.update(line)
+        if signal is None:
+            return None
+        return {'value': line, 'signal': signal['value'], 'histogram': line - signal['value']}
+
+
+INDICATOR_CLASSES = {
+    'sma': SMA,
+    'ema': EMA,
+    'rsi': RSI,
+    'bollinger': Bollinger,
+    'macd': MACD,
+}
+
+
+class IndicatorSeries:
+    """Indicator output aligned to sample timestamps, extended tick by tick"""
+
+    def __init__(self, indicator, series):
+        self.indicator = indicator
+        self.series = series
+        arrays = series.snapshot()
+        self.count = len(arrays.timestamps)
+        self.last_timestamp = int(arrays.timestamps[-1]) if self.count else None
+
+        prices = arrays.buy
+        columns = indicator.compute(prices)
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        produced = len(self.columns['value'])
+        self.timestamps = arrays.timestamps[len(prices) - produced:]
+        self.prices = prices[len(prices) - produced:]
+
+    def is_current_for(self, series):
+        """True if series only gained samples at the end since the last sync"""
+        timestamps = series.snapshot().timestamps
+        if series is not self.series or len(timestamps) < self.count:
+            return False
+        if not self.count:
+            return False
+        return int(timestamps[self.count - 1]) == self.last_timestamp
+
+    def extend(self):
+        """Feed samples appended to the series since the last call"""
+        arrays = self.series.snapshot()
+        new = range(self.count, len(arrays.timestamps))
+        if not len(new):
+            return 0
+
+        times = []
+        prices = []
+        values = {name: [] for name in self.indicator.columns}
+        buy = arrays.buy
+        for index in new:
+            price = float(buy[index])
+            point = self.indicator.update(price)
+            if point is None:
+                continue
+            times.append(arrays.timestamps[index])
+            prices.append(price)
+            for name in values:
+                values[name].append(point[name])
+
+        if times:
+            self.timestamps = np.concatenate([self.timestamps, np.asarray(times, dtype=np.int64)])
+            self.prices = np.concatenate([self.prices, prices])
+            for name, column in values.items():
+                self.columns[name] = np.concatenate([self.columns[name], column])
+
+        self.count = len(arrays.timestamps)
+        self.last_timestamp = int(arrays.timestamps[-1])
+        return len(new)
+
+    def window(self, start_ts=None, end_ts=None):
+        """(timestamps, prices, columns) of outputs with start_ts <= t <= end_ts"""
+        lo = 0 if start_ts is None else int(np.searchsorted(self.timestamps, start_ts, side='left'))
+        hi = len(self.timestamps) if end_ts is None else int(np.searchsorted(self.timestamps, end_ts, side='right'))
+        return (
+            self.timestamps[lo:hi],
+            self.prices[lo:hi],
+            {name: values[lo:hi] for name, values in self.columns.items()},
+        )
+
+
+class IndicatorCache:
+    """Process-local IndicatorSeries per (pair, bank, indicator, period)"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, currency_pair, bank, name, period):
+        from .ohlc import series_cache
+
+        series = series_cache.get(currency_pair, bank)
+        key = (currency_pair, bank or None, name, period)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.is_current_for(series):
+                entry.extend()
+                return entry
+
+            entry = IndicatorSeries(INDICATOR_CLASSES[name](period), series)
+            self._entries[key] = entry
+            return entry
+
+
+indicator_cache = IndicatorCache()
+
+
+def to_points(window, tz):
+    """Indicator API rows (time, value, price and any extra columns)"""
+    timestamps, prices, columns = window
+    times = timestamps.tolist()
+    prices = prices.tolist()
+    columns = {name: values.tolist() for name, values in columns.items()}
+    rows = []
+    for i in range(len(times)):
+        row = {'time': datetime.fromtimestamp(times[i], tz).isoformat()}
+        for name, values in columns.items():
+            row[name] = values[i]
+        row['price'] = prices[i]
+        rows.append(row)
+    return rows
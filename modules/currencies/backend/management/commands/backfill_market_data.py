@@ -0,0 +1,72 @@
+"""
+Backfill MarketData candles from stored exchange rates
+
+Rolls up an arbitrary historical range for several intervals with one
+scan per chunk (see market_rollup.py). Existing candles in the range are
+updated in place, so the command can be re-run safely.
+
+Usage: python manage.py backfill_market_data --start 2024-01-01 --end 2024-07-01 --intervals 1h 1d
+"""
+
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from modules.currencies.backend.market_rollup import (
+    CHUNK_SECONDS, DEFAULT_INTERVALS, INTERVAL_SECONDS, rollup_market_data
+)
+
+
+def _parse_day(value):
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+    return datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild MarketData OHLCV candles for a historical range'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            required=True,
+            help='First day to roll up (YYYY-MM-DD, UTC)',
+        )
+        parser.add_argument(
+            '--end',
+            help='Day after the last one to roll up (YYYY-MM-DD, UTC; default: now)',
+        )
+        parser.add_argument(
+            '--intervals',
+            nargs='+',
+            choices=list(INTERVAL_SECONDS),
+            default=list(DEFAULT_INTERVALS),
+            help=f'Candle intervals (default: {" ".join(DEFAULT_INTERVALS)})',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=CHUNK_SECONDS // 86400,
+            help='Days of rates scanned per query (default: 1)',
+        )
+
+    def handle(self, *args, **options):
+        start = _parse_day(options['start'])
+        end = _parse_day(options['end']) if options['end'] else timezone.now()
+        if end <= start:
+            raise CommandError('--end must be after --start')
+
+        self.stdout.write(f'Rolling up {start:%Y-%m-%d} - {end:%Y-%m-%d %H:%M} ({", ".join(options["intervals"])})')
+        stats = rollup_market_data(
+            start,
+            end,
+            intervals=options['intervals'],
+            chunk_seconds=max(1, options['chunk_days']) * 86400,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['rates']:,} rates -> {stats['candles']:,} candles "
+            f"in {stats['chunks']} chunks ({stats['pairs']} pairs)"
+        ))
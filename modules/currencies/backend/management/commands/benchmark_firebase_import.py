@@ -0,0 +1,181 @@
+"""
+Benchmark the Firebase bank-rate import: full download vs paged streaming
+
+Serves a generated `kurlar` tree from a local HTTP server that understands
+the Firebase REST range parameters (orderBy="$key", startAt, limitToFirst)
+and measures, for several history sizes, the peak Python memory of
+
+- full:        requests.get(...).json() of the whole tree (old task)
+- streamed:    every page through FirebaseRateSource + parse_entry
+- incremental: only the entries after a high-water mark near the end
+
+Nothing is written to the database.
+
+Usage: python manage.py benchmark_firebase_import --entries 10000 50000 200000
+"""
+
+import json
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from django.core.management.base import BaseCommand
+
+from modules.currencies.backend.firebase_import import (
+    FirebaseRateSource, parse_entry, push_key_floor, start_key_for
+)
+
+BANKS = ['Akbank', 'Garanti BBVA', 'Yapı Kredi', 'Ziraat', 'İş Bankası']
+PAIRS = ['USDTRY', 'EURTRY', 'XAUTRY', 'GBPTRY', 'CHFTRY', 'JPYTRY']
+START_MS = 1_600_000_000_000
+STEP_MS = 5 * 60 * 1000
+
+
+class FixtureTree:
+    """Deterministic kurlar entries, generated on demand (never held in memory)"""
+
+    def __init__(self, size):
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.key(index)
+
+    def timestamp(self, index):
+        return START_MS + index * STEP_MS
+
+    def key(self, index):
+        return push_key_floor(self.timestamp(index)) + f'{index:012d}'
+
+    def entry(self, index):
+        base = 30 + (index % 1000) / 100
+        return {
+            'zaman': self.timestamp(index),
+            'data': [
+                {
+                    'banka': bank,
+                    'banka_kuru': [
+                        {'kur': pair, 'alis': round(base * (p + 1), 4), 'satis': round(base * (p + 1) * 1.01, 4)}
+                        for p, pair in enumerate(PAIRS)
+                    ],
+                }
+                for bank in BANKS
+            ],
+        }
+
+
+def _handler(tree):
+    class FirebaseHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+            start = 0
+            if 'startAt' in params:
+                start = bisect_left(tree, json.loads(params['startAt']))
+            stop = len(tree)
+            if 'limitToFirst' in params:
+                stop = min(stop, start + int(params['limitToFirst']))
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            if start >= stop:
+                self.wfile.write(b'null')
+                return
+
+            # Stream the object; the response is never built in full
+            self.wfile.write(b'{')
+            for index in range(start, stop):
+                member = json.dumps(tree.key(index)) + ':' + json.dumps(tree.entry(index))
+                self.wfile.write(((',' if index > start else '') + member).encode())
+            self.wfile.write(b'}')
+
+    return FirebaseHandler
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, time.perf_counter() - start, peak
+
+
+class Command(BaseCommand):
+    help = 'Compare peak memory of full-tree vs paged streaming Firebase imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entries',
+            type=int,
+            nargs='+',
+            default=[10000, 50000],
+            help='History sizes to serve (default: 10000 50000)',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=500,
+            help='Entries per range query (default: 500)',
+        )
+        parser.add_argument(
+            '--new-entries',
+            type=int,
+            default=100,
+            help='Entries after the high-water mark for the incremental run (default: 100)',
+        )
+        parser.add_argument(
+            '--skip-full',
+            action='store_true',
+            help='Skip the full download (slow and memory hungry for big trees)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"entries":>9} {"mode":<12} {"seconds":>8} {"peak MiB":>9} {"requests":>9} {"rates":>9}'
+        )
+        for size in options['entries']:
+            tree = FixtureTree(size)
+            server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(tree))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f'http://127.0.0.1:{server.server_address[1]}/kurlar.json'
+
+            try:
+                if not options['skip_full']:
+                    def full():
+                        data = requests.get(url, timeout=600).json()
+                        return 1, sum(len(parse_entry(key, entry)[1]) for key, entry in data.items())
+                    self._report(size, 'full', *_measure(full))
+
+                def streamed(start_key=None):
+                    source = FirebaseRateSource(url, page_size=options['page_size'])
+                    rates = 0
+                    for page in source.iter_pages(start_key):
+                        rates += sum(len(parse_entry(key, entry)[1]) for key, entry in page)
+                    return source.requests, rates
+
+                self._report(size, 'streamed', *_measure(streamed))
+
+                mark = max(size - options['new_entries'], 0)
+                start_key = start_key_for(tree.key(mark), tree.timestamp(mark))
+                self._report(size, 'incremental', *_measure(lambda: streamed(start_key)))
+            finally:
+                server.shutdown()
+
+    def _report(self, size, mode, result, seconds, peak):
+        requests_made, rates = result
+        self.stdout.write(
+            f'{size:>9,} {mode:<12} {seconds:8.2f} {peak / 2**20:9.1f} {requests_made:>9} {rates:>9,}'
+        )
@@ -0,0 +1,128 @@
+"""
+Benchmark technical indicators: per-point loops vs vectorised vs incremental
+
+Runs the SMA/EMA/RSI loops the indicators endpoint used to run (one
+np.mean per window, Python recurrences) against the vectorised functions
+in indicators.py on a synthetic random-walk series, checks that both give
+the same values, and times O(1) tick updates on a warmed-up indicator.
+
+Usage: python manage.py benchmark_indicators --points 200000 --periods 14 50 200
+"""
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from modules.currencies.backend.indicators import INDICATOR_CLASSES, ema, rsi, sma
+
+
+def _loop_sma(prices, period):
+    return [float(np.mean(prices[i - period + 1:i + 1])) for i in range(period - 1, len(prices))]
+
+
+def _loop_ema(prices, period):
+    multiplier = 2 / (period + 1)
+    value = np.mean(prices[:period])
+    values = [float(value)]
+    for i in range(period, len(prices)):
+        value = (prices[i] * multiplier) + (value * (1 - multiplier))
+        values.append(float(value))
+    return values
+
+
+def _loop_rsi(prices, period):
+    deltas = np.diff(prices)
+    seed = deltas[:period]
+    up = seed[seed >= 0].sum() / period
+    down = -seed[seed < 0].sum() / period
+    values = [100.0 if down == 0 else 100 - 100 / (1 + up / down)]
+    for i in range(period, len(prices) - 1):
+        delta = deltas[i]
+        up = (up * (period - 1) + max(delta, 0)) / period
+        down = (down * (period - 1) + max(-delta, 0)) / period
+        values.append(100.0 if down == 0 else float(100 - 100 / (1 + up / down)))
+    return values
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = 'Benchmark loop vs vectorised vs incremental technical indicators'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--points',
+            type=int,
+            default=200000,
+            help='Synthetic price samples (default: 200000)',
+        )
+        parser.add_argument(
+            '--periods',
+            type=int,
+            nargs='+',
+            default=[14, 50, 200],
+            help='Indicator periods (default: 14 50 200)',
+        )
+        parser.add_argument(
+            '--ticks',
+            type=int,
+            default=10000,
+            help='Incremental updates to time per indicator (default: 10000)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed (default: 42)',
+        )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        total = options['points'] + options['ticks']
+        walk = 32.5 * np.exp(np.cumsum(rng.normal(0, 0.0005, total)))
+        prices = walk[:options['points']]
+        ticks = walk[options['points']:].tolist()
+        price_list = prices.tolist()
+
+        self.stdout.write(f'{len(prices):,} samples, {len(ticks):,} incremental ticks')
+        self.stdout.write(
+            f'{"indicator":<14} {"loop ms":>10} {"vector ms":>10} {"speedup":>8} '
+            f'{"max diff":>10} {"tick us":>8}'
+        )
+
+        cases = (('sma', _loop_sma, sma), ('ema', _loop_ema, ema), ('rsi', _loop_rsi, rsi))
+        for period in options['periods']:
+            for name, loop, vectorised in cases:
+                expected, loop_time = _timed(loop, price_list, period)
+                actual, vector_time = _timed(vectorised, prices, period)
+                diff = float(np.max(np.abs(np.asarray(expected) - actual))) if len(actual) else 0.0
+
+                indicator = INDICATOR_CLASSES[name](period)
+                indicator.compute(prices)
+                start = time.perf_counter()
+                for price in ticks:
+                    indicator.update(price)
+                tick_time = (time.perf_counter() - start) / len(ticks) if ticks else 0.0
+
+                self.stdout.write(
+                    f'{f"{name}({period})":<14} {loop_time * 1000:10.1f} {vector_time * 1000:10.2f} '
+                    f'{loop_time / max(vector_time, 1e-9):7.0f}x {diff:10.2e} {tick_time * 1e6:8.2f}'
+                )
+
+        for name in ('bollinger', 'macd'):
+            for period in options['periods'] if name == 'bollinger' else [None]:
+                indicator = INDICATOR_CLASSES[name](period)
+                _, vector_time = _timed(indicator.compute, prices)
+                start = time.perf_counter()
+                for price in ticks:
+                    indicator.update(price)
+                tick_time = (time.perf_counter() - start) / len(ticks) if ticks else 0.0
+                label = f'{name}({period})' if period else name
+                self.stdout.write(
+                    f'{label:<14} {"-":>10} {vector_time * 1000:10.2f} {"-":>8} {"-":>10} {tick_time * 1e6:8.2f}'
+                )
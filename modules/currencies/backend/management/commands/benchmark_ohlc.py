@@ -0,0 +1,124 @@
+"""
+Benchmark the vectorised OHLC engine
+
+Generates 5 years of synthetic minute rates (a random walk, ~2.6M samples),
+then times candle generation for every chart timeframe against a pure
+Python per-bucket loop, plus an incremental append of new rates. No
+database access is needed.
+
+Usage: python manage.py benchmark_ohlc --years 5 --rounds 5
+"""
+
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from modules.currencies.backend.ohlc import INTERVAL_SECONDS, PriceSeries
+
+# Chart timeframe -> (window, interval), as in ChartDataViewSet.ohlc_data
+TIMEFRAMES = {
+    '1H': (timedelta(hours=24), 'hour'),
+    '4H': (timedelta(hours=96), '4hour'),
+    '1D': (timedelta(days=30), 'day'),
+    '1W': (timedelta(weeks=12), 'week'),
+    '1Y': (timedelta(days=365), 'day'),
+    'ALL': (None, 'day'),
+}
+
+UTC_OFFSET = 3 * 3600  # Europe/Istanbul
+
+
+def _python_ohlc(timestamps, prices, interval, start_ts, end_ts):
+    """Reference implementation: one pass, dict of buckets"""
+    width = INTERVAL_SECONDS[interval]
+    shift = UTC_OFFSET + (3 * 86400 if interval == 'week' else 0)
+    candles = {}
+    for ts, price in zip(timestamps, prices):
+        if (start_ts is not None and ts < start_ts) or ts > end_ts:
+            continue
+        bucket = (ts + shift) // width
+        candle = candles.get(bucket)
+        if candle is None:
+            candles[bucket] = [price, price, price, price, 1]
+        else:
+            candle[1] = max(candle[1], price)
+            candle[2] = min(candle[2], price)
+            candle[3] = price
+            candle[4] += 1
+    return candles
+
+
+class Command(BaseCommand):
+    help = 'Benchmark NumPy OHLC resampling over synthetic minute data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=5,
+            help='Years of minute data to generate (default: 5)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Timed runs per timeframe (default: 5)',
+        )
+        parser.add_argument(
+            '--skip-python',
+            action='store_true',
+            help='Skip the pure Python reference timings',
+        )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(42)
+        end = datetime.now(dt_timezone.utc).replace(second=0, microsecond=0)
+        end_ts = int(end.timestamp())
+        minutes = options['years'] * 365 * 24 * 60
+
+        timestamps = np.arange(end_ts - (minutes - 1) * 60, end_ts + 1, 60, dtype=np.int64)
+        buy = 30 * np.exp(np.cumsum(rng.normal(0, 0.0002, minutes)))
+        sell = buy * 1.002
+
+        start = time.perf_counter()
+        series = PriceSeries.from_arrays(timestamps, buy, sell)
+        self.stdout.write(
+            f'{len(series):,} minute samples ({options["years"]} years), '
+            f'{(series.timestamps.nbytes + series.buy.nbytes + series.sell.nbytes) / 1e6:.0f} MB, '
+            f'built in {(time.perf_counter() - start) * 1000:.1f} ms'
+        )
+
+        ts_list = timestamps.tolist() if not options['skip_python'] else None
+        buy_list = buy.tolist() if not options['skip_python'] else None
+
+        self.stdout.write(f'{"timeframe":<10}{"candles":>9}{"numpy ms":>11}{"python ms":>11}')
+        for timeframe, (window, interval) in TIMEFRAMES.items():
+            start_ts = end_ts - int(window.total_seconds()) if window else None
+
+            timings = []
+            for _ in range(options['rounds']):
+                begin = time.perf_counter()
+                candles = series.ohlc(interval, start_ts, end_ts, utc_offset=UTC_OFFSET)
+                timings.append(time.perf_counter() - begin)
+            numpy_ms = min(timings) * 1000
+
+            python_ms = ''
+            if ts_list is not None:
+                begin = time.perf_counter()
+                reference = _python_ohlc(ts_list, buy_list, interval, start_ts, end_ts)
+                python_ms = f'{(time.perf_counter() - begin) * 1000:.1f}'
+                if len(reference) != len(candles['time']):
+                    self.stdout.write(self.style.ERROR(f'{timeframe}: candle count mismatch'))
+
+            self.stdout.write(f'{timeframe:<10}{len(candles["time"]):>9,}{numpy_ms:>11.2f}{python_ms:>11}')
+
+        # Incremental append of a day of new minute rates
+        rows = [
+            (end + timedelta(minutes=i + 1), buy[-1], sell[-1], 'TCMB', None)
+            for i in range(1440)
+        ]
+        begin = time.perf_counter()
+        series.append(rows)
+        self.stdout.write(f'append 1,440 rows: {(time.perf_counter() - begin) * 1000:.1f} ms')
@@ -0,0 +1,127 @@
+"""
+Benchmark portfolio valuation: per-portfolio loop vs batch matrix product
+
+Generates synthetic holdings for many portfolios and values them in TRY
+and USD two ways, with a price service that returns canned prices and
+counts its calls:
+
+- loop:  what calculate_portfolio_performance did - for every portfolio
+         and currency, CryptoAPIService.calculate_portfolio_value with its
+         own price lookup (plus a holdings query each, not executed here)
+- batch: portfolio_valuation - one price fetch and one
+         holdings x price product per currency
+
+Nothing is written to the database.
+
+Usage: python manage.py benchmark_portfolio_valuation --portfolios 50000
+"""
+
+import random
+import time
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from modules.currencies.backend.portfolio_valuation import (
+    CURRENCIES, HoldingsMatrix, price_matrix, value_portfolios
+)
+from modules.currencies.backend.real_crypto_service import CryptoAPIService
+
+
+class CannedPriceService(CryptoAPIService):
+    """CryptoAPIService whose get_all_prices answers from a fixed table"""
+
+    def __init__(self, prices):
+        super().__init__()
+        self.prices = prices
+        self.calls = 0
+
+    def get_all_prices(self, symbols=None, concurrent=True):
+        self.calls += 1
+        return {symbol: self.prices[symbol] for symbol in symbols}
+
+
+class Command(BaseCommand):
+    help = 'Compare per-portfolio and batch portfolio valuation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--portfolios',
+            type=int,
+            default=50000,
+            help='Number of portfolios (default: 50000)',
+        )
+        parser.add_argument(
+            '--symbols',
+            type=int,
+            default=40,
+            help='Distinct symbols held (default: 40)',
+        )
+        parser.add_argument(
+            '--holdings',
+            type=int,
+            default=5,
+            help='Average holdings per portfolio (default: 5)',
+        )
+        parser.add_argument(
+            '--loop-sample',
+            type=int,
+            default=5000,
+            help='Portfolios valued with the loop; the rest is extrapolated (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        symbols = [f'C{i}' for i in range(options['symbols'])]
+        prices = {
+            symbol: {'aggregated': {'usd_price': usd, 'try_price': usd * 32.5}}
+            for symbol in symbols
+            for usd in [round(rng.uniform(0.01, 50000), 4)]
+        }
+
+        rows = []
+        for _ in range(options['portfolios']):
+            portfolio_id = uuid.uuid4()
+            count = max(1, min(len(symbols), int(rng.expovariate(1 / options['holdings']))))
+            for symbol in rng.sample(symbols, count):
+                rows.append((portfolio_id, symbol, rng.uniform(0.001, 100), rng.uniform(0.01, 50000)))
+        self.stdout.write(f'{options["portfolios"]:,} portfolios, {len(rows):,} holdings, {len(symbols)} symbols')
+
+        # Batch
+        service = CannedPriceService(prices)
+        start = time.perf_counter()
+        holdings = HoldingsMatrix.from_rows(rows)
+        built = time.perf_counter()
+        matrix = price_matrix(holdings.symbols, service.get_all_prices(holdings.symbols))
+        values = value_portfolios(holdings, matrix, 32.5)
+        batch_seconds = time.perf_counter() - start
+        self.stdout.write(
+            f'batch: {batch_seconds:8.3f}s  (matrix build {built - start:.3f}s)  '
+            f'price fetches {service.calls}  holdings queries 1'
+        )
+
+        # Loop, on a sample of portfolios
+        by_portfolio = {}
+        for portfolio_id, symbol, amount, _ in rows:
+            by_portfolio.setdefault(portfolio_id, []).append({'symbol': symbol, 'amount': amount})
+        sample = holdings.portfolio_ids[:options['loop_sample']]
+
+        service = CannedPriceService(prices)
+        start = time.perf_counter()
+        loop_totals = np.array([
+            [float(service.calculate_portfolio_value(by_portfolio[portfolio_id], currency)['total_value'])
+             for currency in CURRENCIES]
+            for portfolio_id in sample
+        ])
+        loop_seconds = (time.perf_counter() - start) * len(holdings) / max(len(sample), 1)
+        self.stdout.write(
+            f'loop:  {loop_seconds:8.3f}s  (extrapolated from {len(sample):,})  '
+            f'price fetches {service.calls * len(holdings) // max(len(sample), 1):,}  '
+            f'holdings queries {len(holdings) * len(CURRENCIES):,}'
+        )
+        self.stdout.write(f'speedup: {loop_seconds / batch_seconds:.0f}x')
+
+        batch_totals = np.column_stack([values[f'total_value_{currency.lower()}'] for currency in CURRENCIES])
+        difference = np.abs(batch_totals[:len(sample)] - loop_totals) / np.maximum(np.abs(loop_totals), 1)
+        self.stdout.write(f'max relative difference vs loop: {difference.max():.2e}')
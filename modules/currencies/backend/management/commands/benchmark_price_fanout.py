@@ -0,0 +1,175 @@
+"""
+Benchmark CryptoAPIService.get_all_prices: serial vs concurrent fan-out
+
+Starts a local mock server for the Binance, CoinGecko and BTCTurk
+endpoints with injected latency, points a CryptoAPIService at it and
+times both refresh modes. One source can be made to hang to check that
+the fan-out degrades instead of waiting for it.
+
+Usage: python manage.py benchmark_price_fanout --symbols 10 --latency-ms 150
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from modules.currencies.backend.real_crypto_service import CryptoAPIService
+
+
+def _handler(latency, slow_source, slow_latency, counter):
+    """Request handler class serving mock ticker data"""
+
+    class MockExchangeHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            source = url.path.strip('/').split('/')[0]
+
+            with counter['lock']:
+                counter['requests'] += 1
+            time.sleep(slow_latency if source == slow_source else latency)
+
+            if source in ('binance', 'binance_us'):
+                body = self._binance(params)
+            elif source == 'coingecko':
+                body = self._coingecko(params)
+            elif source == 'btcturk':
+                body = self._btcturk(params)
+            else:
+                self.send_error(404)
+                return
+
+            payload = json.dumps(body).encode()
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client gave up on a deliberately slow source
+
+        @staticmethod
+        def _ticker(pair, price):
+            now_ms = int(time.time() * 1000)
+            return {
+                'symbol': pair, 'lastPrice': str(price), 'bidPrice': str(price * 0.999),
+                'askPrice': str(price * 1.001), 'volume': '1000', 'quoteVolume': str(price * 1000),
+                'priceChange': '1.5', 'priceChangePercent': '0.5', 'highPrice': str(price * 1.02),
+                'lowPrice': str(price * 0.98), 'closeTime': now_ms,
+            }
+
+        def _binance(self, params):
+            if 'symbols' in params:
+                return [self._ticker(pair, 100 + i) for i, pair in enumerate(json.loads(params['symbols']))]
+            return self._ticker(params.get('symbol', ''), 100)
+
+        def _coingecko(self, params):
+            currencies = params.get('vs_currencies', 'usd').split(',')
+            return {
+                coin_id: {
+                    **{currency: 100 + i for currency in currencies},
+                    'last_updated_at': int(time.time()),
+                }
+                for i, coin_id in enumerate(params.get('ids', '').split(','))
+            }
+
+        def _btcturk(self, params):
+            pairs = [params['pairSymbol']] if 'pairSymbol' in params else [f'C{i}TRY' for i in range(400)]
+            return {'data': [
+                {'pair': pair, 'last': 3400 + i, 'bid': 3399, 'ask': 3401, 'volume': 10,
+                 'dailyChange': 1, 'dailyPercent': 0.1, 'high': 3500, 'low': 3300,
+                 'timestamp': int(time.time() * 1000)}
+                for i, pair in enumerate(pairs)
+            ]}
+
+    return MockExchangeHandler
+
+
+class Command(BaseCommand):
+    help = 'Benchmark serial vs concurrent crypto price refresh against a mock exchange server'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbols',
+            type=int,
+            default=10,
+            help='Number of symbols to refresh (default: 10)',
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=int,
+            default=150,
+            help='Injected latency per request in ms (default: 150)',
+        )
+        parser.add_argument(
+            '--slow-source',
+            choices=['binance', 'coingecko', 'btcturk'],
+            help='Make one source hang past the fan-out timeout',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=3,
+            help='Refreshes per mode (default: 3)',
+        )
+
+    def handle(self, *args, **options):
+        latency = options['latency_ms'] / 1000
+        symbols = [f'C{i}' for i in range(options['symbols'])]
+        counter = {'requests': 0, 'lock': threading.Lock()}
+
+        service = CryptoAPIService()
+        slow_latency = service.FANOUT_TIMEOUT + 2
+
+        server = ThreadingHTTPServer(
+            ('127.0.0.1', 0),
+            _handler(latency, options['slow_source'], slow_latency, counter)
+        )
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+
+        service.BINANCE_API = f'{base}/binance'
+        service.BINANCE_US_API = f'{base}/binance_us'
+        service.COINGECKO_API = f'{base}/coingecko'
+        service.BTCTURK_API = f'{base}/btcturk'
+        service.REQUEST_TIMEOUT = slow_latency + 1
+
+        self.stdout.write(
+            f'{len(symbols)} symbols, {options["latency_ms"]}ms latency per request'
+            + (f', {options["slow_source"]} hangs {slow_latency}s' if options['slow_source'] else '')
+        )
+
+        # Response caching would hide the request cost after the first round
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            for label, concurrent in (('serial', False), ('concurrent', True)):
+                if not concurrent and options['slow_source']:
+                    self.stdout.write('serial:      skipped (would wait on the hanging source)')
+                    continue
+
+                counter['requests'] = 0
+                timings = []
+                for _ in range(options['rounds']):
+                    start = time.perf_counter()
+                    prices = service.get_all_prices(symbols, concurrent=concurrent)
+                    timings.append(time.perf_counter() - start)
+
+                priced = sum(1 for data in prices.values() if data['aggregated'].get('usd_price'))
+                self.stdout.write(
+                    f'{label + ":":<12} {sum(timings) / len(timings) * 1000:8.1f} ms/refresh  '
+                    f'{counter["requests"] / options["rounds"]:.0f} requests/refresh  '
+                    f'{priced}/{len(symbols)} symbols priced'
+                )
+                if concurrent:
+                    self.stdout.write(f'source status: {service.last_source_status}')
+
+        server.shutdown()
@@ -0,0 +1,223 @@
+"""
+Load test CurrencyRatesConsumer with the rate publisher fan-out
+
+Connects thousands of simulated websocket clients (channels
+WebsocketCommunicator) to CurrencyRatesConsumer on the in-memory channel
+layer, subscribes each to a few pairs and drives RatePublisher with a
+stream of rate changes. Reports database queries per minute (counted on
+every connection the consumers open) and delivery latency from publish
+to the client, next to the lookups the old per-connection 10 second
+polling loop would have made.
+
+The rate cache is warmed first, so no database access is expected.
+
+Usage: python manage.py benchmark_rate_broadcast --clients 5000 --pairs 50 --seconds 30
+"""
+
+import asyncio
+import random
+import statistics
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+
+from modules.currencies.backend.broadcast import RatePublisher, rate_cache_key
+from modules.currencies.backend.consumers import CurrencyRatesConsumer
+
+LEGACY_POLLS_PER_MINUTE = 6
+
+
+class QueryCounter:
+    """Counts queries on every database connection, including new thread-local ones"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        connection_created.connect(self.install)
+        for connection in connections.all():
+            self.install(connection)
+        return self
+
+    def __exit__(self, *exc):
+        connection_created.disconnect(self.install)
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+def _rate_data(rate, sent):
+    return {
+        'rate': rate, 'bid': None, 'ask': None, 'change_24h': 0, 'volume_24h': 0,
+        'timestamp': '', 'sent': sent,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Load test the rate broadcaster with simulated websocket clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=5000,
+            help='Simulated websocket clients (default: 5000)',
+        )
+        parser.add_argument(
+            '--pairs',
+            type=int,
+            default=50,
+            help='Currency pairs (default: 50)',
+        )
+        parser.add_argument(
+            '--subscriptions',
+            type=int,
+            default=3,
+            help='Pairs each client subscribes to (default: 3)',
+        )
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=30,
+            help='Duration of the publish phase (default: 30)',
+        )
+        parser.add_argument(
+            '--updates-per-second',
+            type=int,
+            default=200,
+            help='Rate changes offered to the publisher per second (default: 200)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Publisher throttle per pair in seconds (default: 1.0)',
+        )
+
+    def handle(self, *args, **options):
+        settings_override = override_settings(
+            CHANNEL_LAYERS={'default': {
+                'BACKEND': 'channels.layers.InMemoryChannelLayer',
+                'CONFIG': {'capacity': 1000},
+            }},
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        )
+        with settings_override, QueryCounter() as queries:
+            async_to_sync(self._run)(options, queries)
+
+    async def _run(self, options, queries):
+        pairs = [(f'C{i}', 'TRY') for i in range(options['pairs'])]
+        rates = {pair: 10.0 + i for i, pair in enumerate(pairs)}
+
+        # What the publisher leaves behind in normal operation
+        cache.set('latest_currency_rates', {}, None)
+        for pair, rate in rates.items():
+            cache.set(rate_cache_key(*pair), _rate_data(rate, None), None)
+
+        publisher = RatePublisher(min_interval=options['interval'], channel_layer=get_channel_layer())
+        latencies = []
+        received = [0]
+
+        # Connect and subscribe
+        start = time.perf_counter()
+        clients = []
+        for offset in range(0, options['clients'], 500):
+            batch = [
+                self._connect(pairs, options['subscriptions'])
+                for _ in range(offset, min(offset + 500, options['clients']))
+            ]
+            clients.extend(await asyncio.gather(*batch))
+        setup = time.perf_counter() - start
+        setup_queries = queries.count
+        subscriptions = sum(len(subscribed) for _, subscribed in clients)
+        self.stdout.write(
+            f'{len(clients)} clients, {subscriptions} subscriptions over {len(pairs)} pairs '
+            f'connected in {setup:.1f}s ({setup_queries} queries)'
+        )
+
+        readers = [asyncio.ensure_future(self._read(communicator, latencies, received))
+                   for communicator, _ in clients]
+
+        # Publish phase
+        queries.count = 0
+        start = time.perf_counter()
+        offered = 0
+        while time.perf_counter() - start < options['seconds']:
+            tick = time.perf_counter()
+            for _ in range(max(options['updates_per_second'] // 10, 1)):
+                pair = random.choice(pairs)
+                rates[pair] = round(rates[pair] * random.uniform(0.999, 1.001), 4)
+                await publisher.apublish(*pair, _rate_data(rates[pair], time.perf_counter()))
+                offered += 1
+            await asyncio.sleep(max(0.1 - (time.perf_counter() - tick), 0))
+        await asyncio.sleep(options['interval'] + 0.5)  # Let pending flushes go out
+        elapsed = time.perf_counter() - start
+        publish_queries = queries.count
+
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        for communicator, _ in clients:
+            await communicator.disconnect()
+
+        minutes = elapsed / 60
+        legacy = subscriptions * LEGACY_POLLS_PER_MINUTE
+        self.stdout.write(f'publisher: {publisher.stats} ({offered / elapsed:.0f} offered/s)')
+        self.stdout.write(f'delivered: {received[0]} messages ({received[0] / elapsed:.0f}/s)')
+        self.stdout.write(
+            f'DB queries/min: {publish_queries / minutes:.1f} '
+            f'(per-connection polling: {legacy} cache/DB lookups/min)'
+        )
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                'latency ms: '
+                f'p50 {statistics.median(latencies) * 1000:.1f}  '
+                f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f}  '
+                f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}  '
+                f'max {latencies[-1] * 1000:.1f}'
+            )
+
+    async def _connect(self, pairs, count):
+        communicator = WebsocketCommunicator(CurrencyRatesConsumer.as_asgi(), '/ws/currencies/rates/')
+        communicator.scope['user'] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        if not connected:
+            raise RuntimeError('Consumer refused the connection')
+        await communicator.receive_json_from()  # initial_rates
+
+        subscribed = random.sample(pairs, min(count, len(pairs)))
+        for base, target in subscribed:
+            await communicator.send_json_to({
+                'type': 'subscribe_pair',
+                'data': {'base_currency': base, 'target_currency': target},
+            })
+            await communicator.receive_json_from()  # current rate
+        return communicator, subscribed
+
+    async def _read(self, communicator, latencies, received):
+        while True:
+            message = await communicator.receive_json_from(timeout=3600)
+            received[0] += 1
+            sent = message['data']['rate'].get('sent')
+            if sent is not None:
+                latencies.append(time.perf_counter() - sent)
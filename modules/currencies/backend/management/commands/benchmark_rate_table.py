@@ -0,0 +1,96 @@
+"""
+Benchmark the latest rate table
+
+Converts random currency pairs through LatestRateTable and reports the
+load time and per-conversion cost, first resolution (shortest path
+search) and memoised. By default the table is built from the database;
+--synthetic builds a TRY-centred graph with some USD and EUR quotes
+instead, so no rows are needed.
+
+Usage: python manage.py benchmark_rate_table --pairs 100000 --synthetic 150
+"""
+
+import random
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from modules.currencies.backend.rate_table import LatestRateTable, latest_rate_rows
+
+
+def _synthetic_rows(count, seed):
+    """Rates to TRY for `count` currencies, plus some USD/EUR quotes"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    codes = [f'C{i:03d}' for i in range(count)]
+    rows = [('USD', 'TRY', Decimal('32.5'), now), ('EUR', 'TRY', Decimal('35.4'), now)]
+    for code in codes:
+        if rng.random() < 0.7:
+            rows.append((code, 'TRY', Decimal(str(round(rng.uniform(0.01, 3_000_000), 6))), now))
+        else:
+            rows.append((code, rng.choice(['USD', 'EUR']), Decimal(str(round(rng.uniform(0.0001, 90_000), 6))), now))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Benchmark currency conversions through the in-memory latest rate table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pairs',
+            type=int,
+            default=100000,
+            help='Random conversions to run (default: 100000)',
+        )
+        parser.add_argument(
+            '--synthetic',
+            type=int,
+            default=0,
+            help='Use N generated currencies instead of database rates',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed (default: 42)',
+        )
+
+    def handle(self, *args, **options):
+        table = LatestRateTable(max_age=3600, check_interval=3600)
+
+        start = time.perf_counter()
+        if options['synthetic']:
+            table.load(_synthetic_rows(options['synthetic'], options['seed']))
+            source = f"{options['synthetic']} synthetic currencies"
+        else:
+            table.load(latest_rate_rows())
+            source = 'database'
+        load_ms = (time.perf_counter() - start) * 1000
+
+        stats = table.stats()
+        if stats['currencies'] < 2:
+            self.stdout.write(self.style.WARNING('Not enough rates loaded; try --synthetic 150'))
+            return
+
+        codes = table.currencies()
+        rng = random.Random(options['seed'])
+        pairs = [(rng.choice(codes), rng.choice(codes)) for _ in range(options['pairs'])]
+
+        self.stdout.write(
+            f"Loaded {stats['pairs']} pairs / {stats['currencies']} currencies "
+            f"from {source} in {load_ms:.1f} ms"
+        )
+
+        for label in ('first pass', 'memoised'):
+            resolved = 0
+            start = time.perf_counter()
+            for from_code, to_code in pairs:
+                if table.get_rate(from_code, to_code) is not None:
+                    resolved += 1
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{label + ":":<12} {len(pairs):,} conversions in {elapsed * 1000:.1f} ms '
+                f'({elapsed / len(pairs) * 1e6:.2f} us each, {resolved:,} resolved)'
+            )
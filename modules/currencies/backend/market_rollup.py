@@ -0,0 +1,213 @@
+"""
+Market data rollup
+
+Builds MarketData OHLCV candles for every currency pair from one
+streaming scan of ExchangeRate, ordered by pair and time, instead of a
+handful of queries per pair. The same scan feeds every requested interval
+(1m/5m/1h/1d by default); candles are upserted with
+bulk_create(update_conflicts=True), so re-running a range - the hourly job
+or a historical backfill - refreshes candles in place.
+
+Buckets are aligned to UTC. A range is widened to whole buckets of the
+widest interval and scanned in chunks of whole buckets, so a candle is
+never split across two scans; only the bucket containing `end` can be
+partial, and the next run completes it.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from .models import ExchangeRate, MarketData
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 3600,
+    '4h': 4 * 3600,
+    '1d': 86400,
+    '1w': 7 * 86400,
+}
+
+# 1970-01-01 was a Thursday; shifting by 3 days makes week buckets start on Monday
+WEEK_SHIFT = 3 * 86400
+
+DEFAULT_INTERVALS = ('1m', '5m', '1h', '1d')
+
+SOURCE = 'AGGREGATED'
+
+# Hours re-aggregated by the periodic job (late or corrected rates)
+LOOKBACK_HOURS = 2
+
+# Span of rates read per query when rolling up long ranges
+CHUNK_SECONDS = 86400
+
+BATCH_SIZE = 2000
+
+UPDATE_FIELDS = ['open_price', 'high_price', 'low_price', 'close_price', 'volume', 'period_end']
+UNIQUE_FIELDS = ['currency_pair', 'period_start', 'interval', 'source']
+
+
+def bucket_start(timestamp, interval):
+    """Start (epoch seconds) of the interval bucket containing timestamp"""
+    width = INTERVAL_SECONDS[interval]
+    shift = WEEK_SHIFT if interval == '1w' else 0
+    return (timestamp + shift) // width * width - shift
+
+
+class CandleBuilder:
+    """
+    OHLCV candles for one pair over several intervals.
+
+    Rates must be added in time order; open is the first rate of a bucket
+    and close the last.
+    """
+
+    def __init__(self, pair, intervals=DEFAULT_INTERVALS):
+        self.pair = pair
+        self.intervals = tuple(intervals)
+        self._candles = {}  # (interval, bucket start) -> [open, high, low, close, volume]
+
+    def add(self, timestamp, rate, volume=None):
+        volume = volume or Decimal('0')
+        for interval in self.intervals:
+            key = (interval, bucket_start(timestamp, interval))
+            candle = self._candles.get(key)
+            if candle is None:
+                self._candles[key] = [rate, rate, rate, rate, volume]
+                continue
+            if rate > candle[1]:
+                candle[1] = rate
+            if rate < candle[2]:
+                candle[2] = rate
+            candle[3] = rate
+            candle[4] += volume
+
+    def __len__(self):
+        return len(self._candles)
+
+    def candles(self):
+        """(interval, period start, period end, open, high, low, close, volume) tuples"""
+        for (interval, start), (open_, high, low, close, volume) in self._candles.items():
+            yield interval, start, start + INTERVAL_SECONDS[interval], open_, high, low, close, volume
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc)
+
+
+def _market_data(pair, candle):
+    interval, start, end, open_, high, low, close, volume = candle
+    return MarketData(
+        currency_pair=pair,
+        interval=interval,
+        source=SOURCE,
+        period_start=_to_datetime(start),
+        period_end=_to_datetime(end),
+        open_price=open_,
+        high_price=high,
+        low_price=low,
+        close_price=close,
+        volume=volume,
+    )
+
+
+def _upsert(rows):
+    if rows:
+        MarketData.objects.bulk_create(
+            rows,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=UNIQUE_FIELDS,
+            update_fields=UPDATE_FIELDS,
+        )
+    return len(rows)
+
+
+def _rate_rows(start, end):
+    """(base, target, timestamp, rate, volume) in [start, end), by pair then time"""
+    return ExchangeRate.objects.filter(
+        timestamp__gte=start, timestamp__lt=end
+    ).order_by(
+        'base_currency_id', 'target_currency_id', 'timestamp'
+    ).values_list(
+        'base_currency__code', 'target_currency__code', 'timestamp', 'rate', 'volume_24h'
+    ).iterator(chunk_size=5000)
+
+
+def rollup_chunk(start, end, intervals=DEFAULT_INTERVALS):
+    """Scan [start, end) once and upsert candles; returns (pairs, rates, candles)"""
+    pairs = rates = written = 0
+    pending = []
+    builder = None
+
+    def flush(builder):
+        pending.extend(_market_data(builder.pair, candle) for candle in builder.candles())
+
+    for base, target, timestamp, rate, volume in _rate_rows(start, end):
+        pair = f"{base}/{target}"
+        if builder is None or builder.pair != pair:
+            if builder is not None:
+                flush(builder)
+            builder = CandleBuilder(pair, intervals)
+            pairs += 1
+        builder.add(int(timestamp.timestamp()), rate, volume)
+        rates += 1
+
+        if len(pending) >= BATCH_SIZE:
+            written += _upsert(pending)
+            pending = []
+
+    if builder is not None:
+        flush(builder)
+    written += _upsert(pending)
+    return pairs, rates, written
+
+
+def rollup_market_data(start, end, intervals=DEFAULT_INTERVALS, chunk_seconds=CHUNK_SECONDS):
+    """
+    Build MarketData candles for all pairs between start and end.
+
+    Args:
+        start, end: Aware datetimes; start is moved back to the beginning
+            of its widest-interval bucket
+        intervals: Interval codes from INTERVAL_SECONDS
+        chunk_seconds: Scan size, rounded up to whole widest buckets
+
+    Returns:
+        dict with scanned range, chunk, pair, rate and candle counts
+    """
+    unknown = [interval for interval in intervals if interval not in INTERVAL_SECONDS]
+    if unknown:
+        raise ValueError(f"Unknown intervals: {', '.join(unknown)}")
+
+    widest = max(intervals, key=INTERVAL_SECONDS.get)
+    width = INTERVAL_SECONDS[widest]
+    chunk = max(width, -(-chunk_seconds // width) * width)
+
+    chunk_start = bucket_start(int(start.timestamp()), widest)
+    end_ts = int(end.timestamp())
+
+    stats = {'start': _to_datetime(chunk_start), 'end': end, 'chunks': 0, 'pairs': 0, 'rates': 0, 'candles': 0}
+    while chunk_start < end_ts:
+        chunk_end = min(chunk_start + chunk, end_ts)
+        pairs, rates, written = rollup_chunk(_to_datetime(chunk_start), _to_datetime(chunk_end), intervals)
+        stats['chunks'] += 1
+        stats['pairs'] = max(stats['pairs'], pairs)
+        stats['rates'] += rates
+        stats['candles'] += written
+        chunk_start += chunk
+
+    logger.info(
+        f"Market data rollup {stats['start']:%Y-%m-%d %H:%M} - {end:%Y-%m-%d %H:%M}: "
+        f"{stats['rates']} rates -> {stats['candles']} candles ({', '.join(intervals)})"
+    )
+    return stats
+
+
+def rollup_recent(now, hours=LOOKBACK_HOURS, intervals=DEFAULT_INTERVALS):
+    """Periodic job: refresh candles touched by the last few hours"""
+    return rollup_market_data(now - timedelta(hours=hours), now, intervals)
@@ -263,15 +263,13 @@ class PortfolioHolding(models.Model):
             except CryptoExchangeRate.DoesNotExist:
                 pass
         
-        # Fall back to regular exchange rates
-        try:
-            rate = ExchangeRate.objects.filter(
-                base_currency=self.currency,
-                target_currency__code=base_currency
-            ).latest('timestamp')
-            return self.amount * rate.rate
-        except ExchangeRate.DoesNotExist:
+        # Fall back to regular exchange rates (direct or cross rate)
+        from .rate_table import rate_table
+        
+        rate = rate_table.get_rate(self.currency.code, base_currency)
+        if rate is None:
             return None
+        return self.amount * rate
     
     def calculate_unrealized_pnl(self, base_currency='TRY'):
         """Calculate unrealized P&L"""
@@ -802,6 +800,11 @@ class BankExchangeRate(models.Model):
     
     def save(self, *args, **kwargs):
         """Calculate spread and change values before saving"""
+        self.update_derived_fields()
+        super().save(*args, **kwargs)
+    
+    def update_derived_fields(self):
+        """Spread and change values (bulk_create does not call save())"""
         # Calculate spread
         if self.buy_rate and self.sell_rate:
             self.spread = self.sell_rate - self.buy_rate
@@ -818,8 +821,6 @@ class BankExchangeRate(models.Model):
             self.sell_change = self.sell_rate - self.previous_sell_rate
             if self.previous_sell_rate > 0:
                 self.sell_change_percentage = (self.sell_change / self.previous_sell_rate) * 100
-        
-        super().save(*args, **kwargs)
     
     @classmethod
     def get_latest_rates(cls, bank=None, currency_pair=None):
@@ -925,6 +926,10 @@ class BankRateImportLog(models.Model):
     # Source information
     source_url = models.URLField(blank=True)
     
+    # High-water mark of incremental imports (last Firebase key and its time)
+    last_entry_key = models.CharField(max_length=100, blank=True)
+    last_entry_timestamp = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         db_table = 'bank_rate_import_logs'
         indexes = [
@@ -0,0 +1,365 @@
+"""
+Vectorised OHLC engine for bank exchange rates
+
+The price history of a currency pair (optionally a single bank) is loaded
+once into NumPy arrays - epoch seconds, buy and sell rates, bank codes -
+and kept in a process-local cache. Later requests only fetch rows created
+since the last load (minus an overlap for rows committed late) and append
+them, so chart endpoints never re-scan the full history. Appends publish
+new arrays with a single assignment: readers take one snapshot() and never
+see the arrays of two different versions.
+
+Candles for any interval are computed on the arrays: the time window is
+located with np.searchsorted, samples are mapped to bucket ids with integer
+division, and open/high/low/close/volume come from the bucket boundaries
+(np.maximum.reduceat / np.minimum.reduceat for high and low).
+
+Buckets are aligned in local time (settings.TIME_ZONE) like the TruncHour /
+TruncDay / TruncWeek queries they replace; the UTC offset is taken at the
+end of the requested window, which is exact for fixed-offset zones such as
+Europe/Istanbul.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = {
+    'hour': 3600,
+    '4hour': 4 * 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+}
+
+# 1970-01-01 was a Thursday; shifting by 3 days makes week buckets start on Monday
+WEEK_SHIFT = 3 * 86400
+
+# Seconds between incremental appends for a cached series
+APPEND_INTERVAL = 30
+
+# Full reload (picks up deleted or corrected rows)
+FULL_RELOAD_INTERVAL = 3600
+
+# Incremental queries re-read rows created this long before the newest
+# loaded row: created_at is set on save, so a row can commit after a newer one
+APPEND_OVERLAP = timedelta(minutes=5)
+
+# Arrays of one version of a series, replaced as a whole
+Arrays = namedtuple('Arrays', ['timestamps', 'buy', 'sell', 'bank_codes'])
+
+
+def window_of(timestamps, start_ts=None, end_ts=None):
+    """Index range [lo, hi) of sorted timestamps with start_ts <= t <= end_ts"""
+    lo = 0 if start_ts is None else int(np.searchsorted(timestamps, start_ts, side='left'))
+    hi = len(timestamps) if end_ts is None else int(np.searchsorted(timestamps, end_ts, side='right'))
+    return lo, hi
+
+
+class PriceSeries:
+    """
+    Time-ordered price samples for one pair (and bank, if filtered).
+
+    Usage:
+        series = PriceSeries.from_rows(rows)
+        candles = series.ohlc('day', start_ts, end_ts)
+    """
+
+    def __init__(self):
+        self._arrays = Arrays(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.int16),
+        )
+        self.bank_names = []  # Only grows, so codes of older snapshots stay valid
+        self._bank_index = {}
+        self.last_created_at = None
+
+    def __len__(self):
+        return len(self._arrays.timestamps)
+
+    def snapshot(self):
+        """Arrays of the current version; later appends do not change them"""
+        return self._arrays
+
+    @property
+    def timestamps(self):
+        return self._arrays.timestamps
+
+    @property
+    def buy(self):
+        return self._arrays.buy
+
+    @property
+    def sell(self):
+        return self._arrays.sell
+
+    @property
+    def bank_codes(self):
+        return self._arrays.bank_codes
+
+    @classmethod
+    def from_rows(cls, rows):
+        series = cls()
+        series.append(rows)
+        return series
+
+    @classmethod
+    def from_arrays(cls, timestamps, buy, sell, bank='TCMB'):
+        """Series from ready-made, time-ordered arrays (single bank)"""
+        series = cls()
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        series._arrays = Arrays(
+            timestamps,
+            np.asarray(buy, dtype=np.float64),
+            np.asarray(sell, dtype=np.float64),
+            np.full(len(timestamps), series._bank_code(bank), dtype=np.int16),
+        )
+        return series
+
+    def _bank_code(self, bank):
+        code = self._bank_index.get(bank)
+        if code is None:
+            code = self._bank_index[bank] = len(self.bank_names)
+            self.bank_names.append(bank)
+        return code
+
+    def append(self, rows):
+        """
+        Add (timestamp, buy_rate, sell_rate, bank, created_at) rows.
+
+        Rows are usually newer than the series; late rows are merged in
+        with a stable sort. Rows created no later than the newest loaded
+        row (re-read by the overlapping incremental query) are skipped if
+        the series already has a sample of that bank at that time. Not
+        safe to call from two threads at once - SeriesCache serialises
+        appends per series.
+        """
+        current = self._arrays
+        seen_until = self.last_created_at
+        timestamps = []
+        buys = []
+        sells = []
+        codes = []
+        last_created_at = seen_until
+
+        for timestamp, buy_rate, sell_rate, bank, created_at in rows:
+            epoch = int(timestamp.timestamp())
+            code = self._bank_code(bank)
+            if (
+                created_at is not None and seen_until is not None and created_at <= seen_until
+                and _has_sample(current, epoch, code)
+            ):
+                continue
+            timestamps.append(epoch)
+            buys.append(float(buy_rate))
+            sells.append(float(sell_rate))
+            codes.append(code)
+            if created_at is not None and (last_created_at is None or created_at > last_created_at):
+                last_created_at = created_at
+
+        self.last_created_at = last_created_at
+        if not timestamps:
+            return 0
+
+        new_timestamps = np.array(timestamps, dtype=np.int64)
+        needs_sort = (
+            np.any(np.diff(new_timestamps) < 0)
+            or (len(current.timestamps) and new_timestamps[0] < current.timestamps[-1])
+        )
+
+        arrays = Arrays(
+            np.concatenate([current.timestamps, new_timestamps]),
+            np.concatenate([current.buy, np.array(buys, dtype=np.float64)]),
+            np.concatenate([current.sell, np.array(sells, dtype=np.float64)]),
+            np.concatenate([current.bank_codes, np.array(codes, dtype=np.int16)]),
+        )
+        if needs_sort:
+            order = np.argsort(arrays.timestamps, kind='stable')
+            arrays = Arrays(*(array[order] for array in arrays))
+
+        self._arrays = arrays
+        return len(timestamps)
+
+    def window(self, start_ts=None, end_ts=None):
+        """Index range [lo, hi) of samples with start_ts <= t <= end_ts"""
+        return window_of(self._arrays.timestamps, start_ts, end_ts)
+
+    def prices(self, field):
+        return self.sell if field == 'sell' else self.buy
+
+    def ohlc(self, interval, start_ts=None, end_ts=None, field='buy', utc_offset=0):
+        """
+        Candles for samples in [start_ts, end_ts].
+
+        Args:
+            interval: 'hour', '4hour', 'day' or 'week'
+            start_ts, end_ts: Epoch seconds (None = unbounded)
+            field: 'buy' or 'sell'
+            utc_offset: Local UTC offset in seconds used to align buckets
+
+        Returns:
+            dict of arrays: time (bucket start, epoch seconds), open, high,
+            low, close, volume (sample count)
+        """
+        width = INTERVAL_SECONDS[interval]
+        shift = utc_offset + (WEEK_SHIFT if interval == 'week' else 0)
+
+        arrays = self._arrays
+        lo, hi = window_of(arrays.timestamps, start_ts, end_ts)
+        timestamps = arrays.timestamps[lo:hi]
+        prices = (arrays.sell if field == 'sell' else arrays.buy)[lo:hi]
+
+        if not len(timestamps):
+            empty = np.empty(0)
+            return {'time': empty.astype(np.int64), 'open': empty, 'high': empty,
+                    'low': empty, 'close': empty, 'volume': empty.astype(np.int64)}
+
+        buckets = (timestamps + shift) // width
+        starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+        ends = np.append(starts[1:], len(prices))
+
+        return {
+            'time': buckets[starts] * width - shift,
+            'open': prices[starts],
+            'high': np.maximum.reduceat(prices, starts),
+            'low': np.minimum.reduceat(prices, starts),
+            'close': prices[ends - 1],
+            'volume': ends - starts,
+        }
+
+
+def _has_sample(arrays, epoch, code):
+    lo, hi = window_of(arrays.timestamps, epoch, epoch)
+    return bool(np.any(arrays.bank_codes[lo:hi] == code))
+
+
+def to_candles(ohlc, tz):
+    """Chart API rows from ohlc() arrays"""
+    times = ohlc['time'].tolist()
+    opens = ohlc['open'].tolist()
+    highs = ohlc['high'].tolist()
+    lows = ohlc['low'].tolist()
+    closes = ohlc['close'].tolist()
+    volumes = ohlc['volume'].tolist()
+    return [
+        {
+            'time': datetime.fromtimestamp(times[i], tz).isoformat(),
+            'open': opens[i],
+            'high': highs[i],
+            'low': lows[i],
+            'close': closes[i],
+            'volume': volumes[i],
+        }
+        for i in range(len(times))
+    ]
+
+
+def to_points(series, start_ts, end_ts, field, tz):
+    """Line chart rows (time, value, bank) for a window of the series"""
+    arrays = series.snapshot()
+    lo, hi = window_of(arrays.timestamps, start_ts, end_ts)
+    times = arrays.timestamps[lo:hi].tolist()
+    values = (arrays.sell if field == 'sell' else arrays.buy)[lo:hi].tolist()
+    codes = arrays.bank_codes[lo:hi].tolist()
+    names = series.bank_names
+    return [
+        {
+            'time': datetime.fromtimestamp(times[i], tz).isoformat(),
+            'value': values[i],
+            'bank': names[codes[i]],
+        }
+        for i in range(len(times))
+    ]
+
+
+def _rate_rows(currency_pair, bank=None, created_after=None):
+    from .models import BankExchangeRate
+
+    queryset = BankExchangeRate.objects.filter(currency_pair=currency_pair)
+    if bank:
+        queryset = queryset.filter(bank=bank)
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gt=created_after - APPEND_OVERLAP)
+    return queryset.order_by('timestamp').values_list(
+        'timestamp', 'buy_rate', 'sell_rate', 'bank', 'created_at'
+    ).iterator(chunk_size=5000)
+
+
+class _Entry:
+    """Cached series of one key; its lock serialises loads and appends"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = None
+        self.loaded_at = None
+        self.appended_at = None
+
+
+class SeriesCache:
+    """
+    Process-local PriceSeries per (currency pair, bank)
+
+    The cache lock only guards the entry table; loading and appending
+    happen under the entry's own lock, so a full-history load of one pair
+    never blocks requests for another. While a series is being reloaded
+    or appended to, other requests for it get the current version.
+    """
+
+    def __init__(self, append_interval=APPEND_INTERVAL, reload_interval=FULL_RELOAD_INTERVAL):
+        self.append_interval = append_interval
+        self.reload_interval = reload_interval
+        self._entries = {}  # key -> _Entry
+        self._lock = threading.Lock()
+
+    def get(self, currency_pair, bank=None):
+        key = (currency_pair, bank or None)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+
+        # Wait only if there is nothing to serve yet
+        if not entry.lock.acquire(blocking=entry.series is None):
+            return entry.series
+
+        try:
+            now = time.monotonic()
+            if entry.series is None or now - entry.loaded_at >= self.reload_interval:
+                series = PriceSeries.from_rows(_rate_rows(currency_pair, bank))
+                entry.series, entry.loaded_at, entry.appended_at = series, now, now
+                logger.debug(f"Loaded {len(series)} rates for {key}")
+                return series
+
+            series = entry.series
+            if now - entry.appended_at >= self.append_interval:
+                added = series.append(_rate_rows(currency_pair, bank, series.last_created_at))
+                entry.appended_at = now
+                if added:
+                    logger.debug(f"Appended {added} rates to {key}")
+            return series
+        finally:
+            entry.lock.release()
+
+    def invalidate(self, currency_pair=None):
+        with self._lock:
+            if currency_pair is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == currency_pair]:
+                    del self._entries[key]
+
+
+series_cache = SeriesCache()
+
+
+def epoch_seconds(value):
+    """Aware datetime -> epoch seconds"""
+    return int(value.astimezone(dt_timezone.utc).timestamp())
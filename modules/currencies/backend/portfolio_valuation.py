@@ -0,0 +1,277 @@
+"""
+Batch portfolio valuation
+
+Values every portfolio at once instead of calling
+Portfolio.calculate_total_value per portfolio and currency (each of which
+re-reads the holdings and fetches prices again):
+
+1. all holdings are read in one query into a sparse holdings matrix
+   (portfolio index, symbol index, amount),
+2. prices for the distinct symbols are fetched once
+   (crypto_service.get_all_prices, one fan-out) into a symbol x currency
+   price matrix,
+3. totals are the holdings x price product per currency, done with
+   np.bincount over the non-zero entries,
+4. Portfolio totals / P&L are written with bulk_update and today's
+   PortfolioPerformance rows with one upsert per batch.
+
+Prices and P&L follow PortfolioPerformance.capture_snapshot: a holding
+without a price counts as zero, cost basis only covers priced holdings
+and period P&L is the USD value against the snapshot of that day.
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.utils import timezone
+
+from .models import Portfolio, PortfolioHolding, PortfolioPerformance
+
+logger = logging.getLogger(__name__)
+
+CURRENCIES = ('TRY', 'USD')
+
+# Key of each currency in the aggregated prices of crypto_service
+PRICE_KEYS = {'TRY': 'try_price', 'USD': 'usd_price'}
+
+# Period P&L: (days back, PortfolioPerformance field prefix)
+PNL_PERIODS = [(1, 'daily'), (7, 'weekly'), (30, 'monthly'), (365, 'yearly')]
+
+WRITE_BATCH_SIZE = 1000
+
+# Percentages are clipped to what PortfolioPerformance can store (max_digits=10, 4 places)
+MAX_PERCENTAGE = 999999
+
+CENT = Decimal('0.01')
+BASIS_POINT = Decimal('0.0001')
+
+
+def _decimal(value, exp=CENT):
+    return Decimal(repr(float(value))).quantize(exp)
+
+
+class HoldingsMatrix:
+    """
+    Sparse portfolio x symbol amounts.
+
+    rows[k], cols[k] and amounts[k] describe one holding; costs[k] is its
+    amount x average buy price.
+    """
+
+    def __init__(self, portfolio_ids, symbols, rows, cols, amounts, costs):
+        self.portfolio_ids = portfolio_ids
+        self.symbols = symbols
+        self.rows = rows
+        self.cols = cols
+        self.amounts = amounts
+        self.costs = costs
+
+    @classmethod
+    def from_rows(cls, holdings):
+        """Build from (portfolio id, symbol, amount, average buy price) rows"""
+        portfolio_index = {}
+        symbol_index = {}
+        rows = []
+        cols = []
+        amounts = []
+        costs = []
+        for portfolio_id, symbol, amount, buy_price in holdings:
+            rows.append(portfolio_index.setdefault(portfolio_id, len(portfolio_index)))
+            cols.append(symbol_index.setdefault(symbol, len(symbol_index)))
+            amount = float(amount)
+            amounts.append(amount)
+            costs.append(amount * float(buy_price))
+        return cls(
+            list(portfolio_index),
+            list(symbol_index),
+            np.array(rows, dtype=np.int64),
+            np.array(cols, dtype=np.int64),
+            np.array(amounts, dtype=np.float64),
+            np.array(costs, dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, portfolio_ids=None):
+        """All holdings (or those of some portfolios) in one query"""
+        holdings = PortfolioHolding.objects.all()
+        if portfolio_ids is not None:
+            holdings = holdings.filter(portfolio_id__in=portfolio_ids)
+        return cls.from_rows(
+            holdings.values_list('portfolio_id', 'currency__code', 'amount', 'average_buy_price')
+            .iterator(chunk_size=10000)
+        )
+
+    def __len__(self):
+        return len(self.portfolio_ids)
+
+    def totals(self, prices):
+        """Per-portfolio totals for a (symbols x n) price matrix -> (portfolios x n)"""
+        prices = np.asarray(prices, dtype=np.float64).reshape(len(self.symbols), -1)
+        out = np.empty((len(self.portfolio_ids), prices.shape[1]))
+        for column in range(prices.shape[1]):
+            out[:, column] = np.bincount(
+                self.rows, weights=self.amounts * prices[self.cols, column], minlength=len(self.portfolio_ids)
+            )
+        return out
+
+    def priced_costs(self, prices):
+        """Cost basis of the holdings that have a price (see calculate_pnl)"""
+        priced = np.asarray(prices, dtype=np.float64)[self.cols] > 0
+        return np.bincount(self.rows, weights=np.where(priced, self.costs, 0.0), minlength=len(self.portfolio_ids))
+
+
+def price_matrix(symbols, prices, currencies=CURRENCIES):
+    """(symbols x currencies) matrix from get_all_prices() output; missing prices are 0"""
+    matrix = np.zeros((len(symbols), len(currencies)))
+    for i, symbol in enumerate(symbols):
+        aggregated = (prices.get(symbol) or {}).get('aggregated') or {}
+        for j, currency in enumerate(currencies):
+            matrix[i, j] = aggregated.get(PRICE_KEYS[currency]) or 0
+    return matrix
+
+
+def fetch_price_matrix(symbols, service=None):
+    """One price fan-out for every symbol held"""
+    if service is None:
+        from .real_crypto_service import crypto_service as service
+    if not symbols:
+        return np.zeros((0, len(CURRENCIES)))
+    return price_matrix(symbols, service.get_all_prices(list(symbols)))
+
+
+def _usd_try_rate(prices):
+    """USD/TRY from the rate table, else implied by the prices themselves"""
+    try:
+        from .rate_table import rate_table
+        rate = rate_table.get_rate('USD', 'TRY')
+        if rate:
+            return float(rate)
+    except Exception as e:
+        logger.debug(f"Rate table unavailable: {e}")
+
+    try_prices = prices[:, CURRENCIES.index('TRY')]
+    usd_prices = prices[:, CURRENCIES.index('USD')]
+    both = (try_prices > 0) & (usd_prices > 0)
+    return float(np.median(try_prices[both] / usd_prices[both])) if both.any() else 0.0
+
+
+def _reference_values(portfolio_ids, today):
+    """{days back: USD values aligned with portfolio_ids, NaN where no snapshot}"""
+    dates = {today - timedelta(days=days): days for days, _ in PNL_PERIODS}
+    index = {portfolio_id: i for i, portfolio_id in enumerate(portfolio_ids)}
+    values = {days: np.full(len(portfolio_ids), np.nan) for days, _ in PNL_PERIODS}
+
+    snapshots = PortfolioPerformance.objects.filter(snapshot_date__in=list(dates)).values_list(
+        'portfolio_id', 'snapshot_date', 'total_value_usd'
+    )
+    for portfolio_id, snapshot_date, value in snapshots.iterator(chunk_size=10000):
+        i = index.get(portfolio_id)
+        if i is not None:
+            values[dates[snapshot_date]][i] = float(value)
+    return values
+
+
+def _pnl(current, reference):
+    """(P&L, percentage) arrays; 0 where there is no reference snapshot"""
+    has_reference = ~np.isnan(reference)
+    pnl = np.where(has_reference, current - np.nan_to_num(reference), 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(has_reference & (reference > 0), pnl / reference * 100, 0.0)
+    return pnl, np.clip(pct, -MAX_PERCENTAGE, MAX_PERCENTAGE)
+
+
+def value_portfolios(holdings, prices, usd_try):
+    """
+    Vectorised valuation.
+
+    Args:
+        holdings: HoldingsMatrix
+        prices: (symbols x CURRENCIES) price matrix
+        usd_try: Rate converting the USD cost basis to TRY
+
+    Returns:
+        dict of arrays aligned with holdings.portfolio_ids
+    """
+    totals = holdings.totals(prices)
+    value_try = totals[:, CURRENCIES.index('TRY')]
+    value_usd = totals[:, CURRENCIES.index('USD')]
+    cost_usd = holdings.priced_costs(prices[:, CURRENCIES.index('USD')])
+    total_pnl = value_usd - cost_usd
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_pnl_pct = np.where(cost_usd > 0, total_pnl / cost_usd * 100, 0.0)
+    return {
+        'total_value_try': value_try,
+        'total_value_usd': value_usd,
+        'total_invested_usd': cost_usd,
+        'total_invested_try': cost_usd * usd_try,
+        'total_pnl': total_pnl,
+        'total_pnl_percentage': np.clip(total_pnl_pct, -MAX_PERCENTAGE, MAX_PERCENTAGE),
+    }
+
+
+def write_valuations(portfolio_ids, values, now, batch_size=WRITE_BATCH_SIZE):
+    """bulk_update Portfolio totals and upsert today's PortfolioPerformance rows"""
+    today = now.date()
+    references = _reference_values(portfolio_ids, today)
+    for days, name in PNL_PERIODS:
+        values[f'{name}_pnl'], values[f'{name}_pnl_percentage'] = _pnl(values['total_value_usd'], references[days])
+
+    portfolio_fields = [
+        'total_value_try', 'total_value_usd', 'daily_pnl', 'daily_pnl_percentage', 'last_calculated', 'updated_at'
+    ]
+    snapshot_fields = [
+        'snapshot_time', 'total_value_usd', 'total_value_try', 'total_invested_usd', 'total_invested_try',
+        'total_pnl', 'total_pnl_percentage',
+    ] + [f'{name}_{suffix}' for _, name in PNL_PERIODS for suffix in ('pnl', 'pnl_percentage')]
+
+    for start in range(0, len(portfolio_ids), batch_size):
+        stop = min(start + batch_size, len(portfolio_ids))
+        portfolios = []
+        snapshots = []
+        for i in range(start, stop):
+            snapshot = {
+                field: _decimal(values[field][i], BASIS_POINT if field.endswith('percentage') else CENT)
+                for field in snapshot_fields if field != 'snapshot_time'
+            }
+            portfolios.append(Portfolio(
+                id=portfolio_ids[i],
+                total_value_try=snapshot['total_value_try'],
+                total_value_usd=snapshot['total_value_usd'],
+                daily_pnl=snapshot['daily_pnl'],
+                daily_pnl_percentage=snapshot['daily_pnl_percentage'].quantize(CENT),
+                last_calculated=now,
+                updated_at=now,
+            ))
+            snapshots.append(PortfolioPerformance(
+                portfolio_id=portfolio_ids[i], snapshot_date=today, snapshot_time=now, **snapshot
+            ))
+
+        Portfolio.objects.bulk_update(portfolios, portfolio_fields)
+        PortfolioPerformance.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['portfolio', 'snapshot_date'],
+            update_fields=snapshot_fields,
+        )
+
+
+def run_valuation(service=None, now=None):
+    """
+    Value every portfolio with holdings and store the results.
+
+    Returns:
+        (portfolio ids, values dict of arrays)
+    """
+    now = now or timezone.now()
+    holdings = HoldingsMatrix.load()
+    if not len(holdings):
+        return [], {}
+
+    prices = fetch_price_matrix(holdings.symbols, service)
+    values = value_portfolios(holdings, prices, _usd_try_rate(prices))
+    write_valuations(holdings.portfolio_ids, values, now)
+
+    logger.info(f"Valued {len(holdings)} portfolios over {len(holdings.symbols)} symbols")
+    return holdings.portfolio_ids, values
@@ -0,0 +1,234 @@
+"""
+Latest Rate Table
+
+Process-local table of the newest ExchangeRate per currency pair, loaded
+with one query and used to convert between any two currencies without
+touching the database.
+
+Pairs with no stored rate are resolved by the shortest path over the
+currency graph (each stored rate is an edge in both directions, the
+reverse edge being 1/rate), preferring TRY and then USD as the
+intermediate currency. Resolved pairs are memoised until the next reload.
+
+Freshness follows the same scheme as the sync export policy cache: a
+version stamp in the shared Django cache is replaced whenever rates are
+written (see signals below), and each process checks the stamp at most
+once per STAMP_CHECK_INTERVAL seconds.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ExchangeRate
+
+logger = logging.getLogger(__name__)
+
+STAMP_KEY = 'currencies:rate_table:version'
+
+# How often a process looks at the shared version stamp
+STAMP_CHECK_INTERVAL = 1.0
+
+# Reload even without a stamp change (rates written outside the ORM)
+MAX_AGE_SECONDS = 300
+
+# Intermediate currencies tried first when several paths are equally short
+PREFERRED_HUBS = ('TRY', 'USD')
+
+ONE = Decimal('1')
+
+
+def bump_rate_version():
+    """Tell every process to reload its rate table"""
+    try:
+        cache.set(STAMP_KEY, uuid.uuid4().hex, None)
+    except Exception as e:
+        logger.warning(f"Could not bump rate table version: {e}")
+
+
+def _current_stamp():
+    stamp = cache.get(STAMP_KEY)
+    if stamp is None:
+        cache.add(STAMP_KEY, uuid.uuid4().hex, None)
+        stamp = cache.get(STAMP_KEY)
+    return stamp
+
+
+def latest_rate_rows(before=None):
+    """(base code, target code, rate, timestamp) of the newest rate per pair (at or before `before`)"""
+    rows = ExchangeRate.objects.all()
+    if before is not None:
+        rows = rows.filter(timestamp__lte=before)
+    rows = rows.order_by(
+        'base_currency__code', 'target_currency__code', '-timestamp'
+    )
+    fields = ('base_currency__code', 'target_currency__code', 'rate', 'timestamp')
+
+    if connection.features.can_distinct_on_fields:
+        # PostgreSQL: DISTINCT ON keeps one row per pair server-side
+        yield from rows.distinct('base_currency__code', 'target_currency__code').values_list(*fields)
+        return
+
+    last_pair = None
+    for base, target, rate, timestamp in rows.values_list(*fields).iterator(chunk_size=2000):
+        if (base, target) != last_pair:
+            last_pair = (base, target)
+            yield base, target, rate, timestamp
+
+
+class LatestRateTable:
+    """
+    In-memory latest rates with cross-rate resolution.
+
+    Usage:
+        rate_table.get_rate('USD', 'EUR')   # Decimal or None
+        rate_table.convert(100, 'BTC', 'TRY')
+    """
+
+    def __init__(self, max_age=MAX_AGE_SECONDS, check_interval=STAMP_CHECK_INTERVAL):
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._rates = {}  # (base, target) -> (rate, timestamp)
+        self._graph = {}  # code -> {neighbor: rate}
+        self._resolved = {}  # (from, to) -> rate or None
+        self._stamp = None
+        self._loaded_at = None
+        self._checked_at = 0.0
+
+    def load(self, rows):
+        """Replace the table from (base, target, rate, timestamp) rows"""
+        rates = {}
+        for base, target, rate, timestamp in rows:
+            if rate:
+                rates[(base, target)] = (Decimal(rate), timestamp)
+
+        graph = {}
+        for (base, target), (rate, _) in rates.items():
+            graph.setdefault(base, {})[target] = rate
+            # A stored reverse rate wins over the inverse of this one
+            if (target, base) not in rates:
+                graph.setdefault(target, {})[base] = ONE / rate
+
+        with self._lock:
+            self._rates = rates
+            self._graph = graph
+            self._resolved = {}
+            self._loaded_at = self._checked_at = time.monotonic()
+
+    def refresh(self):
+        """Reload from the database"""
+        try:
+            stamp = _current_stamp()
+        except Exception:
+            stamp = None
+        self.load(latest_rate_rows())
+        self._stamp = stamp
+        logger.debug(f"Rate table loaded: {len(self._rates)} pairs")
+
+    def invalidate(self):
+        """Force a reload on the next lookup in this process"""
+        self._loaded_at = None
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= self.max_age:
+            self.refresh()
+            return
+        if now - self._checked_at < self.check_interval:
+            return
+
+        self._checked_at = now
+        try:
+            stamp = _current_stamp()
+        except Exception as e:
+            logger.debug(f"Rate table stamp unavailable: {e}")
+            return
+        if stamp != self._stamp:
+            self.refresh()
+
+    def _shortest_path_rate(self, from_code, to_code):
+        """Multiply rates along the fewest-hop path (BFS)"""
+        graph = self._graph
+        if from_code not in graph or to_code not in graph:
+            return None
+
+        previous = {from_code: None}
+        queue = deque([from_code])
+        while queue:
+            code = queue.popleft()
+            if code == to_code:
+                break
+            neighbors = graph[code]
+            ordered = [hub for hub in PREFERRED_HUBS if hub in neighbors]
+            ordered.extend(n for n in neighbors if n not in PREFERRED_HUBS)
+            for neighbor in ordered:
+                if neighbor not in previous:
+                    previous[neighbor] = code
+                    queue.append(neighbor)
+        else:
+            return None
+
+        rate = ONE
+        code = to_code
+        while previous[code] is not None:
+            rate *= graph[previous[code]][code]
+            code = previous[code]
+        return rate
+
+    def get_rate(self, from_code, to_code):
+        """Rate converting one unit of from_code into to_code (None if unknown)"""
+        if from_code == to_code:
+            return ONE
+
+        self._ensure_fresh()
+        key = (from_code, to_code)
+        resolved = self._resolved
+        if key in resolved:
+            return resolved[key]
+
+        rate = self._shortest_path_rate(from_code, to_code)
+        resolved[key] = rate
+        return rate
+
+    def convert(self, amount, from_code, to_code):
+        """Convert an amount, None if no rate path exists"""
+        rate = self.get_rate(from_code, to_code)
+        if rate is None:
+            return None
+        return Decimal(str(amount)) * rate
+
+    def latest(self, from_code, to_code):
+        """(rate, timestamp) of the stored rate for a pair, if any"""
+        self._ensure_fresh()
+        return self._rates.get((from_code, to_code))
+
+    def currencies(self):
+        """Codes of every currency with at least one rate"""
+        return sorted(self._graph)
+
+    def stats(self):
+        return {
+            'pairs': len(self._rates),
+            'currencies': len(self._graph),
+            'resolved': len(self._resolved),
+        }
+
+
+rate_table = LatestRateTable()
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def _exchange_rate_changed(sender, **kwargs):
+    """New rates invalidate this process now and other processes on commit"""
+    rate_table.invalidate()
+    transaction.on_commit(bump_rate_version)
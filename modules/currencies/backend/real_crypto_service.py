@@ -5,6 +5,8 @@ Handles real price fetching from Binance, CoinGecko, and BTCTurk
 
 import logging
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
 from django.core.cache import cache
@@ -30,17 +32,38 @@ class CryptoAPIService:
     # Supported cryptocurrencies
     SUPPORTED_CRYPTOS = ['BTC', 'ETH', 'AVAX']
     
+    # Symbol -> CoinGecko coin id
+    COIN_ID_MAP = {
+        'BTC': 'bitcoin',
+        'ETH': 'ethereum',
+        'AVAX': 'avalanche-2'
+    }
+    
     # Cache settings
     CACHE_TTL = 60  # 1 minute cache for real-time data
     RATE_LIMIT_CACHE_TTL = 3600  # 1 hour for rate limit tracking
     
+    # Concurrent fan-out settings
+    REQUEST_TIMEOUT = 10
+    FANOUT_TIMEOUT = 8  # Sources still running after this are skipped
+    SOURCE_CONCURRENCY = {
+        'binance': 4,
+        'coingecko': 1,  # Strict public rate limit
+        'btcturk': 2,
+    }
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'UNIBOS/1.0 (Cryptocurrency Portfolio Manager)'
         })
+        self._source_limits = {
+            source: threading.BoundedSemaphore(limit)
+            for source, limit in self.SOURCE_CONCURRENCY.items()
+        }
+        self.last_source_status = {}
         
-    def _make_request(self, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+    def _make_request(self, url: str, params: Optional[Dict] = None, source: Optional[str] = None) -> Optional[Dict]:
         """Make HTTP request with error handling and caching"""
         # Generate cache key
         cache_key = hashlib.md5(f"{url}:{json.dumps(params or {})}".encode()).hexdigest()
@@ -52,7 +75,11 @@ class CryptoAPIService:
             return cached_data
         
         try:
-            response = self.session.get(url, params=params, timeout=10)
+            if source in self._source_limits:
+                with self._source_limits[source]:
+                    response = self.session.get(url, params=params, timeout=self.REQUEST_TIMEOUT)
+            else:
+                response = self.session.get(url, params=params, timeout=self.REQUEST_TIMEOUT)
             response.raise_for_status()
             data = response.json()
             
@@ -82,31 +109,64 @@ class CryptoAPIService:
         
         # Try main Binance first
         url = f"{self.BINANCE_API}/ticker/24hr"
-        data = self._make_request(url, {'symbol': trading_pair})
+        data = self._make_request(url, {'symbol': trading_pair}, source='binance')
         
         if not data:
             # Fallback to Binance US
             url = f"{self.BINANCE_US_API}/ticker/24hr"
-            data = self._make_request(url, {'symbol': trading_pair})
+            data = self._make_request(url, {'symbol': trading_pair}, source='binance')
         
         if data:
+            return self._parse_binance_ticker(symbol, quote, data)
+        
+        return None
+    
+    @staticmethod
+    def _parse_binance_ticker(symbol: str, quote: str, data: Dict) -> Dict:
+        """Convert a Binance 24hr ticker to the common price format"""
+        return {
+            'exchange': 'Binance',
+            'symbol': symbol,
+            'quote': quote,
+            'price': float(data.get('lastPrice', 0)),
+            'bid': float(data.get('bidPrice', 0)),
+            'ask': float(data.get('askPrice', 0)),
+            'volume_24h': float(data.get('volume', 0)),
+            'volume_24h_quote': float(data.get('quoteVolume', 0)),
+            'change_24h': float(data.get('priceChange', 0)),
+            'change_percentage_24h': float(data.get('priceChangePercent', 0)),
+            'high_24h': float(data.get('highPrice', 0)),
+            'low_24h': float(data.get('lowPrice', 0)),
+            'timestamp': timezone.make_aware(datetime.fromtimestamp(data.get('closeTime', 0) / 1000), pytz.utc)
+        }
+    
+    def get_binance_prices(self, symbols: List[str], quote: str = 'USDT') -> Dict[str, Dict]:
+        """
+        Get prices for several symbols with one Binance ticker call
+        
+        Falls back to Binance US, then to per-symbol requests (an unknown
+        pair makes Binance reject the whole batch).
+        
+        Returns:
+            Dict of symbol -> price information (missing symbols omitted)
+        """
+        pairs = {f"{symbol}{quote}": symbol for symbol in symbols}
+        params = {'symbols': json.dumps(sorted(pairs), separators=(',', ':'))}
+        
+        data = self._make_request(f"{self.BINANCE_API}/ticker/24hr", params, source='binance')
+        if not isinstance(data, list):
+            data = self._make_request(f"{self.BINANCE_US_API}/ticker/24hr", params, source='binance')
+        
+        if isinstance(data, list):
             return {
-                'exchange': 'Binance',
-                'symbol': symbol,
-                'quote': quote,
-                'price': float(data.get('lastPrice', 0)),
-                'bid': float(data.get('bidPrice', 0)),
-                'ask': float(data.get('askPrice', 0)),
-                'volume_24h': float(data.get('volume', 0)),
-                'volume_24h_quote': float(data.get('quoteVolume', 0)),
-                'change_24h': float(data.get('priceChange', 0)),
-                'change_percentage_24h': float(data.get('priceChangePercent', 0)),
-                'high_24h': float(data.get('highPrice', 0)),
-                'low_24h': float(data.get('lowPrice', 0)),
-                'timestamp': timezone.make_aware(datetime.fromtimestamp(data.get('closeTime', 0) / 1000), pytz.utc)
+                pairs[ticker['symbol']]: self._parse_binance_ticker(pairs[ticker['symbol']], quote, ticker)
+                for ticker in data
+                if ticker.get('symbol') in pairs
             }
         
-        return None
+        with ThreadPoolExecutor(max_workers=self.SOURCE_CONCURRENCY['binance']) as executor:
+            results = executor.map(lambda symbol: self.get_binance_price(symbol, quote), symbols)
+            return {symbol: price for symbol, price in zip(symbols, results) if price}
     
     def get_coingecko_price(self, coin_id: str, vs_currency: str = 'usd') -> Optional[Dict]:
         """
@@ -120,14 +180,8 @@ class CryptoAPIService:
             Dict with price information or None if failed
         """
         # Map symbols to CoinGecko IDs
-        coin_id_map = {
-            'BTC': 'bitcoin',
-            'ETH': 'ethereum',
-            'AVAX': 'avalanche-2'
-        }
-        
-        if coin_id in coin_id_map:
-            coin_id = coin_id_map[coin_id]
+        if coin_id in self.COIN_ID_MAP:
+            coin_id = self.COIN_ID_MAP[coin_id]
         
         url = f"{self.COINGECKO_API}/simple/price"
         params = {
@@ -139,23 +193,57 @@ class CryptoAPIService:
             'include_last_updated_at': 'true'
         }
         
-        data = self._make_request(url, params)
+        data = self._make_request(url, params, source='coingecko')
         
         if data and coin_id in data:
-            coin_data = data[coin_id]
-            return {
-                'exchange': 'CoinGecko',
-                'symbol': coin_id.upper(),
-                'quote': vs_currency.upper(),
-                'price': coin_data.get(vs_currency, 0),
-                'market_cap': coin_data.get(f'{vs_currency}_market_cap', 0),
-                'volume_24h': coin_data.get(f'{vs_currency}_24h_vol', 0),
-                'change_percentage_24h': coin_data.get(f'{vs_currency}_24h_change', 0),
-                'timestamp': timezone.make_aware(datetime.fromtimestamp(coin_data.get('last_updated_at', 0)), pytz.utc)
-            }
+            return self._parse_coingecko_price(coin_id, vs_currency, data[coin_id])
         
         return None
     
+    @staticmethod
+    def _parse_coingecko_price(coin_id: str, vs_currency: str, coin_data: Dict) -> Dict:
+        """Convert one CoinGecko simple/price entry to the common price format"""
+        return {
+            'exchange': 'CoinGecko',
+            'symbol': coin_id.upper(),
+            'quote': vs_currency.upper(),
+            'price': coin_data.get(vs_currency, 0),
+            'market_cap': coin_data.get(f'{vs_currency}_market_cap', 0),
+            'volume_24h': coin_data.get(f'{vs_currency}_24h_vol', 0),
+            'change_percentage_24h': coin_data.get(f'{vs_currency}_24h_change', 0),
+            'timestamp': timezone.make_aware(datetime.fromtimestamp(coin_data.get('last_updated_at', 0)), pytz.utc)
+        }
+    
+    def get_coingecko_prices(self, symbols: List[str], vs_currencies: Tuple[str, ...] = ('usd', 'try')) -> Dict[str, Dict[str, Dict]]:
+        """
+        Get prices for several symbols and currencies with one simple/price call
+        
+        Returns:
+            Dict of symbol -> {vs_currency: price information}
+        """
+        coin_ids = {self.COIN_ID_MAP.get(symbol, symbol.lower()): symbol for symbol in symbols}
+        params = {
+            'ids': ','.join(sorted(coin_ids)),
+            'vs_currencies': ','.join(vs_currencies),
+            'include_market_cap': 'true',
+            'include_24hr_vol': 'true',
+            'include_24hr_change': 'true',
+            'include_last_updated_at': 'true'
+        }
+        
+        data = self._make_request(f"{self.COINGECKO_API}/simple/price", params, source='coingecko')
+        
+        prices = {}
+        for coin_id, coin_data in (data or {}).items():
+            if coin_id not in coin_ids:
+                continue
+            prices[coin_ids[coin_id]] = {
+                vs_currency: self._parse_coingecko_price(coin_id, vs_currency, coin_data)
+                for vs_currency in vs_currencies
+                if vs_currency in coin_data
+            }
+        return prices
+    
     def get_btcturk_price(self, symbol: str) -> Optional[Dict]:
         """
         Get real-time TRY prices from BTCTurk
@@ -171,33 +259,61 @@ class CryptoAPIService:
         # Get ticker data
         url = f"{self.BTCTURK_API}/ticker"
         params = {'pairSymbol': pair_symbol}
-        data = self._make_request(url, params)
+        data = self._make_request(url, params, source='btcturk')
         
         if data and 'data' in data and len(data['data']) > 0:
-            ticker = data['data'][0]
-            return {
-                'exchange': 'BTCTurk',
-                'symbol': symbol,
-                'quote': 'TRY',
-                'price': float(ticker.get('last', 0)),
-                'bid': float(ticker.get('bid', 0)),
-                'ask': float(ticker.get('ask', 0)),
-                'volume_24h': float(ticker.get('volume', 0)),
-                'change_24h': float(ticker.get('dailyChange', 0)),
-                'change_percentage_24h': float(ticker.get('dailyPercent', 0)),
-                'high_24h': float(ticker.get('high', 0)),
-                'low_24h': float(ticker.get('low', 0)),
-                'timestamp': timezone.make_aware(datetime.fromtimestamp(ticker.get('timestamp', 0) / 1000), pytz.utc) if isinstance(ticker.get('timestamp'), (int, float)) else timezone.now()
-            }
+            return self._parse_btcturk_ticker(symbol, data['data'][0])
         
         return None
     
-    def get_all_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+    @staticmethod
+    def _parse_btcturk_ticker(symbol: str, ticker: Dict) -> Dict:
+        """Convert a BTCTurk ticker to the common price format"""
+        return {
+            'exchange': 'BTCTurk',
+            'symbol': symbol,
+            'quote': 'TRY',
+            'price': float(ticker.get('last', 0)),
+            'bid': float(ticker.get('bid', 0)),
+            'ask': float(ticker.get('ask', 0)),
+            'volume_24h': float(ticker.get('volume', 0)),
+            'change_24h': float(ticker.get('dailyChange', 0)),
+            'change_percentage_24h': float(ticker.get('dailyPercent', 0)),
+            'high_24h': float(ticker.get('high', 0)),
+            'low_24h': float(ticker.get('low', 0)),
+            'timestamp': timezone.make_aware(datetime.fromtimestamp(ticker.get('timestamp', 0) / 1000), pytz.utc) if isinstance(ticker.get('timestamp'), (int, float)) else timezone.now()
+        }
+    
+    def get_btcturk_prices(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Get TRY prices for several symbols with one BTCTurk ticker call
+        
+        Returns:
+            Dict of symbol -> TRY price information
+        """
+        pairs = {f"{symbol}TRY": symbol for symbol in symbols}
+        data = self._make_request(f"{self.BTCTURK_API}/ticker", source='btcturk')
+        
+        prices = {}
+        for ticker in (data or {}).get('data') or []:
+            symbol = pairs.get(ticker.get('pair') or ticker.get('pairNormalized', '').replace('_', ''))
+            if symbol:
+                prices[symbol] = self._parse_btcturk_ticker(symbol, ticker)
+        return prices
+    
+    def get_all_prices(self, symbols: Optional[List[str]] = None, concurrent: bool = True) -> Dict[str, Dict]:
         """
         Get prices for multiple cryptocurrencies from all available sources
         
+        By default every source is queried at the same time with its batch
+        endpoint (one request per source for all symbols). A source that
+        fails or does not answer within FANOUT_TIMEOUT is left out; the
+        outcome per source is kept in last_source_status.
+        
         Args:
             symbols: List of crypto symbols (defaults to SUPPORTED_CRYPTOS)
+            concurrent: Use the concurrent batch fan-out (False = one
+                request per symbol and source, in sequence)
         
         Returns:
             Dict with prices from all sources
@@ -205,6 +321,54 @@ class CryptoAPIService:
         if not symbols:
             symbols = self.SUPPORTED_CRYPTOS
         
+        if not concurrent:
+            return self._get_all_prices_serial(symbols)
+        
+        sources = {
+            'binance': (self.get_binance_prices, (symbols, 'USDT')),
+            'coingecko': (self.get_coingecko_prices, (symbols, ('usd', 'try'))),
+            'btcturk': (self.get_btcturk_prices, (symbols,)),
+        }
+        
+        executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='crypto-fanout')
+        futures = {executor.submit(fetch, *args): name for name, (fetch, args) in sources.items()}
+        done, _ = wait(futures, timeout=self.FANOUT_TIMEOUT)
+        # Do not block on sources that timed out; their threads finish on their own
+        executor.shutdown(wait=False)
+        
+        results = {}
+        status = {}
+        for future, name in futures.items():
+            if future not in done:
+                logger.warning(f"{name} did not respond within {self.FANOUT_TIMEOUT}s, skipping")
+                status[name] = 'timeout'
+                results[name] = {}
+                continue
+            try:
+                results[name] = future.result() or {}
+                status[name] = 'ok' if results[name] else 'empty'
+            except Exception as e:
+                logger.error(f"{name} price fetch failed: {e}")
+                status[name] = 'error'
+                results[name] = {}
+        self.last_source_status = status
+        
+        prices = {}
+        for symbol in symbols:
+            coingecko = results['coingecko'].get(symbol, {})
+            prices[symbol] = {
+                'binance_usdt': results['binance'].get(symbol),
+                'coingecko_usd': coingecko.get('usd'),
+                'coingecko_try': coingecko.get('try'),
+                'btcturk_try': results['btcturk'].get(symbol),
+                'aggregated': {}
+            }
+            prices[symbol]['aggregated'] = self._aggregate_prices(prices[symbol])
+        
+        return prices
+    
+    def _get_all_prices_serial(self, symbols: List[str]) -> Dict[str, Dict]:
+        """One request per symbol and source, in sequence (reference path)"""
         prices = {}
         
         for symbol in symbols:
@@ -290,13 +454,7 @@ class CryptoAPIService:
         Returns:
             List of historical data points or None if failed
         """
-        coin_id_map = {
-            'BTC': 'bitcoin',
-            'ETH': 'ethereum',
-            'AVAX': 'avalanche-2'
-        }
-        
-        coin_id = coin_id_map.get(symbol)
+        coin_id = self.COIN_ID_MAP.get(symbol)
         if not coin_id:
             return None
         
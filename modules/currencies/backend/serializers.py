@@ -429,7 +429,7 @@ class BankRateImportLogSerializer(serializers.ModelSerializer):
 
 class BankRateExportSerializer(serializers.Serializer):
     """Serializer for exporting bank rates"""
-    format = serializers.ChoiceField(choices=['csv', 'excel', 'json'])
+    format = serializers.ChoiceField(choices=['csv', 'excel', 'json', 'ndjson'])
     start_date = serializers.DateField(required=False)
     end_date = serializers.DateField(required=False)
     banks = serializers.ListField(
@@ -441,6 +441,7 @@ class BankRateExportSerializer(serializers.Serializer):
         required=False
     )
     include_statistics = serializers.BooleanField(default=False)
+    gzip = serializers.BooleanField(default=False)
 
 
 class CryptoExchangeRateSerializer(serializers.ModelSerializer):
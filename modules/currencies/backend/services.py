@@ -17,6 +17,7 @@ import hashlib
 import hmac
 
 from .models import Currency, ExchangeRate, MarketData
+from .rate_table import rate_table
 
 logger = logging.getLogger(__name__)
 
@@ -532,64 +533,25 @@ class CurrencyService:
     ) -> Optional[Decimal]:
         """
         Get conversion rate between two currencies
-        Handles cross rates through TRY if needed
+        Handles reverse and cross rates (through TRY if needed)
+        
+        Served from the process-local latest rate table; use_cache=False
+        reloads the table from the database first.
         """
         if from_currency == to_currency:
             return Decimal('1')
         
-        cache_key = f"conversion_{from_currency}_{to_currency}"
-        
-        if use_cache:
-            cached_rate = cache.get(cache_key)
-            if cached_rate:
-                return Decimal(str(cached_rate))
-        
         try:
-            # Try direct rate
-            rate = ExchangeRate.objects.filter(
-                base_currency__code=from_currency,
-                target_currency__code=to_currency
-            ).latest('timestamp')
-            
-            cache.set(cache_key, str(rate.rate), 300)
-            return rate.rate
-            
-        except ExchangeRate.DoesNotExist:
-            # Try reverse rate
-            try:
-                reverse_rate = ExchangeRate.objects.filter(
-                    base_currency__code=to_currency,
-                    target_currency__code=from_currency
-                ).latest('timestamp')
-                
-                rate = Decimal('1') / reverse_rate.rate
-                cache.set(cache_key, str(rate), 300)
-                return rate
-                
-            except ExchangeRate.DoesNotExist:
-                # Try through TRY
-                try:
-                    from_try = ExchangeRate.objects.filter(
-                        base_currency__code=from_currency,
-                        target_currency__code='TRY'
-                    ).latest('timestamp')
-                    
-                    to_try = ExchangeRate.objects.filter(
-                        base_currency__code=to_currency,
-                        target_currency__code='TRY'
-                    ).latest('timestamp')
-                    
-                    rate = from_try.rate / to_try.rate
-                    cache.set(cache_key, str(rate), 300)
-                    return rate
-                    
-                except ExchangeRate.DoesNotExist:
-                    logger.warning(f"No rate found for {from_currency}/{to_currency}")
-                    return None
-        
+            if not use_cache:
+                rate_table.refresh()
+            rate = rate_table.get_rate(from_currency, to_currency)
         except Exception as e:
             logger.error(f"Error getting conversion rate: {e}")
             return None
+        
+        if rate is None:
+            logger.warning(f"No rate found for {from_currency}/{to_currency}")
+        return rate
     
     def cleanup_old_rates(self, days: int = 30) -> int:
         """
@@ -8,7 +8,6 @@ from celery.utils.log import get_task_logger
 from django.utils import timezone
 from django.core.cache import cache
 from django.db.models import Q
-from decimal import Decimal
 from datetime import timedelta
 
 from .services import CurrencyService
@@ -66,71 +65,13 @@ def check_currency_alerts(self):
     Should be run every 1-5 minutes
     """
     try:
-        logger.info("Checking currency alerts")
+        from .alert_engine import alert_engine
+        from .rate_table import latest_rate_rows
         
-        triggered_alerts = []
-        active_alerts = CurrencyAlert.objects.filter(is_active=True)
+        logger.info("Checking currency alerts")
         
-        for alert in active_alerts:
-            try:
-                # Get latest exchange rate
-                latest_rate = ExchangeRate.objects.filter(
-                    base_currency=alert.base_currency,
-                    target_currency=alert.target_currency
-                ).latest('timestamp')
-                
-                # Check if alert should trigger
-                should_trigger = False
-                
-                if alert.alert_type == 'above':
-                    should_trigger = latest_rate.rate > alert.threshold_value
-                elif alert.alert_type == 'below':
-                    should_trigger = latest_rate.rate < alert.threshold_value
-                elif alert.alert_type == 'change_percent':
-                    # Get rate from 24 hours ago
-                    yesterday = timezone.now() - timedelta(days=1)
-                    try:
-                        old_rate = ExchangeRate.objects.filter(
-                            base_currency=alert.base_currency,
-                            target_currency=alert.target_currency,
-                            timestamp__lte=yesterday
-                        ).latest('timestamp')
-                        
-                        change_pct = ((latest_rate.rate - old_rate.rate) / old_rate.rate) * 100
-                        should_trigger = abs(change_pct) >= abs(alert.threshold_value)
-                    except ExchangeRate.DoesNotExist:
-                        continue
-                
-                if should_trigger:
-                    # Check cooldown period (don't trigger too frequently)
-                    if alert.last_triggered:
-                        time_since_last = timezone.now() - alert.last_triggered
-                        if time_since_last.seconds < 3600:  # 1 hour cooldown
-                            continue
-                    
-                    # Trigger alert
-                    alert.last_triggered = timezone.now()
-                    alert.trigger_count += 1
-                    alert.save()
-                    
-                    triggered_alerts.append({
-                        'alert_id': str(alert.id),
-                        'user_id': alert.user.id,
-                        'pair': f"{alert.base_currency.code}/{alert.target_currency.code}",
-                        'rate': float(latest_rate.rate),
-                        'threshold': float(alert.threshold_value),
-                        'type': alert.alert_type
-                    })
-                    
-                    # Send notifications
-                    send_alert_notifications.delay(alert.id)
-                    
-            except ExchangeRate.DoesNotExist:
-                logger.warning(f"No rate found for alert {alert.id}")
-                continue
-            except Exception as e:
-                logger.error(f"Error checking alert {alert.id}: {e}")
-                continue
+        latest = {(base, target): rate for base, target, rate, _ in latest_rate_rows()}
+        triggered_alerts = _evaluate_alerts(alert_engine, latest)
         
         logger.info(f"Triggered {len(triggered_alerts)} alerts")
         
@@ -146,6 +87,82 @@ def check_currency_alerts(self):
         raise self.retry(exc=e)
 
 
+@shared_task
+def evaluate_pair_alerts(base_code, target_code):
+    """
+    Check the alerts of one currency pair
+    Scheduled when a new rate is saved (CURRENCY_ALERTS_EVENT_DRIVEN)
+    """
+    try:
+        from .alert_engine import alert_engine, latest_pair_rate
+        
+        pair = (base_code, target_code)
+        rate = latest_pair_rate(pair)
+        if rate is None:
+            return {'status': 'success', 'triggered_count': 0}
+        
+        triggered_alerts = _evaluate_alerts(alert_engine, {pair: rate})
+        if triggered_alerts:
+            logger.info(f"Triggered {len(triggered_alerts)} alerts for {base_code}/{target_code}")
+        
+        return {
+            'status': 'success',
+            'triggered_count': len(triggered_alerts),
+            'timestamp': timezone.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Alert evaluation for {base_code}/{target_code} failed: {e}", exc_info=True)
+
+
+def _evaluate_alerts(engine, latest):
+    """Run the alert engine on {pair: rate}, record triggers and queue notifications"""
+    from .alert_engine import latest_pair_rate
+    from .rate_table import latest_rate_rows
+    
+    now = timezone.now()
+    
+    # Load before change_pairs(): a cold engine has no change_percent indexes yet
+    engine.ensure_fresh()
+    
+    # 24h-old rates only for pairs that have change_percent alerts
+    previous = {}
+    change_pairs = engine.change_pairs() & set(latest)
+    if change_pairs:
+        yesterday = now - timedelta(days=1)
+        if len(change_pairs) == 1:
+            pair = next(iter(change_pairs))
+            previous[pair] = latest_pair_rate(pair, before=yesterday)
+        else:
+            previous = {
+                (base, target): rate
+                for base, target, rate, _ in latest_rate_rows(before=yesterday)
+                if (base, target) in change_pairs
+            }
+    
+    triggered = engine.evaluate(latest, previous, now=now.timestamp(), refresh=False)
+    try:
+        confirmed = engine.record_triggers(triggered, now)
+    except Exception:
+        # The engine already put these alerts in cooldown; reload from the database
+        engine.invalidate()
+        raise
+    
+    triggered_alerts = []
+    for alert, rate in confirmed:
+        triggered_alerts.append({
+            'alert_id': str(alert.id),
+            'user_id': alert.user_id,
+            'pair': f"{alert.pair[0]}/{alert.pair[1]}",
+            'rate': float(rate),
+            'threshold': float(alert.threshold),
+            'type': alert.alert_type
+        })
+        send_alert_notifications.delay(alert.id)
+    
+    return triggered_alerts
+
+
 @shared_task
 def send_alert_notifications(alert_id):
     """
@@ -232,66 +249,30 @@ def cleanup_old_rates():
 
 
 @shared_task
-def generate_market_data():
+def generate_market_data(hours=None, intervals=None):
     """
     Generate market data for charts from exchange rates
     Run hourly
+
+    One scan of recent ExchangeRate rows refreshes the 1m/5m/1h/1d candles
+    of every pair (see market_rollup.py).
     """
     try:
-        from .models import MarketData
+        from .market_rollup import DEFAULT_INTERVALS, LOOKBACK_HOURS, rollup_recent
         
-        # Get unique currency pairs
-        pairs = ExchangeRate.objects.values_list(
-            'base_currency__code', 'target_currency__code'
-        ).distinct()
-        
-        created_count = 0
-        
-        for base_code, target_code in pairs:
-            pair_str = f"{base_code}/{target_code}"
-            
-            # Get rates from last hour
-            hour_ago = timezone.now() - timedelta(hours=1)
-            rates = ExchangeRate.objects.filter(
-                base_currency__code=base_code,
-                target_currency__code=target_code,
-                timestamp__gte=hour_ago
-            ).order_by('timestamp')
-            
-            if rates.count() < 2:
-                continue
-            
-            # Calculate OHLCV
-            open_price = rates.first().rate
-            close_price = rates.last().rate
-            high_price = rates.aggregate(max_rate=Max('rate'))['max_rate']
-            low_price = rates.aggregate(min_rate=Min('rate'))['min_rate']
-            volume = rates.aggregate(total_vol=Sum('volume_24h'))['total_vol'] or Decimal('0')
-            
-            # Create market data entry
-            market_data, created = MarketData.objects.get_or_create(
-                currency_pair=pair_str,
-                period_start=hour_ago,
-                interval='1h',
-                source='AGGREGATED',
-                defaults={
-                    'open_price': open_price,
-                    'high_price': high_price,
-                    'low_price': low_price,
-                    'close_price': close_price,
-                    'volume': volume,
-                    'period_end': timezone.now()
-                }
-            )
-            
-            if created:
-                created_count += 1
+        stats = rollup_recent(
+            timezone.now(),
+            hours=hours or LOOKBACK_HOURS,
+            intervals=tuple(intervals or DEFAULT_INTERVALS)
+        )
         
-        logger.info(f"Generated {created_count} market data entries")
+        logger.info(f"Generated {stats['candles']} market data entries for {stats['pairs']} pairs")
         
         return {
             'status': 'success',
-            'created_count': created_count,
+            'created_count': stats['candles'],
+            'pairs': stats['pairs'],
+            'rates': stats['rates'],
             'timestamp': timezone.now().isoformat()
         }
         
@@ -302,44 +283,35 @@ def generate_market_data():
 @shared_task
 def calculate_portfolio_performance():
     """
-    Calculate and cache portfolio performance metrics
+    Calculate and store portfolio performance metrics
     Run every 15 minutes
+    
+    All portfolios are valued in one batch (see portfolio_valuation.py):
+    one holdings query, one price fetch, and bulk writes to Portfolio and
+    today's PortfolioPerformance rows
     """
     try:
-        from .models import Portfolio
-        
-        portfolios = Portfolio.objects.filter(
-            holdings__isnull=False
-        ).distinct()
-        
-        updated_count = 0
-        
-        for portfolio in portfolios:
-            try:
-                # Calculate metrics
-                total_value_try = portfolio.calculate_total_value('TRY')
-                total_value_usd = portfolio.calculate_total_value('USD')
-                
-                # Cache the results
-                cache_key = f"portfolio_performance_{portfolio.id}"
-                cache_data = {
-                    'total_value_try': float(total_value_try),
-                    'total_value_usd': float(total_value_usd),
-                    'calculated_at': timezone.now().isoformat()
+        from .portfolio_valuation import run_valuation
+        
+        calculated_at = timezone.now()
+        portfolio_ids, values = run_valuation(now=calculated_at)
+        
+        # Cache the results
+        for start in range(0, len(portfolio_ids), 1000):
+            cache.set_many({
+                f"portfolio_performance_{portfolio_ids[i]}": {
+                    'total_value_try': float(values['total_value_try'][i]),
+                    'total_value_usd': float(values['total_value_usd'][i]),
+                    'calculated_at': calculated_at.isoformat()
                 }
-                
-                cache.set(cache_key, cache_data, 900)  # Cache for 15 minutes
-                updated_count += 1
-                
-            except Exception as e:
-                logger.error(f"Failed to calculate performance for portfolio {portfolio.id}: {e}")
-                continue
+                for i in range(start, min(start + 1000, len(portfolio_ids)))
+            }, 900)  # Cache for 15 minutes
         
-        logger.info(f"Updated performance for {updated_count} portfolios")
+        logger.info(f"Updated performance for {len(portfolio_ids)} portfolios")
         
         return {
             'status': 'success',
-            'updated_count': updated_count,
+            'updated_count': len(portfolio_ids),
             'timestamp': timezone.now().isoformat()
         }
         
@@ -352,43 +324,12 @@ def import_firebase_rates_incremental(self):
     """
     Import new bank exchange rates from Firebase
     Runs every 5 minutes to check for new data
-    Only imports records that don't exist in database
-    """
-    import requests
-    from datetime import datetime
-    from decimal import Decimal, InvalidOperation
-    from django.db import transaction
-    import pytz
-    from .models import BankExchangeRate, BankRateImportLog
-    
-    FIREBASE_URL = 'https://findmeonphotos-default-rtdb.europe-west1.firebasedatabase.app/kurlar.json'
     
-    # Bank and currency mappings
-    BANK_MAPPING = {
-        'TCMB': 'TCMB',
-        'Akbank': 'Akbank',
-        'Garanti': 'Garanti',
-        'Garanti BBVA': 'Garanti',
-        'YKB': 'YKB',
-        'Yapı Kredi': 'YKB',
-        'Ziraat': 'Ziraat',
-        'Halkbank': 'Halkbank',
-        'Vakıfbank': 'Vakıfbank',
-        'İş Bankası': 'İşbank',
-        'ING': 'ING',
-        'QNB': 'QNB',
-        'Denizbank': 'Denizbank',
-        'TEB': 'TEB',
-    }
-    
-    CURRENCY_MAPPING = {
-        'USDTRY': 'USDTRY',
-        'EURTRY': 'EURTRY',
-        'XAUTRY': 'XAUTRY',
-        'GBPTRY': 'GBPTRY',
-        'CHFTRY': 'CHFTRY',
-        'JPYTRY': 'JPYTRY',
-    }
+    Only entries after the stored high-water mark are requested, page by
+    page, and parsed as they stream in (see firebase_import.py)
+    """
+    from .firebase_import import FIREBASE_URL, import_incremental
+    from .models import BankRateImportLog
     
     # Create import log
     import_log = BankRateImportLog.objects.create(
@@ -400,142 +341,10 @@ def import_firebase_rates_incremental(self):
     try:
         logger.info("Starting incremental Firebase rates import")
         
-        # Fetch data from Firebase
-        response = requests.get(FIREBASE_URL, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        if not data:
-            raise ValueError('No data received from Firebase')
-        
-        # Get all existing entry IDs in a single query for performance
-        existing_ids = set(BankExchangeRate.objects.values_list('entry_id', flat=True))
-        logger.info(f"Found {len(existing_ids)} existing entries in database")
-        
-        # Get latest timestamp for reference
-        latest_entry = BankExchangeRate.objects.order_by('-timestamp').first()
-        latest_timestamp = latest_entry.timestamp if latest_entry else None
-        
-        stats = {
-            'total': 0,
-            'new': 0,
-            'updated': 0,
-            'failed': 0,
-            'skipped': 0
-        }
-        
-        # Batch for bulk insert
-        batch = []
-        batch_size = 100
-        istanbul_tz = pytz.timezone('Europe/Istanbul')
-        
-        # Process entries
-        for entry_id, entry_data in data.items():
-            try:
-                # Validate entry
-                if not isinstance(entry_data, dict) or 'zaman' not in entry_data:
-                    stats['skipped'] += 1
-                    continue
-                
-                # Parse timestamp
-                timestamp_ms = entry_data['zaman']
-                timestamp = datetime.fromtimestamp(timestamp_ms / 1000, tz=istanbul_tz)
-                
-                # Skip very old entries for performance (only check last 7 days in scheduled task)
-                if latest_timestamp and (latest_timestamp - timestamp).days > 7:
-                    stats['skipped'] += 1
-                    continue
-                
-                date = timestamp.date()
-                
-                # Process bank data
-                if 'data' not in entry_data or not isinstance(entry_data['data'], list):
-                    stats['skipped'] += 1
-                    continue
-                
-                for bank_data in entry_data['data']:
-                    if not isinstance(bank_data, dict):
-                        continue
-                    
-                    bank_name_raw = bank_data.get('banka', '')
-                    bank_name = BANK_MAPPING.get(bank_name_raw)
-                    
-                    if not bank_name:
-                        continue
-                    
-                    # Process each currency rate
-                    for rate_data in bank_data.get('banka_kuru', []):
-                        if not isinstance(rate_data, dict):
-                            continue
-                        
-                        currency_pair_raw = rate_data.get('kur', '')
-                        currency_pair = CURRENCY_MAPPING.get(currency_pair_raw)
-                        
-                        if not currency_pair:
-                            continue
-                        
-                        # Parse rates
-                        try:
-                            buy_rate = Decimal(str(rate_data.get('alis', 0)))
-                            sell_rate = Decimal(str(rate_data.get('satis', 0)))
-                            
-                            # Skip invalid rates
-                            if buy_rate <= 0 or sell_rate <= 0:
-                                stats['skipped'] += 1
-                                continue
-                            
-                        except (ValueError, TypeError, InvalidOperation):
-                            stats['failed'] += 1
-                            continue
-                        
-                        # Create unique entry ID
-                        unique_entry_id = f"{entry_id}_{bank_name}_{currency_pair}"
-                        
-                        # Skip if already exists
-                        if unique_entry_id in existing_ids:
-                            stats['skipped'] += 1
-                            continue
-                        
-                        # Get previous rates for change calculation
-                        previous = BankExchangeRate.objects.filter(
-                            bank=bank_name,
-                            currency_pair=currency_pair,
-                            timestamp__lt=timestamp
-                        ).order_by('-timestamp').first()
-                        
-                        # Create new entry
-                        new_entry = BankExchangeRate(
-                            entry_id=unique_entry_id,
-                            bank=bank_name,
-                            currency_pair=currency_pair,
-                            buy_rate=buy_rate,
-                            sell_rate=sell_rate,
-                            date=date,
-                            timestamp=timestamp,
-                            previous_buy_rate=previous.buy_rate if previous else None,
-                            previous_sell_rate=previous.sell_rate if previous else None
-                        )
-                        
-                        batch.append(new_entry)
-                        stats['new'] += 1
-                        stats['total'] += 1
-                        
-                        # Save batch if reached batch size
-                        if len(batch) >= batch_size:
-                            with transaction.atomic():
-                                BankExchangeRate.objects.bulk_create(batch, batch_size=50)
-                            batch = []
-                
-            except Exception as e:
-                logger.error(f'Error processing entry {entry_id}: {str(e)}')
-                stats['failed'] += 1
-        
-        # Save remaining batch
-        if batch:
-            with transaction.atomic():
-                BankExchangeRate.objects.bulk_create(batch, batch_size=50)
+        stats = import_incremental(import_log=import_log)
         
-        # Update import log
+        # Update import log (keeps the high-water mark written during the import)
+        import_log.refresh_from_db(fields=['last_entry_key', 'last_entry_timestamp'])
         import_log.total_entries = stats['total']
         import_log.new_entries = stats['new']
         import_log.updated_entries = stats['updated']
@@ -550,7 +359,8 @@ def import_firebase_rates_incremental(self):
         
         logger.info(
             f"Firebase incremental import completed: {stats['new']} new, "
-            f"{stats['skipped']} skipped, {stats['failed']} failed"
+            f"{stats['updated']} updated, {stats['skipped']} skipped, {stats['failed']} failed "
+            f"({stats['pages']} pages)"
         )
         
         # Clear cache for latest rates if new data was imported
@@ -568,6 +378,7 @@ def import_firebase_rates_incremental(self):
         }
         
     except Exception as e:
+        import_log.refresh_from_db(fields=['last_entry_key', 'last_entry_timestamp'])
         import_log.status = 'failed'
         import_log.error_message = str(e)
         import_log.completed_at = timezone.now()
@@ -5,6 +5,7 @@ Tests security, performance, and functionality
 
 from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
@@ -107,6 +108,96 @@ class ExchangeRateModelTests(TestCase):
             )
 
 
+class PriceSeriesTests(TestCase):
+    """Test incremental appends of the OHLC price series"""
+
+    def test_overlapping_append_keeps_late_rows_once(self):
+        """Re-read rows are skipped, a row committed late is added, old snapshots stay intact"""
+        from .ohlc import PriceSeries
+
+        start = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+        rows = [
+            (start + timedelta(minutes=i), Decimal('32.10') + i, Decimal('32.20') + i, 'TCMB',
+             start + timedelta(minutes=i, seconds=1))
+            for i in range(3)
+        ]
+        series = PriceSeries.from_rows(rows)
+        before = series.snapshot()
+
+        # Created before the newest loaded row, but committed after the last query
+        late = (start + timedelta(minutes=1, seconds=30), Decimal('40'), Decimal('41'), 'TCMB',
+                start + timedelta(minutes=1, seconds=40))
+        added = series.append(rows[1:] + [late])
+
+        self.assertEqual(added, 1)
+        self.assertEqual(len(series), 4)
+        self.assertEqual(series.buy.tolist(), [32.10, 33.10, 40.0, 34.10])
+        self.assertEqual(len(before.timestamps), 3)
+        self.assertEqual(series.last_created_at, rows[-1][4])
+
+
+class MarketDataRollupTests(TestCase):
+    """Test single-scan MarketData rollup"""
+    
+    def setUp(self):
+        from datetime import datetime, timezone as dt_timezone
+        
+        self.usd = Currency.objects.create(code='USD', name='US Dollar', symbol='$', currency_type='fiat')
+        self.eur = Currency.objects.create(code='EUR', name='Euro', symbol='€', currency_type='fiat')
+        self.try_currency = Currency.objects.create(code='TRY', name='Turkish Lira', symbol='₺', currency_type='fiat')
+        self.hour = datetime(2024, 3, 1, 10, 0, tzinfo=dt_timezone.utc)
+        
+        for minute, rate in [(5, '32.10'), (20, '32.40'), (40, '31.90'), (55, '32.20')]:
+            ExchangeRate.objects.create(
+                base_currency=self.usd, target_currency=self.try_currency,
+                rate=Decimal(rate), volume_24h=Decimal('10'), source='TCMB',
+                timestamp=self.hour + timedelta(minutes=minute)
+            )
+        ExchangeRate.objects.create(
+            base_currency=self.eur, target_currency=self.try_currency,
+            rate=Decimal('35.00'), source='TCMB', timestamp=self.hour + timedelta(minutes=30)
+        )
+    
+    def test_hourly_candles_for_all_pairs(self):
+        """One scan produces OHLCV for every pair"""
+        from .market_rollup import rollup_market_data
+        
+        stats = rollup_market_data(self.hour, self.hour + timedelta(hours=1), intervals=['1h'])
+        self.assertEqual(stats['pairs'], 2)
+        self.assertEqual(stats['rates'], 5)
+        
+        candle = MarketData.objects.get(currency_pair='USD/TRY', interval='1h')
+        self.assertEqual(candle.period_start, self.hour)
+        self.assertEqual(candle.period_end, self.hour + timedelta(hours=1))
+        self.assertEqual(candle.open_price, Decimal('32.10'))
+        self.assertEqual(candle.high_price, Decimal('32.40'))
+        self.assertEqual(candle.low_price, Decimal('31.90'))
+        self.assertEqual(candle.close_price, Decimal('32.20'))
+        self.assertEqual(candle.volume, Decimal('40'))
+        self.assertTrue(MarketData.objects.filter(currency_pair='EUR/TRY', interval='1h').exists())
+    
+    def test_multiple_intervals_and_rerun(self):
+        """Intervals share the scan and re-runs update candles in place"""
+        from .market_rollup import rollup_market_data
+        
+        end = self.hour + timedelta(hours=1)
+        rollup_market_data(self.hour, end, intervals=['5m', '1h', '1d'])
+        self.assertEqual(MarketData.objects.filter(currency_pair='USD/TRY', interval='5m').count(), 4)
+        self.assertEqual(MarketData.objects.filter(interval='1d').count(), 2)
+        
+        ExchangeRate.objects.create(
+            base_currency=self.usd, target_currency=self.try_currency,
+            rate=Decimal('33.00'), source='TCMB', timestamp=self.hour + timedelta(minutes=58)
+        )
+        rollup_market_data(self.hour, end, intervals=['5m', '1h', '1d'])
+        
+        candle = MarketData.objects.get(currency_pair='USD/TRY', interval='1d')
+        self.assertEqual(candle.period_start, self.hour.replace(hour=0))
+        self.assertEqual(candle.high_price, Decimal('33.00'))
+        self.assertEqual(candle.close_price, Decimal('33.00'))
+        self.assertEqual(MarketData.objects.filter(currency_pair='USD/TRY', interval='1d').count(), 1)
+
+
 class PortfolioModelTests(TestCase):
     """Test Portfolio and related models"""
     
@@ -189,6 +280,84 @@ class PortfolioModelTests(TestCase):
         self.assertEqual(total_value, Decimal('3300'))  # 100 USD * 33.00
 
 
+class PortfolioValuationTests(TestCase):
+    """Test the batch portfolio valuation job"""
+
+    class FakePriceService:
+        def __init__(self, prices):
+            self.prices = prices
+            self.calls = 0
+
+        def get_all_prices(self, symbols=None, concurrent=True):
+            self.calls += 1
+            return {symbol: {'aggregated': self.prices.get(symbol, {})} for symbol in symbols}
+
+    def setUp(self):
+        self.btc = Currency.objects.create(code='BTC', name='Bitcoin', symbol='₿', currency_type='crypto')
+        self.eth = Currency.objects.create(code='ETH', name='Ethereum', symbol='Ξ', currency_type='crypto')
+        self.doge = Currency.objects.create(code='DOGE', name='Dogecoin', symbol='Ð', currency_type='crypto')
+        self.portfolios = []
+        for i, holdings in enumerate([
+            [(self.btc, '0.5', '40000'), (self.eth, '2', '2000')],
+            [(self.eth, '10', '3000'), (self.doge, '1000', '0.1')],
+        ]):
+            user = User.objects.create_user(username=f'investor{i}', email=f'investor{i}@example.com', password='testpass')
+            portfolio = Portfolio.objects.create(user=user, name=f'Portfolio {i}')
+            for currency, amount, buy_price in holdings:
+                PortfolioHolding.objects.create(
+                    portfolio=portfolio, currency=currency,
+                    amount=Decimal(amount), average_buy_price=Decimal(buy_price)
+                )
+            self.portfolios.append(portfolio)
+        self.service = self.FakePriceService({
+            'BTC': {'usd_price': 60000, 'try_price': 1950000},
+            'ETH': {'usd_price': 2500, 'try_price': 81250},
+        })
+
+    def test_batch_values_all_portfolios_with_one_price_fetch(self):
+        """Totals, cost basis and snapshots match the per-portfolio rules"""
+        from .models import PortfolioPerformance
+        from .portfolio_valuation import run_valuation
+
+        run_valuation(service=self.service)
+        self.assertEqual(self.service.calls, 1)
+
+        first, second = [Portfolio.objects.get(id=p.id) for p in self.portfolios]
+        self.assertEqual(first.total_value_usd, Decimal('35000.00'))
+        self.assertEqual(first.total_value_try, Decimal('1137500.00'))
+        self.assertEqual(second.total_value_usd, Decimal('25000.00'))  # DOGE has no price
+        self.assertIsNotNone(first.last_calculated)
+
+        snapshot = PortfolioPerformance.objects.get(portfolio=self.portfolios[1])
+        self.assertEqual(snapshot.total_invested_usd, Decimal('30000.00'))  # Priced holdings only
+        self.assertEqual(snapshot.total_pnl, Decimal('-5000.00'))
+        self.assertEqual(snapshot.daily_pnl, Decimal('0.00'))
+
+    def test_daily_pnl_and_rerun_updates_snapshot(self):
+        """Daily P&L is measured against yesterday's snapshot; reruns upsert"""
+        from .models import PortfolioPerformance
+        from .portfolio_valuation import run_valuation
+
+        now = timezone.now()
+        PortfolioPerformance.objects.create(
+            portfolio=self.portfolios[0], snapshot_date=now.date() - timedelta(days=1),
+            snapshot_time=now - timedelta(days=1), total_value_usd=Decimal('28000'),
+            total_value_try=Decimal('0'), total_invested_usd=Decimal('0'), total_invested_try=Decimal('0')
+        )
+
+        run_valuation(service=self.service, now=now)
+        self.service.prices['BTC'] = {'usd_price': 62000, 'try_price': 2015000}
+        run_valuation(service=self.service, now=now)
+
+        portfolio = Portfolio.objects.get(id=self.portfolios[0].id)
+        self.assertEqual(portfolio.total_value_usd, Decimal('36000.00'))
+        self.assertEqual(portfolio.daily_pnl, Decimal('8000.00'))
+        self.assertEqual(portfolio.daily_pnl_percentage, Decimal('28.57'))
+        self.assertEqual(
+            PortfolioPerformance.objects.filter(portfolio=self.portfolios[0], snapshot_date=now.date()).count(), 1
+        )
+
+
 class CurrencyAPITests(APITestCase):
     """Test Currency API endpoints"""
     
@@ -433,6 +602,305 @@ class PortfolioAPITests(APITestCase):
         self.assertEqual(len(response.data['holdings']), 1)
 
 
+class AlertEngineTests(TestCase):
+    """Test indexed alert evaluation"""
+    
+    def test_index_matches_brute_force_100k_alerts(self):
+        """Bisect indexes trigger exactly the alerts a per-alert scan would"""
+        import random
+        from .alert_engine import AlertEngine
+        
+        rng = random.Random(7)
+        pairs = [('USD', 'TRY'), ('EUR', 'TRY'), ('BTC', 'USD'), ('XAU', 'TRY'), ('GBP', 'TRY')]
+        rows = []
+        for i in range(100000):
+            alert_type = rng.choice(['above', 'below', 'change_percent'])
+            if alert_type == 'change_percent':
+                threshold = Decimal(str(round(rng.uniform(-10, 10), 4)))
+            else:
+                threshold = Decimal(str(round(rng.uniform(20, 40), 4)))
+            rows.append((i, i % 500, *rng.choice(pairs), alert_type, threshold, None))
+        
+        engine = AlertEngine(cooldown=3600)
+        engine.load(rows, now=0)
+        latest = {pair: Decimal(str(round(rng.uniform(20, 40), 4))) for pair in pairs}
+        previous = {pair: rate * Decimal('0.97') for pair, rate in latest.items()}
+        
+        expected = set()
+        for alert_id, _, base, target, alert_type, threshold, _ in rows:
+            rate = latest[(base, target)]
+            if alert_type == 'above':
+                hit = rate > threshold
+            elif alert_type == 'below':
+                hit = rate < threshold
+            else:
+                old = previous[(base, target)]
+                hit = abs((rate - old) / old * 100) >= abs(threshold)
+            if hit:
+                expected.add(alert_id)
+        
+        triggered = engine.evaluate(latest, previous, now=1000, refresh=False)
+        self.assertEqual({alert.id for alert, _ in triggered}, expected)
+        self.assertTrue(expected)
+        
+        # Triggered alerts sit out the cooldown, then fire again while the condition holds
+        self.assertEqual(engine.evaluate(latest, previous, now=2000, refresh=False), [])
+        again = engine.evaluate(latest, previous, now=1000 + 3601, refresh=False)
+        self.assertEqual({alert.id for alert, _ in again}, expected)
+        self.assertEqual(engine.stats()['alerts'], 100000)
+    
+    @patch('modules.currencies.backend.tasks.send_alert_notifications')
+    def test_batched_trigger_updates(self, mock_notify):
+        """Query count does not grow with the number of alerts"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .alert_engine import AlertEngine
+        from .tasks import _evaluate_alerts
+        
+        user = User.objects.create_user(username='alerts', email='alerts@example.com', password='testpass123')
+        usd = Currency.objects.create(code='USD', name='US Dollar', symbol='$', currency_type='fiat')
+        try_currency = Currency.objects.create(code='TRY', name='Turkish Lira', symbol='₺', currency_type='fiat')
+        CurrencyAlert.objects.bulk_create([
+            CurrencyAlert(
+                user=user, base_currency=usd, target_currency=try_currency,
+                alert_type='above' if i % 2 else 'below',
+                threshold_value=Decimal(30) + Decimal(i % 50) / 10
+            )
+            for i in range(500)
+        ])
+        
+        engine = AlertEngine()
+        with CaptureQueriesContext(connection) as queries:
+            triggered = _evaluate_alerts(engine, {('USD', 'TRY'): Decimal('32.45')})
+        
+        expected = CurrencyAlert.objects.filter(
+            Q(alert_type='above', threshold_value__lt=Decimal('32.45'))
+            | Q(alert_type='below', threshold_value__gt=Decimal('32.45'))
+        )
+        self.assertEqual(len(triggered), expected.count())
+        self.assertLessEqual(len(queries), 6)
+        self.assertEqual(mock_notify.delay.call_count, len(triggered))
+        self.assertFalse(expected.filter(trigger_count=0).exists())
+        
+        # Cooldown: nothing fires on the next run
+        self.assertEqual(_evaluate_alerts(engine, {('USD', 'TRY'): Decimal('32.45')}), [])
+
+    def test_alert_changes_reach_other_processes(self):
+        """A new alert is picked up through the database stamp, without a shared cache"""
+        from .alert_engine import AlertEngine
+
+        user = User.objects.create_user(username='stamps', email='stamps@example.com', password='testpass123')
+        usd = Currency.objects.create(code='USD', name='US Dollar', symbol='$', currency_type='fiat')
+        try_currency = Currency.objects.create(code='TRY', name='Turkish Lira', symbol='₺', currency_type='fiat')
+        # Engine of a worker process: warm, and far from its max_age reload
+        engine = AlertEngine(check_interval=0)
+        engine.ensure_fresh()
+        self.assertEqual(engine.stats()['alerts'], 0)
+
+        alert = CurrencyAlert.objects.create(
+            user=user, base_currency=usd, target_currency=try_currency,
+            alert_type='above', threshold_value=Decimal('30')
+        )
+        triggered = engine.evaluate({('USD', 'TRY'): Decimal('31')})
+        self.assertEqual([item.id for item, _ in triggered], [alert.id])
+
+        alert.delete()
+        engine.ensure_fresh()
+        self.assertEqual(engine.stats()['alerts'], 0)
+
+    @patch('modules.currencies.backend.tasks.send_alert_notifications')
+    def test_change_percent_on_cold_engine(self, mock_notify):
+        """The first run of a fresh engine loads alerts before picking pairs that need 24h-old rates"""
+        from .alert_engine import AlertEngine
+        from .tasks import _evaluate_alerts
+
+        user = User.objects.create_user(username='changes', email='changes@example.com', password='testpass123')
+        usd = Currency.objects.create(code='USD', name='US Dollar', symbol='$', currency_type='fiat')
+        try_currency = Currency.objects.create(code='TRY', name='Turkish Lira', symbol='₺', currency_type='fiat')
+        ExchangeRate.objects.create(
+            base_currency=usd, target_currency=try_currency, rate=Decimal('30.00'),
+            source='TCMB', timestamp=timezone.now() - timedelta(days=2)
+        )
+        alert = CurrencyAlert.objects.create(
+            user=user, base_currency=usd, target_currency=try_currency,
+            alert_type='change_percent', threshold_value=Decimal('5')
+        )
+
+        triggered = _evaluate_alerts(AlertEngine(), {('USD', 'TRY'): Decimal('33.00')})
+
+        self.assertEqual([item['alert_id'] for item in triggered], [str(alert.id)])
+        mock_notify.delay.assert_called_once_with(alert.id)
+
+
+class FirebaseImportTests(TestCase):
+    """Test the streaming incremental Firebase importer"""
+    
+    @staticmethod
+    def _entry(minute, rate):
+        return {
+            'zaman': 1700000000000 + minute * 60000,
+            'data': [{'banka': 'Akbank', 'banka_kuru': [{'kur': 'USDTRY', 'alis': rate, 'satis': rate + 0.1}]}]
+        }
+    
+    def test_streaming_parser_chunk_boundaries(self):
+        """Members decode correctly whatever the chunk boundaries"""
+        from .firebase_import import iter_object_items
+        
+        tree = {f'-Nk{i:03d}': self._entry(i, 32.5 + i / 1000) for i in range(50)}
+        payload = json.dumps(tree, ensure_ascii=False).encode()
+        for size in (1, 7, 4096):
+            chunks = [payload[i:i + size] for i in range(0, len(payload), size)]
+            self.assertEqual(dict(iter_object_items(chunks)), tree)
+        self.assertEqual(list(iter_object_items([b'null'])), [])
+    
+    def test_incremental_import_uses_high_water_mark(self):
+        """Entries are imported once and the mark is stored on the log"""
+        from .firebase_import import import_incremental
+        from .models import BankExchangeRate, BankRateImportLog
+        
+        entries = [(f'k{i:03d}', self._entry(i, 32.5 + i / 100)) for i in range(10)]
+        
+        class FakeSource:
+            requests = 0
+            
+            def __init__(self):
+                self.start_keys = []
+            
+            def iter_pages(self, start_key=None):
+                self.start_keys.append(start_key)
+                page = [item for item in entries if start_key is None or item[0] >= start_key]
+                for i in range(0, len(page), 4):
+                    yield page[i:i + 4]
+        
+        log = BankRateImportLog.objects.create(import_type='scheduled', status='in_progress')
+        stats = import_incremental(source=FakeSource(), import_log=log)
+        self.assertEqual(stats['new'], 10)
+        self.assertEqual(BankExchangeRate.objects.count(), 10)
+        log.refresh_from_db()
+        self.assertEqual(log.last_entry_key, 'k009')
+        
+        latest = BankExchangeRate.objects.get(entry_id='k009_Akbank_USDTRY')
+        self.assertEqual(latest.previous_buy_rate, Decimal('32.58'))
+        self.assertIsNotNone(latest.spread)
+        
+        entries.append(('k010', self._entry(10, 32.7)))
+        source = FakeSource()
+        stats = import_incremental(source=source, import_log=BankRateImportLog.objects.create(import_type='scheduled'))
+        self.assertEqual(source.start_keys, ['k009'])
+        self.assertEqual(stats['new'], 1)
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(BankExchangeRate.objects.count(), 11)
+
+
+class RatePublisherTests(TestCase):
+    """Test the change-only, throttled rate fan-out"""
+
+    class FakeLayer:
+        def __init__(self):
+            self.sent = []
+
+        async def group_send(self, group, message):
+            self.sent.append((group, message['data']['rate']['rate']))
+
+    def test_publishes_changes_only_and_coalesces(self):
+        """Unchanged rates are dropped and a burst sends only its newest rate"""
+        import time
+        from .broadcast import RatePublisher, pair_group
+
+        layer = self.FakeLayer()
+        publisher = RatePublisher(min_interval=0.05, channel_layer=layer)
+        now = timezone.now()
+
+        self.assertTrue(publisher.publish('USD', 'TRY', {'rate': 32.5}, timestamp=now))
+        publisher.publish('USD', 'TRY', {'rate': 32.5}, timestamp=now)
+        for i in range(1, 6):
+            publisher.publish('USD', 'TRY', {'rate': 32.5 + i / 10}, timestamp=now + timedelta(seconds=i))
+        self.assertFalse(publisher.publish('USD', 'TRY', {'rate': 1.0}, timestamp=now))
+
+        time.sleep(0.3)
+        group = pair_group('USD', 'TRY')
+        self.assertEqual(layer.sent, [(group, 32.5), (group, 33.0)])
+        self.assertEqual(publisher.stats['unchanged'], 1)
+        self.assertEqual(publisher.stats['stale'], 1)
+
+
+class BankRateExportTests(APITestCase):
+    """Test the streaming bank rate export"""
+
+    @staticmethod
+    def _rows(count):
+        from datetime import date
+        day = date(2024, 1, 1)
+        start = timezone.now()
+        rates = [Decimal('32.5') + Decimal(i) / 100 for i in range(100)]
+        for i in range(count):
+            buy = rates[i % 100]
+            yield (day, start, 'Akbank', 'USDTRY', buy, buy + 1, Decimal('1'), Decimal('3.0769'))
+
+    def test_multi_million_row_export_has_bounded_rss(self):
+        """3M rows stream through with statistics and RSS stays flat"""
+        import resource
+        from .bank_export import RateStatistics, export_chunks
+
+        rows = 3_000_000
+        statistics = RateStatistics()
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        total = 0
+        for chunk in export_chunks('csv', self._rows(rows), statistics):
+            total += len(chunk)
+        growth_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+
+        self.assertGreater(total, rows * 50)
+        self.assertEqual(statistics.count, rows)
+        self.assertEqual(statistics.as_dict()['min_buy'], Decimal('32.5'))
+        self.assertEqual(statistics.as_dict()['max_sell'], Decimal('34.49'))
+        self.assertLess(growth_kb, 64 * 1024)
+
+    def test_xlsx_splits_sheets_and_appends_statistics(self):
+        """The streamed workbook is a valid zip with one sheet per row block"""
+        import io
+        import zipfile
+        from . import bank_export
+
+        with patch.object(bank_export, 'XLSX_MAX_ROWS', 4):
+            data = b''.join(bank_export.export_chunks('excel', self._rows(10), bank_export.RateStatistics()))
+
+        workbook = zipfile.ZipFile(io.BytesIO(data))
+        self.assertIn('xl/worksheets/sheet4.xml', workbook.namelist())
+        self.assertIn(b'name="Bank Rates 3"', workbook.read('xl/workbook.xml'))
+        self.assertIn(b'Average Buy Rate', workbook.read('xl/worksheets/sheet4.xml'))
+        self.assertEqual(workbook.read('xl/worksheets/sheet3.xml').count(b'<row>'), 3)
+
+    def test_gzip_ndjson_endpoint(self):
+        """The endpoint streams gzip-encoded NDJSON with a statistics line"""
+        import gzip
+        from .models import BankExchangeRate
+
+        now = timezone.now()
+        for i, bank in enumerate(['Akbank', 'Garanti']):
+            BankExchangeRate.objects.create(
+                entry_id=f'e{i}', bank=bank, currency_pair='USDTRY',
+                buy_rate=Decimal('32.5') + i, sell_rate=Decimal('32.7') + i,
+                date=now.date(), timestamp=now
+            )
+
+        user = User.objects.create_user(username='exporter', password='testpass')
+        self.client.force_authenticate(user=user)
+        url = reverse('currencies:bankrate-export')
+        response = self.client.post(
+            url, {'format': 'ndjson', 'include_statistics': True, 'gzip': True}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['bank'], 'Akbank')
+        summary = json.loads(lines[-1])
+        self.assertEqual(summary['count'], 2)
+        self.assertEqual(Decimal(summary['statistics']['avg_buy']), Decimal('33.0'))
+
+
 class CurrencyServiceTests(TestCase):
     """Test currency services"""
     
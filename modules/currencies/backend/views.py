@@ -8,6 +8,7 @@ from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from rest_framework.pagination import PageNumberPagination
 from django.core.cache import cache
+from django.http import StreamingHttpResponse
 from django.db.models import Q, Sum, Avg, Count, F, Max, Min
 from django.db import transaction
 from django.utils import timezone
@@ -37,6 +38,11 @@ from .serializers import (
 )
 # from .services import CurrencyService, TCMBService, CoinGeckoService  # TODO: Fix services imports
 from .permissions import IsOwnerOrReadOnly
+from .bank_export import (
+    CONTENT_TYPES as EXPORT_CONTENT_TYPES, EXTENSIONS as EXPORT_EXTENSIONS,
+    RateStatistics, export_chunks, export_rows
+)
+from core.system.logging.backend.export import gzip_chunks
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -1039,9 +1045,7 @@ class ChartDataViewSet(viewsets.ViewSet):
         Timeframes: 1H, 4H, 1D, 1W, 1M, 3M, 6M, 1Y, ALL
         Currency pairs: USDTRY, EURTRY, XAUTRY, etc.
         """
-        from django.db.models import Max, Min, Avg
-        from django.db.models.functions import TruncHour, TruncDay, TruncWeek, TruncMonth
-        import pytz
+        from .ohlc import series_cache, epoch_seconds, to_candles
         
         # Validate parameters
         valid_timeframes = ['1H', '4H', '1D', '1W', '1M', '3M', '6M', '1Y', 'ALL']
@@ -1069,7 +1073,6 @@ class ChartDataViewSet(viewsets.ViewSet):
             return Response(cached_data)
         
         # Determine date range
-        istanbul_tz = pytz.timezone('Europe/Istanbul')
         end_date = timezone.now()
         
         if timeframe == '1H':
@@ -1097,76 +1100,20 @@ class ChartDataViewSet(viewsets.ViewSet):
             start_date = end_date - timedelta(days=365)
             interval = 'day'
         else:  # ALL
-            start_date = BankExchangeRate.objects.filter(
-                currency_pair=currency_pair
-            ).earliest('timestamp').timestamp
+            start_date = None
             interval = 'day'
         
-        # Query data
-        queryset = BankExchangeRate.objects.filter(
-            currency_pair=currency_pair,
-            timestamp__gte=start_date,
-            timestamp__lte=end_date
+        # Resample the cached price arrays (true first/last sample per candle)
+        series = series_cache.get(currency_pair, bank)
+        local_tz = timezone.get_current_timezone()
+        candles = series.ohlc(
+            interval,
+            start_ts=epoch_seconds(start_date) if start_date else None,
+            end_ts=epoch_seconds(end_date),
+            field='buy',
+            utc_offset=int(timezone.localtime(end_date).utcoffset().total_seconds())
         )
-        
-        if bank:
-            queryset = queryset.filter(bank=bank)
-        
-        # Group and aggregate based on interval
-        if interval == 'hour':
-            queryset = queryset.annotate(
-                period=TruncHour('timestamp')
-            )
-        elif interval == '4hour':
-            # Custom 4-hour grouping
-            queryset = queryset.extra(
-                select={'period': "DATE_TRUNC('hour', timestamp) - INTERVAL '1 hour' * (EXTRACT(HOUR FROM timestamp)::INT % 4)"}
-            )
-        elif interval == 'day':
-            queryset = queryset.annotate(
-                period=TruncDay('timestamp')
-            )
-        elif interval == 'week':
-            queryset = queryset.annotate(
-                period=TruncWeek('timestamp')
-            )
-        elif interval == 'month':
-            queryset = queryset.annotate(
-                period=TruncMonth('timestamp')
-            )
-        
-        # Aggregate OHLC data
-        ohlc_data = []
-        
-        if interval != '4hour':
-            grouped = queryset.values('period').annotate(
-                open=Avg('buy_rate'),  # Using average as approximation
-                high=Max('buy_rate'),
-                low=Min('buy_rate'),
-                close=Avg('buy_rate'),  # Last value would be better
-                volume=Count('id')
-            ).order_by('period')
-        else:
-            # Handle 4-hour grouping differently
-            grouped = queryset.values('period').annotate(
-                open=Avg('buy_rate'),
-                high=Max('buy_rate'),
-                low=Min('buy_rate'),
-                close=Avg('buy_rate'),
-                volume=Count('id')
-            ).order_by('period')
-        
-        # Format for chart library
-        for item in grouped:
-            if item['period']:
-                ohlc_data.append({
-                    'time': item['period'].isoformat(),
-                    'open': float(item['open'] or 0),
-                    'high': float(item['high'] or 0),
-                    'low': float(item['low'] or 0),
-                    'close': float(item['close'] or 0),
-                    'volume': item['volume']
-                })
+        ohlc_data = to_candles(candles, local_tz)
         
         result = {
             'currency_pair': currency_pair,
@@ -1187,7 +1134,7 @@ class ChartDataViewSet(viewsets.ViewSet):
         """
         Get line chart data for simple price visualization
         """
-        import pytz
+        from .ohlc import series_cache, epoch_seconds, to_points
         
         # Validate parameters
         valid_timeframes = ['1H', '4H', '1D', '1W', '1M', '3M', '6M', '1Y', 'ALL']
@@ -1232,31 +1179,18 @@ class ChartDataViewSet(viewsets.ViewSet):
         if timeframe != 'ALL':
             start_date = end_date - timeframe_map[timeframe]
         else:
-            start_date = BankExchangeRate.objects.filter(
-                currency_pair=currency_pair
-            ).earliest('timestamp').timestamp
-        
-        # Query data
-        queryset = BankExchangeRate.objects.filter(
-            currency_pair=currency_pair,
-            timestamp__gte=start_date,
-            timestamp__lte=end_date
+            start_date = None
+        
+        # Get data points from the cached price arrays
+        series = series_cache.get(currency_pair, bank)
+        data_points = to_points(
+            series,
+            epoch_seconds(start_date) if start_date else None,
+            epoch_seconds(end_date),
+            'buy' if rate_type == 'buy' else 'sell',
+            timezone.get_current_timezone()
         )
         
-        if bank:
-            queryset = queryset.filter(bank=bank)
-        
-        # Get data points
-        data_points = []
-        rate_field = 'buy_rate' if rate_type == 'buy' else 'sell_rate'
-        
-        for item in queryset.order_by('timestamp'):
-            data_points.append({
-                'time': item.timestamp.isoformat(),
-                'value': float(getattr(item, rate_field)),
-                'bank': item.bank
-            })
-        
         result = {
             'currency_pair': currency_pair,
             'timeframe': timeframe,
@@ -1348,10 +1282,15 @@ class ChartDataViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='indicators/(?P<currency_pair>[^/]+)')
     def technical_indicators(self, request, currency_pair=None):
         """
-        Calculate technical indicators (SMA, EMA, RSI, etc.)
+        Calculate technical indicators (SMA, EMA, RSI, Bollinger, MACD)
+        
+        Indicators are computed once over the cached price arrays and then
+        updated incrementally as new rates arrive (see indicators.py).
+        Bollinger rows add 'upper'/'lower'; MACD (12/26/9, period is
+        ignored) adds 'signal'/'histogram'.
         """
-        import numpy as np
-        from decimal import Decimal
+        from .ohlc import epoch_seconds
+        from .indicators import INDICATORS, indicator_cache, to_points
         
         valid_pairs = ['USDTRY', 'EURTRY', 'XAUTRY', 'GBPTRY', 'CHFTRY', 'JPYTRY']
         if currency_pair not in valid_pairs:
@@ -1363,102 +1302,32 @@ class ChartDataViewSet(viewsets.ViewSet):
         # Parameters
         bank = request.query_params.get('bank')
         period = int(request.query_params.get('period', 14))
-        indicator = request.query_params.get('indicator', 'sma')  # sma, ema, rsi
+        indicator = request.query_params.get('indicator', 'sma')  # sma, ema, rsi, bollinger, macd
         
-        # Get data
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=period * 3)  # Get extra data for calculations
-        
-        queryset = BankExchangeRate.objects.filter(
-            currency_pair=currency_pair,
-            timestamp__gte=start_date,
-            timestamp__lte=end_date
-        )
-        
-        if bank:
-            queryset = queryset.filter(bank=bank)
+        if indicator not in INDICATORS:
+            return Response(
+                {'error': f'Invalid indicator. Valid options: {", ".join(INDICATORS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if period < 1:
+            return Response(
+                {'error': 'Period must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get prices
-        prices = []
-        timestamps = []
+        end_date = timezone.now()
+        start_date = end_date - timedelta(days=period * 3)
         
-        for item in queryset.order_by('timestamp'):
-            prices.append(float(item.buy_rate))
-            timestamps.append(item.timestamp.isoformat())
+        series = indicator_cache.get(currency_pair, bank, indicator, period)
+        window = series.window(epoch_seconds(start_date), epoch_seconds(end_date))
         
-        if len(prices) < period:
+        if not len(window[0]):
             return Response(
                 {'error': f'Insufficient data for {period} period calculation'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Calculate indicators
-        result_data = []
-        
-        if indicator == 'sma':
-            # Simple Moving Average
-            sma_values = []
-            for i in range(period - 1, len(prices)):
-                sma = np.mean(prices[i - period + 1:i + 1])
-                sma_values.append({
-                    'time': timestamps[i],
-                    'value': float(sma),
-                    'price': prices[i]
-                })
-            result_data = sma_values
-            
-        elif indicator == 'ema':
-            # Exponential Moving Average
-            multiplier = 2 / (period + 1)
-            ema_values = []
-            
-            # Start with SMA for first EMA value
-            ema = np.mean(prices[:period])
-            ema_values.append({
-                'time': timestamps[period - 1],
-                'value': float(ema),
-                'price': prices[period - 1]
-            })
-            
-            # Calculate EMA for remaining values
-            for i in range(period, len(prices)):
-                ema = (prices[i] * multiplier) + (ema * (1 - multiplier))
-                ema_values.append({
-                    'time': timestamps[i],
-                    'value': float(ema),
-                    'price': prices[i]
-                })
-            result_data = ema_values
-            
-        elif indicator == 'rsi':
-            # Relative Strength Index
-            deltas = np.diff(prices)
-            seed = deltas[:period]
-            up = seed[seed >= 0].sum() / period
-            down = -seed[seed < 0].sum() / period
-            rs = up / down if down != 0 else 100
-            rsi_values = [{'time': timestamps[period], 'value': 100 - (100 / (1 + rs)), 'price': prices[period]}]
-            
-            for i in range(period, len(prices) - 1):
-                delta = deltas[i]
-                if delta > 0:
-                    upval = delta
-                    downval = 0
-                else:
-                    upval = 0
-                    downval = -delta
-                
-                up = (up * (period - 1) + upval) / period
-                down = (down * (period - 1) + downval) / period
-                rs = up / down if down != 0 else 100
-                rsi = 100 - (100 / (1 + rs))
-                
-                rsi_values.append({
-                    'time': timestamps[i + 1],
-                    'value': float(rsi),
-                    'price': prices[i + 1]
-                })
-            result_data = rsi_values
+        result_data = to_points(window, timezone.get_current_timezone())
         
         result = {
             'currency_pair': currency_pair,
@@ -1756,7 +1625,11 @@ class BankExchangeRateViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['post'])
     def export(self, request):
         """
-        Export bank rates to CSV or Excel
+        Export bank rates to CSV, JSON, NDJSON or Excel
+
+        The response is streamed from a server-side cursor and statistics are
+        accumulated in the same pass, so memory use does not grow with the
+        number of rows. gzip=true compresses the body (Content-Encoding: gzip).
         """
         serializer = BankRateExportSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -1767,6 +1640,7 @@ class BankExchangeRateViewSet(viewsets.ReadOnlyModelViewSet):
         banks = serializer.validated_data.get('banks', [])
         currency_pairs = serializer.validated_data.get('currency_pairs', [])
         include_statistics = serializer.validated_data.get('include_statistics', False)
+        compress = serializer.validated_data.get('gzip', False)
         
         # Build query
         queryset = BankExchangeRate.objects.all()
@@ -1782,118 +1656,21 @@ class BankExchangeRateViewSet(viewsets.ReadOnlyModelViewSet):
         
         queryset = queryset.order_by('date', 'timestamp', 'bank', 'currency_pair')
         
-        if export_format == 'json':
-            # Return JSON response
-            data = list(queryset.values(
-                'date', 'timestamp', 'bank', 'currency_pair',
-                'buy_rate', 'sell_rate', 'spread', 'spread_percentage'
-            ))
-            
-            response_data = {
-                'data': data,
-                'count': len(data)
-            }
-            
-            if include_statistics:
-                response_data['statistics'] = {
-                    'avg_buy': queryset.aggregate(Avg('buy_rate'))['buy_rate__avg'],
-                    'avg_sell': queryset.aggregate(Avg('sell_rate'))['sell_rate__avg'],
-                    'min_buy': queryset.aggregate(Min('buy_rate'))['buy_rate__min'],
-                    'max_sell': queryset.aggregate(Max('sell_rate'))['sell_rate__max'],
-                }
-            
-            return Response(response_data)
+        statistics = RateStatistics() if include_statistics else None
+        chunks = export_chunks(export_format, export_rows(queryset), statistics)
         
-        elif export_format == 'csv':
-            # Generate CSV
-            import csv
-            from django.http import HttpResponse
-            
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="bank_rates_{timezone.now().date()}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow([
-                'Date', 'Timestamp', 'Bank', 'Currency Pair',
-                'Buy Rate', 'Sell Rate', 'Spread', 'Spread %'
-            ])
-            
-            for rate in queryset:
-                writer.writerow([
-                    rate.date,
-                    rate.timestamp,
-                    rate.bank,
-                    rate.currency_pair,
-                    rate.buy_rate,
-                    rate.sell_rate,
-                    rate.spread,
-                    rate.spread_percentage
-                ])
-            
-            if include_statistics:
-                writer.writerow([])
-                writer.writerow(['Statistics'])
-                writer.writerow(['Average Buy Rate', queryset.aggregate(Avg('buy_rate'))['buy_rate__avg']])
-                writer.writerow(['Average Sell Rate', queryset.aggregate(Avg('sell_rate'))['sell_rate__avg']])
-                writer.writerow(['Min Buy Rate', queryset.aggregate(Min('buy_rate'))['buy_rate__min']])
-                writer.writerow(['Max Sell Rate', queryset.aggregate(Max('sell_rate'))['sell_rate__max']])
-            
-            return response
+        # XLSX is already deflate-compressed
+        compress = compress and export_format != 'excel'
+        if compress:
+            chunks = gzip_chunks(chunks)
         
-        elif export_format == 'excel':
-            # Generate Excel file
-            try:
-                import openpyxl
-                from openpyxl import Workbook
-                from django.http import HttpResponse
-                
-                wb = Workbook()
-                ws = wb.active
-                ws.title = 'Bank Rates'
-                
-                # Headers
-                headers = [
-                    'Date', 'Timestamp', 'Bank', 'Currency Pair',
-                    'Buy Rate', 'Sell Rate', 'Spread', 'Spread %'
-                ]
-                ws.append(headers)
-                
-                # Data
-                for rate in queryset:
-                    ws.append([
-                        rate.date,
-                        rate.timestamp,
-                        rate.bank,
-                        rate.currency_pair,
-                        float(rate.buy_rate),
-                        float(rate.sell_rate),
-                        float(rate.spread) if rate.spread else None,
-                        float(rate.spread_percentage) if rate.spread_percentage else None
-                    ])
-                
-                # Statistics sheet
-                if include_statistics:
-                    stats_ws = wb.create_sheet('Statistics')
-                    stats_ws.append(['Metric', 'Value'])
-                    stats_ws.append(['Average Buy Rate', float(queryset.aggregate(Avg('buy_rate'))['buy_rate__avg'])])
-                    stats_ws.append(['Average Sell Rate', float(queryset.aggregate(Avg('sell_rate'))['sell_rate__avg'])])
-                    stats_ws.append(['Min Buy Rate', float(queryset.aggregate(Min('buy_rate'))['buy_rate__min'])])
-                    stats_ws.append(['Max Sell Rate', float(queryset.aggregate(Max('sell_rate'))['sell_rate__max'])])
-                
-                # Save to response
-                response = HttpResponse(
-                    content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                )
-                response['Content-Disposition'] = f'attachment; filename="bank_rates_{timezone.now().date()}.xlsx"'
-                wb.save(response)
-                
-                return response
-                
-            except ImportError:
-                return Response(
-                    {'error': 'Excel export requires openpyxl package'},
-                    status=status.HTTP_501_NOT_IMPLEMENTED
-                )
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="bank_rates_{timezone.now().date()}.{EXPORT_EXTENSIONS[export_format]}"'
+        )
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        return response
     
     @action(detail=False, methods=['get'])
     def import_logs(self, request):
@@ -23,6 +23,8 @@ from django.utils import timezone
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
+from .image_context import ImageContext
+
 logger = logging.getLogger('documents.analysis')
 
 
@@ -89,7 +91,7 @@ class OCRAnalysisService:
         else:
             return obj
 
-    def analyze_document(self, document, force_refresh: bool = False, methods_to_run: list = None, max_workers: int = 2) -> Dict:
+    def analyze_document(self, document, force_refresh: bool = False, methods_to_run: list = None, max_workers: int = None) -> Dict:
         """
         Run OCR methods on a document (fast methods by default, or specified methods)
 
@@ -101,7 +103,9 @@ class OCRAnalysisService:
             force_refresh: If True, re-run analysis even if results exist in database
             methods_to_run: List of methods to run (default: ['paddleocr'] for fast initial load)
                           Available methods: 'paddleocr', 'tesseract', 'llama_vision', 'trocr', 'donut', 'layoutlmv3', 'surya', 'doctr', 'easyocr', 'ocrmypdf', 'hybrid'
-            max_workers: Maximum number of concurrent workers (default: 2, max: 5)
+            max_workers: Maximum number of methods dispatched at once (default: all requested);
+                         the method executor's lanes and memory admission decide what actually
+                         runs concurrently
 
         Returns:
             Dictionary with analysis results for requested methods
@@ -127,9 +131,27 @@ class OCRAnalysisService:
         logger.info(f"Running fresh analysis for document {document_id}")
         analysis_start_time = time.time()  # Track total analysis time
 
+        # One read + decode of the file, shared by fingerprinting, quality
+        # assessment, preprocessing and every engine below
+        image = ImageContext(document.file_path.path)
+
+        # Results of identical images (re-uploads, other users) come from the content-addressed cache
+        from .result_cache import result_cache
+        fingerprint = result_cache.fingerprint(image)
+        cached_results = {}
+        for method_name in methods_to_run:
+            cached = result_cache.get(fingerprint, method_name)
+            if cached is not None:
+                cached_results[method_name] = {**cached, 'from_result_cache': True}
+        if cached_results:
+            logger.info(f"Result cache hits for {document_id}: {', '.join(cached_results)}")
+
         # Step 1: Assess image quality and get OCR recommendation
-        image_path = document.file_path.path
-        quality_assessment = self.quality_service.assess_quality(image_path)
+        quality_assessment = result_cache.get(fingerprint, 'quality_assessment')
+        if quality_assessment is None:
+            quality_assessment = self.quality_service.assess_quality(image)
+            if quality_assessment.get('success'):
+                result_cache.put(fingerprint, 'quality_assessment', self._make_json_serializable(quality_assessment))
 
         logger.info(f"Quality assessment for {document_id}:")
         logger.info(f"  - Quality level: {quality_assessment.get('quality_level', 'unknown')}")
@@ -138,27 +160,24 @@ class OCRAnalysisService:
         logger.info(f"  - Contrast: {quality_assessment.get('contrast_score', 0):.2f}")
         logger.info(f"  - DPI: {quality_assessment.get('dpi', 0)}")
 
-        # Step 2: Apply preprocessing if needed
-        preprocessed_path = None
-        if quality_assessment.get('success') and any(quality_assessment.get('preprocessing_needed', {}).values()):
+        # Step 2: Apply preprocessing if needed (kept in memory on the image context)
+        preprocessed = False
+        needs_engines = len(cached_results) < len(methods_to_run)
+        if needs_engines and quality_assessment.get('success') and any(quality_assessment.get('preprocessing_needed', {}).values()):
             logger.info("Applying preprocessing to improve OCR quality...")
-            preprocessing_result = self.quality_service.preprocess_image(image_path)
+            preprocessing_result = self.quality_service.preprocess_image(image, quality=quality_assessment)
 
             if preprocessing_result.get('success'):
-                preprocessed_path = preprocessing_result['preprocessed_path']
+                preprocessed = True
                 logger.info(f"Preprocessing applied: {preprocessing_result['preprocessing_applied']}")
-                logger.info(f"Using preprocessed image: {preprocessed_path}")
             else:
                 logger.warning(f"Preprocessing failed: {preprocessing_result.get('error')}")
 
-        # Use preprocessed image if available, otherwise use original
-        ocr_image_path = preprocessed_path if preprocessed_path else image_path
-
         results = {
             'document_id': document_id,
             'filename': document.original_filename,
             'quality_assessment': quality_assessment,  # Add quality info to results
-            'preprocessed': preprocessed_path is not None,
+            'preprocessed': preprocessed,
             'paddleocr': {},
             'tesseract': {},
             'llama_vision': {},
@@ -191,7 +210,10 @@ class OCRAnalysisService:
             'ocrmypdf': self._analyze_ocrmypdf
         }
 
-        # Execute selected methods in parallel using ThreadPoolExecutor
+        # Each method runs in its executor lane (process pool / thread / native slot)
+        from .method_executor import method_executor
+        if not max_workers:
+            max_workers = max(1, len(methods_to_run))
         logger.info(f"Running {len(methods_to_run)} methods in parallel: {', '.join(methods_to_run)} (max_workers={max_workers})")
 
         # Send WebSocket messages for queued methods
@@ -223,11 +245,17 @@ class OCRAnalysisService:
                     'timestamp': timezone.now().isoformat()
                 })
 
+                if method_name in cached_results:
+                    logger.info(f"[{method_name}] ♻️  Reused cached result")
+                    return method_name, cached_results[method_name]
+
                 analysis_func = method_map.get(method_name)
                 if analysis_func:
-                    result = method_name, analysis_func(document)
+                    result = method_name, method_executor.run(method_name, analysis_func, document, image)
                     method_elapsed = time.time() - method_start
                     logger.info(f"[{method_name}] ✅ Completed in {method_elapsed:.2f}s (wall clock)")
+                    if result[1].get('status') == 'success':
+                        result_cache.put(fingerprint, method_name, self._make_json_serializable(result[1]))
                     return result
                 else:
                     logger.warning(f"[{method_name}] ❌ Unknown method")
@@ -237,9 +265,9 @@ class OCRAnalysisService:
                 logger.error(f"[{method_name}] ❌ Failed after {method_elapsed:.2f}s: {e}")
                 return method_name, self._get_error_result(str(e))
 
-        # Execute methods in parallel (max 2 concurrent workers to avoid memory issues)
-        # Each deep learning model (TrOCR, LayoutLMv3, EasyOCR) can use 1-3GB RAM
-        # Running too many in parallel causes OOM crashes (exit code 251)
+        # Each deep learning model (TrOCR, LayoutLMv3, EasyOCR) can use 1-3GB RAM;
+        # running too many in parallel caused OOM crashes (exit code 251), so the
+        # executor's admission controller only starts methods whose memory fits
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit all method tasks
             future_to_method = {
@@ -344,6 +372,7 @@ class OCRAnalysisService:
 
         total_analysis_time = time.time() - analysis_start_time
         logger.info(f"✅ Analysis completed for document {document_id} in {total_analysis_time:.2f}s (wall clock time)")
+        logger.info(f"   Image read {image.bytes_read} bytes, decoded {image.decodes}x")
         logger.info(f"   Saved analysis results to database for document {document_id}")
 
         # Send WebSocket completion message
@@ -378,7 +407,7 @@ class OCRAnalysisService:
             'bottom_info': None
         }
 
-    def _analyze_tesseract(self, document) -> Dict:
+    def _analyze_tesseract(self, document, image=None) -> Dict:
         """Analyze using pure Tesseract OCR"""
         try:
             if not document.tesseract_text:
@@ -421,8 +450,10 @@ class OCRAnalysisService:
                 'processing_time': 0
             }
 
-    def _analyze_llama_vision(self, document) -> Dict:
+    def _analyze_llama_vision(self, document, image=None) -> Dict:
         """Analyze using Llama 3.2-Vision (Meta's primary vision model)"""
+        if image is None:
+            image = document.file_path.path
         try:
             from .ollama_service import OllamaService
 
@@ -457,7 +488,7 @@ class OCRAnalysisService:
             ollama.current_model = 'llama3.2-vision'
 
             # Load image as base64
-            image_base64 = self._load_image_as_base64(document.file_path.path)
+            image_base64 = self._load_image_as_base64(image)
             if not image_base64:
                 return {
                     'status': 'error',
@@ -504,11 +535,13 @@ class OCRAnalysisService:
             'processing_time': 0
             }
 
-    def _analyze_hybrid(self, document) -> Dict:
+    def _analyze_hybrid(self, document, image=None) -> Dict:
         """Analyze using Hybrid approach (PaddleOCR + Llama Vision parsing)"""
+        if image is None:
+            image = document.file_path.path
         try:
             from .ollama_service import OllamaService
-            from .paddleocr_service import PaddleOCRService
+            from .model_pool import model_pool
 
             # Get PaddleOCR text (run it inline if needed)
             paddle_text = None
@@ -519,11 +552,11 @@ class OCRAnalysisService:
             else:
                 # Run PaddleOCR inline to get the text
                 try:
-                    paddle = PaddleOCRService(lang='en', use_structure=False)
-                    if paddle.is_available():
-                        ocr_result = paddle.get_text_with_layout(document.file_path.path)
-                        if ocr_result:
-                            paddle_text = ocr_result if isinstance(ocr_result, str) else ocr_result.get('text', '')
+                    with model_pool.acquire('paddleocr') as paddle:
+                        if paddle.is_available():
+                            ocr_result = paddle.get_text_with_layout(image)
+                            if ocr_result:
+                                paddle_text = ocr_result if isinstance(ocr_result, str) else ocr_result.get('text', '')
                 except Exception as paddle_error:
                     logger.warning(f"Failed to run PaddleOCR for hybrid: {paddle_error}")
 
@@ -548,7 +581,7 @@ class OCRAnalysisService:
             ollama.current_model = 'llama3.2-vision'
 
             # Load image as base64
-            image_base64 = self._load_image_as_base64(document.file_path.path)
+            image_base64 = self._load_image_as_base64(image)
 
             # Run hybrid analysis (PaddleOCR text + image)
             start_time = time.time()
@@ -634,10 +667,12 @@ class OCRAnalysisService:
                 'fields_extracted': 0
             }
 
-    def _analyze_paddleocr(self, document) -> Dict:
+    def _analyze_paddleocr(self, document, image=None) -> Dict:
         """Analyze using PaddleOCR (multilingual OCR with 80+ language support)"""
+        if image is None:
+            image = document.file_path.path
         try:
-            from .paddleocr_service import PaddleOCRService
+            from .model_pool import model_pool
 
             # Check if already processed
             if hasattr(document, 'paddle_text') and document.paddle_text:
@@ -655,52 +690,51 @@ class OCRAnalysisService:
                     **findings
                 }
 
-            # Initialize PaddleOCR service with PP-Structure support
-            paddle = PaddleOCRService(lang='en', use_structure=True)
-
-            if not paddle.is_available():
-                return {
-                    'status': 'not_available',
-                    'text': '',
-                    'confidence': 0,
-                    'char_count': 0,
-                    'word_count': 0,
-                    'processing_time': 0,
-                    'found_store': False,
-                    'found_total': False,
-                    'found_date': False,
-                    'found_bottom': False,
-                    'error': 'PaddleOCR library not installed',
-                    'install_command': 'pip install paddleocr',
-                    'install_with_structure': 'pip install "paddleocr[structure]"',
-                    'note': 'Install PaddleOCR to enable this OCR method (80+ languages, layout analysis, table detection)'
-                }
+            # Warm PaddleOCR service with PP-Structure support from the model pool
+            with model_pool.acquire('paddleocr_structure') as paddle:
+                if not paddle.is_available():
+                    return {
+                        'status': 'not_available',
+                        'text': '',
+                        'confidence': 0,
+                        'char_count': 0,
+                        'word_count': 0,
+                        'processing_time': 0,
+                        'found_store': False,
+                        'found_total': False,
+                        'found_date': False,
+                        'found_bottom': False,
+                        'error': 'PaddleOCR library not installed',
+                        'install_command': 'pip install paddleocr',
+                        'install_with_structure': 'pip install "paddleocr[structure]"',
+                        'note': 'Install PaddleOCR to enable this OCR method (80+ languages, layout analysis, table detection)'
+                    }
 
-            # Try PP-Structure first if available
-            start_time = time.time()
-            text = None
-            confidence = 0
-            structure_result = None
-
-            if paddle.is_structure_available():
-                logger.info("Using PP-Structure for layout analysis")
-                structure_result = paddle.analyze_structure(document.file_path.path)
-                if structure_result.get('success'):
-                    text = structure_result.get('text', '')
-                    # Estimate confidence based on element detection
-                    confidence = 85 if structure_result.get('element_count', 0) > 0 else 50
-                    logger.info(f"PP-Structure found {structure_result.get('element_count', 0)} elements")
-                else:
-                    logger.warning(f"PP-Structure failed: {structure_result.get('error')}")
+                # Try PP-Structure first if available
+                start_time = time.time()
+                text = None
+                confidence = 0
+                structure_result = None
+
+                if paddle.is_structure_available():
+                    logger.info("Using PP-Structure for layout analysis")
+                    structure_result = paddle.analyze_structure(image)
+                    if structure_result.get('success'):
+                        text = structure_result.get('text', '')
+                        # Estimate confidence based on element detection
+                        confidence = 85 if structure_result.get('element_count', 0) > 0 else 50
+                        logger.info(f"PP-Structure found {structure_result.get('element_count', 0)} elements")
+                    else:
+                        logger.warning(f"PP-Structure failed: {structure_result.get('error')}")
 
-            # Fallback to basic OCR if structure analysis failed
-            ocr_result = None
-            if not text:
-                logger.info("Using basic PaddleOCR (structure not available or failed)")
-                ocr_result = paddle.get_text_with_layout(document.file_path.path)
-                if ocr_result:
-                    text = ocr_result if isinstance(ocr_result, str) else ocr_result.get('text', '')
-                    confidence = ocr_result.get('confidence', 0) if isinstance(ocr_result, dict) else 0
+                # Fallback to basic OCR if structure analysis failed
+                ocr_result = None
+                if not text:
+                    logger.info("Using basic PaddleOCR (structure not available or failed)")
+                    ocr_result = paddle.get_text_with_layout(image)
+                    if ocr_result:
+                        text = ocr_result if isinstance(ocr_result, str) else ocr_result.get('text', '')
+                        confidence = ocr_result.get('confidence', 0) if isinstance(ocr_result, dict) else 0
 
             processing_time = time.time() - start_time
 
@@ -1009,12 +1043,13 @@ class OCRAnalysisService:
 
         return count
 
-    def _load_image_as_base64(self, image_path: str, preprocess_for_vision: bool = True) -> Optional[str]:
+    def _load_image_as_base64(self, image_path, preprocess_for_vision: bool = True) -> Optional[str]:
         """
         Load image file and convert to base64
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file or ImageContext (the vision-ready
+                JPEG is then built once and shared, e.g. by llama_vision and hybrid)
             preprocess_for_vision: If True, preprocess image for vision models (RGB, resize, padding)
 
         Includes comprehensive error handling for file access issues
@@ -1022,7 +1057,10 @@ class OCRAnalysisService:
         try:
             import os
             from PIL import Image
-            import io
+
+            image = image_path if isinstance(image_path, ImageContext) else None
+            if image is not None:
+                image_path = image.path
 
             # Check if file exists
             if not os.path.exists(image_path):
@@ -1040,49 +1078,12 @@ class OCRAnalysisService:
                 logger.warning(f"Large image file ({file_size / 1024 / 1024:.1f}MB): {image_path}")
 
             if preprocess_for_vision:
-                # Preprocess image for vision models (GPT recommendations + pad-to-square)
-                img = Image.open(image_path)
-                logger.info(f"Original image: {img.size}, mode: {img.mode}")
-
-                # Convert to RGB if needed
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                    logger.info("Converted image to RGB")
-
-                # Step 1: Resize to optimal dimensions for vision models
-                # Reduced size for faster processing: max 800px on longest side
-                width, height = img.size
-                long_side = max(width, height)
-
-                # Scale down if too large
-                if long_side > 800:
-                    scale = 800 / long_side
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-                    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    logger.info(f"Resized image to {img.size}")
-                    width, height = img.size
-
-                # Step 2: Pad to square for better vision model performance
-                # This prevents aspect ratio distortion and improves OCR accuracy
-                target_size = max(width, height)
-
-                # Create a white canvas
-                padded_img = Image.new('RGB', (target_size, target_size), (255, 255, 255))
-
-                # Calculate padding to center the image
-                x_offset = (target_size - width) // 2
-                y_offset = (target_size - height) // 2
-
-                # Paste the original image onto the canvas
-                padded_img.paste(img, (x_offset, y_offset))
-                logger.info(f"Padded image to square: {padded_img.size}")
-
-                # Save to bytes with optimized quality (faster processing)
-                buffer = io.BytesIO()
-                padded_img.save(buffer, format='JPEG', quality=85)
-                image_data = buffer.getvalue()
-                logger.info(f"Preprocessed image size: {len(image_data)} bytes")
+                if image is not None:
+                    image_data = image.derive('vision_jpeg', lambda: self._vision_jpeg(image.pil))
+                else:
+                    image_data = self._vision_jpeg(Image.open(image_path))
+            elif image is not None:
+                image_data = image.raw
             else:
                 # Read raw image data
                 with open(image_path, 'rb') as f:
@@ -1104,37 +1105,86 @@ class OCRAnalysisService:
             logger.error(f"Unexpected error loading image {image_path}: {e}")
             return None
 
-    def _analyze_trocr(self, document) -> Dict:
+    def _vision_jpeg(self, img) -> bytes:
+        """Preprocess image for vision models (GPT recommendations + pad-to-square)"""
+        logger.info(f"Original image: {img.size}, mode: {img.mode}")
+
+        # Convert to RGB if needed
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+            logger.info("Converted image to RGB")
+
+        # Step 1: Resize to optimal dimensions for vision models
+        # Reduced size for faster processing: max 800px on longest side
+        width, height = img.size
+        long_side = max(width, height)
+
+        # Scale down if too large
+        if long_side > 800:
+            scale = 800 / long_side
+            new_width = int(width * scale)
+            new_height = int(height * scale)
+            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            logger.info(f"Resized image to {img.size}")
+            width, height = img.size
+
+        # Step 2: Pad to square for better vision model performance
+        # This prevents aspect ratio distortion and improves OCR accuracy
+        target_size = max(width, height)
+
+        # Create a white canvas
+        padded_img = Image.new('RGB', (target_size, target_size), (255, 255, 255))
+
+        # Calculate padding to center the image
+        x_offset = (target_size - width) // 2
+        y_offset = (target_size - height) // 2
+
+        # Paste the original image onto the canvas
+        padded_img.paste(img, (x_offset, y_offset))
+        logger.info(f"Padded image to square: {padded_img.size}")
+
+        # Save to bytes with optimized quality (faster processing)
+        buffer = io.BytesIO()
+        padded_img.save(buffer, format='JPEG', quality=85)
+        image_data = buffer.getvalue()
+        logger.info(f"Preprocessed image size: {len(image_data)} bytes")
+        return image_data
+
+    def _analyze_trocr(self, document, image=None) -> Dict:
         """
         Analyze using TrOCR (Transformer OCR for difficult fonts)
         Uses hybrid approach: PaddleOCR for line detection + TrOCR for text recognition
         This provides much better results than processing the entire image at once
         """
+        if image is None:
+            image = document.file_path.path
         try:
-            from .trocr_service import TrOCRService
-            from .paddleocr_service import PaddleOCRService
-            from PIL import Image
-
-            trocr = TrOCRService(language='tr')
-            if not trocr.is_available():
-                return {
-                    'status': 'error',
-                    'error': 'TrOCR not available (pip install transformers torch)',
-                    'char_count': 0,
-                    'word_count': 0,
-                'processing_time': 0
-                }
+            from .model_pool import model_pool
+
+            with model_pool.acquire('trocr') as trocr:
+                if not trocr.is_available():
+                    return {
+                        'status': 'error',
+                        'error': 'TrOCR not available (pip install transformers torch)',
+                        'char_count': 0,
+                        'word_count': 0,
+                    'processing_time': 0
+                    }
 
-            start_time = time.time()
+                start_time = time.time()
 
-            # Use PaddleOCR to detect text regions (bounding boxes)
-            logger.info("TrOCR: Using PaddleOCR for line detection")
-            paddle = PaddleOCRService(lang='en')
-            if paddle.is_available():
-                paddle.initialize_ocr()
-                paddle_result = paddle.process_image(document.file_path.path)
+                # Use PaddleOCR to detect text regions (bounding boxes)
+                # The pool lock order is always <model> -> paddleocr, never the reverse
+                logger.info("TrOCR: Using PaddleOCR for line detection")
+                paddle_result = None
+                with model_pool.acquire('paddleocr') as paddle:
+                    if paddle.is_available():
+                        paddle_result = paddle.process_image(image)
 
-                if paddle_result.get('success') and paddle_result.get('lines'):
+                if paddle_result is None:
+                    logger.warning("TrOCR: PaddleOCR not available, using full image processing")
+                    result = trocr.process_image(image)
+                elif paddle_result.get('success') and paddle_result.get('lines'):
                     lines = paddle_result['lines']
                     logger.info(f"TrOCR: Detected {len(lines)} text regions")
 
@@ -1151,13 +1201,10 @@ class OCRAnalysisService:
                             regions.append((int(x1), int(y1), int(x2), int(y2)))
 
                     # Process regions with TrOCR
-                    result = trocr.process_image_regions(document.file_path.path, regions)
+                    result = trocr.process_image_regions(image, regions)
                 else:
                     logger.warning("TrOCR: PaddleOCR detection failed, falling back to full image")
-                    result = trocr.process_image(document.file_path.path)
-            else:
-                logger.warning("TrOCR: PaddleOCR not available, using full image processing")
-                result = trocr.process_image(document.file_path.path)
+                    result = trocr.process_image(image)
 
             processing_time = time.time() - start_time
 
@@ -1205,24 +1252,26 @@ class OCRAnalysisService:
             'processing_time': 0
             }
 
-    def _analyze_donut(self, document) -> Dict:
+    def _analyze_donut(self, document, image=None) -> Dict:
         """Analyze using Donut (OCR-free document understanding)"""
+        if image is None:
+            image = document.file_path.path
         try:
-            from .donut_service import DonutService
-
-            donut = DonutService(language='tr')
-            if not donut.is_available():
-                return {
-                    'status': 'error',
-                    'error': 'Donut not available (pip install transformers torch)',
-                    'char_count': 0,
-                    'word_count': 0,
-                'processing_time': 0
-                }
+            from .model_pool import model_pool
+
+            with model_pool.acquire('donut') as donut:
+                if not donut.is_available():
+                    return {
+                        'status': 'error',
+                        'error': 'Donut not available (pip install transformers torch)',
+                        'char_count': 0,
+                        'word_count': 0,
+                    'processing_time': 0
+                    }
 
-            start_time = time.time()
-            result = donut.process_receipt(document.file_path.path)
-            processing_time = time.time() - start_time
+                start_time = time.time()
+                result = donut.process_receipt(image)
+                processing_time = time.time() - start_time
 
             if result.get('success'):
                 text = result.get('text', '')
@@ -1277,24 +1326,26 @@ class OCRAnalysisService:
             'processing_time': 0
             }
 
-    def _analyze_layoutlmv3(self, document) -> Dict:
+    def _analyze_layoutlmv3(self, document, image=None) -> Dict:
         """Analyze using LayoutLMv3 (layout-aware extraction)"""
+        if image is None:
+            image = document.file_path.path
         try:
-            from .layoutlmv3_service import LayoutLMv3Service
-
-            layoutlm = LayoutLMv3Service(language='tr')
-            if not layoutlm.is_available():
-                return {
-                    'status': 'error',
-                    'error': 'LayoutLMv3 not available (pip install transformers torch)',
-                    'char_count': 0,
-                    'word_count': 0,
-                'processing_time': 0
-                }
+            from .model_pool import model_pool
+
+            with model_pool.acquire('layoutlmv3') as layoutlm:
+                if not layoutlm.is_available():
+                    return {
+                        'status': 'error',
+                        'error': 'LayoutLMv3 not available (pip install transformers torch)',
+                        'char_count': 0,
+                        'word_count': 0,
+                    'processing_time': 0
+                    }
 
-            start_time = time.time()
-            result = layoutlm.process_with_paddleocr(document.file_path.path)
-            processing_time = time.time() - start_time
+                start_time = time.time()
+                result = layoutlm.process_with_paddleocr(image)
+                processing_time = time.time() - start_time
 
             if result.get('success'):
                 text = result.get('text', '')
@@ -1336,26 +1387,27 @@ class OCRAnalysisService:
             'processing_time': 0
             }
 
-    def _analyze_surya(self, document) -> Dict:
+    def _analyze_surya(self, document, image=None) -> Dict:
         """Analyze using Surya OCR (all-in-one solution with 90+ language support)"""
+        if image is None:
+            image = document.file_path.path
         try:
-            from .surya_service import SuryaOCRService
-
-            surya = SuryaOCRService()
-
-            # Check if Surya is available
-            if not surya.is_available():
-                return {
-                    'status': 'error',
-                    'error': 'Surya OCR not installed. Install with: pip install surya-ocr',
-                    'char_count': 0,
-                    'word_count': 0,
-                    'processing_time': 0
-                }
+            from .model_pool import model_pool
+
+            with model_pool.acquire('surya') as surya:
+                # Check if Surya is available
+                if not surya.is_available():
+                    return {
+                        'status': 'error',
+                        'error': 'Surya OCR not installed. Install with: pip install surya-ocr',
+                        'char_count': 0,
+                        'word_count': 0,
+                        'processing_time': 0
+                    }
 
-            start_time = time.time()
-            result = surya.process_image(document.file_path.path)
-            processing_time = time.time() - start_time
+                start_time = time.time()
+                result = surya.process_image(image)
+                processing_time = time.time() - start_time
 
             if result.get('success'):
                 text = result.get('text', '')
@@ -1399,15 +1451,17 @@ class OCRAnalysisService:
             'processing_time': 0
             }
 
-    def _analyze_doctr(self, document) -> Dict:
+    def _analyze_doctr(self, document, image=None) -> Dict:
         """Analyze using DocTR (modern PyTorch-based OCR)"""
+        if image is None:
+            image = document.file_path.path
         try:
-            from .doctr_service import DocTROCRService
+            from .model_pool import model_pool
 
-            doctr = DocTROCRService()
-            start_time = time.time()
-            result = doctr.process_image(document.file_path.path)
-            processing_time = time.time() - start_time
+            with model_pool.acquire('doctr') as doctr:
+                start_time = time.time()
+                result = doctr.process_image(image)
+                processing_time = time.time() - start_time
 
             if result.get('success'):
                 text = result.get('text', '')
@@ -1450,15 +1504,17 @@ class OCRAnalysisService:
             'processing_time': 0
             }
 
-    def _analyze_easyocr(self, document) -> Dict:
+    def _analyze_easyocr(self, document, image=None) -> Dict:
         """Analyze using EasyOCR (multilingual fallback OCR)"""
+        if image is None:
+            image = document.file_path.path
         try:
-            from .easyocr_service import EasyOCRService
+            from .model_pool import model_pool
 
-            easyocr = EasyOCRService()
-            start_time = time.time()
-            result = easyocr.process_image(document.file_path.path)
-            processing_time = time.time() - start_time
+            with model_pool.acquire('easyocr') as easyocr:
+                start_time = time.time()
+                result = easyocr.process_image(image)
+                processing_time = time.time() - start_time
 
             if result.get('success'):
                 text = result.get('text', '')
@@ -1502,14 +1558,17 @@ class OCRAnalysisService:
             'processing_time': 0
             }
 
-    def _analyze_ocrmypdf(self, document) -> Dict:
+    def _analyze_ocrmypdf(self, document, image=None) -> Dict:
         """Analyze using OCRMyPDF (PDF-optimized OCR with Tesseract backend)"""
+        if image is None:
+            image = document.file_path.path
         try:
             from .ocrmypdf_service import OCRMyPDFService
+            from .image_context import image_path
 
             ocrmypdf = OCRMyPDFService()
             start_time = time.time()
-            result = ocrmypdf.process_image(document.file_path.path)
+            result = ocrmypdf.process_image(image_path(image))
             processing_time = time.time() - start_time
 
             if result.get('success'):
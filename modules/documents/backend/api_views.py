@@ -614,7 +614,9 @@ def ocr_resume(request):
     """
     try:
         from django.core.cache import cache
+        from .ocr_queue import notify
         cache.delete('ocr_processing_paused')
+        notify()
 
         logger.info(f"OCR processing resumed by user {request.user.username}")
 
@@ -958,7 +960,7 @@ def run_analysis_methods(request, document_id):
         # Get requested methods
         methods_to_run = data.get('methods', [])
         force_refresh = data.get('force_refresh', False)
-        max_workers = data.get('max_workers', 2)  # Get user-defined max_workers (default: 2)
+        max_workers = data.get('max_workers')  # Optional cap; memory admission decides otherwise
 
         # Validate methods parameter
         if not methods_to_run or not isinstance(methods_to_run, list):
@@ -968,7 +970,7 @@ def run_analysis_methods(request, document_id):
             }, status=400)
 
         # Validate max_workers parameter
-        if not isinstance(max_workers, int) or max_workers < 1 or max_workers > 5:
+        if max_workers is not None and (not isinstance(max_workers, int) or max_workers < 1 or max_workers > 5):
             return JsonResponse({
                 'success': False,
                 'error': 'max_workers must be an integer between 1 and 5'
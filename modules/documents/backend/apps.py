@@ -31,6 +31,9 @@ class DocumentsConfig(AppConfig):
         # If you add signals in the future, uncomment:
         # from . import signals  # noqa
 
+        # Queue uploaded documents for background OCR
+        from . import ocr_queue  # noqa
+
     def _add_sdk_to_path(self):
         """Add UNIBOS SDK to Python path if not already there"""
         try:
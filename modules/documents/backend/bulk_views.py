@@ -15,7 +15,8 @@ import json
 import csv
 import logging
 
-from .models import Document
+from .models import Document, OCRJobPriority
+from .ocr_queue import enqueue
 from core.system.web_ui.backend.views import BaseUIView
 
 logger = logging.getLogger('documents.bulk')
@@ -57,7 +58,7 @@ class BulkDeleteView(LoginRequiredMixin, View):
 
 
 class BulkReprocessView(LoginRequiredMixin, View):
-    """Handle bulk OCR reprocessing"""
+    """Queue selected documents for OCR reprocessing (bulk priority)"""
 
     def post(self, request):
         try:
@@ -74,52 +75,16 @@ class BulkReprocessView(LoginRequiredMixin, View):
                 is_deleted=False
             )
 
-            processed = 0
-            failed = 0
-
-            # Import OCR processor
-            from .ocr_service import OCRProcessor
-            ocr_processor = OCRProcessor()
+            with transaction.atomic():
+                ids = list(documents.values_list('id', flat=True))
+                Document.objects.filter(id__in=ids).update(processing_status='processing')
+                enqueue(ids, OCRJobPriority.BULK)
 
-            # Process each document
-            for doc in documents:
-                try:
-                    # Process with OCR
-                    result = ocr_processor.process_document(
-                        doc.file_path.path,
-                        document_type=doc.document_type,
-                        force_ocr=True,
-                        document_instance=doc
-                    )
-
-                    if result and result.get('success'):
-                        # OCR processor already saved the document with dual results
-                        # Just refresh from DB to get updated values
-                        doc.refresh_from_db()
-
-                        # Check if document was deleted during processing
-                        if doc.is_deleted:
-                            logger.info(f"document {doc.id} was deleted during processing, skipping")
-                            continue
-
-                        processed += 1
-                    else:
-                        doc.processing_status = 'failed'
-                        doc.save()
-                        failed += 1
-
-                except Exception as e:
-                    logger.error(f"error processing document {doc.id}: {e}")
-                    doc.processing_status = 'failed'
-                    doc.save()
-                    failed += 1
-
-            logger.info(f"user {request.user.id} processed {processed} documents, {failed} failed")
+            logger.info(f"user {request.user.id} queued {len(ids)} documents for reprocessing")
 
             return JsonResponse({
                 'success': True,
-                'processed': processed,
-                'failed': failed
+                'queued': len(ids)
             })
 
         except Exception as e:
@@ -128,7 +93,7 @@ class BulkReprocessView(LoginRequiredMixin, View):
 
 
 class BulkReprocessPendingView(LoginRequiredMixin, View):
-    """Handle bulk OCR reprocessing for all pending documents"""
+    """Queue all pending documents for OCR (bulk priority)"""
 
     def post(self, request):
         try:
@@ -139,52 +104,16 @@ class BulkReprocessPendingView(LoginRequiredMixin, View):
                 processing_status='pending'
             )
 
-            processed = 0
-            failed = 0
-
-            # Import OCR processor
-            from .ocr_service import OCRProcessor
-            ocr_processor = OCRProcessor()
+            with transaction.atomic():
+                ids = list(documents.values_list('id', flat=True))
+                Document.objects.filter(id__in=ids).update(processing_status='processing')
+                enqueue(ids, OCRJobPriority.BULK)
 
-            # Process each document
-            for doc in documents:
-                try:
-                    # Process with OCR
-                    result = ocr_processor.process_document(
-                        doc.file_path.path,
-                        document_type=doc.document_type,
-                        force_ocr=True,
-                        document_instance=doc
-                    )
-
-                    if result and result.get('success'):
-                        # OCR processor already saved the document with dual results
-                        # Just refresh from DB to get updated values
-                        doc.refresh_from_db()
-
-                        # Check if document was deleted during processing
-                        if doc.is_deleted:
-                            logger.info(f"document {doc.id} was deleted during processing, skipping")
-                            continue
-
-                        processed += 1
-                    else:
-                        doc.processing_status = 'failed'
-                        doc.save()
-                        failed += 1
-
-                except Exception as e:
-                    logger.error(f"error processing document {doc.id}: {e}")
-                    doc.processing_status = 'failed'
-                    doc.save()
-                    failed += 1
-
-            logger.info(f"user {request.user.id} processed {processed} pending documents, {failed} failed")
+            logger.info(f"user {request.user.id} queued {len(ids)} pending documents")
 
             return JsonResponse({
                 'success': True,
-                'processed': processed,
-                'failed': failed
+                'queued': len(ids)
             })
 
         except Exception as e:
@@ -9,6 +9,8 @@ import logging
 from typing import Dict, List, Optional
 import re
 
+from .image_context import ImageContext
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,12 +38,12 @@ class DocTROCRService:
             logger.error(f"Failed to load DocTR model: {e}")
             raise
 
-    def process_image(self, image_path: str) -> Dict:
+    def process_image(self, image_path) -> Dict:
         """
         Process image with DocTR OCR
 
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file or ImageContext
 
         Returns:
             Dictionary containing OCR results
@@ -49,8 +51,8 @@ class DocTROCRService:
         try:
             from doctr.io import DocumentFile
 
-            # Load image using DocTR's document loader
-            doc = DocumentFile.from_images(image_path)
+            # Load image using DocTR's document loader (from the already read bytes when shared)
+            doc = DocumentFile.from_images(image_path.raw if isinstance(image_path, ImageContext) else image_path)
 
             # Run OCR
             result = self.model(doc)
@@ -6,10 +6,9 @@ Directly extracts structured data (JSON) from document images without OCR
 
 import logging
 from typing import Dict, Optional
-import os
 import json
-from PIL import Image
 import re
+from .image_context import image_exists, load_rgb
 from .receipt_field_extractor import ReceiptFieldExtractor
 
 logger = logging.getLogger('documents.donut')
@@ -100,13 +99,13 @@ class DonutService:
             self.available = False
             return False
 
-    def process_receipt(self, image_path: str) -> Dict:
+    def process_receipt(self, image_path) -> Dict:
         """
         Process receipt image with Donut (OCR-free)
         Extracts structured data directly as JSON
 
         Args:
-            image_path: Path to receipt image
+            image_path: Path to receipt image or ImageContext
 
         Returns:
             Dictionary with structured receipt data
@@ -131,7 +130,7 @@ class DonutService:
 
         try:
             # Check if file exists
-            if not os.path.exists(image_path):
+            if not image_exists(image_path):
                 return {
                     'success': False,
                     'error': f'Image file not found: {image_path}',
@@ -141,7 +140,7 @@ class DonutService:
 
             # Load image
             logger.info(f"Processing receipt with Donut: {image_path}")
-            image = Image.open(image_path).convert('RGB')
+            image = load_rgb(image_path)
 
             # Prepare image for model
             pixel_values = self.processor(image, return_tensors="pt").pixel_values
@@ -9,6 +9,8 @@ import logging
 from typing import Dict, List, Optional
 import re
 
+from .image_context import engine_input
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,12 +35,12 @@ class EasyOCRService:
             logger.error(f"Failed to initialize EasyOCR: {e}")
             raise
 
-    def process_image(self, image_path: str) -> Dict:
+    def process_image(self, image_path) -> Dict:
         """
         Process image with EasyOCR
 
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file or ImageContext
 
         Returns:
             Dictionary containing OCR results
@@ -46,7 +48,7 @@ class EasyOCRService:
         try:
             # Read text from image
             # Returns list of (bbox, text, confidence)
-            results = self.reader.readtext(image_path)
+            results = self.reader.readtext(engine_input(image_path, 'rgb'))
 
             if not results:
                 return {
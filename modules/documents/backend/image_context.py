@@ -0,0 +1,163 @@
+"""
+Image Context - One read, one decode per document analysis
+Quality assessment, preprocessing, the result cache fingerprint and every
+OCR engine used to open document.file_path.path on their own (PIL and
+OpenCV separately, plus a temporary preprocessed file on disk). An
+ImageContext reads the file once, decodes it once and memoises the
+variants the stages need:
+
+- raw        file bytes (engines that decode themselves, e.g. docTR)
+- pil        RGB PIL image, EXIF orientation applied, metadata kept
+- rgb / bgr  shared read-only NumPy buffers (PaddleOCR, EasyOCR, OpenCV)
+- gray       8-bit grayscale buffer (blur / contrast metrics)
+
+Stages memoise their own variants with derive(), e.g. the binarised
+'preprocessed' image of ImageQualityService and the resized 'vision_jpeg'
+sent to vision models.
+
+Variants are built lazily on first use and shared by the analysis
+threads. Services accept either a path or an ImageContext; the helpers
+below hide the difference.
+
+Usage:
+    image = ImageContext(document.file_path.path)
+    quality = quality_service.assess_quality(image)
+    result = paddle.process_image(image)
+"""
+
+import io
+import logging
+import os
+import threading
+
+import numpy as np
+from PIL import Image, ImageOps
+
+logger = logging.getLogger('documents.image_context')
+
+
+class ImageContext:
+    """Lazily decoded, memoised views of one document image"""
+
+    def __init__(self, path):
+        self.path = path
+        self.bytes_read = 0
+        self.decodes = 0
+        self._memo = {}
+        self._lock = threading.RLock()  # Re-entrant: variants build on each other
+
+    def __str__(self):
+        return str(self.path)
+
+    def __repr__(self):
+        return f'ImageContext({self.path!r})'
+
+    def __getstate__(self):
+        # Sent to OCR pool workers: the bytes already read travel along,
+        # decoded variants are rebuilt on the other side
+        state = {'path': self.path}
+        if 'raw' in self._memo:
+            state['raw'] = self._memo['raw']
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+        if 'raw' in state:
+            self._memo['raw'] = state['raw']
+
+    def derive(self, name, build):
+        """Memoised variant: build() runs once, later calls share its result"""
+        with self._lock:
+            if name not in self._memo:
+                self._memo[name] = build()
+            return self._memo[name]
+
+    @property
+    def raw(self):
+        def read():
+            with open(self.path, 'rb') as file:
+                data = file.read()
+            self.bytes_read += len(data)
+            return data
+        return self.derive('raw', read)
+
+    @property
+    def pil(self):
+        def decode():
+            with Image.open(io.BytesIO(self.raw)) as image:
+                image.load()
+                info = dict(image.info)
+                rgb = ImageOps.exif_transpose(image).convert('RGB')
+            rgb.info.update(info)
+            self.decodes += 1
+            return rgb
+        return self.derive('pil', decode)
+
+    @property
+    def is_image(self):
+        """False for files PIL cannot decode (PDFs)"""
+        def probe():
+            try:
+                self.pil
+                return True
+            except Exception as e:
+                logger.debug(f"{self.path} is not a decodable image: {e}")
+                return False
+        return self.derive('is_image', probe)
+
+    @property
+    def rgb(self):
+        return self.derive('rgb', lambda: _read_only(np.asarray(self.pil, dtype=np.uint8)))
+
+    @property
+    def bgr(self):
+        return self.derive('bgr', lambda: _read_only(np.ascontiguousarray(self.rgb[:, :, ::-1])))
+
+    @property
+    def gray(self):
+        return self.derive('gray', lambda: _read_only(np.asarray(self.pil.convert('L'), dtype=np.uint8)))
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+def as_context(image):
+    """ImageContext for a path (an ImageContext is returned as is)"""
+    return image if isinstance(image, ImageContext) else ImageContext(image)
+
+
+def image_path(image):
+    """File path of a path or ImageContext"""
+    return image.path if isinstance(image, ImageContext) else image
+
+
+def image_exists(image):
+    return os.path.exists(image_path(image))
+
+
+def load_rgb(image):
+    """RGB PIL image (shared for an ImageContext - do not modify in place)"""
+    if isinstance(image, ImageContext):
+        return image.pil
+    return Image.open(image).convert('RGB')
+
+
+def engine_input(image, channels='bgr'):
+    """
+    What to hand an engine that accepts either a path or an array:
+    the decoded buffer of an ImageContext, else the path itself
+    """
+    if isinstance(image, ImageContext) and image.is_image:
+        return image.bgr if channels == 'bgr' else image.rgb
+    return image_path(image)
+
+
+def io_counters():
+    """Bytes this process read/wrote so far ({} where /proc is unavailable)"""
+    try:
+        with open('/proc/self/io') as stats:
+            return {key: int(value) for key, value in (line.split(': ') for line in stats)}
+    except Exception:
+        return {}
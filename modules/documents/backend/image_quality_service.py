@@ -11,6 +11,8 @@ from PIL import Image
 import io
 import base64
 
+from .image_context import ImageContext, as_context
+
 logger = logging.getLogger('documents.image_quality')
 
 
@@ -38,25 +40,25 @@ class ImageQualityService:
         except ImportError:
             logger.warning("OpenCV not available. Install with: pip install opencv-python")
 
-    def assess_quality(self, image_path: str) -> Dict:
+    def assess_quality(self, image_path) -> Dict:
         """
         Assess image quality and recommend OCR method
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file or ImageContext
 
         Returns:
             Dictionary with quality metrics and OCR recommendation
         """
         try:
-            # Load image
-            img = Image.open(image_path)
+            # Decode once; every metric works on the shared buffers
+            image = as_context(image_path)
 
             # Calculate metrics
-            blur_score = self._calculate_blur(image_path)
-            contrast_score = self._calculate_contrast(img)
-            dpi = self._estimate_dpi(img)
-            orientation = self._detect_orientation(image_path)
+            blur_score = self._calculate_blur(image)
+            contrast_score = self._calculate_contrast(image.gray)
+            dpi = self._estimate_dpi(image.pil)
+            orientation = self._detect_orientation(image)
 
             # Determine quality level
             if blur_score >= self.BLUR_THRESHOLD_HIGH and dpi >= self.MIN_DPI_HIGH_QUALITY:
@@ -98,16 +100,20 @@ class ImageQualityService:
                 'recommended_ocr': 'paddleocr'  # Default fallback
             }
 
-    def preprocess_image(self, image_path: str, output_path: Optional[str] = None) -> Dict:
+    def preprocess_image(self, image_path, output_path: Optional[str] = None,
+                         quality: Optional[Dict] = None) -> Dict:
         """
         Apply preprocessing to improve OCR results
 
         Args:
-            image_path: Path to input image
+            image_path: Path to input image or ImageContext
             output_path: Path to save preprocessed image (optional)
+            quality: Result of assess_quality() for this image, if already known
 
         Returns:
-            Dictionary with preprocessing results and processed image path
+            Dictionary with preprocessing results and processed image path.
+            For an ImageContext the image stays in memory ('preprocessed_image',
+            memoised on the context) unless output_path is given.
         """
         if not self.cv2_available:
             return {
@@ -116,53 +122,31 @@ class ImageQualityService:
             }
 
         try:
+            in_memory = isinstance(image_path, ImageContext)
+            image = as_context(image_path)
+
             # Assess quality first
-            quality = self.assess_quality(image_path)
+            quality = quality or self.assess_quality(image)
 
             if not quality['success']:
                 return quality
 
-            # Load image with OpenCV
-            img = self.cv2.imread(image_path)
-
-            if img is None:
+            if not image.is_image:
                 return {
                     'success': False,
                     'error': 'Failed to load image with OpenCV'
                 }
 
-            original_img = img.copy()
-            preprocessing_applied = []
-
-            # Apply preprocessing based on quality assessment
-            needs = quality['preprocessing_needed']
-
-            # 1. Deskew (if needed)
-            if needs['deskew'] and quality['orientation'] != 0:
-                img = self._deskew_image(img, quality['orientation'])
-                preprocessing_applied.append('deskew')
-                logger.info(f"Applied deskew: {quality['orientation']} degrees")
-
-            # 2. Contrast enhancement (if needed)
-            if needs['contrast_enhancement']:
-                img = self._enhance_contrast(img)
-                preprocessing_applied.append('contrast_enhancement')
-                logger.info("Applied contrast enhancement")
-
-            # 3. Denoising (if needed)
-            if needs['denoising']:
-                img = self._denoise_image(img)
-                preprocessing_applied.append('denoising')
-                logger.info("Applied denoising")
-
-            # 4. Adaptive threshold for better text extraction
-            img = self._adaptive_threshold(img)
-            preprocessing_applied.append('adaptive_threshold')
+            img, preprocessing_applied = image.derive(
+                'preprocessed', lambda: self._apply_preprocessing(image.bgr.copy(), quality)
+            )
 
             # Save preprocessed image
             if output_path:
                 self.cv2.imwrite(output_path, img)
                 result_path = output_path
+            elif in_memory:
+                result_path = None
             else:
                 # Save to temporary file
                 import tempfile
@@ -174,8 +158,9 @@ class ImageQualityService:
 
             return {
                 'success': True,
-                'original_path': image_path,
+                'original_path': image.path,
                 'preprocessed_path': result_path,
+                'preprocessed_image': img,
                 'preprocessing_applied': preprocessing_applied,
                 'quality_assessment': quality
             }
@@ -187,13 +172,53 @@ class ImageQualityService:
                 'error': str(e)
             }
 
-    def _calculate_blur(self, image_path: str) -> float:
+    def _apply_preprocessing(self, img, quality: Dict) -> Tuple:
+        """
+        Run the preprocessing steps the quality assessment asks for
+
+        Args:
+            img: OpenCV image (modified copy of the original)
+            quality: Result of assess_quality()
+
+        Returns:
+            (preprocessed image, list of applied steps)
+        """
+        preprocessing_applied = []
+
+        # Apply preprocessing based on quality assessment
+        needs = quality['preprocessing_needed']
+
+        # 1. Deskew (if needed)
+        if needs['deskew'] and quality['orientation'] != 0:
+            img = self._deskew_image(img, quality['orientation'])
+            preprocessing_applied.append('deskew')
+            logger.info(f"Applied deskew: {quality['orientation']} degrees")
+
+        # 2. Contrast enhancement (if needed)
+        if needs['contrast_enhancement']:
+            img = self._enhance_contrast(img)
+            preprocessing_applied.append('contrast_enhancement')
+            logger.info("Applied contrast enhancement")
+
+        # 3. Denoising (if needed)
+        if needs['denoising']:
+            img = self._denoise_image(img)
+            preprocessing_applied.append('denoising')
+            logger.info("Applied denoising")
+
+        # 4. Adaptive threshold for better text extraction
+        img = self._adaptive_threshold(img)
+        preprocessing_applied.append('adaptive_threshold')
+
+        return img, preprocessing_applied
+
+    def _calculate_blur(self, image_path) -> float:
         """
         Calculate blur score using Laplacian variance
         Higher score = sharper image
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file or ImageContext
 
         Returns:
             Blur score (0-500+, higher is better)
@@ -202,9 +227,10 @@ class ImageQualityService:
             return 100.0  # Default medium score
 
         try:
-            img = self.cv2.imread(image_path, self.cv2.IMREAD_GRAYSCALE)
-            if img is None:
+            image = as_context(image_path)
+            if not image.is_image:
                 return 100.0
+            img = image.gray
 
             # Calculate Laplacian variance
             laplacian = self.cv2.Laplacian(img, self.cv2.CV_64F)
@@ -217,23 +243,23 @@ class ImageQualityService:
             logger.error(f"Blur calculation error: {e}")
             return 100.0
 
-    def _calculate_contrast(self, img: Image.Image) -> float:
+    def _calculate_contrast(self, img) -> float:
         """
         Calculate image contrast using standard deviation
 
         Args:
-            img: PIL Image
+            img: PIL Image or grayscale array
 
         Returns:
             Contrast score (0-100+)
         """
         try:
             # Convert to grayscale
-            if img.mode != 'L':
+            if isinstance(img, Image.Image) and img.mode != 'L':
                 img = img.convert('L')
 
-            # Convert to numpy array
-            img_array = np.array(img)
+            # Convert to numpy array (no copy for the shared grayscale buffer)
+            img_array = np.asarray(img)
 
             # Calculate standard deviation (contrast measure)
             contrast = float(np.std(img_array))
@@ -282,12 +308,12 @@ class ImageQualityService:
             logger.error(f"DPI estimation error: {e}")
             return 150  # Default medium DPI
 
-    def _detect_orientation(self, image_path: str) -> int:
+    def _detect_orientation(self, image_path) -> int:
         """
         Detect image orientation (0, 90, 180, 270 degrees)
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file or ImageContext
 
         Returns:
             Orientation in degrees (0, 90, 180, 270)
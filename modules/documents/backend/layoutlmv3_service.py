@@ -6,9 +6,8 @@ Combines text, layout (bounding boxes), and image information
 
 import logging
 from typing import Dict, Optional, List, Tuple
-import os
-from PIL import Image
 import json
+from .image_context import image_exists, load_rgb
 from .receipt_field_extractor import ReceiptFieldExtractor
 
 logger = logging.getLogger('documents.layoutlmv3')
@@ -103,7 +102,7 @@ class LayoutLMv3Service:
 
     def process_document(
         self,
-        image_path: str,
+        image_path,
         words: List[str],
         boxes: List[Tuple[int, int, int, int]]
     ) -> Dict:
@@ -111,7 +110,7 @@ class LayoutLMv3Service:
         Process document with LayoutLMv3 for token classification
 
         Args:
-            image_path: Path to document image
+            image_path: Path to document image or ImageContext
             words: List of OCR words
             boxes: List of bounding boxes (x0, y0, x1, y1) for each word
 
@@ -138,7 +137,7 @@ class LayoutLMv3Service:
 
         try:
             # Check if file exists
-            if not os.path.exists(image_path):
+            if not image_exists(image_path):
                 return {
                     'success': False,
                     'error': f'Image file not found: {image_path}',
@@ -148,7 +147,7 @@ class LayoutLMv3Service:
 
             # Load image
             logger.info(f"Processing document with LayoutLMv3: {image_path}")
-            image = Image.open(image_path).convert('RGB')
+            image = load_rgb(image_path)
 
             # Normalize boxes to 0-1000 range (LayoutLMv3 requirement)
             width, height = image.size
@@ -227,31 +226,31 @@ class LayoutLMv3Service:
                 'text': ''
             }
 
-    def process_with_paddleocr(self, image_path: str) -> Dict:
+    def process_with_paddleocr(self, image_path) -> Dict:
         """
         Process document using PaddleOCR for text/boxes + LayoutLMv3 for classification
 
         Args:
-            image_path: Path to document image
+            image_path: Path to document image or ImageContext
 
         Returns:
             Dictionary with classified fields
         """
         try:
-            # Use PaddleOCR to get words and boxes
-            from .paddleocr_service import PaddleOCRService
-
-            paddle = PaddleOCRService(lang='en', use_structure=False)
-            if not paddle.is_available() or not paddle.initialize_ocr():
-                return {
-                    'success': False,
-                    'error': 'PaddleOCR not available for text extraction',
-                    'fields': {},
-                    'text': ''
-                }
-
-            # Get OCR results
-            ocr_result = paddle.process_image(image_path)
+            # Use the warm PaddleOCR engine to get words and boxes
+            from .model_pool import model_pool
+
+            with model_pool.acquire('paddleocr') as paddle:
+                if not paddle.is_available() or paddle.ocr is None:
+                    return {
+                        'success': False,
+                        'error': 'PaddleOCR not available for text extraction',
+                        'fields': {},
+                        'text': ''
+                    }
+
+                # Get OCR results
+                ocr_result = paddle.process_image(image_path)
             if not ocr_result.get('success'):
                 return {
                     'success': False,
@@ -0,0 +1,118 @@
+"""
+Benchmark the per-document image pipeline: file paths vs a shared ImageContext
+
+Runs result cache fingerprinting, quality assessment, preprocessing and
+(optionally) OCR engines over a batch of images two ways and reports
+per-document wall time, disk I/O and decodes:
+
+- path:    every stage opens document.file_path.path itself and
+           preprocessing writes a temporary file, as analyze_document did
+- context: one ImageContext per document - read and decoded once, the
+           stages share its buffers and nothing is written to disk
+
+I/O comes from /proc/self/io (rchar/wchar: bytes through read()/write(),
+read_bytes/write_bytes: bytes that hit the block device). Engines are
+loaded through the model pool before timing, so only image handling
+differs between the two runs.
+
+Usage: python manage.py benchmark_image_pipeline --documents 50 --engines paddleocr,easyocr
+"""
+
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from modules.documents.backend.image_context import ImageContext, io_counters
+from modules.documents.backend.image_quality_service import ImageQualityService
+from modules.documents.backend.model_pool import ModelPool
+from modules.documents.backend.result_cache import image_fingerprint
+
+from .benchmark_model_pool import RUNNERS, generate_receipts
+
+IO_FIELDS = ['rchar', 'wchar', 'read_bytes', 'write_bytes']
+
+
+class Command(BaseCommand):
+    help = 'Compare per-document wall time and disk I/O of path-based and shared-context image handling'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=50,
+            help='Batch size (default: 50)'
+        )
+        parser.add_argument(
+            '--images',
+            help='Directory with images to use instead of generated receipts'
+        )
+        parser.add_argument(
+            '--engines',
+            default='',
+            help=f'Comma separated OCR engines to include ({", ".join(sorted(RUNNERS))}; default: none)'
+        )
+
+    def handle(self, *args, **options):
+        engines = [name for name in options['engines'].split(',') if name]
+        unknown = set(engines) - set(RUNNERS)
+        if unknown:
+            raise CommandError(f"Unknown engines: {', '.join(sorted(unknown))}")
+
+        quality_service = ImageQualityService()
+        pool = ModelPool()
+
+        with tempfile.TemporaryDirectory() as directory:
+            if options['images']:
+                names = sorted(
+                    name for name in os.listdir(options['images'])
+                    if name.lower().endswith(('.jpg', '.jpeg', '.png'))
+                )
+                if not names:
+                    raise CommandError(f"No images in {options['images']}")
+                paths = [os.path.join(options['images'], names[i % len(names)]) for i in range(options['documents'])]
+            else:
+                paths = generate_receipts(directory, options['documents'])
+
+            def analyze(image):
+                shared = isinstance(image, ImageContext)
+                image_fingerprint(image)
+                quality = quality_service.assess_quality(image)
+                # analyze_document used to let preprocess_image() assess the file again
+                quality_service.preprocess_image(image, quality=quality if shared else None)
+                for engine in engines:
+                    with pool.acquire(engine) as service:
+                        RUNNERS[engine](service, image)
+
+            # Load models (and warm the page cache) outside the timed runs
+            analyze(paths[0])
+
+            self.stdout.write(f'{len(paths)} documents, engines: {", ".join(engines) or "none"}')
+            self.stdout.write(
+                f'{"mode":8} {"ms/doc":>9} ' + ' '.join(f'{field + "/doc":>16}' for field in IO_FIELDS)
+                + f' {"decodes/doc":>12}'
+            )
+            timings = {}
+            for mode in ('path', 'context'):
+                decodes = 0
+                before = io_counters()
+                start = time.perf_counter()
+                for path in paths:
+                    if mode == 'context':
+                        image = ImageContext(path)
+                        analyze(image)
+                        decodes += image.decodes
+                    else:
+                        analyze(path)
+                elapsed = time.perf_counter() - start
+                after = io_counters()
+                timings[mode] = elapsed
+
+                io = ' '.join(
+                    f'{(after.get(field, 0) - before.get(field, 0)) / len(paths):16,.0f}' for field in IO_FIELDS
+                )
+                decoded = f'{decodes / len(paths):12.1f}' if mode == 'context' else f'{"-":>12}'
+                self.stdout.write(f'{mode:8} {elapsed / len(paths) * 1000:9.1f} {io} {decoded}')
+
+        self.stdout.write(f'speedup: {timings["path"] / timings["context"]:.2f}x')
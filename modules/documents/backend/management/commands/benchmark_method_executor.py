@@ -0,0 +1,147 @@
+"""
+Benchmark analysis method scheduling: thread pool vs method executor lanes
+
+Analyzes a batch of documents with --concurrency documents in flight (as
+the OCR queue workers do) two ways and reports throughput, per-document
+latency and CPU utilisation:
+
+- threads:  what analyze_document did - every method of a document on a
+            ThreadPoolExecutor(max_workers=2)
+- executor: method_executor.run() - GIL-bound methods in the process
+            pool, I/O-bound ones on threads, native engines in their
+            slots, all under memory admission
+
+Documents are unsaved Document instances with generated receipt images
+and long Tesseract text, so nothing is written to the database. Models
+and pool workers are warmed up before timing; the executor's CPU figure
+includes the pool workers' start-up, since their time is only known once
+they exit. Run it on the target machine (e.g. a 32-core box) - the
+numbers depend on cores and memory.
+
+Usage: python manage.py benchmark_method_executor --documents 256 --methods tesseract,paddleocr
+"""
+
+import os
+import resource
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from modules.documents.backend.analysis_service import OCRAnalysisService
+from modules.documents.backend.image_context import ImageContext
+from modules.documents.backend.method_executor import METHODS, MethodExecutor
+from modules.documents.backend.models import Document
+
+from .benchmark_model_pool import generate_receipts
+
+
+def receipt_text(i, lines=300):
+    """Tesseract-like receipt text; long enough to make key finding parsing GIL-bound"""
+    rows = ['MIGROS TICARET A.S.', f'TARIH: {1 + i % 28:02d}.10.2025 SAAT: 12:{i % 60:02d}', f'FIS NO: {1000 + i}']
+    rows += [f'URUN {row:03d} {row % 7 + 1} AD X {row % 50 + 1},{row % 100:02d} *{(row % 50 + 1) * 2},90' for row in range(lines)]
+    rows += [f'TOPLAM *{26 + i % 17},40', 'KDV *4,12', 'NAKIT *100,00']
+    return '\n'.join(rows)
+
+
+def cpu_seconds():
+    """CPU time of this process and its reaped children"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class Command(BaseCommand):
+    help = 'Compare analysis throughput with the thread pool and with the method executor lanes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=256,
+            help='Batch size (default: 256)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Documents analyzed at once (default: one per core)'
+        )
+        parser.add_argument(
+            '--methods',
+            default='tesseract,paddleocr',
+            help=f'Comma separated methods ({", ".join(sorted(METHODS))}; default: tesseract,paddleocr)'
+        )
+
+    def handle(self, *args, **options):
+        methods = [name for name in options['methods'].split(',') if name]
+        unknown = set(methods) - set(METHODS)
+        if not methods or unknown:
+            raise CommandError(f"Unknown methods: {', '.join(sorted(unknown)) or '(none given)'}")
+
+        service = OCRAnalysisService()
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = generate_receipts(directory, options['documents'])
+            documents = [
+                (Document(original_filename=os.path.basename(path), tesseract_text=receipt_text(i),
+                          tesseract_confidence=90), path)
+                for i, path in enumerate(paths)
+            ]
+
+            def threads(document, path):
+                image = ImageContext(path)
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    return list(pool.map(lambda method: getattr(service, f'_analyze_{method}')(document, image), methods))
+
+            executor = MethodExecutor()
+
+            def lanes(document, path):
+                image = ImageContext(path)
+                with ThreadPoolExecutor(max_workers=len(methods)) as pool:
+                    return list(pool.map(
+                        lambda method: executor.run(method, getattr(service, f'_analyze_{method}'), document, image),
+                        methods
+                    ))
+
+            self.stdout.write(
+                f'{len(documents)} documents, {options["concurrency"]} in flight, {os.cpu_count()} cores, '
+                f'methods: {", ".join(f"{method} ({executor.lane(method)})" for method in methods)}'
+            )
+            self.stdout.write(f'{"mode":9} {"docs/min":>9} {"p50 ms":>9} {"p95 ms":>9} {"cpu %":>7}')
+
+            results = {}
+            for mode, analyze in (('threads', threads), ('executor', lanes)):
+                def timed(item):
+                    start = time.perf_counter()
+                    analyze(*item)
+                    return time.perf_counter() - start
+
+                with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                    # Load models and start pool workers outside the timed run
+                    list(pool.map(timed, documents[:options['concurrency']]))
+
+                    cpu_before = cpu_seconds()
+                    start = time.perf_counter()
+                    latencies = sorted(pool.map(timed, documents))
+                    elapsed = time.perf_counter() - start
+
+                if mode == 'executor':
+                    # Reap the pool workers so their CPU time is counted
+                    executor.shutdown()
+                cpu = (cpu_seconds() - cpu_before) / (elapsed * (os.cpu_count() or 1)) * 100
+                results[mode] = elapsed
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                self.stdout.write(
+                    f'{mode:9} {len(documents) / elapsed * 60:9.1f} {statistics.median(latencies) * 1000:9.1f} '
+                    f'{p95 * 1000:9.1f} {cpu:7.1f}'
+                )
+
+        self.stdout.write(f'speedup: {results["threads"] / results["executor"]:.2f}x')
+        admission = executor.stats()['admission']
+        self.stdout.write(
+            f"admission: budget {admission['budget_mb']} MB  peak reserved {admission['peak_reserved_mb']} MB  "
+            f"waited {admission['waited']}/{admission['admitted']}"
+        )
@@ -0,0 +1,149 @@
+"""
+Benchmark OCR throughput: per-document engine construction vs the model pool
+
+Runs one OCR engine over a batch of images two ways and reports
+documents per minute:
+
+- cold: what the analysis methods did - build the service (and load its
+        model) for every document
+- warm: model_pool.acquire() - the model is loaded once and reused
+
+Images come from --images (a directory of .jpg/.png files) or are
+generated receipt-like images. Cold runs are slow, so only
+--cold-sample documents are run that way and the rest is extrapolated.
+
+Usage: python manage.py benchmark_model_pool --engine paddleocr --documents 200
+"""
+
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageDraw
+
+from modules.documents.backend.model_pool import ENGINES, ModelPool
+
+# How each engine is run on one image
+RUNNERS = {
+    'paddleocr': lambda service, path: service.process_image(path),
+    'paddleocr_structure': lambda service, path: service.analyze_structure(path),
+    'trocr': lambda service, path: service.process_image(path),
+    'donut': lambda service, path: service.process_receipt(path),
+    'layoutlmv3': lambda service, path: service.process_with_paddleocr(path),
+    'surya': lambda service, path: service.process_image(path),
+    'doctr': lambda service, path: service.process_image(path),
+    'easyocr': lambda service, path: service.process_image(path),
+}
+
+
+def generate_receipts(directory, count):
+    """Simple receipt-like images with a few lines of text"""
+    paths = []
+    for i in range(count):
+        image = Image.new('RGB', (600, 800), 'white')
+        draw = ImageDraw.Draw(image)
+        lines = [
+            'MIGROS TICARET A.S.',
+            f'TARIH: {1 + i % 28:02d}.10.2025  SAAT: 12:{i % 60:02d}',
+            f'FIS NO: {1000 + i}',
+            f'EKMEK            *{5 + i % 10},50',
+            f'SUT              *{20 + i % 7},90',
+            f'TOPLAM           *{26 + i % 17},40',
+        ]
+        for row, line in enumerate(lines):
+            draw.text((40, 60 + row * 50), line, fill='black')
+        path = os.path.join(directory, f'receipt_{i:04d}.png')
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+class Command(BaseCommand):
+    help = 'Compare OCR documents/minute with per-document model loading and with the warm model pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--engine',
+            choices=sorted(ENGINES),
+            default='paddleocr',
+            help='OCR engine to benchmark (default: paddleocr)'
+        )
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=200,
+            help='Batch size (default: 200)'
+        )
+        parser.add_argument(
+            '--images',
+            help='Directory with images to use instead of generated receipts'
+        )
+        parser.add_argument(
+            '--cold-sample',
+            type=int,
+            default=10,
+            help='Documents run with per-document loading; the rest is extrapolated (default: 10)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Threads sharing the pool, as in analyze_document (default: 2)'
+        )
+
+    def handle(self, *args, **options):
+        engine = options['engine']
+        factory, _ = ENGINES[engine]
+        run = RUNNERS[engine]
+
+        with tempfile.TemporaryDirectory() as directory:
+            if options['images']:
+                names = sorted(
+                    name for name in os.listdir(options['images'])
+                    if name.lower().endswith(('.jpg', '.jpeg', '.png'))
+                )
+                if not names:
+                    raise CommandError(f"No images in {options['images']}")
+                paths = [os.path.join(options['images'], names[i % len(names)]) for i in range(options['documents'])]
+            else:
+                paths = generate_receipts(directory, options['documents'])
+            self.stdout.write(f'{engine}: {len(paths)} documents, {options["workers"]} workers')
+
+            # Cold: a new service per document
+            sample = paths[:max(1, min(options['cold_sample'], len(paths)))]
+            start = time.perf_counter()
+            for path in sample:
+                run(factory(), path)
+            cold_seconds = (time.perf_counter() - start) * len(paths) / len(sample)
+            self.stdout.write(
+                f'cold: {cold_seconds:9.1f}s  {len(paths) / cold_seconds * 60:8.1f} docs/min  '
+                f'(extrapolated from {len(sample)})'
+            )
+
+            # Warm: shared pooled service
+            pool = ModelPool()
+
+            def warm(path):
+                with pool.acquire(engine) as service:
+                    return run(service, path)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                results = list(executor.map(warm, paths))
+            warm_seconds = time.perf_counter() - start
+            self.stdout.write(
+                f'warm: {warm_seconds:9.1f}s  {len(paths) / warm_seconds * 60:8.1f} docs/min'
+            )
+
+        failed = sum(1 for result in results if not (isinstance(result, dict) and result.get('success')))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} documents returned no result'))
+        self.stdout.write(f'speedup: {cold_seconds / warm_seconds:.1f}x')
+
+        stats = pool.stats()['engines'][engine]
+        self.stdout.write(
+            f"pool: loads {stats['loads']}  load time {stats['total_load_seconds']}s  "
+            f"hit rate {stats['hit_rate']}  resident {stats['resident_mb']} MB"
+        )
@@ -4,6 +4,7 @@ OCR Processing Control - Pause/Resume mechanism
 import os
 from django.core.management.base import BaseCommand
 from django.core.cache import cache
+from modules.documents.backend.ocr_queue import notify
 
 
 class Command(BaseCommand):
@@ -27,6 +28,7 @@ class Command(BaseCommand):
             
         elif action == 'resume':
             cache.delete('ocr_processing_paused')
+            notify()
             self.stdout.write(self.style.SUCCESS('▶️  OCR processing RESUMED'))
             self.stdout.write('Background OCR will continue processing.')
             
@@ -0,0 +1,293 @@
+"""
+OCR Method Executor - Where each analysis method runs
+analyze_document used to run every method on a ThreadPoolExecutor with
+max_workers=2, so pure-Python work (regex parsing of OCR text, model
+glue) contended on the GIL while native engines oversubscribed the CPU.
+Each method now declares what bounds it and runs in the matching lane:
+
+- gil:    pure-Python work - a process pool whose workers set up Django
+          and pre-load the models of the methods routed to them
+- io:     waits on Ollama HTTP or an OCRmyPDF subprocess - runs on the
+          calling thread, any number at once
+- native: PaddleOCR, PyTorch models and OpenCV already spread over all
+          cores with their own threads - at most OCR_NATIVE_CONCURRENCY
+          run at a time
+
+Lanes can be overridden per method with settings.OCR_METHOD_EXECUTION
+(e.g. {'easyocr': 'gil'}). Before a method starts, the AdmissionController
+reserves its estimated memory (models not loaded yet + a working set) and
+makes it wait while the reservations of running methods would exceed
+the budget (settings.OCR_ANALYSIS_MEMORY_MB, else the memory available
+when the first method runs). One method is always admitted, so an
+oversized method runs alone instead of never.
+
+Usage:
+    result = method_executor.run('tesseract', service._analyze_tesseract, document, image)
+"""
+
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .model_pool import model_pool
+
+try:
+    from prometheus_client import Counter, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger('documents.method_executor')
+
+GIL_BOUND = 'gil'
+IO_BOUND = 'io'
+NATIVE = 'native'
+LANES = (GIL_BOUND, IO_BOUND, NATIVE)
+
+# method -> (lane, model pool engines it uses)
+METHODS = {
+    'tesseract': (GIL_BOUND, []),
+    'paddleocr': (NATIVE, ['paddleocr_structure']),
+    'llama_vision': (IO_BOUND, []),
+    'hybrid': (IO_BOUND, ['paddleocr']),
+    'trocr': (NATIVE, ['trocr', 'paddleocr']),
+    'donut': (NATIVE, ['donut']),
+    'layoutlmv3': (NATIVE, ['layoutlmv3', 'paddleocr']),
+    'surya': (NATIVE, ['surya']),
+    'doctr': (NATIVE, ['doctr']),
+    'easyocr': (NATIVE, ['easyocr']),
+    'ocrmypdf': (IO_BOUND, []),
+}
+
+# Memory a running method needs besides its models (image buffers, activations)
+WORKING_SET_MB = getattr(settings, 'OCR_METHOD_WORKING_SET_MB', 256)
+
+# Kept free when the budget is derived from the available memory
+HEADROOM_MB = 512
+
+if PROMETHEUS_AVAILABLE:
+    METHOD_RUNS = Counter(
+        'unibos_ocr_method_runs_total', 'OCR analysis methods run', ['method', 'lane']
+    )
+    ADMISSION_WAIT_SECONDS = Histogram(
+        'unibos_ocr_method_admission_wait_seconds', 'Time OCR methods waited for memory admission',
+        buckets=(0.01, 0.1, 0.5, 1, 5, 15, 60, 300)
+    )
+
+
+class AdmissionController:
+    """Admits work while the memory reserved by running work fits a budget"""
+
+    def __init__(self, budget_mb=None):
+        self._budget_mb = budget_mb
+        self._condition = threading.Condition()
+        self.reserved_mb = 0
+        self.running = 0
+        self.peak_reserved_mb = 0
+        self.admitted = 0
+        self.waited = 0
+
+    @property
+    def budget_mb(self):
+        if self._budget_mb is None:
+            configured = getattr(settings, 'OCR_ANALYSIS_MEMORY_MB', None)
+            if configured:
+                self._budget_mb = int(configured)
+            else:
+                from .ocr_queue import available_memory_mb
+                available = available_memory_mb()
+                self._budget_mb = max(WORKING_SET_MB, available - HEADROOM_MB) if available else 4096
+            logger.info(f"OCR method admission budget: {self._budget_mb} MB")
+        return self._budget_mb
+
+    @contextmanager
+    def admit(self, mb):
+        """Block until `mb` fits next to what is running, and hold it"""
+        budget = self.budget_mb
+        started = time.perf_counter()
+        with self._condition:
+            if self.running and self.reserved_mb + mb > budget:
+                self.waited += 1
+                self._condition.wait_for(lambda: not self.running or self.reserved_mb + mb <= budget)
+            self.reserved_mb += mb
+            self.running += 1
+            self.admitted += 1
+            self.peak_reserved_mb = max(self.peak_reserved_mb, self.reserved_mb)
+        if PROMETHEUS_AVAILABLE:
+            ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.reserved_mb -= mb
+                self.running -= 1
+                self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'budget_mb': self._budget_mb,
+                'reserved_mb': round(self.reserved_mb, 1),
+                'peak_reserved_mb': round(self.peak_reserved_mb, 1),
+                'running': self.running,
+                'admitted': self.admitted,
+                'waited': self.waited,
+            }
+
+
+# State of a process pool worker
+_worker_service = None
+
+
+def _init_worker(engines):
+    """Process pool initializer: set up Django and load the routed methods' models"""
+    global _worker_service
+    import django
+    django.setup()
+
+    from .analysis_service import OCRAnalysisService
+    _worker_service = OCRAnalysisService()
+    for engine in engines:
+        try:
+            with model_pool.acquire(engine):
+                pass
+        except Exception as e:
+            logger.warning(f"OCR worker {os.getpid()} could not pre-load '{engine}': {e}")
+
+
+def _run_in_worker(method_name, document, image):
+    from django.db import close_old_connections
+    close_old_connections()
+    return getattr(_worker_service, f'_analyze_{method_name}')(document, image)
+
+
+class MethodExecutor:
+    """Routes analysis methods to their lane under memory admission"""
+
+    def __init__(self, methods=None, admission=None, process_workers=None, native_concurrency=None):
+        self.methods = dict(methods or METHODS)
+        for method_name, lane in getattr(settings, 'OCR_METHOD_EXECUTION', {}).items():
+            if lane not in LANES:
+                raise ValueError(f"OCR_METHOD_EXECUTION[{method_name!r}]: unknown lane {lane!r}")
+            engines = self.methods.get(method_name, (lane, []))[1]
+            self.methods[method_name] = (lane, engines)
+        self.admission = admission or AdmissionController()
+
+        if native_concurrency is None:
+            native_concurrency = getattr(settings, 'OCR_NATIVE_CONCURRENCY', None) or max(1, (os.cpu_count() or 1) // 8)
+        self._native_slots = threading.BoundedSemaphore(native_concurrency)
+        self.native_concurrency = native_concurrency
+
+        self._process_workers = process_workers or getattr(settings, 'OCR_PROCESS_POOL_WORKERS', None)
+        self._process_pool = None
+        self._process_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._runs = {lane: 0 for lane in LANES}
+        self.process_fallbacks = 0
+
+    def lane(self, method_name):
+        return self.methods.get(method_name, (IO_BOUND, []))[0]
+
+    def memory_mb(self, method_name):
+        """Estimated memory a method needs before it starts"""
+        lane, engines = self.methods.get(method_name, (IO_BOUND, []))
+        if lane == GIL_BOUND:
+            # Models live (pre-loaded) in the pool's workers
+            return WORKING_SET_MB
+        return WORKING_SET_MB + sum(
+            model_pool.estimate_mb(engine) for engine in engines if not model_pool.is_loaded(engine)
+        )
+
+    def _gil_engines(self):
+        return sorted({
+            engine for lane, engines in self.methods.values() if lane == GIL_BOUND for engine in engines
+        })
+
+    def _pool(self):
+        with self._process_lock:
+            if self._process_pool is None:
+                engines = self._gil_engines()
+                workers = self._process_workers
+                if not workers:
+                    workers = max(1, (os.cpu_count() or 1) // 2)
+                    if engines:
+                        # Every worker holds its own copy of the pre-loaded models
+                        from .ocr_queue import available_memory_mb
+                        available = available_memory_mb()
+                        per_worker = WORKING_SET_MB + sum(model_pool.estimate_mb(engine) for engine in engines)
+                        if available:
+                            workers = max(1, min(workers, int(available // per_worker)))
+                logger.info(f"Starting OCR process pool: {workers} workers, pre-loading {engines or 'no models'}")
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    # Spawned, not forked: the parent runs threads holding locks and DB connections
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(engines,),
+                )
+            return self._process_pool
+
+    def _reset_pool(self, pool):
+        with self._process_lock:
+            if self._process_pool is pool:
+                self._process_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, method_name, func, document, image):
+        """Run func(document, image) - or its copy in a pool worker - in the method's lane"""
+        lane = self.lane(method_name)
+        with self._lock:
+            self._runs[lane] += 1
+        if PROMETHEUS_AVAILABLE:
+            METHOD_RUNS.labels(method=method_name, lane=lane).inc()
+
+        if lane == NATIVE:
+            with self._native_slots, self.admission.admit(self.memory_mb(method_name)):
+                return func(document, image)
+
+        with self.admission.admit(self.memory_mb(method_name)):
+            if lane == IO_BOUND:
+                return func(document, image)
+
+            pool = self._pool()
+            try:
+                return pool.submit(_run_in_worker, method_name, document, image).result()
+            except (BrokenProcessPool, pickle.PicklingError, TypeError) as e:
+                # A worker died (OOM kill) or the arguments cannot be sent
+                # (unpicklable objects such as locks raise TypeError): run here
+                logger.warning(f"[{method_name}] process pool unavailable ({e}), running in thread")
+                with self._lock:
+                    self.process_fallbacks += 1
+                if isinstance(e, BrokenProcessPool):
+                    self._reset_pool(pool)
+                return func(document, image)
+
+    def shutdown(self):
+        with self._process_lock:
+            pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            runs = dict(self._runs)
+            fallbacks = self.process_fallbacks
+        return {
+            'lanes': {method_name: lane for method_name, (lane, _) in sorted(self.methods.items())},
+            'runs': runs,
+            'process_pool_running': self._process_pool is not None,
+            'process_fallbacks': fallbacks,
+            'native_concurrency': self.native_concurrency,
+            'admission': self.admission.stats(),
+        }
+
+
+method_executor = MethodExecutor()
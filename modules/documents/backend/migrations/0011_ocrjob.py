@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-17 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def enqueue_processing_documents(apps, schema_editor):
+    """Queue documents that the old polling daemon would have picked up"""
+    Document = apps.get_model('documents', 'Document')
+    OCRJob = apps.get_model('documents', 'OCRJob')
+    pending = Document.objects.filter(processing_status='processing', is_deleted=False).order_by('uploaded_at')
+    OCRJob.objects.bulk_create(
+        (OCRJob(document_id=document_id) for document_id in pending.values_list('id', flat=True).iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0010_alter_document_file_path_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.PositiveSmallIntegerField(choices=[(0, 'Interactive upload'), (10, 'Bulk reprocess')], default=0)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running')], default='queued', max_length=10)),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ocr_job', to='documents.document')),
+            ],
+            options={
+                'ordering': ['priority', 'created_at'],
+                'indexes': [models.Index(fields=['status', 'priority', 'created_at'], name='documents_o_status_9b1e0a_idx')],
+            },
+        ),
+        migrations.RunPython(enqueue_processing_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-17 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0011_ocrjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRResultCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('perceptual_hash', models.CharField(blank=True, db_index=True, default='', max_length=16)),
+                ('method', models.CharField(max_length=30)),
+                ('engine_version', models.CharField(max_length=255)),
+                ('result', models.JSONField()),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('content_hash', 'method', 'engine_version')},
+            },
+        ),
+    ]
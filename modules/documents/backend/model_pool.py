@@ -0,0 +1,337 @@
+"""
+OCR Model Pool - Warm, shared OCR engines
+Every OCR engine (PaddleOCR, TrOCR, Donut, LayoutLMv3, Surya, docTR,
+EasyOCR) is loaded once per process and reused across documents instead
+of being constructed inside every analysis call.
+
+- Engines load lazily on first use; loads are serialized so two threads
+  never build the same (or two different) multi-GB models at once
+- Loaded engines are kept warm and evicted least-recently-used first when
+  the resident memory of all engines would exceed the budget
+  (settings.OCR_MODEL_POOL_MEMORY_MB); engines in use are never evicted
+- Handles are context managers holding the engine's lock, so one engine
+  instance is never used by two threads at the same time
+- Load time, hit rate and resident memory are tracked per engine and
+  exported through prometheus_client when available
+
+Usage:
+    with model_pool.acquire('trocr') as trocr:
+        result = trocr.process_image(path)
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger('documents.model_pool')
+
+# Budget for all warm engines together
+DEFAULT_MEMORY_MB = 6144
+
+MB = 1024 * 1024
+
+
+if PROMETHEUS_AVAILABLE:
+    MODEL_LOADS = Counter(
+        'unibos_ocr_model_loads_total', 'OCR engine loads', ['engine']
+    )
+    MODEL_REQUESTS = Counter(
+        'unibos_ocr_model_requests_total', 'OCR engine handle requests', ['engine', 'result']
+    )
+    MODEL_EVICTIONS = Counter(
+        'unibos_ocr_model_evictions_total', 'OCR engines evicted to stay within the memory budget', ['engine']
+    )
+    MODEL_RESIDENT_BYTES = Gauge(
+        'unibos_ocr_model_resident_bytes', 'Resident memory attributed to a loaded OCR engine', ['engine']
+    )
+    MODEL_LOAD_SECONDS = Histogram(
+        'unibos_ocr_model_load_seconds', 'Time to load an OCR engine', ['engine'],
+        buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+    )
+
+
+def process_rss():
+    """Resident set size of this process in bytes (0 if unknown)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        pass
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        return 0
+
+
+# Engine factories - each returns a service with its model loaded
+
+def _paddleocr():
+    from .paddleocr_service import PaddleOCRService
+    service = PaddleOCRService(lang='en')
+    if service.is_available():
+        service.initialize_ocr()
+    return service
+
+
+def _paddleocr_structure():
+    from .paddleocr_service import PaddleOCRService
+    service = PaddleOCRService(lang='en', use_structure=True)
+    if service.is_structure_available():
+        service.initialize_structure()
+    return service
+
+
+def _trocr():
+    from .trocr_service import TrOCRService
+    service = TrOCRService(language='tr')
+    if service.is_available():
+        service.initialize_model()
+    return service
+
+
+def _donut():
+    from .donut_service import DonutService
+    service = DonutService(language='tr')
+    if service.is_available():
+        service.initialize_model()
+    return service
+
+
+def _layoutlmv3():
+    from .layoutlmv3_service import LayoutLMv3Service
+    service = LayoutLMv3Service(language='tr')
+    if service.is_available():
+        service.initialize_model()
+    return service
+
+
+def _surya():
+    from .surya_service import SuryaOCRService
+    return SuryaOCRService()
+
+
+def _doctr():
+    from .doctr_service import DocTROCRService
+    return DocTROCRService()
+
+
+def _easyocr():
+    from .easyocr_service import EasyOCRService
+    return EasyOCRService()
+
+
+# name -> (factory, estimated resident MB used before the first load is measured)
+ENGINES = {
+    'paddleocr': (_paddleocr, 600),
+    'paddleocr_structure': (_paddleocr_structure, 1500),
+    'trocr': (_trocr, 1400),
+    'donut': (_donut, 1800),
+    'layoutlmv3': (_layoutlmv3, 1600),
+    'surya': (_surya, 2500),
+    'doctr': (_doctr, 900),
+    'easyocr': (_easyocr, 1000),
+}
+
+
+class _Engine:
+    """Pool entry of one engine"""
+
+    def __init__(self, name, factory, estimate_bytes):
+        self.name = name
+        self.factory = factory
+        self.estimate_bytes = estimate_bytes
+        self.service = None
+        self.lock = threading.Lock()  # Held by the thread using the service
+        self.users = 0  # Threads holding or waiting for a handle
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.last_load_seconds = 0.0
+        self.total_load_seconds = 0.0
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'loaded': self.service is not None,
+            'in_use': self.users,
+            'resident_mb': round(self.resident_bytes / MB, 1),
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / requests, 4) if requests else None,
+            'last_load_seconds': round(self.last_load_seconds, 3),
+            'total_load_seconds': round(self.total_load_seconds, 3),
+        }
+
+
+class ModelPool:
+    """
+    Process-wide registry of warm OCR engines with an LRU memory budget
+    """
+
+    def __init__(self, engines=None, memory_budget_mb=None):
+        if memory_budget_mb is None:
+            memory_budget_mb = getattr(settings, 'OCR_MODEL_POOL_MEMORY_MB', DEFAULT_MEMORY_MB)
+        self.memory_budget = int(memory_budget_mb * MB)
+        self._lock = threading.Lock()  # Guards the entries and the LRU order
+        self._load_lock = threading.Lock()  # One engine load at a time
+        self._engines = {}
+        self._lru = OrderedDict()  # Loaded engine names, least recently used first
+        for name, (factory, estimate_mb) in (engines or ENGINES).items():
+            self.register(name, factory, estimate_mb)
+
+    def register(self, name, factory, estimate_mb=1000):
+        """Add (or replace) an engine factory"""
+        with self._lock:
+            self._engines[name] = _Engine(name, factory, int(estimate_mb * MB))
+
+    @contextmanager
+    def acquire(self, name):
+        """
+        Exclusive handle on a warm engine, loading it on first use
+
+        Raises KeyError for unknown engines and whatever the factory raises
+        if the engine cannot be loaded (nothing is cached in that case).
+        """
+        with self._lock:
+            engine = self._engines[name]
+            engine.users += 1
+        try:
+            with engine.lock:
+                service = engine.service
+                if service is None:
+                    service = self._load(engine)
+                    result = 'miss'
+                else:
+                    engine.hits += 1
+                    result = 'hit'
+                with self._lock:
+                    self._lru[name] = True
+                    self._lru.move_to_end(name)
+                if PROMETHEUS_AVAILABLE:
+                    MODEL_REQUESTS.labels(engine=name, result=result).inc()
+                yield service
+        finally:
+            with self._lock:
+                engine.users -= 1
+
+    def _load(self, engine):
+        """Build the engine's service (caller holds engine.lock)"""
+        with self._load_lock:
+            engine.misses += 1
+            self._make_room(engine.estimate_bytes if not engine.resident_bytes else engine.resident_bytes,
+                            keep=engine.name)
+
+            logger.info(f"Loading OCR engine '{engine.name}'")
+            rss_before = process_rss()
+            started = time.perf_counter()
+            service = engine.factory()
+            elapsed = time.perf_counter() - started
+            measured = process_rss() - rss_before
+
+            engine.service = service
+            engine.resident_bytes = measured if measured > 0 else engine.estimate_bytes
+            engine.loads += 1
+            engine.last_load_seconds = elapsed
+            engine.total_load_seconds += elapsed
+            logger.info(
+                f"OCR engine '{engine.name}' loaded in {elapsed:.2f}s "
+                f"(~{engine.resident_bytes / MB:.0f} MB resident)"
+            )
+            if PROMETHEUS_AVAILABLE:
+                MODEL_LOADS.labels(engine=engine.name).inc()
+                MODEL_LOAD_SECONDS.labels(engine=engine.name).observe(elapsed)
+                MODEL_RESIDENT_BYTES.labels(engine=engine.name).set(engine.resident_bytes)
+            return service
+
+    def _resident_total(self):
+        return sum(engine.resident_bytes for engine in self._engines.values() if engine.service is not None)
+
+    def _make_room(self, needed, keep=None):
+        """Evict idle engines, least recently used first, until `needed` more bytes fit"""
+        while True:
+            with self._lock:
+                if self._resident_total() + needed <= self.memory_budget:
+                    return
+                victim = next(
+                    (self._engines[name] for name in self._lru
+                     if name != keep and self._engines[name].users == 0),
+                    None
+                )
+                if victim is None:
+                    logger.warning(
+                        f"OCR model pool over budget ({(self._resident_total() + needed) / MB:.0f} MB "
+                        f"> {self.memory_budget / MB:.0f} MB) and every loaded engine is in use"
+                    )
+                    return
+                # No handle can be taken while users == 0 is seen under self._lock
+                # and the entry is out of the LRU
+                del self._lru[victim.name]
+                self._unload(victim)
+
+    def _unload(self, engine):
+        logger.info(f"Evicting OCR engine '{engine.name}' (~{engine.resident_bytes / MB:.0f} MB)")
+        engine.service = None
+        engine.evictions += 1
+        if PROMETHEUS_AVAILABLE:
+            MODEL_EVICTIONS.labels(engine=engine.name).inc()
+            MODEL_RESIDENT_BYTES.labels(engine=engine.name).set(0)
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+
+    def is_loaded(self, name):
+        with self._lock:
+            engine = self._engines.get(name)
+            return engine is not None and engine.service is not None
+
+    def estimate_mb(self, name):
+        """Resident MB the engine takes (measured once loaded, else the estimate)"""
+        with self._lock:
+            engine = self._engines[name]
+            return (engine.resident_bytes or engine.estimate_bytes) / MB
+
+    def evict(self, name=None):
+        """Unload one idle engine (or all idle engines)"""
+        with self._lock:
+            names = [name] if name else list(self._lru)
+            for engine_name in names:
+                engine = self._engines[engine_name]
+                if engine.service is not None and engine.users == 0:
+                    self._lru.pop(engine_name, None)
+                    self._unload(engine)
+
+    def stats(self):
+        with self._lock:
+            engines = {name: engine.stats() for name, engine in self._engines.items()}
+            hits = sum(engine.hits for engine in self._engines.values())
+            requests = hits + sum(engine.misses for engine in self._engines.values())
+            return {
+                'budget_mb': round(self.memory_budget / MB, 1),
+                'resident_mb': round(self._resident_total() / MB, 1),
+                'hit_rate': round(hits / requests, 4) if requests else None,
+                'engines': engines,
+            }
+
+
+model_pool = ModelPool()
@@ -219,6 +219,59 @@ class DocumentBatch(models.Model):
         return f"{self.batch_name} - {self.processed_documents}/{self.total_documents}"
 
 
+class OCRJobPriority(models.IntegerChoices):
+    INTERACTIVE = 0, 'Interactive upload'
+    BULK = 10, 'Bulk reprocess'
+
+
+class OCRJobStatus(models.TextChoices):
+    QUEUED = 'queued', 'Queued'
+    RUNNING = 'running', 'Running'
+
+
+class OCRJob(models.Model):
+    """Background OCR work item, claimed by process_ocr workers (see ocr_queue)"""
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, related_name='ocr_job')
+    priority = models.PositiveSmallIntegerField(choices=OCRJobPriority.choices, default=OCRJobPriority.INTERACTIVE)
+    status = models.CharField(max_length=10, choices=OCRJobStatus.choices, default=OCRJobStatus.QUEUED)
+
+    worker = models.CharField(max_length=100, blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['priority', 'created_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"OCR job {self.document_id} ({self.status}, priority {self.priority})"
+
+
+class OCRResultCacheEntry(models.Model):
+    """OCR result of one method for one image content (see result_cache)"""
+    content_hash = models.CharField(max_length=64)  # SHA-256 of the normalised pixels
+    perceptual_hash = models.CharField(max_length=16, blank=True, default='', db_index=True)
+    method = models.CharField(max_length=30)
+    engine_version = models.CharField(max_length=255)
+
+    result = models.JSONField()
+    size_bytes = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = [['content_hash', 'method', 'engine_version']]
+
+    def __str__(self):
+        return f"{self.method} result for {self.content_hash[:12]} ({self.hits} hits)"
+
+
 class OCRTemplate(models.Model):
     """Templates for parsing specific store/company receipts"""
     store_name = models.CharField(max_length=255, unique=True)
@@ -0,0 +1,371 @@
+"""
+OCR Work Queue - Claim-based background OCR
+Replaces the single-document polling loop of process_ocr with a queue
+table (OCRJob) served by a pool of worker threads:
+
+- jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number
+  of workers on any number of nodes take distinct documents
+- interactive uploads (priority 0) are claimed before bulk reprocessing
+  (priority 10), oldest first within a priority
+- the 'ocr_processing_paused' cache flag stops new claims; a document
+  aborted by a pause goes back to the queue instead of being failed
+- claims are leases: the dispatcher renews the claims of its running
+  documents, so only jobs of workers that stopped renewing (died) are
+  requeued after OCR_QUEUE_LEASE_SECONDS
+- workers sleep on PostgreSQL LISTEN/NOTIFY (documents_ocr_queue) and
+  wake as soon as a job is queued or OCR is resumed; other databases
+  fall back to checking every --interval seconds
+
+Uploads are queued by the post_save receiver below; callers that move
+documents back to 'processing' in bulk use enqueue() directly.
+"""
+
+import logging
+import os
+import queue
+import select
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Document, OCRJob, OCRJobPriority, OCRJobStatus, ProcessingStatus
+
+logger = logging.getLogger('documents.ocr_queue')
+
+NOTIFY_CHANNEL = 'documents_ocr_queue'
+PAUSE_KEY = 'ocr_processing_paused'
+
+# A running job whose claim was not renewed for this long belongs to a dead worker
+LEASE_SECONDS = getattr(settings, 'OCR_QUEUE_LEASE_SECONDS', 30 * 60)
+
+# Live workers renew their claims several times per lease
+RENEW_SECONDS = LEASE_SECONDS / 3
+
+# Memory one OCR worker needs (Tesseract + image preprocessing + model handles)
+WORKER_MEMORY_MB = getattr(settings, 'OCR_WORKER_MEMORY_MB', 1024)
+
+
+def is_paused():
+    return bool(cache.get(PAUSE_KEY, False))
+
+
+def _send_notify():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, ''])
+
+
+def notify():
+    """Wake idle workers once the current transaction commits"""
+    try:
+        transaction.on_commit(_send_notify)
+    except Exception as e:
+        logger.warning(f"Could not notify OCR workers: {e}")
+
+
+def enqueue(document_ids, priority=OCRJobPriority.INTERACTIVE):
+    """
+    Queue documents for background OCR
+
+    Already queued documents keep their place, but are moved up if the new
+    priority is more urgent.
+    """
+    document_ids = list(document_ids)
+    if not document_ids:
+        return
+    OCRJob.objects.bulk_create(
+        [OCRJob(document_id=document_id, priority=priority) for document_id in document_ids],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    OCRJob.objects.filter(
+        document_id__in=document_ids, status=OCRJobStatus.QUEUED, priority__gt=priority
+    ).update(priority=priority)
+    notify()
+
+
+def claim(worker):
+    """Take the most urgent queued job, or None"""
+    with transaction.atomic():
+        job = (
+            OCRJob.objects.select_for_update(skip_locked=True)
+            .filter(status=OCRJobStatus.QUEUED)
+            .order_by('priority', 'created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = OCRJobStatus.RUNNING
+        job.worker = worker
+        job.claimed_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=['status', 'worker', 'claimed_at', 'attempts'])
+        return job
+
+
+def release(job):
+    """Put a claimed job back in the queue"""
+    OCRJob.objects.filter(pk=job.pk).update(status=OCRJobStatus.QUEUED, worker='', claimed_at=None)
+
+
+def finish(job):
+    OCRJob.objects.filter(pk=job.pk).delete()
+
+
+def renew(worker):
+    """Extend the lease of the jobs a live worker is processing"""
+    return OCRJob.objects.filter(status=OCRJobStatus.RUNNING, worker=worker).update(claimed_at=timezone.now())
+
+
+def requeue_stale(lease_seconds=LEASE_SECONDS):
+    """Return jobs of workers that died mid-document to the queue"""
+    count = OCRJob.objects.filter(
+        status=OCRJobStatus.RUNNING,
+        claimed_at__lt=timezone.now() - timedelta(seconds=lease_seconds),
+    ).update(status=OCRJobStatus.QUEUED, worker='', claimed_at=None)
+    if count:
+        logger.warning(f"Requeued {count} stale OCR jobs")
+    return count
+
+
+def available_memory_mb():
+    try:
+        import psutil
+        return psutil.virtual_memory().available // (1024 * 1024)
+    except Exception:
+        pass
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except Exception:
+        pass
+    return None
+
+
+def default_worker_count():
+    """settings.OCR_WORKERS, else one per core as far as memory allows"""
+    configured = getattr(settings, 'OCR_WORKERS', None)
+    if configured:
+        return int(configured)
+    workers = os.cpu_count() or 1
+    memory = available_memory_mb()
+    if memory is not None:
+        workers = min(workers, memory // WORKER_MEMORY_MB)
+    return max(1, workers)
+
+
+@receiver(post_save, sender=Document)
+def enqueue_uploaded_document(sender, instance, created, **kwargs):
+    """New documents saved as 'processing' are waiting for background OCR"""
+    if created and instance.processing_status == ProcessingStatus.PROCESSING and not instance.is_deleted:
+        document_id = instance.pk
+        transaction.on_commit(lambda: enqueue([document_id], OCRJobPriority.INTERACTIVE))
+
+
+class OCRWorkQueue:
+    """
+    Dispatcher plus a fixed pool of OCR worker threads
+
+    The dispatcher claims jobs only while a worker is idle, so a node never
+    holds more claims than it can process; the rest stay available to
+    other nodes.
+    """
+
+    def __init__(self, workers=None, interval=30, report=None):
+        self.workers = workers or default_worker_count()
+        self.interval = interval
+        self.report = report or (lambda message, level='info': logger.info(message))
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.jobs = queue.Queue()
+        self._idle = self.workers
+        self._idle_lock = threading.Lock()
+        self._threads = []
+        self._renewed_at = time.monotonic()
+
+    # Dispatcher
+
+    def run(self):
+        requeue_stale()
+        self._start_listener()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'ocr-worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.report(f'{self.workers} ocr workers started on {self.name}', 'success')
+
+        paused = False
+        try:
+            while not self.stopping.is_set():
+                self.wake.clear()
+                if is_paused():
+                    if not paused:
+                        self.report('⏸️  OCR processing is PAUSED. Waiting...', 'warning')
+                        paused = True
+                else:
+                    if paused:
+                        self.report('▶️  OCR processing resumed', 'success')
+                        paused = False
+                    self._dispatch()
+                if not self.wake.wait(self.interval):
+                    requeue_stale()
+                self._renew_leases()
+        finally:
+            self.stop()
+
+    def _dispatch(self):
+        """Claim a job for every idle worker (or until the queue is empty)"""
+        while not is_paused():
+            with self._idle_lock:
+                if not self._idle:
+                    return
+            try:
+                job = claim(self.name)
+            except Exception as e:
+                logger.error(f'error claiming ocr job: {e}')
+                close_old_connections()
+                return
+            if job is None:
+                return
+            with self._idle_lock:
+                self._idle -= 1
+            self.jobs.put(job)
+
+    def _renew_leases(self):
+        """Keep the claims of documents still being processed from looking stale"""
+        if time.monotonic() - self._renewed_at < RENEW_SECONDS:
+            return
+        try:
+            renew(self.name)
+        except Exception as e:
+            logger.error(f'error renewing ocr job leases: {e}')
+            close_old_connections()
+            return
+        self._renewed_at = time.monotonic()
+
+    def stop(self):
+        """Let running documents finish, then stop the workers"""
+        self.stopping.set()
+        for _ in self._threads:
+            self.jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    # Workers
+
+    def _work(self):
+        from .ocr_service import OCRProcessor
+        processor = OCRProcessor()
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+                close_old_connections()
+                try:
+                    self.process(job, processor)
+                finally:
+                    with self._idle_lock:
+                        self._idle += 1
+                    self.wake.set()
+        finally:
+            connection.close()
+
+    def process(self, job, processor):
+        document = Document.objects.filter(pk=job.document_id).first()
+        if document is None or document.is_deleted or document.processing_status != ProcessingStatus.PROCESSING:
+            # Deleted, or processed elsewhere since it was queued
+            finish(job)
+            return
+
+        self.report(f'📄 processing: {document.original_filename} (id: {document.id})')
+        try:
+            result = processor.process_document(
+                document.file_path.path,
+                document_type=document.document_type,
+                force_ocr=True,
+                document_instance=document
+            )
+
+            if result and result.get('success'):
+                # OCR processor already saved the document with dual results
+                document.refresh_from_db()
+                if document.is_deleted:
+                    self.report('  ⚠ document was deleted during processing, skipping', 'warning')
+                else:
+                    self.report(
+                        f'  ✓ completed {document.id} (confidence: {document.ocr_confidence}%) - '
+                        f'Tesseract: {len(document.tesseract_text or "")} chars, '
+                        f'Ollama: {len(document.ollama_text or "")} chars',
+                        'success'
+                    )
+            elif is_paused():
+                # Aborted by a pause - keep the document queued
+                release(job)
+                self.report(f'  ⏸️  paused, {document.id} returned to the queue', 'warning')
+                return
+            else:
+                error_msg = result.get('error', 'Unknown error') if result else 'No result returned'
+                document.processing_status = ProcessingStatus.FAILED
+                document.save(update_fields=['processing_status'])
+                self.report(f'  ✗ failed {document.id}: {error_msg}', 'error')
+
+        except Exception as e:
+            logger.error(f'error processing document {document.id}: {e}')
+            self.report(f'  ✗ error {document.id}: {str(e)}', 'error')
+            try:
+                document.processing_status = ProcessingStatus.FAILED
+                document.save(update_fields=['processing_status'])
+            except Exception:
+                pass
+
+        finish(job)
+
+    # Wakeups
+
+    def _start_listener(self):
+        if connection.vendor != 'postgresql':
+            logger.info(f'no LISTEN/NOTIFY on {connection.vendor}, checking the queue every {self.interval}s')
+            return
+        thread = threading.Thread(target=self._listen, name='ocr-queue-listener', daemon=True)
+        thread.start()
+
+    def _listen(self):
+        """Set self.wake on every NOTIFY (dedicated autocommit connection)"""
+        while not self.stopping.is_set():
+            listener = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                listener.ensure_connection()
+                listener.set_autocommit(True)
+                with listener.cursor() as cursor:
+                    cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                pg = listener.connection
+                if not hasattr(pg, 'poll'):
+                    logger.info('database driver has no notification polling, using interval checks')
+                    return
+                # A notification may have been missed while (re)connecting
+                self.wake.set()
+                while not self.stopping.is_set():
+                    if select.select([pg], [], [], 5) == ([], [], []):
+                        continue
+                    pg.poll()
+                    if pg.notifies:
+                        del pg.notifies[:]
+                        self.wake.set()
+            except Exception as e:
+                logger.warning(f'ocr queue listener error, reconnecting: {e}')
+                self.stopping.wait(self.interval)
+            finally:
+                listener.close()
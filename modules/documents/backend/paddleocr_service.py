@@ -8,6 +8,8 @@ import logging
 from typing import Dict, Optional, List
 import os
 
+from .image_context import engine_input, image_exists
+
 logger = logging.getLogger('documents.paddleocr')
 
 
@@ -108,12 +110,12 @@ class PaddleOCRService:
             self.structure_available = False
             return False
 
-    def process_image(self, image_path: str) -> Dict:
+    def process_image(self, image_path) -> Dict:
         """
         Process image with PaddleOCR
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file or ImageContext
 
         Returns:
             Dictionary with OCR results
@@ -140,7 +142,7 @@ class PaddleOCRService:
 
         try:
             # Check if file exists
-            if not os.path.exists(image_path):
+            if not image_exists(image_path):
                 return {
                     'success': False,
                     'error': f'Image file not found: {image_path}',
@@ -151,7 +153,7 @@ class PaddleOCRService:
 
             # Run OCR (v3.3+ uses predict() and returns OCRResult object)
             logger.info(f"Running PaddleOCR on {image_path}")
-            result = self.ocr.predict(image_path, use_textline_orientation=True)
+            result = self.ocr.predict(engine_input(image_path), use_textline_orientation=True)
 
             # Process results (v3.3+ returns list with OCRResult dict-like object)
             if not result or len(result) == 0:
@@ -266,12 +268,12 @@ class PaddleOCRService:
                 'lines': []
             }
 
-    def get_text_with_layout(self, image_path: str) -> Dict:
+    def get_text_with_layout(self, image_path) -> Dict:
         """
         Get OCR text preserving spatial layout
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file or ImageContext
 
         Returns:
             Dictionary with text (preserving layout) and confidence
@@ -332,13 +334,13 @@ class PaddleOCRService:
 
         return layout_result
 
-    def analyze_structure(self, image_path: str) -> Dict:
+    def analyze_structure(self, image_path) -> Dict:
         """
         Analyze document structure using PP-Structure
         Detects layout elements (text, tables, figures, etc.)
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file or ImageContext
 
         Returns:
             Dictionary with structure analysis results
@@ -363,7 +365,7 @@ class PaddleOCRService:
 
         try:
             # Check if file exists
-            if not os.path.exists(image_path):
+            if not image_exists(image_path):
                 return {
                     'success': False,
                     'error': f'Image file not found: {image_path}',
@@ -373,7 +375,7 @@ class PaddleOCRService:
 
             # Run structure analysis
             logger.info(f"Running PP-Structure analysis on {image_path}")
-            result = self.structure_engine(image_path)
+            result = self.structure_engine(engine_input(image_path))
 
             # Process results
             if not result:
@@ -0,0 +1,257 @@
+"""
+OCR Result Cache - Content-addressed OCR results
+Results are keyed by what was recognised, not by which Document it was:
+re-uploads of the same receipt, refreshed analyses and the same image
+uploaded by different users reuse the result of every OCR method
+instead of running the engines again.
+
+- Key: SHA-256 of the normalised image (EXIF orientation applied, RGB
+  pixels + size, so re-saved files with other metadata still match)
+  + method + engine version (library versions, model names and
+  CACHE_VERSION), so upgrading an engine never serves stale output
+- A 64-bit difference hash (dHash) is stored with every entry; matching
+  on it alone (re-encoded JPEGs) is opt-in via
+  OCR_RESULT_CACHE_MATCH_PERCEPTUAL because visually similar receipts of
+  the same store can share a dHash
+- Entries live in the database (OCRResultCacheEntry); when their total
+  size exceeds OCR_RESULT_CACHE_MAX_MB the least recently used ones are
+  deleted
+- Hit/miss counts per method via stats() and, when prometheus_client is
+  installed, unibos_ocr_result_cache_requests_total
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from importlib import metadata
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .image_context import ImageContext
+from .models import OCRResultCacheEntry
+
+try:
+    from prometheus_client import Counter
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger('documents.result_cache')
+
+# Bump when the result format of the analysis methods changes
+CACHE_VERSION = 1
+
+MB = 1024 * 1024
+
+# Libraries and models whose versions decide a method's output
+ENGINE_COMPONENTS = {
+    'quality_assessment': ['opencv-python', 'numpy'],
+    'tesseract': ['pytesseract', 'tesseract'],
+    'paddleocr': ['paddleocr', 'paddlepaddle'],
+    'llama_vision': ['ollama:llama3.2-vision'],
+    'hybrid': ['paddleocr', 'paddlepaddle', 'ollama:llama3.2-vision'],
+    'trocr': ['transformers', 'torch', 'paddleocr', 'model:microsoft/trocr-base-printed'],
+    'donut': ['transformers', 'torch', 'model:naver-clova-ix/donut-base-finetuned-cord-v2'],
+    'layoutlmv3': ['transformers', 'torch', 'paddleocr', 'model:microsoft/layoutlmv3-base'],
+    'surya': ['surya-ocr'],
+    'doctr': ['python-doctr'],
+    'easyocr': ['easyocr'],
+    'ocrmypdf': ['ocrmypdf', 'tesseract'],
+}
+
+if PROMETHEUS_AVAILABLE:
+    RESULT_CACHE_REQUESTS = Counter(
+        'unibos_ocr_result_cache_requests_total', 'OCR result cache lookups', ['method', 'result']
+    )
+
+ImageFingerprint = namedtuple('ImageFingerprint', ['content_hash', 'perceptual_hash'])
+
+
+def difference_hash(image, size=8):
+    """64-bit dHash: brightness gradients of a 9x8 grayscale thumbnail"""
+    pixels = list(image.convert('L').resize((size + 1, size), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            offset = row * (size + 1) + col
+            bits = (bits << 1) | (pixels[offset] > pixels[offset + 1])
+    return f'{bits:016x}'
+
+
+def _pixel_fingerprint(image):
+    digest = hashlib.sha256(f'{image.width}x{image.height}:'.encode())
+    digest.update(image.tobytes())
+    return ImageFingerprint(digest.hexdigest(), difference_hash(image))
+
+
+def image_fingerprint(path):
+    """
+    ImageFingerprint of an image file or ImageContext; non-images (PDFs)
+    are hashed as bytes
+    """
+    if isinstance(path, ImageContext):
+        if path.is_image:
+            return _pixel_fingerprint(path.pil)
+        return ImageFingerprint(hashlib.sha256(path.raw).hexdigest(), '')
+
+    try:
+        with Image.open(path) as image:
+            return _pixel_fingerprint(ImageOps.exif_transpose(image).convert('RGB'))
+    except UnidentifiedImageError:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(MB), b''):
+                digest.update(block)
+        return ImageFingerprint(digest.hexdigest(), '')
+
+
+@lru_cache(maxsize=None)
+def _component_version(component):
+    if component.startswith(('model:', 'ollama:')):
+        return component
+    if component == 'tesseract':
+        try:
+            import pytesseract
+            return f'tesseract={pytesseract.get_tesseract_version()}'
+        except Exception:
+            return 'tesseract=missing'
+    try:
+        return f'{component}={metadata.version(component)}'
+    except metadata.PackageNotFoundError:
+        return f'{component}=missing'
+
+
+def engine_version(method):
+    components = ENGINE_COMPONENTS.get(method, [])
+    return ';'.join([f'v{CACHE_VERSION}'] + [_component_version(component) for component in components])[:255]
+
+
+class ResultCache:
+    """Database-backed, size-bounded LRU of OCR results"""
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'OCR_RESULT_CACHE_ENABLED', True)
+        self.max_bytes = int(getattr(settings, 'OCR_RESULT_CACHE_MAX_MB', 512) * MB)
+        self.match_perceptual = getattr(settings, 'OCR_RESULT_CACHE_MATCH_PERCEPTUAL', False)
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+
+    def fingerprint(self, path):
+        """ImageFingerprint or None (cache disabled / unreadable file)"""
+        if not self.enabled:
+            return None
+        try:
+            return image_fingerprint(path)
+        except Exception as e:
+            logger.warning(f"Could not fingerprint {path}: {e}")
+            return None
+
+    def _count(self, method, hit):
+        with self._lock:
+            counts = self._hits if hit else self._misses
+            counts[method] = counts.get(method, 0) + 1
+        if PROMETHEUS_AVAILABLE:
+            RESULT_CACHE_REQUESTS.labels(method=method, result='hit' if hit else 'miss').inc()
+
+    def get(self, fingerprint, method):
+        """Cached result dict, or None"""
+        if fingerprint is None:
+            return None
+        version = engine_version(method)
+        entries = OCRResultCacheEntry.objects.filter(method=method, engine_version=version)
+        entry = entries.filter(content_hash=fingerprint.content_hash).first()
+        if entry is None and self.match_perceptual and fingerprint.perceptual_hash:
+            entry = entries.filter(perceptual_hash=fingerprint.perceptual_hash).order_by('-last_used_at').first()
+        self._count(method, entry is not None)
+        if entry is None:
+            return None
+
+        OCRResultCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+        return entry.result
+
+    def put(self, fingerprint, method, result):
+        """Store a result (replacing an older one for the same key)"""
+        if fingerprint is None:
+            return
+        try:
+            payload = json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Not caching {method} result: {e}")
+            return
+        size = len(json.dumps(payload))
+        try:
+            OCRResultCacheEntry.objects.update_or_create(
+                content_hash=fingerprint.content_hash,
+                method=method,
+                engine_version=engine_version(method),
+                defaults={
+                    'perceptual_hash': fingerprint.perceptual_hash,
+                    'result': payload,
+                    'size_bytes': size,
+                    'last_used_at': timezone.now(),
+                },
+            )
+        except IntegrityError:
+            # Stored concurrently by another worker
+            return
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        total = OCRResultCacheEntry.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return 0
+
+        # Free a little extra so eviction does not run on every put
+        excess += self.max_bytes // 10
+        victims = []
+        oldest = OCRResultCacheEntry.objects.order_by('last_used_at').values_list('pk', 'size_bytes')
+        for pk, size in oldest.iterator(chunk_size=1000):
+            victims.append(pk)
+            excess -= size
+            if excess <= 0:
+                break
+        for start in range(0, len(victims), 1000):
+            OCRResultCacheEntry.objects.filter(pk__in=victims[start:start + 1000]).delete()
+        logger.info(f"Evicted {len(victims)} OCR result cache entries")
+        return len(victims)
+
+    def invalidate(self, fingerprint):
+        """Forget every method's result for an image"""
+        if fingerprint is not None:
+            OCRResultCacheEntry.objects.filter(content_hash=fingerprint.content_hash).delete()
+
+    def stats(self):
+        with self._lock:
+            methods = sorted(set(self._hits) | set(self._misses))
+            per_method = {
+                method: {
+                    'hits': self._hits.get(method, 0),
+                    'misses': self._misses.get(method, 0),
+                }
+                for method in methods
+            }
+        hits = sum(counts['hits'] for counts in per_method.values())
+        requests = hits + sum(counts['misses'] for counts in per_method.values())
+        for counts in per_method.values():
+            method_requests = counts['hits'] + counts['misses']
+            counts['hit_rate'] = round(counts['hits'] / method_requests, 4) if method_requests else None
+        return {
+            'hits': hits,
+            'misses': requests - hits,
+            'hit_rate': round(hits / requests, 4) if requests else None,
+            'methods': per_method,
+        }
+
+
+result_cache = ResultCache()
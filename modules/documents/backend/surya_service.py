@@ -4,11 +4,12 @@ Surya is a comprehensive OCR toolkit that handles text detection, recognition, a
 Supports 90+ languages with high accuracy
 """
 
-from PIL import Image
 import logging
 from typing import Dict, List, Optional, Tuple
 import re
 
+from .image_context import load_rgb
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,12 +50,12 @@ class SuryaOCRService:
         """Check if Surya OCR is available"""
         return self.is_available_flag
 
-    def process_image(self, image_path: str) -> Dict:
+    def process_image(self, image_path) -> Dict:
         """
         Process image with Surya OCR
 
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file or ImageContext
 
         Returns:
             Dictionary containing OCR results
@@ -70,9 +71,7 @@ class SuryaOCRService:
 
         try:
             # Load image
-            image = Image.open(image_path)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+            image = load_rgb(image_path)
 
             # Use new predictor API (only API supported in surya-ocr 0.17+)
             # Recognition predictor handles both detection and recognition internally
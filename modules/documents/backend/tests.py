@@ -0,0 +1,465 @@
+"""
+Tests for documents module
+"""
+
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageDraw, PngImagePlugin
+
+from .analysis_service import OCRAnalysisService
+from .method_executor import GIL_BOUND, IO_BOUND, NATIVE, AdmissionController, MethodExecutor
+from .model_pool import ModelPool
+from .models import Document, OCRJob, OCRJobPriority, OCRJobStatus, OCRResultCacheEntry, ProcessingStatus
+from .ocr_queue import LEASE_SECONDS, OCRWorkQueue, claim, enqueue, renew, requeue_stale
+from .result_cache import ResultCache, image_fingerprint
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def receipt_png(note=''):
+    """The same receipt pixels; `note` only changes the PNG metadata"""
+    image = Image.new('RGB', (300, 400), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.text((20, 20), 'MIGROS', fill='black')
+    draw.text((20, 60), 'TOPLAM *42,50', fill='black')
+    info = PngImagePlugin.PngInfo()
+    info.add_text('note', note)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', pnginfo=info)
+    return buffer.getvalue()
+
+
+class InlineExecutor:
+    """
+    ThreadPoolExecutor stand-in running each task on the calling thread, so
+    the analysis writes through the test's transaction instead of worker
+    thread connections
+    """
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ResultCacheTests(TestCase):
+    """Content-addressed OCR result cache"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.cache = ResultCache()
+        self.engine_calls = 0
+
+    def upload(self, username, content):
+        user = User.objects.create_user(username=username, email=f'{username}@example.com', password='testpass')
+        return Document.objects.create(
+            user=user,
+            original_filename='receipt.png',
+            file_path=SimpleUploadedFile('receipt.png', content, content_type='image/png'),
+            processing_status='completed',
+        )
+
+    def slow_engine(self, document):
+        self.engine_calls += 1
+        time.sleep(0.3)
+        return {'status': 'success', 'text': 'MIGROS TOPLAM 42,50', 'confidence': 90, 'processing_time': 0.3}
+
+    def analyze(self, document, force_refresh=False):
+        with patch('modules.documents.backend.result_cache.result_cache', self.cache), \
+                patch('modules.documents.backend.analysis_service.ThreadPoolExecutor', InlineExecutor), \
+                patch.object(OCRAnalysisService, '_analyze_paddleocr', lambda service, doc, image=None: self.slow_engine(doc)), \
+                patch.object(OCRAnalysisService, '_send_websocket_message'), \
+                patch('modules.documents.backend.image_quality_service.ImageQualityService.assess_quality',
+                      return_value={'success': True, 'preprocessing_needed': {}}):
+            start = time.perf_counter()
+            results = OCRAnalysisService().analyze_document(
+                document, force_refresh=force_refresh, methods_to_run=['paddleocr']
+            )
+            return results, time.perf_counter() - start
+
+    def test_duplicate_upload_skips_engines(self):
+        first, first_seconds = self.analyze(self.upload('alice', receipt_png('scan 1')))
+        # Same pixels in a different file, uploaded by someone else
+        second, second_seconds = self.analyze(self.upload('bob', receipt_png('scan 2')))
+
+        self.assertEqual(self.engine_calls, 1)
+        self.assertEqual(second['paddleocr']['text'], first['paddleocr']['text'])
+        self.assertTrue(second['paddleocr']['from_result_cache'])
+        self.assertLess(second_seconds, first_seconds / 4)
+        self.assertEqual(self.cache.stats()['methods']['paddleocr'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_engine_upgrade_misses(self):
+        document = self.upload('carol', receipt_png())
+        self.analyze(document)
+        with patch('modules.documents.backend.result_cache.CACHE_VERSION', 2):
+            # force_refresh: skip the results stored on the document by the first run
+            self.analyze(document, force_refresh=True)
+        self.assertEqual(self.engine_calls, 2)
+
+    def test_lru_eviction(self):
+        fingerprint = image_fingerprint(io.BytesIO(receipt_png()))
+        self.cache.max_bytes = 2000
+        for i in range(20):
+            self.cache.put(fingerprint._replace(content_hash=f'{i:064x}'), 'tesseract', {'text': 'x' * 200})
+            # Keep the first entry in use
+            self.cache.get(fingerprint._replace(content_hash=f'{0:064x}'), 'tesseract')
+
+        self.assertLessEqual(
+            sum(OCRResultCacheEntry.objects.values_list('size_bytes', flat=True)), self.cache.max_bytes
+        )
+        self.assertIsNotNone(self.cache.get(fingerprint._replace(content_hash=f'{0:064x}'), 'tesseract'))
+        self.assertIsNone(self.cache.get(fingerprint._replace(content_hash=f'{1:064x}'), 'tesseract'))
+
+
+def create_documents(user, count, status=ProcessingStatus.PENDING):
+    # Pending by default: 'processing' documents are queued by the upload receiver on commit
+    return [
+        Document.objects.create(user=user, original_filename=f'receipt_{i}.png',
+                                file_path=f'documents/receipt_{i}.png', processing_status=status)
+        for i in range(count)
+    ]
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class OCRQueueTests(TestCase):
+    """Claim-based OCR work queue"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='queue', email='queue@example.com', password='testpass')
+
+    def test_claim_order(self):
+        bulk, late, early = create_documents(self.user, 3)
+        enqueue([bulk.id], OCRJobPriority.BULK)
+        enqueue([late.id, early.id], OCRJobPriority.INTERACTIVE)
+        OCRJob.objects.filter(document=early).update(created_at=timezone.now() - timedelta(hours=1))
+
+        claimed = [claim('node-1:1') for _ in range(3)]
+
+        # Interactive before bulk, oldest first within a priority
+        self.assertEqual([job.document_id for job in claimed], [early.id, late.id, bulk.id])
+        self.assertIsNone(claim('node-1:1'))
+        job = OCRJob.objects.get(pk=claimed[0].pk)
+        self.assertEqual((job.status, job.worker, job.attempts), (OCRJobStatus.RUNNING, 'node-1:1', 1))
+        self.assertIsNotNone(job.claimed_at)
+
+    def test_enqueue_moves_queued_jobs_up(self):
+        running, waiting, new = create_documents(self.user, 3)
+        enqueue([running.id], OCRJobPriority.BULK)
+        claim('node-1:1')
+        enqueue([waiting.id], OCRJobPriority.BULK)
+
+        enqueue([running.id, waiting.id, new.id], OCRJobPriority.INTERACTIVE)
+        # A later bulk request does not move anything down
+        enqueue([new.id], OCRJobPriority.BULK)
+
+        jobs = {job.document_id: job for job in OCRJob.objects.all()}
+        self.assertEqual(len(jobs), 3)
+        self.assertEqual(jobs[waiting.id].priority, OCRJobPriority.INTERACTIVE)
+        self.assertEqual(jobs[new.id].priority, OCRJobPriority.INTERACTIVE)
+        # Already claimed: keeps its claim and priority
+        self.assertEqual(jobs[running.id].priority, OCRJobPriority.BULK)
+        self.assertEqual(jobs[running.id].status, OCRJobStatus.RUNNING)
+
+    def test_requeue_stale(self):
+        dead, alive = create_documents(self.user, 2)
+        enqueue([dead.id, alive.id])
+        stale = claim('node-1:1')
+        claim('node-2:1')
+        OCRJob.objects.filter(pk=stale.pk).update(claimed_at=timezone.now() - timedelta(seconds=LEASE_SECONDS + 60))
+
+        self.assertEqual(requeue_stale(), 1)
+        job = OCRJob.objects.get(pk=stale.pk)
+        self.assertEqual((job.status, job.worker, job.claimed_at), (OCRJobStatus.QUEUED, '', None))
+        self.assertEqual(OCRJob.objects.filter(status=OCRJobStatus.RUNNING).count(), 1)
+
+    def test_renewed_claims_are_not_requeued(self):
+        """A document still being OCR'd past the lease stays with its worker"""
+        slow, = create_documents(self.user, 1)
+        enqueue([slow.id])
+        job = claim('node-1:1')
+        OCRJob.objects.filter(pk=job.pk).update(claimed_at=timezone.now() - timedelta(seconds=LEASE_SECONDS + 60))
+
+        self.assertEqual(renew('node-1:1'), 1)
+        self.assertEqual(requeue_stale(), 0)
+        self.assertEqual(OCRJob.objects.get(pk=job.pk).worker, 'node-1:1')
+
+    @patch('modules.documents.backend.ocr_queue.is_paused', return_value=True)
+    def test_pause_returns_job_to_queue(self, is_paused):
+        document, = create_documents(self.user, 1, status=ProcessingStatus.PROCESSING)
+        enqueue([document.id])
+        job = claim('node-1:1')
+        processor = MagicMock()
+        processor.process_document.return_value = {'success': False, 'error': 'OCR paused'}
+
+        OCRWorkQueue(workers=1, report=lambda message, level='info': None).process(job, processor)
+
+        job = OCRJob.objects.get(document=document)
+        self.assertEqual((job.status, job.worker, job.claimed_at), (OCRJobStatus.QUEUED, '', None))
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, ProcessingStatus.PROCESSING)
+
+    def test_bulk_reprocess_response(self):
+        mine = create_documents(self.user, 2, status=ProcessingStatus.COMPLETED)
+        other_user = User.objects.create_user(username='other', email='other@example.com', password='testpass')
+        theirs, = create_documents(other_user, 1, status=ProcessingStatus.COMPLETED)
+        self.client.force_login(self.user)
+
+        response = self.client.post(
+            reverse('documents:bulk_reprocess'),
+            data=json.dumps({'document_ids': [str(document.id) for document in mine + [theirs]]}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.json(), {'success': True, 'queued': 2})
+        self.assertEqual(
+            set(OCRJob.objects.filter(priority=OCRJobPriority.BULK).values_list('document_id', flat=True)),
+            {document.id for document in mine}
+        )
+        self.assertEqual(
+            Document.objects.filter(processing_status=ProcessingStatus.PROCESSING).count(), 2
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SKIP LOCKED needs PostgreSQL')
+class OCRQueueLockingTests(TransactionTestCase):
+    """Claims of concurrent workers"""
+
+    def test_claim_skips_locked_job(self):
+        user = User.objects.create_user(username='locking', email='locking@example.com', password='testpass')
+        first, second = create_documents(user, 2)
+        enqueue([first.id, second.id])
+        OCRJob.objects.filter(document=first).update(created_at=timezone.now() - timedelta(minutes=1))
+
+        locked = threading.Event()
+        release = threading.Event()
+
+        def other_worker():
+            # Holds the row lock of the most urgent job, as a claim in progress on another node
+            try:
+                with transaction.atomic():
+                    OCRJob.objects.select_for_update().get(document=first)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            job = claim('node-1:1')
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(job.document_id, second.id)
+        self.assertEqual(OCRJob.objects.get(document=first).status, OCRJobStatus.QUEUED)
+
+
+class AdmissionControllerTests(unittest.TestCase):
+    """Memory admission of analysis methods"""
+
+    def test_waits_until_reservation_fits(self):
+        admission = AdmissionController(budget_mb=1000)
+        started = threading.Event()
+        admitted = threading.Event()
+
+        def second_method():
+            started.set()
+            with admission.admit(400):
+                admitted.set()
+
+        with admission.admit(700):
+            thread = threading.Thread(target=second_method)
+            thread.start()
+            started.wait(5)
+            # 700 + 400 MB does not fit the budget
+            self.assertFalse(admitted.wait(0.2))
+        thread.join(5)
+
+        self.assertTrue(admitted.is_set())
+        stats = admission.stats()
+        self.assertEqual((stats['admitted'], stats['waited'], stats['running']), (2, 1, 0))
+        self.assertEqual(stats['peak_reserved_mb'], 700)
+
+    def test_oversized_method_runs_alone(self):
+        admission = AdmissionController(budget_mb=1000)
+        with admission.admit(5000):
+            self.assertEqual(admission.stats()['reserved_mb'], 5000)
+        self.assertEqual(admission.stats()['waited'], 0)
+
+
+class UnpicklablePool:
+    """Process pool stand-in failing like ProcessPoolExecutor on arguments it cannot pickle"""
+
+    def submit(self, fn, *args):
+        import pickle
+        future = Future()
+        try:
+            pickle.dumps(args)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(fn(*args))
+        return future
+
+
+class MethodExecutorTests(unittest.TestCase):
+    """Lane routing of analysis methods"""
+
+    METHODS = {'parse': (GIL_BOUND, []), 'vision': (IO_BOUND, []), 'engine': (NATIVE, [])}
+
+    def executor(self, **options):
+        return MethodExecutor(methods=self.METHODS, admission=AdmissionController(budget_mb=100000), **options)
+
+    def test_lanes_and_overrides(self):
+        executor = self.executor()
+        self.assertEqual([executor.lane(name) for name in ('parse', 'vision', 'engine')], [GIL_BOUND, IO_BOUND, NATIVE])
+        # Unknown methods only wait, they are not sent to the pool
+        self.assertEqual(executor.lane('new_engine'), IO_BOUND)
+
+        with override_settings(OCR_METHOD_EXECUTION={'engine': GIL_BOUND, 'extra': NATIVE}):
+            executor = self.executor()
+        self.assertEqual(executor.lane('engine'), GIL_BOUND)
+        self.assertEqual(executor.lane('extra'), NATIVE)
+
+        with override_settings(OCR_METHOD_EXECUTION={'engine': 'gpu'}):
+            with self.assertRaises(ValueError):
+                self.executor()
+
+    def test_native_slots_limit_concurrency(self):
+        executor = self.executor(native_concurrency=2)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def engine(document, image):
+            with lock:
+                running.append(document)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(document)
+            return {'status': 'success', 'document': document}
+
+        threads = [
+            threading.Thread(target=executor.run, args=('engine', engine, number, None)) for number in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(executor.stats()['runs'][NATIVE], 6)
+
+    def test_io_lane_runs_on_calling_thread(self):
+        executor = self.executor()
+        result = executor.run('vision', lambda document, image: threading.current_thread(), 'document', None)
+        self.assertIs(result, threading.current_thread())
+
+    def test_unpicklable_arguments_run_in_thread(self):
+        executor = self.executor()
+        image = threading.Lock()  # Cannot be sent to a pool worker (TypeError)
+
+        with patch.object(executor, '_pool', return_value=UnpicklablePool()):
+            result = executor.run('parse', lambda document, image: {'status': 'success'}, 'document', image)
+
+        self.assertEqual(result, {'status': 'success'})
+        self.assertEqual(executor.stats()['process_fallbacks'], 1)
+
+
+@patch('modules.documents.backend.model_pool.process_rss', return_value=0)
+class ModelPoolTests(unittest.TestCase):
+    """Warm engine pool with an LRU memory budget"""
+
+    def pool(self, budget_mb=250, **factories):
+        # process_rss is patched to 0, so each engine counts as its 100 MB estimate
+        return ModelPool(engines={name: (factory, 100) for name, factory in factories.items()},
+                         memory_budget_mb=budget_mb)
+
+    def test_eviction_skips_engines_in_use(self, process_rss):
+        pool = self.pool(a=object, b=object, c=object)
+        with pool.acquire('a'):
+            with pool.acquire('b'):
+                pass
+            # 'a' is the least recently used engine, but it is in use
+            with pool.acquire('c'):
+                pass
+            self.assertTrue(pool.is_loaded('a'))
+        self.assertFalse(pool.is_loaded('b'))
+        self.assertTrue(pool.is_loaded('c'))
+        self.assertEqual(pool.stats()['engines']['b']['evictions'], 1)
+        self.assertLessEqual(pool.stats()['resident_mb'], 250)
+
+    def test_failed_load_is_not_cached(self, process_rss):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError('model download failed')
+            return object()
+
+        pool = self.pool(flaky=flaky)
+        with self.assertRaises(RuntimeError):
+            with pool.acquire('flaky'):
+                pass
+        self.assertFalse(pool.is_loaded('flaky'))
+        self.assertEqual(pool.stats()['engines']['flaky']['in_use'], 0)
+
+        with pool.acquire('flaky') as service:
+            self.assertIsNotNone(service)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(pool.stats()['engines']['flaky']['loads'], 1)
+
+    def test_hit_and_miss_stats(self, process_rss):
+        pool = self.pool(a=object, b=object)
+        with pool.acquire('a') as first:
+            pass
+        with pool.acquire('a') as second:
+            self.assertIs(second, first)
+        with pool.acquire('b'):
+            pass
+
+        stats = pool.stats()
+        self.assertEqual(
+            (stats['engines']['a']['hits'], stats['engines']['a']['misses'], stats['engines']['a']['loads']), (1, 1, 1)
+        )
+        self.assertEqual(stats['engines']['b']['hit_rate'], 0.0)
+        self.assertEqual(stats['hit_rate'], round(1 / 3, 4))
@@ -6,8 +6,8 @@ Especially good for handwritten text and poor quality scans
 
 import logging
 from typing import Dict, Optional
-import os
 from PIL import Image
+from .image_context import image_exists, load_rgb
 from .receipt_field_extractor import ReceiptFieldExtractor
 
 logger = logging.getLogger('documents.trocr')
@@ -96,12 +96,12 @@ class TrOCRService:
             self.available = False
             return False
 
-    def process_image(self, image_path: str, max_length: int = 512) -> Dict:
+    def process_image(self, image_path, max_length: int = 512) -> Dict:
         """
         Process image with TrOCR
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file or ImageContext
             max_length: Maximum number of tokens to generate (default: 512)
 
         Returns:
@@ -127,7 +127,7 @@ class TrOCRService:
 
         try:
             # Check if file exists
-            if not os.path.exists(image_path):
+            if not image_exists(image_path):
                 return {
                     'success': False,
                     'error': f'Image file not found: {image_path}',
@@ -137,31 +137,8 @@ class TrOCRService:
 
             # Load image
             logger.info(f"Processing image with TrOCR: {image_path}")
-            image = Image.open(image_path).convert('RGB')
-
-            # Prepare image for model
-            pixel_values = self.processor(image, return_tensors="pt").pixel_values
-
-            # Move to same device as model
-            try:
-                import torch
-                if torch.cuda.is_available():
-                    pixel_values = pixel_values.to('cuda')
-                elif torch.backends.mps.is_available():
-                    pixel_values = pixel_values.to('mps')
-            except Exception:
-                pass  # Stay on CPU
-
-            # Generate text
-            generated_ids = self.model.generate(
-                pixel_values,
-                max_length=max_length,
-                num_beams=5,  # Beam search for better quality
-                early_stopping=True
-            )
-
-            # Decode generated text
-            generated_text = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+            image = load_rgb(image_path)
+            generated_text = self._generate_text(image, max_length)
 
             # TrOCR doesn't provide confidence scores directly
             # We'll estimate based on output length and quality
@@ -195,13 +172,39 @@ class TrOCRService:
                 'confidence': 0
             }
 
-    def process_image_regions(self, image_path: str, regions: list) -> Dict:
+    def _generate_text(self, image: Image.Image, max_length: int = 512) -> str:
+        """Run TrOCR on an RGB PIL image and return the decoded text"""
+        # Prepare image for model
+        pixel_values = self.processor(image, return_tensors="pt").pixel_values
+
+        # Move to same device as model
+        try:
+            import torch
+            if torch.cuda.is_available():
+                pixel_values = pixel_values.to('cuda')
+            elif torch.backends.mps.is_available():
+                pixel_values = pixel_values.to('mps')
+        except Exception:
+            pass  # Stay on CPU
+
+        # Generate text
+        generated_ids = self.model.generate(
+            pixel_values,
+            max_length=max_length,
+            num_beams=5,  # Beam search for better quality
+            early_stopping=True
+        )
+
+        # Decode generated text
+        return self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+
+    def process_image_regions(self, image_path, regions: list) -> Dict:
         """
         Process multiple regions of an image separately
         Useful when combined with layout detection
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file or ImageContext
             regions: List of bounding boxes [(x1, y1, x2, y2), ...]
 
         Returns:
@@ -214,33 +217,37 @@ class TrOCRService:
                 'regions': []
             }
 
+        # Initialize model if not done
+        if self.model is None or self.processor is None:
+            if not self.initialize_model():
+                return {
+                    'success': False,
+                    'error': 'Failed to initialize TrOCR model',
+                    'regions': []
+                }
+
         try:
             # Load full image
-            image = Image.open(image_path).convert('RGB')
+            image = load_rgb(image_path)
 
             results = []
             for i, (x1, y1, x2, y2) in enumerate(regions):
-                # Crop region
+                # Crop region (in memory, no temp file per region)
                 region_img = image.crop((x1, y1, x2, y2))
 
-                # Save to temp file
-                temp_path = f"/tmp/trocr_region_{i}.png"
-                region_img.save(temp_path)
-
                 # Process region
-                result = self.process_image(temp_path)
+                try:
+                    text = self._generate_text(region_img)
+                    confidence = self._estimate_confidence(text)
+                except Exception as e:
+                    logger.error(f"TrOCR region {i} error: {e}")
+                    text, confidence = '', 0
                 results.append({
                     'bbox': (x1, y1, x2, y2),
-                    'text': result.get('text', ''),
-                    'confidence': result.get('confidence', 0)
+                    'text': text,
+                    'confidence': confidence
                 })
 
-                # Clean up temp file
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
-
             # Combine all region texts
             full_text = '\n'.join(r['text'] for r in results if r['text'])
             avg_confidence = sum(r['confidence'] for r in results) / len(results) if results else 0